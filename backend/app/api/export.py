@@ -5,26 +5,53 @@ API endpoints para exportar PDF final.
 from fastapi import APIRouter, HTTPException, Query
 from fastapi.responses import FileResponse
 
-from ..config import PROJECTS_DIR, DEFAULT_DPI
+from ..config import PROJECTS_DIR, DEFAULT_DPI, EXPORT_MODES
 from ..db.repository import projects_repo
-from ..services import export_service
+from ..services import export_service, export_vector, executors
 
 router = APIRouter()
 
 
+def _check_mode(mode: str):
+    if mode not in EXPORT_MODES:
+        raise HTTPException(status_code=400, detail=f"Invalid mode: {mode}")
+
+
+def _export_path(project_dir, dpi: int, mode: str):
+    name = "export_vector.pdf" if mode == "vector" else f"export_{dpi}.pdf"
+    return project_dir / "export" / name
+
+
 @router.post("/pdf")
 async def export_pdf(
     project_id: str,
     dpi: int = Query(default=DEFAULT_DPI),
+    mode: str = Query(default="raster"),
 ):
-    """Genera el PDF final con las páginas traducidas."""
+    """
+    Genera el PDF final con las páginas traducidas (síncrono; para proyectos
+    grandes usar el job POST /jobs/export/async).
+
+    mode="raster" une las imágenes compuestas a dpi; mode="vector" dibuja
+    regiones y dibujos como texto y trazos PDF sobre src.pdf (dpi no aplica).
+    """
+    _check_mode(mode)
     project = projects_repo.get(project_id)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     
     project_dir = PROJECTS_DIR / project_id
+
+    if mode == "vector":
+        output_path = await executors.run_cpu(
+            export_vector.export_vector_pdf,
+            project_dir,
+            export_vector.vector_export_pages(project_id, project.page_count),
+        )
+        return {"status": "ok", "path": str(output_path)}
     
-    output_path = export_service.export_pdf(
+    output_path = await executors.run_cpu(
+        export_service.export_pdf,
         project_dir,
         project.page_count,
         dpi,
@@ -34,14 +61,19 @@ async def export_pdf(
 
 
 @router.get("/pdf/file")
-async def download_pdf(project_id: str, dpi: int = Query(default=DEFAULT_DPI)):
+async def download_pdf(
+    project_id: str,
+    dpi: int = Query(default=DEFAULT_DPI),
+    mode: str = Query(default="raster"),
+):
     """Descarga el PDF exportado."""
+    _check_mode(mode)
     project = projects_repo.get(project_id)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     
     project_dir = PROJECTS_DIR / project_id
-    pdf_path = project_dir / "export" / f"export_{dpi}.pdf"
+    pdf_path = _export_path(project_dir, dpi, mode)
     
     if not pdf_path.exists():
         raise HTTPException(status_code=404, detail="Exported PDF not found")
@@ -9,6 +9,7 @@ from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 
 from ..db.repository import projects_repo, glossary_repo, text_regions_repo, global_glossary_repo
+from ..services.region_translation import build_glossary_map
 
 logger = logging.getLogger(__name__)
 
@@ -104,17 +105,8 @@ async def apply_glossary(project_id: str):
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     
-    global_entries = global_glossary_repo.list_all()
-    glossary_map = {e.src_term: e.tgt_term for e in global_entries if e.locked}
-
-    local_entries = glossary_repo.list_by_project(project_id)
-    for e in local_entries:
-        if not e.locked:
-            continue
-        if e.src_term in glossary_map:
-            continue
-        glossary_map[e.src_term] = e.tgt_term
-    
+    glossary_map = build_glossary_map(project_id)
+
     updated_count = 0
     for page_num in range(project.page_count):
         regions = text_regions_repo.list_by_page(project_id, page_num)
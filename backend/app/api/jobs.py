@@ -6,9 +6,9 @@ from fastapi import APIRouter, HTTPException, BackgroundTasks, Query
 from pydantic import BaseModel
 from typing import Optional
 
-from ..config import DEFAULT_DPI
+from ..config import DEFAULT_DPI, EXPORT_MODES, RENDER_ALL_MODES
 from ..db.repository import projects_repo
-from ..services import job_service
+from ..services import job_service, render_pipeline
 
 router = APIRouter()
 
@@ -19,6 +19,18 @@ class JobResponse(BaseModel):
     progress: float
     current_step: Optional[str]
     error: Optional[str]
+    result: Optional[str] = None
+
+
+def _job_response(job) -> JobResponse:
+    return JobResponse(
+        id=job.id,
+        status=job.status,
+        progress=job.progress,
+        current_step=job.current_step,
+        error=job.error,
+        result=job.result,
+    )
 
 
 @router.post("/render-all/async", response_model=JobResponse)
@@ -26,22 +38,49 @@ async def start_render_all(
     project_id: str,
     background_tasks: BackgroundTasks,
     dpi: int = Query(default=DEFAULT_DPI),
+    mode: Optional[str] = Query(default=None, description="sequential | pipeline | batched (default: config)"),
 ):
     """Inicia un job para renderizar todas las páginas (original + OCR + traducción)."""
     project = projects_repo.get(project_id)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
+    if mode is not None and mode not in RENDER_ALL_MODES:
+        raise HTTPException(status_code=400, detail=f"Invalid mode: {mode}")
     
     job = job_service.create_job(project_id, "render_all")
-    background_tasks.add_task(job_service.run_render_all, job.id, project_id, dpi)
+    background_tasks.add_task(render_pipeline.run_render_all, job.id, project_id, dpi, mode)
     
-    return JobResponse(
-        id=job.id,
-        status=job.status,
-        progress=job.progress,
-        current_step=job.current_step,
-        error=job.error,
-    )
+    return _job_response(job)
+
+
+@router.post("/export/async", response_model=JobResponse)
+async def start_export(
+    project_id: str,
+    background_tasks: BackgroundTasks,
+    dpi: int = Query(default=DEFAULT_DPI),
+    mode: str = Query(default="raster", description="raster | vector"),
+):
+    """Inicia un job de exportación a PDF; al completarse, result es la ruta del PDF."""
+    project = projects_repo.get(project_id)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    if mode not in EXPORT_MODES:
+        raise HTTPException(status_code=400, detail=f"Invalid mode: {mode}")
+
+    job = job_service.create_job(project_id, "export")
+    background_tasks.add_task(job_service.run_export, job.id, project_id, dpi, mode)
+    return _job_response(job)
+
+
+@router.post("/{job_id}/cancel", response_model=JobResponse)
+async def cancel_job(project_id: str, job_id: str):
+    """Pide cancelar un job (solo exportaciones); el estado pasa a cancelled al detenerse."""
+    job = job_service.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job.job_type not in job_service.CANCELLABLE_JOB_TYPES:
+        raise HTTPException(status_code=409, detail=f"Job type {job.job_type} cannot be cancelled")
+    return _job_response(job_service.cancel_job(job_id))
 
 
 @router.get("/{job_id}", response_model=JobResponse)
@@ -51,10 +90,4 @@ async def get_job_status(project_id: str, job_id: str):
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
     
-    return JobResponse(
-        id=job.id,
-        status=job.status,
-        progress=job.progress,
-        current_step=job.current_step,
-        error=job.error,
-    )
+    return _job_response(job)
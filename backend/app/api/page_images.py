@@ -0,0 +1,135 @@
+"""
+API endpoints de imágenes de página: PNG completa, pirámide de teselas y
+thumbnails.
+"""
+
+from pathlib import Path
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import FileResponse, JSONResponse
+
+from ..config import PROJECTS_DIR, DEFAULT_DPI
+from ..db.repository import projects_repo
+from ..services import render_service, executors, tile_service
+
+router = APIRouter()
+
+# Teselas en su versión actual: la URL (con v) no cambia de contenido nunca
+_IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+async def _page_image_path(project_id: str, page_number: int, kind: str, dpi: int) -> Path:
+    """PNG de la página (original o traducida); la original se renderiza bajo demanda si falta."""
+    project = projects_repo.get(project_id)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    
+    project_dir = PROJECTS_DIR / project_id
+    
+    if kind == "original":
+        image_path = render_service.page_path(project_dir, page_number, dpi)
+        # Render (o derivado de un DPI mayor) bajo demanda si no existe
+        if not image_path.exists():
+            pdf_path = project_dir / "src.pdf"
+            if pdf_path.exists():
+                await executors.run_cpu(
+                    render_service.ensure_page, pdf_path, page_number, dpi, project_dir, project.color_mode,
+                )
+            else:
+                raise HTTPException(status_code=404, detail="PDF source not found")
+    elif kind == "translated":
+        image_path = project_dir / "pages" / f"{page_number:03d}_translated_{dpi}.png"
+    else:
+        raise HTTPException(status_code=400, detail="Invalid kind")
+    
+    if not image_path.exists():
+        raise HTTPException(status_code=404, detail="Image not found")
+    return image_path
+
+
+@router.get("/{page_number}/image")
+async def get_page_image(
+    project_id: str,
+    page_number: int,
+    kind: str = Query(default="original"),
+    dpi: int = Query(default=DEFAULT_DPI),
+):
+    """Obtiene la imagen de una página (original o traducida).
+    Si la imagen original no existe, la renderiza bajo demanda."""
+    image_path = await _page_image_path(project_id, page_number, kind, dpi)
+    return FileResponse(image_path, media_type="image/png")
+
+
+def _check_tile_size(tile_size: int) -> None:
+    if tile_size not in tile_service.TILE_SIZES:
+        sizes = ", ".join(str(size) for size in tile_service.TILE_SIZES)
+        raise HTTPException(status_code=400, detail=f"tile_size must be one of {sizes}")
+
+
+@router.get("/{page_number}/tiles")
+async def get_tiles_info(
+    project_id: str,
+    page_number: int,
+    kind: str = Query(default="original"),
+    dpi: int = Query(default=DEFAULT_DPI),
+    tile_size: int = Query(default=tile_service.DEFAULT_TILE_SIZE),
+):
+    """
+    Pirámide de teselas de la imagen de página: tamaño, niveles y versión de
+    cada tesela (va en su URL como v). Cambia con cada composición.
+    """
+    _check_tile_size(tile_size)
+    image_path = await _page_image_path(project_id, page_number, kind, dpi)
+    info = await executors.run_io(tile_service.pyramid_info, image_path, tile_size)
+    return JSONResponse(info, headers={"Cache-Control": "no-cache"})
+
+
+@router.get("/{page_number}/tiles/{level}/{col}/{row}")
+async def get_tile(
+    project_id: str,
+    page_number: int,
+    level: int,
+    col: int,
+    row: int,
+    kind: str = Query(default="original"),
+    dpi: int = Query(default=DEFAULT_DPI),
+    tile_size: int = Query(default=tile_service.DEFAULT_TILE_SIZE),
+    v: Optional[str] = Query(default=None),
+):
+    """
+    Tesela PNG. Con la versión actual (v de GET /tiles) la URL es inmutable y
+    se cachea un año; sin v o con una versión ya sustituida, sin caché.
+    """
+    _check_tile_size(tile_size)
+    image_path = await _page_image_path(project_id, page_number, kind, dpi)
+    # Una versión ya generada no cambia nunca: se sirve sin pasar por el executor
+    cached = tile_service.cached_tile(image_path, tile_size, level, col, row, v) if v else None
+    if cached is not None:
+        path, version = cached, v
+    else:
+        try:
+            path, version = await executors.run_cpu(tile_service.get_tile, image_path, tile_size, level, col, row)
+        except ValueError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+    cache_control = _IMMUTABLE if version == v else "no-cache"
+    return FileResponse(path, media_type="image/png", headers={"Cache-Control": cache_control})
+
+
+@router.get("/{page_number}/thumbnail")
+async def get_thumbnail(
+    project_id: str,
+    page_number: int,
+    kind: str = Query(default="original"),
+):
+    """Obtiene el thumbnail de una página."""
+    project_dir = PROJECTS_DIR / project_id
+    # Intentar JPEG primero (translated), luego PNG (original/legacy)
+    thumb_jpg = project_dir / "thumbs" / f"{page_number:03d}_{kind}.jpg"
+    thumb_png = project_dir / "thumbs" / f"{page_number:03d}_{kind}.png"
+    
+    if thumb_jpg.exists():
+        return FileResponse(thumb_jpg, media_type="image/jpeg")
+    if thumb_png.exists():
+        return FileResponse(thumb_png, media_type="image/png")
+    
+    raise HTTPException(status_code=404, detail="Thumbnail not found")
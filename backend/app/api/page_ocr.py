@@ -0,0 +1,131 @@
+"""
+API endpoints de OCR de una página: detección (con traducción automática de
+las regiones) y re-filtrado de la salida OCR en bruto guardada.
+"""
+
+from collections import Counter
+import time
+from fastapi import APIRouter, HTTPException, Query
+
+from ..config import PROJECTS_DIR, DEFAULT_DPI
+from ..db.repository import projects_repo, pages_repo, text_regions_repo
+from ..services import ocr_pool, ocr_provider, executors
+from ..services.ocr_filters import compile_filters, merge_filters
+from ..services.region_translation import build_glossary_map, translate_regions
+from .pages import log_timing
+
+router = APIRouter()
+
+
+def _ocr_image_path(project_id: str, page_number: int, dpi: int):
+    project = projects_repo.get(project_id)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    image_path = PROJECTS_DIR / project_id / "pages" / f"{page_number:03d}_original_{dpi}.png"
+    if not image_path.exists():
+        raise HTTPException(status_code=400, detail="Original image not rendered yet")
+    return project, image_path
+
+
+async def _translate_and_save(project_id: str, page_number: int, dpi: int, regions) -> tuple:
+    """
+    Traduce las regiones detectadas (en píxeles de la imagen a dpi) y
+    reemplaza las de la página. Devuelve tiempos.
+    """
+    t_trans0 = time.perf_counter()
+    if regions:
+        await executors.run_io(translate_regions, regions, build_glossary_map(project_id))
+    t_trans1 = time.perf_counter()
+
+    text_regions_repo.replace_for_page(project_id, page_number, regions)
+    pages_repo.upsert(project_id, page_number, regions_dpi=dpi)
+    t_save1 = time.perf_counter()
+    return t_trans1 - t_trans0, t_save1 - t_trans1
+
+
+@router.post("/{page_number}/ocr")
+async def run_ocr(
+    project_id: str,
+    page_number: int,
+    dpi: int = Query(default=DEFAULT_DPI),
+    use_global_filters: bool = Query(default=True, description="Merge project filters with global filters"),
+):
+    """Ejecuta OCR en la página y detecta texto chino."""
+    t0 = time.perf_counter()
+    project, image_path = _ocr_image_path(project_id, page_number, dpi)
+    custom_filters = merge_filters(project.ocr_region_filters, use_global_filters)
+
+    # Ejecutar OCR con filtros personalizados y tipo de documento
+    try:
+        t_ocr0 = time.perf_counter()
+        # El OCR corre en el pool OCR (o en el motor en proceso); aquí solo se espera
+        regions = await executors.run_io(
+            ocr_pool.detect_text,
+            image_path,
+            dpi,
+            custom_filters=custom_filters,
+            document_type=project.document_type.value
+        )
+        t_ocr1 = time.perf_counter()
+    except RuntimeError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    # Traducir automáticamente las regiones detectadas y guardar
+    translate_s, save_s = await _translate_and_save(project_id, page_number, dpi, regions)
+
+    t1 = time.perf_counter()
+    log_timing(
+        f"[TIMING] ocr project={project_id} page={page_number} dpi={dpi} "
+        f"detect={t_ocr1 - t_ocr0:.3f}s translate={translate_s:.3f}s "
+        f"save={save_s:.3f}s regions={len(regions)} total={t1 - t0:.3f}s"
+    )
+
+    return {"status": "ok", "region_count": len(regions)}
+
+
+@router.post("/{page_number}/ocr/refilter")
+async def refilter_ocr(
+    project_id: str,
+    page_number: int,
+    dpi: int = Query(default=DEFAULT_DPI),
+    use_global_filters: bool = Query(default=True, description="Merge project filters with global filters"),
+):
+    """
+    Re-aplica filtros y post-proceso a la salida OCR en bruto guardada, sin
+    volver a ejecutar el motor. 409 si la página aún no pasó por el OCR.
+    """
+    t0 = time.perf_counter()
+    project, image_path = _ocr_image_path(project_id, page_number, dpi)
+    custom_filters = merge_filters(project.ocr_region_filters, use_global_filters)
+    filter_hits = Counter()
+
+    try:
+        regions = await executors.run_io(
+            ocr_provider.refilter_text,
+            image_path,
+            dpi,
+            custom_filters=custom_filters,
+            document_type=project.document_type.value,
+            filter_hits=filter_hits,
+        )
+    except ocr_provider.RawOcrMissingError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    t_filter1 = time.perf_counter()
+
+    translate_s, save_s = await _translate_and_save(project_id, page_number, dpi, regions)
+
+    log_timing(
+        f"[TIMING] ocr-refilter project={project_id} page={page_number} dpi={dpi} "
+        f"filter={t_filter1 - t0:.3f}s translate={translate_s:.3f}s "
+        f"save={save_s:.3f}s regions={len(regions)} total={time.perf_counter() - t0:.3f}s"
+    )
+
+    region_filter = compile_filters(custom_filters)
+    return {
+        "status": "ok",
+        "region_count": len(regions),
+        "filter_hits": region_filter.report(filter_hits),
+    }
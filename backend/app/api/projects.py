@@ -15,9 +15,10 @@ from pydantic import BaseModel
 
 import fitz  # PyMuPDF
 
-from ..config import PROJECTS_DIR
+from ..config import COLOR_MODES, DEFAULT_COLOR_MODE, PROJECTS_DIR
 from ..db.models import Project, ProjectStatus, DocumentType
-from ..db.repository import projects_repo
+from ..db.repository import projects_repo, delete_project_data
+from ..services import executors, render_service, thumbnail_service
 
 logger = logging.getLogger(__name__)
 
@@ -72,6 +73,7 @@ class ProjectResponse(BaseModel):
     page_count: int
     created_at: str
     document_type: str = "schematic"
+    color_mode: str = "rgb"
 
     class Config:
         from_attributes = True
@@ -83,30 +85,33 @@ async def create_project(
     file: UploadFile = File(...),
     document_type: str = Query(default="schematic"),
     rotation: int = Query(default=0),
+    color_mode: str = Query(default=DEFAULT_COLOR_MODE),
 ):
     """Crea un nuevo proyecto subiendo un PDF."""
+    if color_mode not in COLOR_MODES:
+        raise HTTPException(status_code=400, detail=f"color_mode must be one of {', '.join(COLOR_MODES)}")
     project_id = str(uuid.uuid4())
     project_dir = PROJECTS_DIR / project_id
     project_dir.mkdir(parents=True, exist_ok=True)
     
+    # Validar rotación antes de tocar disco (el HTTPException no cruza procesos)
+    rotation = _normalize_rotation(rotation)
+
     # Guardar PDF
     pdf_path = project_dir / "src.pdf"
-    with open(pdf_path, "wb") as f:
-        content = await file.read()
-        f.write(content)
+    content = await file.read()
+    await executors.run_io(pdf_path.write_bytes, content)
 
     # Rotar PDF si aplica (persistente: el PDF rotado es el que se usará en el proyecto)
     try:
-        _rotate_pdf_inplace(pdf_path, rotation)
-    except HTTPException:
-        # Re-raise para devolver 400
+        await executors.run_cpu(_rotate_pdf_inplace, pdf_path, rotation)
+    except executors.ExecutorBusyError:
         raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Could not rotate PDF: {e}")
     
     # Contar páginas
-    from ..services.render_service import count_pages
-    page_count = count_pages(pdf_path)
+    page_count = await executors.run_cpu(render_service.count_pages, pdf_path)
     
     # Validar y convertir document_type
     doc_type = DocumentType.SCHEMATIC
@@ -119,20 +124,16 @@ async def create_project(
         name=name,
         page_count=page_count,
         document_type=doc_type,
+        color_mode=color_mode,
     )
 
     # Sincronizar con InsForge en background (fire and forget)
     asyncio.create_task(_sync_project_async(project))
 
-    # Generar solo thumbnails (150 DPI) — rápido (~2-5s para 46 págs)
+    # Thumbnails (150 DPI) en segundo plano y en paralelo: el proyecto se
+    # devuelve ya y la UI consulta GET /pages/thumbnails según van llegando.
     # El render a alta resolución se hace bajo demanda al abrir cada página
-    from ..services.render_service import render_thumbnails_only
-    try:
-        render_thumbnails_only(pdf_path, project_dir)
-    except Exception as e:
-        import logging
-        logger = logging.getLogger(__name__)
-        logger.error(f"Failed to render thumbnails for project {project_id}: {e}")
+    thumbnail_service.start(project_id, pdf_path, project_dir, page_count, project.color_mode)
 
     return ProjectResponse(
         id=project.id,
@@ -141,6 +142,7 @@ async def create_project(
         page_count=project.page_count,
         created_at=project.created_at.isoformat(),
         document_type=project.document_type.value,
+        color_mode=project.color_mode,
     )
 
 
@@ -192,6 +194,8 @@ async def list_projects():
             status=p.status.value,
             page_count=p.page_count,
             created_at=p.created_at.isoformat(),
+            document_type=p.document_type.value,
+            color_mode=p.color_mode,
         )
         for p in projects
     ]
@@ -210,6 +214,7 @@ async def get_project(project_id: str):
         page_count=project.page_count,
         created_at=project.created_at.isoformat(),
         document_type=project.document_type.value,
+        color_mode=project.color_mode,
     )
 
 
@@ -221,12 +226,14 @@ async def delete_project(project_id: str):
         raise HTTPException(status_code=404, detail="Project not found")
     
     # Eliminar directorio
+    thumbnail_service.cancel(project_id)
     project_dir = PROJECTS_DIR / project_id
     if project_dir.exists():
         shutil.rmtree(project_dir)
     
     # Eliminar de DB
     projects_repo.delete(project_id)
+    delete_project_data(project_id)
     
     return {"status": "deleted"}
 
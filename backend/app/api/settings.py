@@ -6,17 +6,23 @@ from fastapi import APIRouter
 from pydantic import BaseModel
 from typing import List, Optional
 
-from ..config import (
+from ..config import save_config, DEFAULT_MIN_HAN_RATIO, OCR_RECHECK_BACKENDS
+from ..settings_cache import (
     get_config,
-    save_config,
-    DEFAULT_MIN_HAN_RATIO,
+    get_settings as get_app_settings,
     get_ocr_region_filters,
     get_ocr_engine,
     get_ocr_mode,
     get_min_ocr_confidence,
     get_ocr_enable_label_recheck,
     get_ocr_recheck_max_regions_per_page,
+    get_ocr_pool_workers,
+    get_cpu_executor_workers,
+    get_io_executor_workers,
+    get_executor_queue_size,
 )
+from ..db.repository import translation_memory
+from ..services import executors, image_cache
 
 router = APIRouter()
 
@@ -30,7 +36,12 @@ class SettingsResponse(BaseModel):
     min_ocr_confidence: float = 0.55
     ocr_enable_label_recheck: bool = True
     ocr_recheck_max_regions_per_page: int = 200
+    ocr_recheck_backend: str = "auto"
     ocr_region_filters: List[dict] = []
+    ocr_pool_workers: int = 0
+    cpu_executor_workers: int = 2
+    io_executor_workers: int = 8
+    executor_queue_size: int = 16
 
 
 class SettingsUpdate(BaseModel):
@@ -42,7 +53,12 @@ class SettingsUpdate(BaseModel):
     min_ocr_confidence: Optional[float] = None
     ocr_enable_label_recheck: Optional[bool] = None
     ocr_recheck_max_regions_per_page: Optional[int] = None
+    ocr_recheck_backend: Optional[str] = None
     ocr_region_filters: Optional[List[dict]] = None
+    ocr_pool_workers: Optional[int] = None
+    cpu_executor_workers: Optional[int] = None
+    io_executor_workers: Optional[int] = None
+    executor_queue_size: Optional[int] = None
 
 
 @router.get("", response_model=SettingsResponse)
@@ -61,7 +77,12 @@ async def get_settings():
         min_ocr_confidence=get_min_ocr_confidence(),
         ocr_enable_label_recheck=get_ocr_enable_label_recheck(),
         ocr_recheck_max_regions_per_page=get_ocr_recheck_max_regions_per_page(),
+        ocr_recheck_backend=get_app_settings().ocr_recheck_backend,
         ocr_region_filters=get_ocr_region_filters(),
+        ocr_pool_workers=get_ocr_pool_workers(),
+        cpu_executor_workers=get_cpu_executor_workers(),
+        io_executor_workers=get_io_executor_workers(),
+        executor_queue_size=get_executor_queue_size(),
     )
 
 
@@ -111,8 +132,51 @@ async def update_settings(settings: SettingsUpdate):
         if value < 0:
             value = 0
         config["ocr_recheck_max_regions_per_page"] = value
+    if settings.ocr_recheck_backend is not None:
+        value = str(settings.ocr_recheck_backend).lower().strip()
+        if value not in OCR_RECHECK_BACKENDS:
+            value = "auto"
+        config["ocr_recheck_backend"] = value
+    if settings.ocr_pool_workers is not None:
+        try:
+            value = int(settings.ocr_pool_workers)
+        except Exception:
+            value = 0
+        if value < 0:
+            value = 0
+        config["ocr_pool_workers"] = value
+    # Los límites se acotan al leerlos (settings_cache.get_*_executor_*)
+    for key in ("cpu_executor_workers", "io_executor_workers", "executor_queue_size"):
+        value = getattr(settings, key)
+        if value is not None:
+            config[key] = int(value)
     if settings.ocr_region_filters is not None:
         if isinstance(settings.ocr_region_filters, list):
             config["ocr_region_filters"] = settings.ocr_region_filters
     save_config(config)
     return {"status": "ok"}
+
+
+@router.get("/executors")
+async def get_executor_stats():
+    """Capacidad y ocupación de los executors CPU y E/S."""
+    return executors.stats()
+
+
+@router.get("/image-cache")
+async def get_image_cache_stats():
+    """Estadísticas de la caché de páginas decodificadas del proceso del servidor."""
+    return image_cache.stats()
+
+
+@router.get("/translation-memory")
+async def get_translation_memory_stats():
+    """Estadísticas de la memoria de traducción (entradas, aciertos, fallos)."""
+    return translation_memory.stats()
+
+
+@router.delete("/translation-memory")
+async def clear_translation_memory():
+    """Vacía la memoria de traducción."""
+    translation_memory.clear()
+    return {"status": "ok"}
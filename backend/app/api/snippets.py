@@ -15,9 +15,11 @@ from pydantic import BaseModel
 from PIL import Image, ImageDraw
 import numpy as np
 
-from ..config import PROJECTS_DIR, SNIPPETS_DIR, DEFAULT_DPI, get_ocr_engine
+from ..config import PROJECTS_DIR, SNIPPETS_DIR, DEFAULT_DPI
+from ..settings_cache import get_ocr_engine
 from ..db.repository import snippets_repo, projects_repo, drawings_repo
-from ..services import snippet_service
+from ..services import snippet_service, executors, image_cache
+from ..services.color_modes import rgb_view
 
 logger = logging.getLogger("uvicorn.error")
 
@@ -214,6 +216,46 @@ def _find_original_image(project_id: str, page_number: int) -> Optional[str]:
     return str(candidates[0])
 
 
+def _crop_and_ocr(img_path: str, bbox: List[float], run_ocr: bool, erase_ocr_text: bool):
+    """Recorta la zona (y opcionalmente ejecuta OCR y borra el texto). Bloqueante."""
+    page = rgb_view(image_cache.get_array(Path(img_path)))
+    height, width = page.shape[:2]
+    logger.info(f"[SNIPPET] image size: {(width, height)}")
+
+    x1, y1, x2, y2 = [int(v) for v in bbox]
+    x1 = max(0, min(x1, width))
+    y1 = max(0, min(y1, height))
+    x2 = max(0, min(x2, width))
+    y2 = max(0, min(y2, height))
+
+    logger.info(f"[SNIPPET] clamped bbox: [{x1}, {y1}, {x2}, {y2}]")
+
+    if x2 <= x1 or y2 <= y1:
+        raise HTTPException(status_code=400, detail=f"Invalid bounding box after clamping: [{x1},{y1},{x2},{y2}]")
+
+    cropped = Image.fromarray(np.array(page[y1:y2, x1:x2]))
+
+    ocr_dets_raw: list = []
+    if run_ocr:
+        logger.info("[SNIPPET] running OCR on cropped area...")
+        ocr_dets_raw = _run_ocr_on_crop(cropped)
+        logger.info(f"[SNIPPET] OCR found {len(ocr_dets_raw)} detections")
+    elif erase_ocr_text:
+        logger.info("[SNIPPET] erase_ocr_text solicitado pero OCR desactivado; se ignora")
+
+    if run_ocr and erase_ocr_text and ocr_dets_raw:
+        logger.info("[SNIPPET] borrando texto detectado en el recorte")
+        cropped = _erase_text_regions(cropped, ocr_dets_raw)
+    return cropped, ocr_dets_raw
+
+
+def _save_snippet_images(cropped: Image.Image, snippet_id: str, remove_bg: bool) -> None:
+    cropped.save(str(SNIPPETS_DIR / f"{snippet_id}.png"), "PNG")
+    if remove_bg:
+        nobg = _remove_white_background(cropped)
+        nobg.save(str(SNIPPETS_DIR / f"{snippet_id}_nobg.png"), "PNG")
+
+
 @router.post("/capture", response_model=SnippetResponse)
 async def capture_snippet(data: CaptureRequest):
     """Captura una zona de la página y la guarda como snippet. Opcionalmente ejecuta OCR."""
@@ -229,33 +271,9 @@ async def capture_snippet(data: CaptureRequest):
         raise HTTPException(status_code=404, detail="Original image not found for this page")
     
     try:
-        img = Image.open(img_path)
-        logger.info(f"[SNIPPET] image size: {img.size}")
-        
-        x1, y1, x2, y2 = [int(v) for v in data.bbox]
-        x1 = max(0, min(x1, img.width))
-        y1 = max(0, min(y1, img.height))
-        x2 = max(0, min(x2, img.width))
-        y2 = max(0, min(y2, img.height))
-        
-        logger.info(f"[SNIPPET] clamped bbox: [{x1}, {y1}, {x2}, {y2}]")
-        
-        if x2 <= x1 or y2 <= y1:
-            raise HTTPException(status_code=400, detail=f"Invalid bounding box after clamping: [{x1},{y1},{x2},{y2}]")
-        
-        cropped = img.crop((x1, y1, x2, y2))
-
-        ocr_dets_raw: list = []
-        if data.run_ocr:
-            logger.info("[SNIPPET] running OCR on cropped area...")
-            ocr_dets_raw = _run_ocr_on_crop(cropped)
-            logger.info(f"[SNIPPET] OCR found {len(ocr_dets_raw)} detections")
-        elif data.erase_ocr_text:
-            logger.info("[SNIPPET] erase_ocr_text solicitado pero OCR desactivado; se ignora")
-
-        if data.run_ocr and data.erase_ocr_text and ocr_dets_raw:
-            logger.info("[SNIPPET] borrando texto detectado en el recorte")
-            cropped = _erase_text_regions(cropped, ocr_dets_raw)
+        cropped, ocr_dets_raw = await executors.run_io(
+            _crop_and_ocr, img_path, data.bbox, data.run_ocr, data.erase_ocr_text
+        )
         
         did_erase = data.run_ocr and data.erase_ocr_text and len(ocr_dets_raw) > 0
         snippet = snippets_repo.create(
@@ -267,17 +285,15 @@ async def capture_snippet(data: CaptureRequest):
             text_erased=did_erase,
         )
         
-        cropped.save(str(SNIPPETS_DIR / f"{snippet.id}.png"), "PNG")
-        
-        if data.remove_bg:
-            nobg = _remove_white_background(cropped)
-            nobg.save(str(SNIPPETS_DIR / f"{snippet.id}_nobg.png"), "PNG")
+        await executors.run_io(_save_snippet_images, cropped, snippet.id, data.remove_bg)
         
         logger.info(f"[SNIPPET] saved snippet {snippet.id} ({cropped.width}x{cropped.height})")
 
         return _snippet_to_response(snippet)
     except HTTPException:
         raise
+    except executors.ExecutorBusyError:
+        raise
     except Exception as e:
         logger.error(f"[SNIPPET] capture error: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Capture failed: {str(e)}")
@@ -481,6 +497,11 @@ class OcrDetectResponse(BaseModel):
     detections: List[OcrDetection]
 
 
+def _detect_on_file(path: Path) -> List[dict]:
+    with Image.open(path) as img:
+        return snippet_service.run_ocr_on_image(img)
+
+
 @router.post("/{snippet_id}/ocr/detect", response_model=OcrDetectResponse)
 async def detect_snippet_ocr(snippet_id: str):
     snippet = snippets_repo.get(snippet_id)
@@ -489,8 +510,7 @@ async def detect_snippet_ocr(snippet_id: str):
     path = snippet_service.get_render_path(snippet_id)
     if not path.exists():
         raise HTTPException(status_code=404, detail="Snippet image not found")
-    with Image.open(path) as img:
-        detections = snippet_service.run_ocr_on_image(img)
+    detections = await executors.run_io(_detect_on_file, path)
     return OcrDetectResponse(detections=[OcrDetection(**d) for d in detections])
 
 
@@ -0,0 +1,219 @@
+"""
+API endpoints de las regiones de texto de una página (listar, crear, editar
+y borrar).
+"""
+
+import uuid
+from typing import List, Optional
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel
+
+from ..db.models import TextRegion
+from ..db.repository import text_regions_repo
+
+router = APIRouter()
+
+
+class TextRegionResponse(BaseModel):
+    id: str
+    page_number: int
+    bbox: List[float]
+    bbox_normalized: List[float]
+    src_text: str
+    tgt_text: Optional[str]
+    confidence: float
+    locked: bool
+    needs_review: bool
+    compose_mode: str
+    font_size: Optional[int]
+    render_order: int
+    # Nuevos campos para editor visual
+    font_family: str = "Arial"
+    text_color: str = "#000000"
+    bg_color: Optional[str] = None
+    text_align: str = "center"
+    rotation: float = 0.0
+    is_manual: bool = False
+    line_height: float = 1.0
+
+
+class TextRegionUpdate(BaseModel):
+    tgt_text: Optional[str] = None
+    locked: Optional[bool] = None
+    compose_mode: Optional[str] = None
+    font_size: Optional[int] = None
+    render_order: Optional[int] = None
+    # Nuevos campos para editor visual
+    font_family: Optional[str] = None
+    text_color: Optional[str] = None
+    bg_color: Optional[str] = None
+    text_align: Optional[str] = None
+    rotation: Optional[float] = None
+    bbox: Optional[List[float]] = None  # [x1, y1, x2, y2] para mover/resize
+    line_height: Optional[float] = None
+
+
+class TextRegionCreate(BaseModel):
+    bbox: List[float]
+    src_text: str = ""
+    tgt_text: str = ""
+    font_size: Optional[float] = None
+    font_family: Optional[str] = None
+    text_color: Optional[str] = None
+    bg_color: Optional[str] = None
+    text_align: Optional[str] = None
+    rotation: Optional[float] = None
+    line_height: Optional[float] = None
+    locked: Optional[bool] = None
+    compose_mode: Optional[str] = None
+    is_manual: Optional[bool] = None
+    confidence: Optional[float] = None
+    render_order: Optional[int] = None
+
+
+@router.get("/{page_number}/text-regions", response_model=List[TextRegionResponse])
+async def get_text_regions(project_id: str, page_number: int):
+    """Obtiene las regiones de texto de una página."""
+    regions = text_regions_repo.list_by_page(project_id, page_number)
+    return [
+        TextRegionResponse(
+            id=r.id,
+            page_number=r.page_number,
+            bbox=r.bbox,
+            bbox_normalized=r.bbox_normalized,
+            src_text=r.src_text,
+            tgt_text=r.tgt_text,
+            confidence=r.confidence,
+            locked=r.locked,
+            needs_review=r.needs_review,
+            compose_mode=r.compose_mode,
+            font_size=r.font_size,
+            render_order=getattr(r, 'render_order', 0),
+            font_family=getattr(r, 'font_family', 'Arial'),
+            text_color=getattr(r, 'text_color', '#000000'),
+            bg_color=getattr(r, 'bg_color', None),
+            text_align=getattr(r, 'text_align', 'center'),
+            rotation=getattr(r, 'rotation', 0.0),
+            is_manual=getattr(r, 'is_manual', False),
+            line_height=getattr(r, 'line_height', 1.0),
+        )
+        for r in regions
+    ]
+
+
+@router.delete("/text-regions/{region_id}")
+async def delete_text_region(project_id: str, region_id: str):
+    """Elimina una región de texto."""
+    deleted = text_regions_repo.delete(region_id, project_id)
+    if not deleted:
+        raise HTTPException(status_code=404, detail="Text region not found")
+    return {"status": "ok"}
+
+
+@router.patch("/text-regions/{region_id}", response_model=TextRegionResponse)
+async def update_text_region(
+    project_id: str,
+    region_id: str,
+    update: TextRegionUpdate,
+):
+    """Actualiza una región de texto."""
+    region = text_regions_repo.get(region_id, project_id)
+    if not region:
+        raise HTTPException(status_code=404, detail="Text region not found")
+
+    update_fields = {
+        "tgt_text": update.tgt_text,
+        "locked": update.locked,
+        "compose_mode": update.compose_mode,
+        "font_size": update.font_size,
+        "render_order": update.render_order,
+        "font_family": update.font_family,
+        "text_color": update.text_color,
+        "bg_color": update.bg_color,
+        "text_align": update.text_align,
+        "rotation": update.rotation,
+        "bbox": update.bbox,
+        "line_height": update.line_height,
+    }
+    # Filtrar campos None
+    update_fields = {k: v for k, v in update_fields.items() if v is not None}
+
+    updated = text_regions_repo.update(region_id, **update_fields)
+
+    return TextRegionResponse(
+        id=updated.id,
+        page_number=updated.page_number,
+        bbox=updated.bbox,
+        bbox_normalized=updated.bbox_normalized,
+        src_text=updated.src_text,
+        tgt_text=updated.tgt_text,
+        confidence=updated.confidence,
+        locked=updated.locked,
+        needs_review=updated.needs_review,
+        compose_mode=updated.compose_mode,
+        font_size=updated.font_size,
+        render_order=getattr(updated, 'render_order', 0),
+        font_family=getattr(updated, 'font_family', 'Arial'),
+        text_color=getattr(updated, 'text_color', '#000000'),
+        bg_color=getattr(updated, 'bg_color', None),
+        text_align=getattr(updated, 'text_align', 'center'),
+        rotation=getattr(updated, 'rotation', 0.0),
+        is_manual=getattr(updated, 'is_manual', False),
+        line_height=getattr(updated, 'line_height', 1.0),
+    )
+
+
+@router.post("/{page_number}/text-regions", response_model=TextRegionResponse)
+async def create_text_region(
+    project_id: str,
+    page_number: int,
+    data: TextRegionCreate,
+):
+    """Crea una nueva región de texto manual."""
+    region = TextRegion(
+        id=str(uuid.uuid4()),
+        project_id=project_id,
+        page_number=page_number,
+        bbox=data.bbox,
+        bbox_normalized=[0, 0, 0, 0],
+        src_text=data.src_text,
+        tgt_text=data.tgt_text or data.src_text,
+        confidence=data.confidence if data.confidence is not None else 1.0,
+        locked=data.locked if data.locked is not None else False,
+        needs_review=False,
+        compose_mode=data.compose_mode or "patch",
+        is_manual=data.is_manual if data.is_manual is not None else True,
+        font_size=data.font_size,
+        font_family=data.font_family or "Arial",
+        text_color=data.text_color or "#000000",
+        bg_color=data.bg_color,
+        text_align=data.text_align or "center",
+        rotation=data.rotation or 0.0,
+        line_height=data.line_height or 1.0,
+        render_order=data.render_order or 0,
+    )
+    
+    # Guardar en repositorio
+    text_regions_repo.add(region)
+    
+    return TextRegionResponse(
+        id=region.id,
+        page_number=region.page_number,
+        bbox=region.bbox,
+        bbox_normalized=region.bbox_normalized,
+        src_text=region.src_text,
+        tgt_text=region.tgt_text,
+        confidence=region.confidence,
+        locked=region.locked,
+        needs_review=region.needs_review,
+        compose_mode=region.compose_mode,
+        font_size=region.font_size,
+        render_order=region.render_order,
+        font_family=region.font_family,
+        text_color=region.text_color,
+        bg_color=region.bg_color,
+        text_align=region.text_align,
+        rotation=region.rotation,
+        is_manual=region.is_manual,
+        line_height=getattr(region, 'line_height', 1.0),
+    )
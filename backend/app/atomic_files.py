@@ -0,0 +1,26 @@
+"""
+Escritura atómica de ficheros: se escribe en un temporal junto al destino y
+se sustituye con replace, así quien lee (la API, otro proceso) nunca ve un
+fichero a medias. El temporal es único por proceso e hilo para que dos
+escritores del mismo fichero no se pisen.
+"""
+
+import os
+import threading
+from pathlib import Path
+
+
+def tmp_path_for(path: Path) -> Path:
+    """Ruta temporal única por proceso e hilo para escribir path de forma atómica."""
+    return path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+
+def write_atomic(path: Path, data: bytes) -> None:
+    """Escribe data en path (creando el directorio); si falla no deja temporales."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = tmp_path_for(path)
+    try:
+        tmp_path.write_bytes(data)
+        tmp_path.replace(path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
@@ -1,15 +1,17 @@
 """
-Configuración del backend.
+Configuración del backend: rutas, valores por defecto y lectura/escritura de
+config.json. La configuración validada y cacheada está en settings_cache.
 """
 
 import os
 import json
 import shutil
-import contextvars
-import contextlib
+import threading
 from pathlib import Path
 
-from typing import Any, Dict, List
+from typing import Any, Dict, Optional, Tuple
+
+from .atomic_files import write_atomic
 
 # Ruta base para datos del usuario: %APPDATA%\NB7XTranslator
 if os.name == "nt":
@@ -33,6 +35,12 @@ CONFIG_FILE = APP_DATA_DIR / "config.json"
 # Glosario global (para todos los proyectos)
 GLOSSARY_GLOBAL_FILE = APP_DATA_DIR / "glossary_global.json"
 
+# Almacén SQLite de páginas, regiones, glosario y dibujos de los proyectos
+PROJECTS_DB_FILE = APP_DATA_DIR / "projects.sqlite3"
+
+# Memoria de traducción (caché persistente de DeepL)
+TRANSLATION_MEMORY_FILE = APP_DATA_DIR / "translation_memory.sqlite3"
+
 # --- Seed: copiar defaults en primera ejecución ---
 import sys as _sys
 _DEFAULTS_DIR = Path(getattr(_sys, "_MEIPASS", Path(__file__).parent)) / "defaults"
@@ -87,136 +95,73 @@ DEFAULT_MIN_OCR_CONFIDENCE = 0.55
 # Recheck (EasyOCR EN) puede ayudar a reducir falsos positivos.
 DEFAULT_OCR_ENABLE_LABEL_RECHECK = True
 DEFAULT_OCR_RECHECK_MAX_REGIONS_PER_PAGE = 200
+# Motor del recheck de etiquetas: "easyocr" (lector EN), "rapidocr" (solo
+# reconocimiento con el modelo ONNX ya cargado) o "auto" (rapidocr si es el
+# motor principal, si no easyocr)
+OCR_RECHECK_BACKENDS = ("auto", "easyocr", "rapidocr")
+DEFAULT_OCR_RECHECK_BACKEND = "auto"
+
+# Job render-all: "sequential" (página a página), "pipeline" (fases solapadas)
+# o "batched" (OCR de todo el proyecto y traducción deduplicada en lote)
+RENDER_ALL_MODES = ("sequential", "pipeline", "batched")
+DEFAULT_RENDER_ALL_MODE = "pipeline"
+# Exportación PDF: "raster" (imágenes compuestas) o "vector" (texto y trazos sobre src.pdf)
+EXPORT_MODES = ("raster", "vector")
+# Modo de color de las páginas de un proyecto; "auto" usa gris si la página no tiene color
+COLOR_MODES = ("auto", "rgb", "gray", "bilevel")
+DEFAULT_COLOR_MODE = "auto"
+DEFAULT_RENDER_PIPELINE_QUEUE_SIZE = 2
+
+# Pool de procesos OCR (0 = OCR en el proceso del servidor)
+DEFAULT_OCR_POOL_WORKERS = 0
+
+# Executors de los endpoints: procesos para CPU (render/composición/export),
+# hilos para E/S (DeepL, espera de OCR). La cola limita las tareas en espera
+# por encima de los workers; al superarla se responde 503 (backpressure).
+DEFAULT_CPU_EXECUTOR_WORKERS = 2
+DEFAULT_IO_EXECUTOR_WORKERS = 8
+DEFAULT_EXECUTOR_QUEUE_SIZE = 16
+
+# Caché en memoria de páginas decodificadas (por proceso; 0 = deshabilitada)
+DEFAULT_IMAGE_CACHE_MAX_MB = 512
+
+# Memoria de traducción
+DEFAULT_TRANSLATION_MEMORY_ENABLED = True
+DEFAULT_TRANSLATION_MEMORY_MAX_ENTRIES = 200_000
 
 # InsForge
 DEFAULT_SYNC_ENABLED = True
 
 
-_CONFIG_OVERRIDE: contextvars.ContextVar[Dict[str, Any] | None] = contextvars.ContextVar(
-    "NB7X_CONFIG_OVERRIDE",
-    default=None,
-)
+# Guardados hechos por este proceso: distinguen dos escrituras de config.json
+# con el mismo mtime/tamaño (resolución del sistema de ficheros)
+_saves = 0
+_saves_lock = threading.Lock()
 
 
-def get_config() -> dict:
-    """Lee la configuración persistente."""
-    import json
-    override = _CONFIG_OVERRIDE.get()
-    if override is not None:
-        return dict(override)
-    if CONFIG_FILE.exists():
-        try:
-            with open(CONFIG_FILE, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except:
-            return {}
-    return {}
-
-
-@contextlib.contextmanager
-def use_config_snapshot(snapshot: Dict[str, Any]):
-    token = _CONFIG_OVERRIDE.set(dict(snapshot or {}))
-    try:
-        yield
-    finally:
-        _CONFIG_OVERRIDE.reset(token)
-
-
-def get_ocr_region_filters() -> List[Dict[str, Any]]:
-    config = get_config()
-    value = config.get("ocr_region_filters", [])
-    if not isinstance(value, list):
-        return []
-    out: List[Dict[str, Any]] = []
-    for item in value:
-        if not isinstance(item, dict):
-            continue
-        mode = str(item.get("mode", "contains"))
-        if mode not in {"contains", "starts", "ends", "regex"}:
-            continue
-        pattern = str(item.get("pattern", ""))
-        if not pattern:
-            continue
-        out.append(
-            {
-                "mode": mode,
-                "pattern": pattern,
-                "case_sensitive": bool(item.get("case_sensitive", False)),
-            }
-        )
-    return out
-
-
-def get_min_han_ratio() -> float:
-    """Obtiene el ratio mínimo de caracteres Han para aceptar una región OCR."""
-    config = get_config()
+def config_file_version() -> Optional[Tuple[int, int, int]]:
+    """(guardados en este proceso, mtime, tamaño) de config.json; None si no existe."""
     try:
-        value = float(config.get("min_han_ratio", DEFAULT_MIN_HAN_RATIO))
-    except Exception:
-        value = DEFAULT_MIN_HAN_RATIO
-    if value < 0.0:
-        return 0.0
-    if value > 1.0:
-        return 1.0
-    return value
-
-
-def get_ocr_engine() -> str:
-    """Obtiene el motor OCR a usar (easyocr, paddleocr o rapidocr)."""
-    config = get_config()
-    value = str(config.get("ocr_engine", DEFAULT_OCR_ENGINE) or DEFAULT_OCR_ENGINE).lower()
-    if value not in {"easyocr", "paddleocr", "rapidocr"}:
-        return DEFAULT_OCR_ENGINE
-    return value
-
-
-def get_ocr_mode() -> str:
-    """Obtiene el modo OCR (basic o advanced)."""
-    config = get_config()
-    value = str(config.get("ocr_mode", DEFAULT_OCR_MODE) or DEFAULT_OCR_MODE).lower()
-    if value not in {"basic", "advanced"}:
-        return DEFAULT_OCR_MODE
-    return value
-
-
-def get_min_ocr_confidence() -> float:
-    config = get_config()
-    try:
-        value = float(config.get("min_ocr_confidence", DEFAULT_MIN_OCR_CONFIDENCE))
-    except Exception:
-        value = DEFAULT_MIN_OCR_CONFIDENCE
-    if value < 0.0:
-        return 0.0
-    if value > 1.0:
-        return 1.0
-    return value
-
-
-def get_ocr_enable_label_recheck() -> bool:
-    config = get_config()
-    return bool(config.get("ocr_enable_label_recheck", DEFAULT_OCR_ENABLE_LABEL_RECHECK))
+        st = CONFIG_FILE.stat()
+    except FileNotFoundError:
+        return None
+    return (_saves, st.st_mtime_ns, st.st_size)
 
 
-def get_ocr_recheck_max_regions_per_page() -> int:
-    config = get_config()
+def load_config_file() -> Dict[str, Any]:
+    """Lee config.json; {} si no existe o no es un objeto JSON válido."""
     try:
-        value = int(config.get("ocr_recheck_max_regions_per_page", DEFAULT_OCR_RECHECK_MAX_REGIONS_PER_PAGE))
-    except Exception:
-        value = DEFAULT_OCR_RECHECK_MAX_REGIONS_PER_PAGE
-    if value < 0:
-        return 0
-    return value
-
-
-def get_sync_enabled() -> bool:
-    """Obtiene si la sincronización con InsForge está habilitada."""
-    config = get_config()
-    return bool(config.get("sync_enabled", DEFAULT_SYNC_ENABLED))
+        with open(CONFIG_FILE, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
 
 
 def save_config(config: dict):
-    """Guarda la configuración persistente."""
-    import json
-    CONFIG_FILE.parent.mkdir(parents=True, exist_ok=True)
-    with open(CONFIG_FILE, "w", encoding="utf-8") as f:
-        json.dump(config, f, indent=2)
+    """Guarda la configuración persistente (escritura atómica)."""
+    global _saves
+    data = json.dumps(config, indent=2).encode("utf-8")
+    with _saves_lock:
+        write_atomic(CONFIG_FILE, data)
+        _saves += 1
@@ -29,6 +29,7 @@ class Project:
     created_at: datetime = field(default_factory=datetime.now)
     ocr_region_filters: List[dict] = field(default_factory=list)
     document_type: DocumentType = DocumentType.SCHEMATIC
+    color_mode: str = "rgb"  # Ver COLOR_MODES en config (los proyectos anteriores son RGB)
 
 
 @dataclass
@@ -37,6 +38,7 @@ class Page:
     page_number: int
     has_original: bool = False
     has_translated: bool = False
+    regions_dpi: Optional[int] = None  # DPI en el que están los píxeles de regiones y dibujos (None = DEFAULT_DPI)
 
 
 @dataclass
@@ -79,11 +81,12 @@ class Job:
     id: str
     project_id: str
     job_type: str
-    status: str = "pending"  # pending, running, completed, error
+    status: str = "pending"  # pending, running, completed, error, cancelled
     progress: float = 0.0
     current_step: Optional[str] = None
     error: Optional[str] = None
     created_at: datetime = field(default_factory=datetime.now)
+    result: Optional[str] = None  # Artefacto generado (p. ej. ruta del PDF exportado)
 
 
 @dataclass
@@ -0,0 +1,140 @@
+"""
+Almacén SQLite transaccional para los datos por proyecto (páginas, regiones
+de texto, glosario y dibujos).
+
+Cada tabla guarda una fila por elemento con el mismo dict que antes se
+escribía en los JSON del proyecto, de modo que editar una región cuesta una
+escritura de fila y no reescribir el fichero completo. La primera vez que se
+carga una colección de un proyecto con su JSON antiguo, se importa en una
+transacción y el fichero se renombra a *.json.bak (migración única).
+"""
+
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from ..config import PROJECTS_DIR
+
+# Tabla -> fichero JSON heredado dentro del directorio del proyecto
+LEGACY_JSON_FILES = {
+    "pages": "pages.json",
+    "text_regions": "text_regions.json",
+    "glossary": "glossary.json",
+    "drawings": "drawings.json",
+}
+
+_SCHEMA = "".join(
+    f"""
+CREATE TABLE IF NOT EXISTS {table} (
+    id TEXT PRIMARY KEY,
+    project_id TEXT NOT NULL,
+    page_number INTEGER,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_{table}_project_page ON {table} (project_id, page_number);
+"""
+    for table in LEGACY_JSON_FILES
+)
+
+
+def _row_id(table: str, item: Dict[str, Any]) -> str:
+    # Las páginas no tienen id propio: se identifican por (proyecto, número)
+    if table == "pages":
+        return f"{item['project_id']}:{item['page_number']}"
+    return str(item["id"])
+
+
+class ProjectStore:
+    def __init__(self, db_path: Path, projects_dir: Path = PROJECTS_DIR):
+        self._db_path = db_path
+        self._projects_dir = projects_dir
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.RLock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self._db_path), check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        with self._lock:
+            conn = self._connect()
+            try:
+                yield conn
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+    def load(self, table: str, project_id: str) -> List[Dict[str, Any]]:
+        """Devuelve los dicts de un proyecto, migrando antes su JSON si existe."""
+        self._migrate_legacy_json(table, project_id)
+        with self._lock:
+            rows = self._connect().execute(
+                f"SELECT data FROM {table} WHERE project_id = ? ORDER BY rowid",
+                (project_id,),
+            ).fetchall()
+        return [json.loads(data) for (data,) in rows]
+
+    def upsert(self, table: str, items: Iterable[Dict[str, Any]], conn: Optional[sqlite3.Connection] = None) -> None:
+        params = [
+            (_row_id(table, item), item["project_id"], item.get("page_number"), json.dumps(item, ensure_ascii=False))
+            for item in items
+        ]
+        if not params:
+            return
+        sql = (
+            f"INSERT INTO {table} (id, project_id, page_number, data) VALUES (?, ?, ?, ?) "
+            f"ON CONFLICT(id) DO UPDATE SET project_id = excluded.project_id, "
+            f"page_number = excluded.page_number, data = excluded.data"
+        )
+        if conn is not None:
+            conn.executemany(sql, params)
+            return
+        with self.transaction() as c:
+            c.executemany(sql, params)
+
+    def delete(self, table: str, ids: Iterable[str], conn: Optional[sqlite3.Connection] = None) -> None:
+        params = [(i,) for i in ids]
+        if not params:
+            return
+        sql = f"DELETE FROM {table} WHERE id = ?"
+        if conn is not None:
+            conn.executemany(sql, params)
+            return
+        with self.transaction() as c:
+            c.executemany(sql, params)
+
+    def delete_project(self, project_id: str) -> None:
+        with self.transaction() as conn:
+            for table in LEGACY_JSON_FILES:
+                conn.execute(f"DELETE FROM {table} WHERE project_id = ?", (project_id,))
+
+    def _migrate_legacy_json(self, table: str, project_id: str) -> None:
+        legacy_path = self._projects_dir / project_id / LEGACY_JSON_FILES[table]
+        if not legacy_path.exists():
+            return
+        with self._lock:
+            # Otro hilo pudo migrarlo mientras esperábamos el lock
+            if not legacy_path.exists():
+                return
+            with open(legacy_path, "r", encoding="utf-8") as f:
+                items = json.load(f)
+            with self.transaction() as conn:
+                self.upsert(table, items, conn=conn)
+            legacy_path.replace(legacy_path.with_name(legacy_path.name + ".bak"))
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
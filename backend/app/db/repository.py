@@ -1,18 +1,23 @@
 """
-Repositorios para persistencia de datos (in-memory + JSON).
+Repositorios para persistencia de datos (in-memory + JSON / SQLite).
+Proyectos y snippets se guardan en JSON; páginas, regiones, glosario y
+dibujos en el almacén SQLite por filas (ver project_store).
 """
 
 import json
 import os
 import uuid
+from dataclasses import asdict
 from pathlib import Path
 from datetime import datetime
 from typing import List, Optional, Dict, Any
 from tempfile import NamedTemporaryFile
 
-from ..config import PROJECTS_DIR, JOBS_DIR, SNIPPETS_DIR
+from ..config import DEFAULT_DPI, PROJECTS_DIR, JOBS_DIR, SNIPPETS_DIR, TRANSLATION_MEMORY_FILE, PROJECTS_DB_FILE
 from .models import Project, ProjectStatus, Page, TextRegion, GlossaryEntry, Job, DocumentType, DrawingElement, Snippet
 from .global_glossary_repository import GlobalGlossaryRepository
+from .translation_memory import TranslationMemory
+from .project_store import ProjectStore
 
 
 class ProjectsRepository:
@@ -43,6 +48,7 @@ class ProjectsRepository:
                             created_at=datetime.fromisoformat(data["created_at"]),
                             ocr_region_filters=ocr_filters,
                             document_type=DocumentType(data.get("document_type", "schematic")),
+                            color_mode=data.get("color_mode", "rgb"),
                         )
     
     def _save(self, project: Project):
@@ -59,10 +65,14 @@ class ProjectsRepository:
                 "created_at": project.created_at.isoformat(),
                 "ocr_region_filters": project.ocr_region_filters if project.ocr_region_filters else [],
                 "document_type": project.document_type.value,
+                "color_mode": project.color_mode,
             }, f, ensure_ascii=False, indent=2)
     
-    def create(self, id: str, name: str, page_count: int, document_type: DocumentType = DocumentType.SCHEMATIC) -> Project:
-        project = Project(id=id, name=name, page_count=page_count, document_type=document_type)
+    def create(
+        self, id: str, name: str, page_count: int,
+        document_type: DocumentType = DocumentType.SCHEMATIC, color_mode: str = "rgb",
+    ) -> Project:
+        project = Project(id=id, name=name, page_count=page_count, document_type=document_type, color_mode=color_mode)
         self._cache[id] = project
         self._save(project)
         return project
@@ -97,29 +107,10 @@ class PagesRepository:
     def _get_project_pages(self, project_id: str) -> Dict[int, Page]:
         if project_id not in self._cache:
             self._cache[project_id] = {}
-            # Cargar desde disco si existe
-            pages_file = PROJECTS_DIR / project_id / "pages.json"
-            if pages_file.exists():
-                with open(pages_file, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                    for p in data:
-                        self._cache[project_id][p["page_number"]] = Page(**p)
+            for p in project_store.load("pages", project_id):
+                self._cache[project_id][p["page_number"]] = Page(**p)
         return self._cache[project_id]
     
-    def _save(self, project_id: str):
-        pages = self._get_project_pages(project_id)
-        pages_file = PROJECTS_DIR / project_id / "pages.json"
-        with open(pages_file, "w", encoding="utf-8") as f:
-            json.dump([
-                {
-                    "project_id": p.project_id,
-                    "page_number": p.page_number,
-                    "has_original": p.has_original,
-                    "has_translated": p.has_translated,
-                }
-                for p in pages.values()
-            ], f, ensure_ascii=False, indent=2)
-    
     def upsert(self, project_id: str, page_number: int, **kwargs) -> Page:
         pages = self._get_project_pages(project_id)
         if page_number in pages:
@@ -130,9 +121,17 @@ class PagesRepository:
         else:
             page = Page(project_id=project_id, page_number=page_number, **kwargs)
             pages[page_number] = page
-        self._save(project_id)
+        project_store.upsert("pages", [asdict(page)])
         return page
     
+    def get(self, project_id: str, page_number: int) -> Optional[Page]:
+        return self._get_project_pages(project_id).get(page_number)
+
+    def regions_dpi(self, project_id: str, page_number: int) -> int:
+        """DPI del espacio de coordenadas de las regiones y dibujos de la página."""
+        page = self.get(project_id, page_number)
+        return page.regions_dpi if page is not None and page.regions_dpi else DEFAULT_DPI
+
     def list_by_project(self, project_id: str) -> List[Page]:
         return list(self._get_project_pages(project_id).values())
 
@@ -146,43 +145,10 @@ class TextRegionsRepository:
     def _get_project_regions(self, project_id: str) -> Dict[str, TextRegion]:
         if project_id not in self._cache:
             self._cache[project_id] = {}
-            regions_file = PROJECTS_DIR / project_id / "text_regions.json"
-            if regions_file.exists():
-                with open(regions_file, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                    for r in data:
-                        self._cache[project_id][r["id"]] = TextRegion(**r)
+            for r in project_store.load("text_regions", project_id):
+                self._cache[project_id][r["id"]] = TextRegion(**r)
         return self._cache[project_id]
     
-    def _save(self, project_id: str):
-        regions = self._get_project_regions(project_id)
-        regions_file = PROJECTS_DIR / project_id / "text_regions.json"
-        with open(regions_file, "w", encoding="utf-8") as f:
-            json.dump([
-                {
-                    "id": r.id,
-                    "project_id": r.project_id,
-                    "page_number": r.page_number,
-                    "bbox": r.bbox,
-                    "bbox_normalized": r.bbox_normalized,
-                    "src_text": r.src_text,
-                    "tgt_text": r.tgt_text,
-                    "confidence": r.confidence,
-                    "locked": r.locked,
-                    "needs_review": r.needs_review,
-                    "compose_mode": r.compose_mode,
-                    "font_size": r.font_size,
-                    "render_order": getattr(r, 'render_order', 0),
-                    "font_family": getattr(r, 'font_family', 'Arial'),
-                    "text_color": getattr(r, 'text_color', '#000000'),
-                    "bg_color": getattr(r, 'bg_color', None),
-                    "text_align": getattr(r, 'text_align', 'center'),
-                    "rotation": getattr(r, 'rotation', 0.0),
-                    "is_manual": getattr(r, 'is_manual', False),
-                }
-                for r in regions.values()
-            ], f, ensure_ascii=False, indent=2)
-    
     def get(self, region_id: str, project_id: str = None) -> Optional[TextRegion]:
         # Si se proporciona project_id, asegurar que está cargado
         if project_id:
@@ -199,6 +165,12 @@ class TextRegionsRepository:
         regions = self._get_project_regions(project_id)
         return [r for r in regions.values() if r.page_number == page_number]
     
+    def add(self, region: TextRegion) -> TextRegion:
+        """Añade (o sobrescribe) una región individual."""
+        self._get_project_regions(region.project_id)[region.id] = region
+        project_store.upsert("text_regions", [asdict(region)])
+        return region
+    
     def replace_for_page(self, project_id: str, page_number: int, regions: List[TextRegion]):
         """
         Reemplaza las regiones de una página.
@@ -210,12 +182,14 @@ class TextRegionsRepository:
             rid for rid, r in project_regions.items() 
             if r.page_number == page_number and not r.locked and not getattr(r, 'is_manual', False)
         ]
+        with project_store.transaction() as conn:
+            project_store.delete("text_regions", to_delete, conn=conn)
+            project_store.upsert("text_regions", [asdict(r) for r in regions], conn=conn)
         for rid in to_delete:
             del project_regions[rid]
         # Añadir nuevas regiones (o actualizar existentes si cambiaron)
         for r in regions:
             project_regions[r.id] = r
-        self._save(project_id)
     
     def update(self, region_id: str, **kwargs) -> Optional[TextRegion]:
         for project_id, project_regions in self._cache.items():
@@ -224,7 +198,7 @@ class TextRegionsRepository:
                 for key, value in kwargs.items():
                     if hasattr(region, key) and value is not None:
                         setattr(region, key, value)
-                self._save(project_id)
+                project_store.upsert("text_regions", [asdict(region)])
                 return region
         return None
     
@@ -234,13 +208,13 @@ class TextRegionsRepository:
             project_regions = self._get_project_regions(project_id)
             if region_id in project_regions:
                 del project_regions[region_id]
-                self._save(project_id)
+                project_store.delete("text_regions", [region_id])
                 return True
         # Buscar en toda la caché
         for pid, project_regions in self._cache.items():
             if region_id in project_regions:
                 del project_regions[region_id]
-                self._save(pid)
+                project_store.delete("text_regions", [region_id])
                 return True
         return False
 
@@ -254,44 +228,49 @@ class GlossaryRepository:
     def _get_project_glossary(self, project_id: str) -> Dict[str, GlossaryEntry]:
         if project_id not in self._cache:
             self._cache[project_id] = {}
-            glossary_file = PROJECTS_DIR / project_id / "glossary.json"
-            if glossary_file.exists():
-                with open(glossary_file, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                    for e in data:
-                        self._cache[project_id][e["id"]] = GlossaryEntry(**e)
+            for e in project_store.load("glossary", project_id):
+                self._cache[project_id][e["id"]] = GlossaryEntry(**e)
         return self._cache[project_id]
     
-    def _save(self, project_id: str):
-        entries = self._get_project_glossary(project_id)
-        glossary_file = PROJECTS_DIR / project_id / "glossary.json"
-        with open(glossary_file, "w", encoding="utf-8") as f:
-            json.dump([
-                {
-                    "id": e.id,
-                    "project_id": e.project_id,
-                    "src_term": e.src_term,
-                    "tgt_term": e.tgt_term,
-                    "locked": e.locked,
-                }
-                for e in entries.values()
-            ], f, ensure_ascii=False, indent=2)
-    
     def list_by_project(self, project_id: str) -> List[GlossaryEntry]:
         return list(self._get_project_glossary(project_id).values())
     
     def replace_for_project(self, project_id: str, entries: List[Any]):
-        self._cache[project_id] = {}
+        old_ids = list(self._get_project_glossary(project_id).keys())
+        new_entries: Dict[str, GlossaryEntry] = {}
         for e in entries:
             entry_id = e.id or str(uuid.uuid4())
-            self._cache[project_id][entry_id] = GlossaryEntry(
+            new_entries[entry_id] = GlossaryEntry(
                 id=entry_id,
                 project_id=project_id,
                 src_term=e.src_term,
                 tgt_term=e.tgt_term,
                 locked=e.locked,
             )
-        self._save(project_id)
+        with project_store.transaction() as conn:
+            project_store.delete("glossary", old_ids, conn=conn)
+            project_store.upsert("glossary", [asdict(e) for e in new_entries.values()], conn=conn)
+        self._cache[project_id] = new_entries
+
+
+def _drawing_to_dict(d: DrawingElement) -> Dict[str, Any]:
+    return {
+        "id": d.id,
+        "project_id": d.project_id,
+        "page_number": d.page_number,
+        "element_type": d.element_type,
+        "points": d.points,
+        "stroke_color": d.stroke_color,
+        "stroke_width": d.stroke_width,
+        "fill_color": d.fill_color,
+        "text": d.text,
+        "font_size": d.font_size,
+        "font_family": d.font_family,
+        "text_color": d.text_color,
+        "image_data": d.image_data,
+        "source_snippet_id": d.source_snippet_id,
+        "created_at": d.created_at.isoformat(),
+    }
 
 
 class DrawingsRepository:
@@ -303,60 +282,31 @@ class DrawingsRepository:
     def _get_project_drawings(self, project_id: str) -> Dict[str, DrawingElement]:
         if project_id not in self._cache:
             self._cache[project_id] = {}
-            drawings_file = PROJECTS_DIR / project_id / "drawings.json"
-            if drawings_file.exists():
-                with open(drawings_file, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                    for d in data:
-                        created_at = d.get("created_at")
-                        if isinstance(created_at, str):
-                            created_at = datetime.fromisoformat(created_at)
-                        else:
-                            created_at = datetime.now()
-                        self._cache[project_id][d["id"]] = DrawingElement(
-                            id=d["id"],
-                            project_id=d["project_id"],
-                            page_number=d["page_number"],
-                            element_type=d["element_type"],
-                            points=d["points"],
-                            stroke_color=d.get("stroke_color", "#000000"),
-                            stroke_width=d.get("stroke_width", 2),
-                            fill_color=d.get("fill_color"),
-                            text=d.get("text"),
-                            font_size=d.get("font_size", 14),
-                            font_family=d.get("font_family", "Arial"),
-                            text_color=d.get("text_color", "#000000"),
-                            image_data=d.get("image_data"),
-                            source_snippet_id=d.get("source_snippet_id"),
-                            created_at=created_at,
-                        )
+            for d in project_store.load("drawings", project_id):
+                created_at = d.get("created_at")
+                if isinstance(created_at, str):
+                    created_at = datetime.fromisoformat(created_at)
+                else:
+                    created_at = datetime.now()
+                self._cache[project_id][d["id"]] = DrawingElement(
+                    id=d["id"],
+                    project_id=d["project_id"],
+                    page_number=d["page_number"],
+                    element_type=d["element_type"],
+                    points=d["points"],
+                    stroke_color=d.get("stroke_color", "#000000"),
+                    stroke_width=d.get("stroke_width", 2),
+                    fill_color=d.get("fill_color"),
+                    text=d.get("text"),
+                    font_size=d.get("font_size", 14),
+                    font_family=d.get("font_family", "Arial"),
+                    text_color=d.get("text_color", "#000000"),
+                    image_data=d.get("image_data"),
+                    source_snippet_id=d.get("source_snippet_id"),
+                    created_at=created_at,
+                )
         return self._cache[project_id]
     
-    def _save(self, project_id: str):
-        drawings = self._get_project_drawings(project_id)
-        drawings_file = PROJECTS_DIR / project_id / "drawings.json"
-        with open(drawings_file, "w", encoding="utf-8") as f:
-            json.dump([
-                {
-                    "id": d.id,
-                    "project_id": d.project_id,
-                    "page_number": d.page_number,
-                    "element_type": d.element_type,
-                    "points": d.points,
-                    "stroke_color": d.stroke_color,
-                    "stroke_width": d.stroke_width,
-                    "fill_color": d.fill_color,
-                    "text": d.text,
-                    "font_size": d.font_size,
-                    "font_family": d.font_family,
-                    "text_color": d.text_color,
-                    "image_data": d.image_data,
-                    "source_snippet_id": d.source_snippet_id,
-                    "created_at": d.created_at.isoformat(),
-                }
-                for d in drawings.values()
-            ], f, ensure_ascii=False, indent=2)
-    
     def create(self, project_id: str, page_number: int, element_type: str, points: List[float], **kwargs) -> DrawingElement:
         drawing_id = str(uuid.uuid4())
         drawing = DrawingElement(
@@ -377,7 +327,7 @@ class DrawingsRepository:
         )
         project_drawings = self._get_project_drawings(project_id)
         project_drawings[drawing_id] = drawing
-        self._save(project_id)
+        project_store.upsert("drawings", [_drawing_to_dict(drawing)])
         return drawing
     
     def get(self, drawing_id: str, project_id: str) -> Optional[DrawingElement]:
@@ -399,7 +349,7 @@ class DrawingsRepository:
         page_number: Optional[int] = None,
     ) -> int:
         drawings = self._get_project_drawings(project_id)
-        updated = 0
+        updated: List[DrawingElement] = []
         for drawing in drawings.values():
             if drawing.element_type != "image":
                 continue
@@ -408,11 +358,11 @@ class DrawingsRepository:
             if page_number is not None and drawing.page_number != page_number:
                 continue
             drawing.image_data = image_data
-            updated += 1
+            updated.append(drawing)
 
-        if updated > 0:
-            self._save(project_id)
-        return updated
+        if updated:
+            project_store.upsert("drawings", [_drawing_to_dict(d) for d in updated])
+        return len(updated)
     
     def update(self, drawing_id: str, project_id: str, **kwargs) -> Optional[DrawingElement]:
         project_drawings = self._get_project_drawings(project_id)
@@ -422,14 +372,14 @@ class DrawingsRepository:
         for key, value in kwargs.items():
             if hasattr(drawing, key) and value is not None:
                 setattr(drawing, key, value)
-        self._save(project_id)
+        project_store.upsert("drawings", [_drawing_to_dict(drawing)])
         return drawing
     
     def delete(self, drawing_id: str, project_id: str) -> bool:
         project_drawings = self._get_project_drawings(project_id)
         if drawing_id in project_drawings:
             del project_drawings[drawing_id]
-            self._save(project_id)
+            project_store.delete("drawings", [drawing_id])
             return True
         return False
 
@@ -598,7 +548,15 @@ class SnippetsRepository:
         return False
 
 
+def delete_project_data(project_id: str) -> None:
+    """Elimina las filas y cachés de un proyecto en todos los repositorios."""
+    project_store.delete_project(project_id)
+    for repo in (pages_repo, text_regions_repo, glossary_repo, drawings_repo):
+        repo._cache.pop(project_id, None)
+
+
 # Instancias singleton
+project_store = ProjectStore(PROJECTS_DB_FILE)
 projects_repo = ProjectsRepository()
 pages_repo = PagesRepository()
 text_regions_repo = TextRegionsRepository()
@@ -606,3 +564,4 @@ glossary_repo = GlossaryRepository()
 global_glossary_repo = GlobalGlossaryRepository()
 drawings_repo = DrawingsRepository()
 snippets_repo = SnippetsRepository()
+translation_memory = TranslationMemory(TRANSLATION_MEMORY_FILE)
@@ -0,0 +1,150 @@
+"""
+Memoria de traducción persistente (SQLite) delante de DeepL.
+
+Clave: (texto origen, idioma origen, idioma destino, huella del glosario).
+Política de tamaño: al superar max_entries se eliminan las entradas usadas
+hace más tiempo hasta quedar en el 90% del máximo.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Mapping, Optional
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS translations (
+    src_text TEXT NOT NULL,
+    source_lang TEXT NOT NULL,
+    target_lang TEXT NOT NULL,
+    glossary_fp TEXT NOT NULL,
+    tgt_text TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (src_text, source_lang, target_lang, glossary_fp)
+);
+CREATE INDEX IF NOT EXISTS idx_translations_last_used ON translations (last_used);
+"""
+
+# SQLite limita el número de parámetros por sentencia
+_MAX_PARAMS = 500
+
+
+def glossary_fingerprint(glossary_map: Optional[Mapping[str, str]]) -> str:
+    """Huella estable del glosario (vacía si no hay glosario)."""
+    if not glossary_map:
+        return ""
+    payload = json.dumps(sorted(glossary_map.items()), ensure_ascii=False)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+
+class TranslationMemory:
+    def __init__(self, db_path: Path, max_entries: int = 200_000):
+        self._db_path = db_path
+        self.max_entries = max_entries
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self._db_path), check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def lookup(
+        self,
+        texts: List[str],
+        source_lang: str,
+        target_lang: str,
+        glossary_fp: str = "",
+    ) -> Dict[str, str]:
+        """Devuelve {texto: traducción} para los textos presentes en memoria."""
+        unique = list(dict.fromkeys(texts))
+        found: Dict[str, str] = {}
+        with self._lock:
+            conn = self._connect()
+            for i in range(0, len(unique), _MAX_PARAMS):
+                chunk = unique[i:i + _MAX_PARAMS]
+                placeholders = ",".join("?" * len(chunk))
+                rows = conn.execute(
+                    f"SELECT src_text, tgt_text FROM translations "
+                    f"WHERE source_lang = ? AND target_lang = ? AND glossary_fp = ? "
+                    f"AND src_text IN ({placeholders})",
+                    [source_lang, target_lang, glossary_fp, *chunk],
+                ).fetchall()
+                found.update(rows)
+            if found:
+                now = time.time()
+                conn.executemany(
+                    "UPDATE translations SET last_used = ?, hits = hits + 1 "
+                    "WHERE src_text = ? AND source_lang = ? AND target_lang = ? AND glossary_fp = ?",
+                    [(now, src, source_lang, target_lang, glossary_fp) for src in found],
+                )
+                conn.commit()
+            self.hits += len(found)
+            self.misses += len(unique) - len(found)
+        return found
+
+    def store(
+        self,
+        translations: Mapping[str, str],
+        source_lang: str,
+        target_lang: str,
+        glossary_fp: str = "",
+    ) -> None:
+        if not translations:
+            return
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.executemany(
+                "INSERT OR REPLACE INTO translations "
+                "(src_text, source_lang, target_lang, glossary_fp, tgt_text, created_at, last_used, hits) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, 0)",
+                [
+                    (src, source_lang, target_lang, glossary_fp, tgt, now, now)
+                    for src, tgt in translations.items()
+                ],
+            )
+            self._evict(conn)
+            conn.commit()
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        if self.max_entries <= 0:
+            return
+        (count,) = conn.execute("SELECT COUNT(*) FROM translations").fetchone()
+        if count <= self.max_entries:
+            return
+        keep = int(self.max_entries * 0.9)
+        conn.execute(
+            "DELETE FROM translations WHERE rowid IN ("
+            "SELECT rowid FROM translations ORDER BY last_used ASC LIMIT ?)",
+            (count - keep,),
+        )
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            (count,) = self._connect().execute("SELECT COUNT(*) FROM translations").fetchone()
+        return {
+            "entries": count,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM translations")
+            conn.commit()
+            self.hits = 0
+            self.misses = 0
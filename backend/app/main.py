@@ -12,10 +12,13 @@ if sys.stderr is not None and hasattr(sys.stderr, 'buffer'):
     sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', errors='replace')
 
 import os
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
-from .api import projects, pages, glossary, export, jobs, settings, global_glossary, drawings, snippets
+from .api import projects, pages, page_ocr, text_regions, page_images, glossary, export, jobs, settings, global_glossary, drawings, snippets
+from .services import ocr_pool, executors
 
 # Configuración CORS desde variables de entorno (para Docker/VPS)
 ALLOWED_ORIGINS = os.environ.get("ALLOWED_ORIGINS", "")
@@ -28,10 +31,19 @@ else:
     cors_origins = ["null"]
     cors_regex = r"^https?://(localhost|127\.0\.0\.1)(:\d+)?$"
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Cerrar procesos OCR y executors al apagar el servidor
+    ocr_pool.shutdown()
+    executors.shutdown()
+
+
 app = FastAPI(
     title="NB7X Translator API",
     description="API para traducir PDFs de imagen de chino a español",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 # CORS middleware configurado según el entorno
@@ -44,9 +56,22 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.exception_handler(executors.ExecutorBusyError)
+async def executor_busy_handler(request: Request, exc: executors.ExecutorBusyError):
+    """Backpressure: el cliente debe reintentar cuando haya capacidad."""
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc), "executor": exc.name},
+        headers={"Retry-After": "2"},
+    )
+
+
 # Routers
 app.include_router(projects.router, prefix="/projects", tags=["projects"])
 app.include_router(pages.router, prefix="/projects/{project_id}/pages", tags=["pages"])
+app.include_router(page_ocr.router, prefix="/projects/{project_id}/pages", tags=["pages"])
+app.include_router(text_regions.router, prefix="/projects/{project_id}/pages", tags=["pages"])
+app.include_router(page_images.router, prefix="/projects/{project_id}/pages", tags=["pages"])
 app.include_router(glossary.router, prefix="/projects/{project_id}/glossary", tags=["glossary"])
 app.include_router(global_glossary.router, prefix="/glossary/global", tags=["glossary-global"])
 app.include_router(export.router, prefix="/projects/{project_id}/export", tags=["export"])
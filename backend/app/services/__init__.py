@@ -1,2 +1,2 @@
 # Services
-from . import render_service, ocr_service, ocr_service_paddle, ocr_provider, ocr_postprocess, text_script_utils, translate_mixed_service, translate_service, compose_service, job_service, export_service
+from . import image_cache, render_service, ocr_service, ocr_service_paddle, ocr_filters, ocr_regions, ocr_raw_cache, ocr_provider, ocr_pool, ocr_postprocess, text_script_utils, translate_mixed_service, translate_service, region_translation, compose_draw, compose_state, compose_service, png_bands, page_stages, render_pipeline, executors, job_service, export_service, export_vector
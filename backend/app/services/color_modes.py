@@ -0,0 +1,88 @@
+"""
+Modos de color de página (rgb / gray / bilevel) y detección de color.
+
+El modo se elige por proyecto ("auto" rasteriza en RGB y pasa a gris si la
+página no tiene color significativo). Una vez rasterizada, la propia página
+lleva el modo por el resto del flujo: en memoria es un array (H, W, 3)
+uint8, (H, W) uint8 o (H, W) bool, y en disco una PNG RGB, gris de 8 bits o
+de 1 bit. La composición y la exportación lo leen de ahí; los motores OCR,
+que esperan RGB, reciben una vista (rgb_view).
+"""
+
+import base64
+import binascii
+import functools
+import io
+import logging
+from typing import Optional, Tuple
+
+import numpy as np
+from PIL import Image, ImageColor
+
+logger = logging.getLogger(__name__)
+
+# Diferencia máx-mín entre canales a partir de la cual un píxel "tiene color"
+COLOR_CHROMA_THRESHOLD = 48
+# Fracción de píxeles con color para considerar que la página lo tiene
+# (una línea roja fina en un A3 a 450 DPI ya la supera)
+COLOR_PIXEL_RATIO = 1e-5
+# Se muestrea uno de cada _SAMPLE_STEP píxeles en cada eje
+_SAMPLE_STEP = 2
+
+
+def has_color(image: np.ndarray) -> bool:
+    """Si un array RGB tiene color significativo (no solo grises y ruido de antialiasing)."""
+    if image.ndim != 3:
+        return False
+    sample = image[::_SAMPLE_STEP, ::_SAMPLE_STEP, :3].astype(np.int16)
+    chroma = sample.max(axis=2) - sample.min(axis=2)
+    return np.count_nonzero(chroma > COLOR_CHROMA_THRESHOLD) > COLOR_PIXEL_RATIO * chroma.size
+
+
+def is_neutral(color: Optional[str]) -> bool:
+    """Si un color CSS/hex (o None) es un gris."""
+    if not color:
+        return True
+    r, g, b = ImageColor.getrgb(color)[:3]
+    return max(r, g, b) - min(r, g, b) <= COLOR_CHROMA_THRESHOLD
+
+
+def image_is_neutral(img: Image.Image) -> bool:
+    if img.mode in ("1", "L", "LA"):
+        return True
+    return not has_color(np.asarray(img.convert("RGB")))
+
+
+@functools.lru_cache(maxsize=32)
+def stamp_is_neutral(image_data: str) -> bool:
+    """Si la imagen base64 de un elemento de dibujo es gris (las ilegibles no se dibujan)."""
+    try:
+        with Image.open(io.BytesIO(base64.b64decode(image_data))) as img:
+            return image_is_neutral(img)
+    except (OSError, binascii.Error, ValueError) as e:
+        logger.warning("Imagen de dibujo ilegible, se trata como neutra: %s", e)
+        return True
+
+
+def gray_level(color: Tuple[int, ...]) -> int:
+    """Gris de un color RGB con la misma fórmula que PIL (ITU-R 601-2)."""
+    r, g, b = color[:3]
+    return int(r * 299 + g * 587 + b * 114) // 1000
+
+
+def ink(color: Tuple[int, ...], mode: str):
+    """Color RGB en el formato que espera ImageDraw para un lienzo de ese modo."""
+    return color if mode == "RGB" else gray_level(color)
+
+
+def to_uint8(page: np.ndarray) -> np.ndarray:
+    """Páginas de 1 bit (bool) a 0/255; las demás tal cual."""
+    return page.astype(np.uint8) * 255 if page.dtype == bool else page
+
+
+def rgb_view(page: np.ndarray) -> np.ndarray:
+    """(H, W, 3) uint8 de cualquier página; para gris es una vista sin copia."""
+    if page.ndim == 3:
+        return page
+    gray = to_uint8(page)
+    return np.broadcast_to(gray[:, :, None], gray.shape + (3,))
@@ -0,0 +1,268 @@
+"""
+Primitivas de dibujo de la composición: regiones de texto en modo patch y
+elementos de dibujo (líneas, rectángulos, texto, imágenes).
+
+Cada primitiva dibuja sobre un lienzo cuyo origen puede no ser (0, 0): la
+composición completa usa la página entera y la incremental un recorte de la
+zona afectada, con las mismas coordenadas de página. Las coordenadas ya
+llegan en píxeles del DPI de salida; scale (DPI salida / DPI de las regiones)
+solo ajusta las medidas fijas en píxeles: padding, límites de fuente y margen
+de muestreo del fondo. Lo que cada primitiva puede pintar (su extent) se
+calcula en compose_state.
+"""
+
+import base64
+import binascii
+import io
+import logging
+from typing import List, NamedTuple, Optional, Tuple
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from ..db.models import DrawingElement, TextRegion
+from . import text_layout
+from .color_modes import ink, rgb_view
+
+logger = logging.getLogger(__name__)
+
+Box = Tuple[int, int, int, int]
+Origin = Tuple[int, int]
+
+PATCH_PADDING = 2
+BACKGROUND_MARGIN = 5
+
+
+def _estimate_background_color(img_array: np.ndarray, bbox: List[float], margin: int = BACKGROUND_MARGIN) -> tuple:
+    """
+    Estima el color de fondo alrededor del bbox.
+    Para esquemas eléctricos, filtra colores de líneas y usa solo colores claros.
+    Recibe img_array (numpy) pre-computado para evitar conversiones repetidas;
+    puede ser RGB, gris o bilevel (color_modes).
+    """
+    x1, y1, x2, y2 = [int(v) for v in bbox]
+    img_h, img_w = img_array.shape[:2]
+
+    # Expandir bbox para obtener el marco
+    x1_outer = max(0, x1 - margin)
+    y1_outer = max(0, y1 - margin)
+    x2_outer = min(img_w, x2 + margin)
+    y2_outer = min(img_h, y2 + margin)
+
+    # Obtener píxeles del marco (excluyendo el interior)
+    strips = []
+
+    # Top strip
+    if y1_outer < y1:
+        strips.append(rgb_view(img_array[y1_outer:y1, x1_outer:x2_outer]).reshape(-1, 3))
+    # Bottom strip
+    if y2 < y2_outer:
+        strips.append(rgb_view(img_array[y2:y2_outer, x1_outer:x2_outer]).reshape(-1, 3))
+    # Left strip
+    if x1_outer < x1:
+        strips.append(rgb_view(img_array[y1:y2, x1_outer:x1]).reshape(-1, 3))
+    # Right strip
+    if x2 < x2_outer:
+        strips.append(rgb_view(img_array[y1:y2, x2:x2_outer]).reshape(-1, 3))
+
+    pixels_array = np.concatenate(strips).astype(np.int64) if strips else np.empty((0, 3), np.int64)
+    if len(pixels_array) == 0:
+        return (255, 255, 255)  # Default: blanco
+
+    # Filtrar solo píxeles claros (luminancia > 200) para evitar líneas de colores
+    luminance = 0.299 * pixels_array[:, 0] + 0.587 * pixels_array[:, 1] + 0.114 * pixels_array[:, 2]
+    light_pixels = pixels_array[luminance > 200]
+
+    if len(light_pixels) > 0:
+        # Usar mediana de píxeles claros
+        median_color = np.median(light_pixels, axis=0).astype(int)
+        return tuple(median_color)
+
+    # Si no hay píxeles claros, usar blanco por defecto (típico en esquemas)
+    return (255, 255, 255)
+
+
+def _get_text_color(bg_color: tuple) -> tuple:
+    """Determina el color del texto basado en el fondo (contraste)."""
+    luminance = 0.299 * bg_color[0] + 0.587 * bg_color[1] + 0.114 * bg_color[2]
+    return (0, 0, 0) if luminance > 128 else (255, 255, 255)
+
+
+def _hex_to_rgb(value: str) -> tuple:
+    hex_color = value.lstrip('#')
+    return tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
+
+
+class TextPlan(NamedTuple):
+    """Geometría de una región patch: caja, maquetación y posición de cada línea."""
+    box: Box
+    padding: int
+    font_family: str
+    layout: text_layout.TextLayout
+    positions: Tuple[Tuple[int, int], ...]
+
+
+def scaled_px(value: int, scale: float) -> int:
+    return max(1, round(value * scale))
+
+
+def plan_text_region(region: TextRegion, effective_bbox: List[float], scale: float) -> Optional[TextPlan]:
+    # Usar texto traducido o original si no hay traducción
+    text = region.tgt_text or region.src_text
+    if not text or region.compose_mode != "patch":
+        # TODO: Implementar modo "inpaint" si se necesita
+        return None
+
+    x1, y1, x2, y2 = [int(v) for v in effective_bbox]
+    # Normalizar coordenadas para PIL (requiere x1<=x2, y1<=y2)
+    x1, y1, x2, y2 = min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2)
+    bbox_width = x2 - x1
+    bbox_height = y2 - y1
+
+    # Ajustar texto (búsqueda binaria + wrap en N líneas, con caché de medidas)
+    font_family = getattr(region, 'font_family', 'Arial')
+    padding = round(PATCH_PADDING * scale)
+    layout = text_layout.fit_text(
+        text, bbox_width, bbox_height,
+        font_family=font_family,
+        fixed_font_size=region.font_size,
+        min_font_size=scaled_px(text_layout.MIN_FONT_SIZE, scale),
+        max_font_size=scaled_px(text_layout.MAX_FONT_SIZE, scale),
+    )
+
+    # Posición de cada línea según la alineación
+    align = getattr(region, 'text_align', 'center')
+    positions = []
+    y_offset = y1 + (bbox_height - layout.total_height) // 2
+    for line_width, line_height in zip(layout.line_widths, layout.line_heights):
+        if align == 'left':
+            x_offset = x1 + padding
+        elif align == 'right':
+            x_offset = x2 - line_width - padding
+        else:  # center
+            x_offset = x1 + (bbox_width - line_width) // 2
+        positions.append((x_offset, y_offset))
+        y_offset += line_height
+
+    return TextPlan((x1, y1, x2, y2), padding, font_family, layout, tuple(positions))
+
+
+def region_colors(region: TextRegion, img_array: np.ndarray, bbox: List[float], margin: int) -> Tuple[tuple, tuple]:
+    """(fondo, texto) de una región; bbox y margin en los píxeles de img_array."""
+    # Color de fondo: el de la región o estimado automáticamente sobre la original
+    if getattr(region, 'bg_color', None):
+        bg_color = _hex_to_rgb(region.bg_color)
+    else:
+        bg_color = _estimate_background_color(img_array, bbox, margin)
+
+    # Color de texto: el de la región o por contraste con el fondo
+    if getattr(region, 'text_color', None):
+        text_color = _hex_to_rgb(region.text_color)
+    else:
+        text_color = _get_text_color(bg_color)
+    return bg_color, text_color
+
+
+def draw_text_region(
+    canvas: Image.Image,
+    draw: ImageDraw.ImageDraw,
+    img_array: np.ndarray,
+    region: TextRegion,
+    effective_bbox: List[float],
+    scale: float = 1.0,
+    origin: Origin = (0, 0),
+) -> None:
+    """Dibuja una región en modo patch: rectángulo de fondo + texto maquetado."""
+    plan = plan_text_region(region, effective_bbox, scale)
+    if plan is None:
+        return
+    ox, oy = origin
+    bg_color, text_color = region_colors(region, img_array, region.bbox, scaled_px(BACKGROUND_MARGIN, scale))
+
+    # Dibujar rectángulo de fondo
+    x1, y1, x2, y2 = plan.box
+    pad = plan.padding
+    draw.rectangle([x1 - pad - ox, y1 - pad - oy, x2 + pad - ox, y2 + pad - oy], fill=ink(bg_color, canvas.mode))
+
+    font = text_layout.resolve_font(plan.font_family, plan.layout.font_size)
+    for line, (x, y) in zip(plan.layout.lines, plan.positions):
+        draw.text((x - ox, y - oy), line, fill=ink(text_color, canvas.mode), font=font)
+
+    # Marcar si hay overflow
+    if plan.layout.overflow:
+        region.needs_review = True
+
+
+def stroke_width_px(elem: DrawingElement, dpi: int) -> int:
+    # El grosor se escala con el DPI para coincidir con el zoom 100% en pantalla (96 DPI)
+    return max(1, int(elem.stroke_width * dpi / 96.0))
+
+
+def draw_drawing_element(
+    canvas: Image.Image,
+    draw: ImageDraw.ImageDraw,
+    elem: DrawingElement,
+    dpi: int = 450,
+    origin: Origin = (0, 0),
+) -> None:
+    """Dibuja un elemento de dibujo (línea, rectángulo, texto, imagen) sobre el lienzo."""
+    scaled_width = stroke_width_px(elem, dpi)
+    ox, oy = origin
+    # Coordenadas de página -> coordenadas del lienzo
+    points = [v - (oy if i % 2 else ox) for i, v in enumerate(elem.points)]
+
+    if elem.element_type == 'line':
+        if len(points) >= 4:
+            x1, y1, x2, y2 = points[:4]
+            draw.line(
+                [(x1, y1), (x2, y2)],
+                fill=elem.stroke_color,
+                width=scaled_width,
+            )
+
+    elif elem.element_type == 'polyline':
+        # Polilínea: array de puntos [x1,y1,x2,y2,x3,y3,...]
+        if len(points) >= 4 and len(points) % 2 == 0:
+            path = [(points[i], points[i+1]) for i in range(0, len(points), 2)]
+            draw.line(path, fill=elem.stroke_color, width=scaled_width)
+
+    elif elem.element_type == 'rect':
+        if len(points) >= 4:
+            x1, y1, x2, y2 = points[:4]
+            if elem.fill_color:
+                draw.rectangle([(x1, y1), (x2, y2)], fill=elem.fill_color, outline=elem.stroke_color, width=scaled_width)
+            else:
+                draw.rectangle([(x1, y1), (x2, y2)], outline=elem.stroke_color, width=scaled_width)
+
+    elif elem.element_type == 'circle':
+        if len(points) >= 4:
+            x1, y1, x2, y2 = points[:4]
+            cx = (x1 + x2) / 2
+            cy = (y1 + y2) / 2
+            rx = abs(x2 - x1) / 2
+            ry = abs(y2 - y1) / 2
+            bbox = [cx - rx, cy - ry, cx + rx, cy + ry]
+            if elem.fill_color:
+                draw.ellipse(bbox, fill=elem.fill_color, outline=elem.stroke_color, width=scaled_width)
+            else:
+                draw.ellipse(bbox, outline=elem.stroke_color, width=scaled_width)
+
+    elif elem.element_type == 'text':
+        if len(points) >= 2 and elem.text:
+            x, y = points[:2]
+            font = text_layout.resolve_font(elem.font_family or 'Arial', elem.font_size or 14)
+            draw.text((x, y), elem.text, fill=elem.text_color, font=font)
+
+    elif elem.element_type == 'image':
+        if len(points) >= 4 and elem.image_data:
+            x1, y1, x2, y2 = [int(v) for v in elem.points[:4]]
+            try:
+                image_bytes = base64.b64decode(elem.image_data)
+                stamp_img = Image.open(io.BytesIO(image_bytes)).convert("RGBA")
+                target_width = x2 - x1
+                target_height = y2 - y1
+                if target_width > 0 and target_height > 0:
+                    stamp_img = stamp_img.resize((target_width, target_height), Image.Resampling.LANCZOS)
+                    canvas.paste(stamp_img, (x1 - ox, y1 - oy), stamp_img)
+            except (OSError, binascii.Error, ValueError) as e:
+                logger.warning("No se pudo dibujar la imagen del elemento %s: %s", elem.id, e)
@@ -1,24 +1,44 @@
 """
 Servicio de composición: dibuja texto traducido sobre la imagen original.
 Modo default: PATCH (rectángulo de color de fondo + texto).
+
+Composición incremental: el proceso del servidor (jobs y API componen en él,
+ver executors.run_compose) guarda, para las últimas páginas que compuso, la
+imagen resultante, la firma y el extent de cada región/dibujo, la PNG
+codificada por bandas y el thumbnail. En la siguiente composición de la
+misma página solo se restauran desde la original los rectángulos de lo que
+cambió (extent anterior y nuevo), se redibuja recortado todo lo que los corta
+en el orden habitual y se re-codifican las bandas PNG y la zona del thumbnail
+afectadas. Si cambió la original, el orden de dibujo o casi toda la página,
+se compone de cero. El estado y las zonas dañadas se llevan en
+compose_state; las zonas re-dibujadas se anotan en la pirámide de teselas
+(tile_service) para invalidar solo las teselas que cortan.
+
+Independencia de resolución: regiones y dibujos se guardan en píxeles del DPI
+con el que se hizo el OCR (source_dpi). Antes de dibujar se llevan al DPI de
+salida (bbox, puntos y tamaños de fuente), así que la vista previa a 150 DPI,
+la página a 450 y una exportación a 600 salen del mismo juego de regiones.
+
+Modo de color: si la original es gris o bilevel (color_modes) y ninguna
+región ni dibujo tiene color, se compone sobre un lienzo gris y la PNG sale
+gris o de 1 bit; si no, en RGB.
 """
 
+import dataclasses
+import functools
+import logging
 from pathlib import Path
-from typing import List
-from functools import lru_cache
-import base64
-import io
+from typing import List, Optional, Tuple
 
 import numpy as np
-from PIL import Image, ImageDraw, ImageFont
 
 from ..db.models import TextRegion, DrawingElement
+from . import compose_draw, compose_state, image_cache, tile_service
+from .color_modes import is_neutral, stamp_is_neutral
+from .compose_state import Item
+from .spatial_index import SpatialIndex
 
-
-def _bbox_intersects(a: List[float], b: List[float]) -> bool:
-    ax1, ay1, ax2, ay2 = a
-    bx1, by1, bx2, by2 = b
-    return not (ax2 <= bx1 or ax1 >= bx2 or ay2 <= by1 or ay1 >= by2)
+logger = logging.getLogger(__name__)
 
 
 def _expand_bbox_height(bbox: List[float], factor: float, img_h: int) -> List[float]:
@@ -34,146 +54,148 @@ def _expand_bbox_height(bbox: List[float], factor: float, img_h: int) -> List[fl
     return [float(x1), ny1, float(x2), ny2]
 
 
-def _effective_bbox_for_compose(region: TextRegion, regions: List[TextRegion], img_w: int, img_h: int) -> List[float]:
-    bbox = list(region.bbox)
-    is_isolated = True
-    for other in regions:
-        if other is region:
-            continue
-        if _bbox_intersects(bbox, other.bbox):
-            is_isolated = False
-            break
-    if is_isolated:
-        return _expand_bbox_height(bbox, 1.2, img_h)
-    return bbox
-
-
-@lru_cache(maxsize=64)
-def _resolve_font(font_family: str, size: int) -> ImageFont.FreeTypeFont:
-    """Resuelve y cachea fuentes para evitar re-abrir archivos .ttf repetidamente."""
-    font_names = [f"{font_family}.ttf", f"{font_family.lower()}.ttf", "arial.ttf", "segoeui.ttf", "tahoma.ttf"]
-    for font_name in font_names:
-        try:
-            return ImageFont.truetype(font_name, size)
-        except Exception:
-            continue
-    return ImageFont.load_default()
-
-
-def _estimate_background_color(img_array: np.ndarray, bbox: List[float], margin: int = 5) -> tuple:
+def effective_bboxes_for_compose(regions: List[TextRegion], img_h: int) -> List[List[float]]:
     """
-    Estima el color de fondo alrededor del bbox.
-    Para esquemas eléctricos, filtra colores de líneas y usa solo colores claros.
-    Recibe img_array (numpy) pre-computado para evitar conversiones repetidas.
+    Bbox de composición de cada región: las aisladas (sin solape con otra)
+    se amplían en altura. El solape se resuelve con el índice espacial.
     """
-    x1, y1, x2, y2 = [int(v) for v in bbox]
-    img_h, img_w = img_array.shape[:2]
-    
-    # Expandir bbox para obtener el marco
-    x1_outer = max(0, x1 - margin)
-    y1_outer = max(0, y1 - margin)
-    x2_outer = min(img_w, x2 + margin)
-    y2_outer = min(img_h, y2 + margin)
-    
-    # Obtener píxeles del marco (excluyendo el interior)
-    pixels = []
-    
-    # Top strip
-    if y1_outer < y1:
-        pixels.extend(img_array[y1_outer:y1, x1_outer:x2_outer].reshape(-1, 3).tolist())
-    # Bottom strip
-    if y2 < y2_outer:
-        pixels.extend(img_array[y2:y2_outer, x1_outer:x2_outer].reshape(-1, 3).tolist())
-    # Left strip
-    if x1_outer < x1:
-        pixels.extend(img_array[y1:y2, x1_outer:x1].reshape(-1, 3).tolist())
-    # Right strip
-    if x2 < x2_outer:
-        pixels.extend(img_array[y1:y2, x2:x2_outer].reshape(-1, 3).tolist())
-    
-    if not pixels:
-        return (255, 255, 255)  # Default: blanco
-    
-    pixels_array = np.array(pixels)
-    
-    # Filtrar solo píxeles claros (luminancia > 200) para evitar líneas de colores
-    luminance = 0.299 * pixels_array[:, 0] + 0.587 * pixels_array[:, 1] + 0.114 * pixels_array[:, 2]
-    light_pixels = pixels_array[luminance > 200]
-    
-    if len(light_pixels) > 0:
-        # Usar mediana de píxeles claros
-        median_color = np.median(light_pixels, axis=0).astype(int)
-        return tuple(median_color)
-    
-    # Si no hay píxeles claros, usar blanco por defecto (típico en esquemas)
-    return (255, 255, 255)
-
-
-def _get_text_color(bg_color: tuple) -> tuple:
-    """Determina el color del texto basado en el fondo (contraste)."""
-    luminance = 0.299 * bg_color[0] + 0.587 * bg_color[1] + 0.114 * bg_color[2]
-    return (0, 0, 0) if luminance > 128 else (255, 255, 255)
-
-
-def _fit_text(
-    draw: ImageDraw.ImageDraw,
-    text: str,
-    bbox_width: int,
-    bbox_height: int,
-    font_path: str = None,
-    min_font_size: int = 8,
-    max_font_size: int = 72,
-    fixed_font_size: int = None,
-    font_family: str = "Arial",
-    text_align: str = "center",
-) -> tuple:
+    index = SpatialIndex(r.bbox for r in regions)
+    return [
+        _expand_bbox_height(list(region.bbox), 1.2, img_h) if index.is_isolated(i) else list(region.bbox)
+        for i, region in enumerate(regions)
+    ]
+
+
+def _region_signature(region: TextRegion, effective_bbox: List[float], scale: float) -> tuple:
+    """Todo lo que influye en cómo se pinta la región."""
+    return (
+        region.tgt_text or region.src_text, region.compose_mode, tuple(region.bbox), tuple(effective_bbox),
+        region.font_size, region.font_family, region.text_color, region.bg_color, region.text_align,
+        region.render_order, scale,
+    )
+
+
+def _scaled_font_size(size: Optional[int], scale: float) -> Optional[int]:
+    return max(1, round(size * scale)) if size else size
+
+
+def _to_target_space(
+    regions: List[TextRegion],
+    drawings: List[DrawingElement],
+    scale: float,
+) -> Tuple[List[TextRegion], List[DrawingElement]]:
     """
-    Ajusta el texto al bbox, reduciendo tamaño o haciendo wrap si es necesario.
-    
-    Returns:
-        (font, lines, overflow, line_height)
+    Copias de regiones y dibujos con coordenadas y fuentes en píxeles de salida.
+    Los puntos de los dibujos se redondean aquí, una sola vez: PIL trunca las
+    coordenadas fraccionarias y, desplazadas al origen de una zona dañada, no
+    caerían en los mismos píxeles que en la composición completa.
     """
-    # Si hay tamaño fijo, usarlo directamente
-    if fixed_font_size:
-        font = _resolve_font(font_family, fixed_font_size)
-        return font, [text], False, fixed_font_size
-    
-    # Auto-ajustar tamaño
-    for size in range(max_font_size, min_font_size - 1, -1):
-        font = _resolve_font(font_family, size)
-        
-        # Verificar si cabe en una línea
-        text_bbox = draw.textbbox((0, 0), text, font=font)
-        text_width = text_bbox[2] - text_bbox[0]
-        text_height = text_bbox[3] - text_bbox[1]
-        
-        if text_width <= bbox_width and text_height <= bbox_height:
-            return font, [text], False, size
-        
-        # Intentar wrap a 2 líneas
-        words = text.split()
-        if len(words) > 1:
-            mid = len(text) // 2
-            space_idx = text.find(" ", mid)
-            if space_idx == -1:
-                space_idx = text.rfind(" ", 0, mid)
-            
-            if space_idx > 0:
-                line1 = text[:space_idx]
-                line2 = text[space_idx + 1:]
-                
-                bbox1 = draw.textbbox((0, 0), line1, font=font)
-                bbox2 = draw.textbbox((0, 0), line2, font=font)
-                
-                max_width = max(bbox1[2] - bbox1[0], bbox2[2] - bbox2[0])
-                total_height = (bbox1[3] - bbox1[1]) + (bbox2[3] - bbox2[1])
-                
-                if max_width <= bbox_width and total_height <= bbox_height:
-                    return font, [line1, line2], False, size
-    
-    # Si nada cabe, usar el tamaño mínimo y marcar overflow
-    font = _resolve_font(font_family, min_font_size)
-    return font, [text], True, min_font_size
+    snapped_drawings = [
+        dataclasses.replace(
+            elem,
+            points=[round(v * scale) for v in elem.points],
+            font_size=_scaled_font_size(elem.font_size, scale),
+        )
+        for elem in drawings
+    ]
+    if scale == 1.0:
+        return regions, snapped_drawings
+    scaled_regions = [
+        dataclasses.replace(
+            region,
+            bbox=[v * scale for v in region.bbox],
+            font_size=_scaled_font_size(region.font_size, scale),
+        )
+        for region in regions
+    ]
+    return scaled_regions, snapped_drawings
+
+
+def _page_items(
+    img_array: np.ndarray,
+    regions: List[TextRegion],
+    drawings: List[DrawingElement],
+    dpi: int,
+    scale: float,
+) -> List[Item]:
+    """Regiones (por render_order) y después dibujos, en orden de pintado."""
+    # Ordenar regiones por render_order (menor = se dibuja primero/debajo)
+    sorted_regions = sorted(regions, key=lambda r: getattr(r, 'render_order', 0))
+    effective_bboxes = effective_bboxes_for_compose(sorted_regions, img_array.shape[0])
+    items = [
+        Item(
+            ("region", region.id),
+            _region_signature(region, bbox, scale),
+            compose_state.text_region_extent(region, bbox, scale),
+            functools.partial(
+                compose_draw.draw_text_region, img_array=img_array, region=region, effective_bbox=bbox, scale=scale,
+            ),
+        )
+        for region, bbox in zip(sorted_regions, effective_bboxes)
+    ]
+    # Los elementos de dibujo van encima de las regiones de texto
+    items.extend(
+        Item(
+            ("drawing", elem.id),
+            dataclasses.astuple(elem),
+            compose_state.drawing_extent(elem, dpi),
+            functools.partial(compose_draw.draw_drawing_element, elem=elem, dpi=dpi),
+        )
+        for elem in drawings
+    )
+    return items
+
+
+def _canvas_modes(img_array: np.ndarray, regions: List[TextRegion], drawings: List[DrawingElement]) -> Tuple[str, str]:
+    """(modo del lienzo, modo de la PNG de salida) según la original y los colores usados."""
+    colors = [c for r in regions for c in (r.text_color, r.bg_color)]
+    colors += [c for d in drawings for c in (d.stroke_color, d.fill_color, d.text_color)]
+    if (
+        img_array.ndim == 3
+        or not all(is_neutral(c) for c in colors)
+        or not all(stamp_is_neutral(d.image_data) for d in drawings if d.element_type == 'image' and d.image_data)
+    ):
+        return "RGB", "RGB"
+    return "L", "1" if img_array.dtype == bool else "L"
+
+
+def _compose(
+    original_path: Path,
+    regions: List[TextRegion],
+    drawings: List[DrawingElement],
+    output_dir: Path,
+    page_number: int,
+    dpi: int,
+    source_dpi: Optional[int],
+) -> Path:
+    output_path = output_dir / "pages" / f"{page_number:03d}_translated_{dpi}.png"
+    thumb_path = output_dir / "thumbs" / f"{page_number:03d}_translated.jpg"
+
+    img_array = image_cache.get_array(original_path)  # Compartido y de solo lectura
+    st = Path(original_path).stat()
+    scale = dpi / source_dpi if source_dpi else 1.0
+    regions, drawings = _to_target_space(regions, drawings, scale)
+    modes = _canvas_modes(img_array, regions, drawings)
+    # Un cambio de modo (p. ej. el primer color) obliga a componer de cero
+    source_key = (str(Path(original_path).resolve()), st.st_mtime_ns, st.st_size, modes)
+    items = _page_items(img_array, regions, drawings, dpi, scale)
+
+    state = compose_state.take_state(output_path, source_key)
+    rects = compose_state.damaged_rects(state, items) if state is not None else None
+    if state is None or rects is None:
+        state = compose_state.compose_full(source_key, img_array, items, modes)
+        logger.debug("Composición completa de %s (%d elementos)", output_path.name, len(items))
+    else:
+        compose_state.compose_incremental(state, img_array, items, rects)
+        logger.debug("Composición incremental de %s (%d zonas)", output_path.name, len(rects))
+
+    # Guardar imagen traducida y thumbnail (JPEG para mayor velocidad)
+    state.png.write(output_path)
+    tile_service.record_update(output_path, rects)  # None: cambió la página entera
+    thumb_path.parent.mkdir(parents=True, exist_ok=True)
+    state.thumb.save(thumb_path, "JPEG", quality=85)
+    compose_state.put_state(output_path, state)
+    return output_path
 
 
 def compose_page(
@@ -182,195 +204,23 @@ def compose_page(
     output_dir: Path,
     page_number: int,
     dpi: int,
+    source_dpi: Optional[int] = None,
 ) -> Path:
     """
     Compone la página traducida dibujando texto ES sobre las regiones de texto.
-    
+
     Args:
         original_path: Ruta a la imagen original
         regions: Lista de TextRegion con traducciones
         output_dir: Directorio del proyecto
         page_number: Número de página
         dpi: DPI de la imagen
-    
+        source_dpi: DPI de las coordenadas de las regiones (None = el mismo que dpi)
+
     Returns:
         Ruta a la imagen traducida
     """
-    # Cargar imagen original
-    img = Image.open(original_path).convert("RGB")
-    draw = ImageDraw.Draw(img)
-    img_array = np.array(img)  # Pre-computar una sola vez para todas las regiones
-    
-    # Ordenar regiones por render_order (menor = se dibuja primero/debajo)
-    sorted_regions = sorted(regions, key=lambda r: getattr(r, 'render_order', 0))
-    
-    img_w, img_h = img.size
-    for region in sorted_regions:
-        # Usar texto traducido o original si no hay traducción
-        text = region.tgt_text or region.src_text
-        if not text:
-            continue
-
-        effective_bbox = _effective_bbox_for_compose(region, sorted_regions, img_w, img_h)
-        x1, y1, x2, y2 = [int(v) for v in effective_bbox]
-        # Normalizar coordenadas para PIL (requiere x1<=x2, y1<=y2)
-        x1, y1, x2, y2 = min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2)
-        bbox_width = x2 - x1
-        bbox_height = y2 - y1
-        
-        if region.compose_mode == "patch":
-            # Determinar color de fondo
-            bg_color = None
-            if getattr(region, 'bg_color', None):
-                # Convertir hex a RGB
-                hex_color = region.bg_color.lstrip('#')
-                bg_color = tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
-            else:
-                # Estimar color de fondo automáticamente
-                bg_color = _estimate_background_color(img_array, region.bbox)
-            
-            # Determinar color de texto
-            text_color = (0, 0, 0)  # Default negro
-            if getattr(region, 'text_color', None):
-                hex_color = region.text_color.lstrip('#')
-                text_color = tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
-            else:
-                text_color = _get_text_color(bg_color)
-            
-            # Dibujar rectángulo de fondo
-            padding = 2
-            draw.rectangle(
-                [x1 - padding, y1 - padding, x2 + padding, y2 + padding],
-                fill=bg_color,
-            )
-            
-            # Ajustar y dibujar texto con propiedades personalizadas
-            font, lines, overflow, final_size = _fit_text(
-                draw, text, bbox_width, bbox_height,
-                fixed_font_size=region.font_size,
-                font_family=getattr(region, 'font_family', 'Arial'),
-                text_align=getattr(region, 'text_align', 'center'),
-            )
-            
-            # Calcular altura total y posición
-            total_height = 0
-            line_heights = []
-            for line in lines:
-                bbox = draw.textbbox((0, 0), line, font=font)
-                h = bbox[3] - bbox[1]
-                line_heights.append(h)
-                total_height += h
-            
-            y_offset = y1 + (bbox_height - total_height) // 2
-            
-            # Dibujar cada línea con alineación
-            for i, line in enumerate(lines):
-                bbox = draw.textbbox((0, 0), line, font=font)
-                line_width = bbox[2] - bbox[0]
-                
-                # Calcular x según alineación
-                align = getattr(region, 'text_align', 'center')
-                if align == 'left':
-                    x_offset = x1 + padding
-                elif align == 'right':
-                    x_offset = x2 - line_width - padding
-                else:  # center
-                    x_offset = x1 + (bbox_width - line_width) // 2
-                
-                draw.text((x_offset, y_offset), line, fill=text_color, font=font)
-                y_offset += line_heights[i]
-            
-            # Marcar si hay overflow
-            if overflow:
-                region.needs_review = True
-        
-        # TODO: Implementar modo "inpaint" si se necesita
-    
-    # Guardar imagen traducida
-    pages_dir = output_dir / "pages"
-    pages_dir.mkdir(parents=True, exist_ok=True)
-    output_path = pages_dir / f"{page_number:03d}_translated_{dpi}.png"
-    img.save(output_path)
-    
-    # Thumbnail (JPEG para mayor velocidad)
-    thumbs_dir = output_dir / "thumbs"
-    thumbs_dir.mkdir(parents=True, exist_ok=True)
-    thumb_path = thumbs_dir / f"{page_number:03d}_translated.jpg"
-    thumb = img.copy()
-    thumb.thumbnail((300, 400))
-    thumb.save(thumb_path, "JPEG", quality=85)
-    
-    return output_path
-
-
-def _draw_drawing_elements(img: Image.Image, draw: ImageDraw.ImageDraw, drawings: List[DrawingElement], dpi: int = 450):
-    """Dibuja los elementos de dibujo (líneas, rectángulos, texto, imágenes) sobre la imagen.
-    
-    El grosor de línea se escala proporcionalmente al DPI para que coincida con la visualización
-    a zoom 100% en pantalla (96 DPI estándar).
-    """
-    # Factor de escala: DPI_render / DPI_pantalla_estándar
-    scale_factor = dpi / 96.0
-    
-    for elem in drawings:
-        # Calcular grosor escalado
-        scaled_width = max(1, int(elem.stroke_width * scale_factor))
-        
-        if elem.element_type == 'line':
-            if len(elem.points) >= 4:
-                x1, y1, x2, y2 = elem.points[:4]
-                draw.line(
-                    [(x1, y1), (x2, y2)],
-                    fill=elem.stroke_color,
-                    width=scaled_width,
-                )
-        
-        elif elem.element_type == 'polyline':
-            # Polilínea: array de puntos [x1,y1,x2,y2,x3,y3,...]
-            if len(elem.points) >= 4 and len(elem.points) % 2 == 0:
-                points = [(elem.points[i], elem.points[i+1]) for i in range(0, len(elem.points), 2)]
-                draw.line(points, fill=elem.stroke_color, width=scaled_width)
-        
-        elif elem.element_type == 'rect':
-            if len(elem.points) >= 4:
-                x1, y1, x2, y2 = elem.points[:4]
-                if elem.fill_color:
-                    draw.rectangle([(x1, y1), (x2, y2)], fill=elem.fill_color, outline=elem.stroke_color, width=scaled_width)
-                else:
-                    draw.rectangle([(x1, y1), (x2, y2)], outline=elem.stroke_color, width=scaled_width)
-        
-        elif elem.element_type == 'circle':
-            if len(elem.points) >= 4:
-                x1, y1, x2, y2 = elem.points[:4]
-                cx = (x1 + x2) / 2
-                cy = (y1 + y2) / 2
-                rx = abs(x2 - x1) / 2
-                ry = abs(y2 - y1) / 2
-                bbox = [cx - rx, cy - ry, cx + rx, cy + ry]
-                if elem.fill_color:
-                    draw.ellipse(bbox, fill=elem.fill_color, outline=elem.stroke_color, width=scaled_width)
-                else:
-                    draw.ellipse(bbox, outline=elem.stroke_color, width=scaled_width)
-        
-        elif elem.element_type == 'text':
-            if len(elem.points) >= 2 and elem.text:
-                x, y = elem.points[:2]
-                font = _resolve_font(elem.font_family or 'Arial', elem.font_size or 14)
-                draw.text((x, y), elem.text, fill=elem.text_color, font=font)
-        
-        elif elem.element_type == 'image':
-            if len(elem.points) >= 4 and elem.image_data:
-                x1, y1, x2, y2 = [int(v) for v in elem.points[:4]]
-                try:
-                    image_bytes = base64.b64decode(elem.image_data)
-                    stamp_img = Image.open(io.BytesIO(image_bytes)).convert("RGBA")
-                    target_width = x2 - x1
-                    target_height = y2 - y1
-                    if target_width > 0 and target_height > 0:
-                        stamp_img = stamp_img.resize((target_width, target_height), Image.Resampling.LANCZOS)
-                        img.paste(stamp_img, (x1, y1), stamp_img)
-                except Exception as e:
-                    pass  # Ignorar errores de imagen
+    return _compose(original_path, regions, [], output_dir, page_number, dpi, source_dpi)
 
 
 def compose_page_with_drawings(
@@ -380,10 +230,11 @@ def compose_page_with_drawings(
     output_dir: Path,
     page_number: int,
     dpi: int,
+    source_dpi: Optional[int] = None,
 ) -> Path:
     """
     Compone la página traducida dibujando texto ES y elementos de dibujo.
-    
+
     Args:
         original_path: Ruta a la imagen original
         regions: Lista de TextRegion con traducciones
@@ -391,107 +242,9 @@ def compose_page_with_drawings(
         output_dir: Directorio del proyecto
         page_number: Número de página
         dpi: DPI de la imagen
-    
+        source_dpi: DPI de las coordenadas de regiones y dibujos (None = el mismo que dpi)
+
     Returns:
         Ruta a la imagen traducida
     """
-    # Cargar imagen original
-    img = Image.open(original_path).convert("RGB")
-    draw = ImageDraw.Draw(img)
-    img_array = np.array(img)  # Pre-computar una sola vez para todas las regiones
-    
-    # Ordenar regiones por render_order (menor = se dibuja primero/debajo)
-    sorted_regions = sorted(regions, key=lambda r: getattr(r, 'render_order', 0))
-
-    img_w, img_h = img.size
-    for region in sorted_regions:
-        # Usar texto traducido o original si no hay traducción
-        text = region.tgt_text or region.src_text
-        if not text:
-            continue
-
-        effective_bbox = _effective_bbox_for_compose(region, sorted_regions, img_w, img_h)
-        x1, y1, x2, y2 = [int(v) for v in effective_bbox]
-        # Normalizar coordenadas para PIL (requiere x1<=x2, y1<=y2)
-        x1, y1, x2, y2 = min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2)
-        bbox_width = x2 - x1
-        bbox_height = y2 - y1
-        
-        if region.compose_mode == "patch":
-            # Determinar color de fondo
-            bg_color = None
-            if getattr(region, 'bg_color', None):
-                hex_color = region.bg_color.lstrip('#')
-                bg_color = tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
-            else:
-                bg_color = _estimate_background_color(img_array, region.bbox)
-            
-            # Determinar color de texto
-            text_color = (0, 0, 0)
-            if getattr(region, 'text_color', None):
-                hex_color = region.text_color.lstrip('#')
-                text_color = tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
-            else:
-                text_color = _get_text_color(bg_color)
-            
-            # Dibujar rectángulo de fondo
-            padding = 2
-            draw.rectangle(
-                [x1 - padding, y1 - padding, x2 + padding, y2 + padding],
-                fill=bg_color,
-            )
-            
-            # Ajustar y dibujar texto
-            font, lines, overflow, final_size = _fit_text(
-                draw, text, bbox_width, bbox_height,
-                fixed_font_size=region.font_size,
-                font_family=getattr(region, 'font_family', 'Arial'),
-                text_align=getattr(region, 'text_align', 'center'),
-            )
-            
-            total_height = 0
-            line_heights = []
-            for line in lines:
-                bbox = draw.textbbox((0, 0), line, font=font)
-                h = bbox[3] - bbox[1]
-                line_heights.append(h)
-                total_height += h
-            
-            y_offset = y1 + (bbox_height - total_height) // 2
-            
-            for i, line in enumerate(lines):
-                bbox = draw.textbbox((0, 0), line, font=font)
-                line_width = bbox[2] - bbox[0]
-                
-                align = getattr(region, 'text_align', 'center')
-                if align == 'left':
-                    x_offset = x1 + padding
-                elif align == 'right':
-                    x_offset = x2 - line_width - padding
-                else:
-                    x_offset = x1 + (bbox_width - line_width) // 2
-                
-                draw.text((x_offset, y_offset), line, fill=text_color, font=font)
-                y_offset += line_heights[i]
-            
-            if overflow:
-                region.needs_review = True
-    
-    # Dibujar elementos de dibujo encima de las regiones de texto
-    _draw_drawing_elements(img, draw, drawings, dpi)
-    
-    # Guardar imagen traducida
-    pages_dir = output_dir / "pages"
-    pages_dir.mkdir(parents=True, exist_ok=True)
-    output_path = pages_dir / f"{page_number:03d}_translated_{dpi}.png"
-    img.save(output_path)
-    
-    # Thumbnail (JPEG para mayor velocidad)
-    thumbs_dir = output_dir / "thumbs"
-    thumbs_dir.mkdir(parents=True, exist_ok=True)
-    thumb_path = thumbs_dir / f"{page_number:03d}_translated.jpg"
-    thumb = img.copy()
-    thumb.thumbnail((300, 400))
-    thumb.save(thumb_path, "JPEG", quality=85)
-    
-    return output_path
+    return _compose(original_path, regions, drawings, output_dir, page_number, dpi, source_dpi)
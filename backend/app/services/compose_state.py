@@ -0,0 +1,220 @@
+"""
+Estado de la composición incremental y su contabilidad de zonas dañadas.
+
+Para las últimas páginas compuestas en el proceso se guarda la imagen, la
+firma y el extent de cada región/dibujo (Item), la PNG por bandas y el
+thumbnail. Las funciones *_extent devuelven el rectángulo (x1, y1, x2, y2)
+que puede pintar una región o un dibujo, o None si no pinta nada.
+damaged_rects compara los items nuevos con los guardados y devuelve las
+zonas a restaurar; compose_incremental las redibuja y actualiza la PNG y el
+thumbnail solo ahí.
+"""
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from ..db.models import DrawingElement, TextRegion
+from . import compose_draw, text_layout
+from .color_modes import to_uint8
+from .compose_draw import Box
+from .png_bands import BandedPng
+from .spatial_index import SpatialIndex
+
+THUMB_SIZE = (300, 400)
+# Margen de seguridad de los extents (antialiasing, redondeos de PIL)
+EXTENT_MARGIN = 2
+# Estados de composición (imagen completa en memoria) por proceso
+MAX_COMPOSE_STATES = 2
+# Por encima de esta fracción de página dañada se compone de cero
+FULL_RECOMPOSE_RATIO = 0.5
+# Soporte del filtro bicúbico del thumbnail, en píxeles del thumbnail
+_THUMB_SUPPORT = 2
+
+
+def text_region_extent(region: TextRegion, effective_bbox: List[float], scale: float = 1.0) -> Optional[Box]:
+    plan = compose_draw.plan_text_region(region, effective_bbox, scale)
+    if plan is None:
+        return None
+    x1, y1, x2, y2 = plan.box
+    # El rectángulo de PIL incluye el borde inferior/derecho
+    ex1, ey1 = x1 - plan.padding, y1 - plan.padding
+    ex2, ey2 = x2 + plan.padding + 1, y2 + plan.padding + 1
+    for line, (x, y) in zip(plan.layout.lines, plan.positions):
+        ix1, iy1, ix2, iy2 = text_layout.ink_bbox(plan.font_family, plan.layout.font_size, line)
+        ex1, ey1 = min(ex1, x + ix1), min(ey1, y + iy1)
+        ex2, ey2 = max(ex2, x + ix2), max(ey2, y + iy2)
+    return _with_margin((ex1, ey1, ex2, ey2))
+
+
+def _with_margin(box: Tuple[float, float, float, float]) -> Box:
+    x1, y1, x2, y2 = box
+    return (
+        int(np.floor(x1)) - EXTENT_MARGIN, int(np.floor(y1)) - EXTENT_MARGIN,
+        int(np.ceil(x2)) + EXTENT_MARGIN, int(np.ceil(y2)) + EXTENT_MARGIN,
+    )
+
+
+def _points_box(points: List[float]) -> Tuple[float, float, float, float]:
+    xs, ys = points[0::2], points[1::2]
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def drawing_extent(elem: DrawingElement, dpi: int) -> Optional[Box]:
+    points = elem.points
+    if elem.element_type in ('line', 'rect', 'circle', 'image') and len(points) >= 4:
+        grow = compose_draw.stroke_width_px(elem, dpi) if elem.element_type != 'image' else 0
+        x1, y1, x2, y2 = _points_box(points[:4])
+        return _with_margin((x1 - grow, y1 - grow, x2 + grow, y2 + grow))
+    if elem.element_type == 'polyline' and len(points) >= 4 and len(points) % 2 == 0:
+        grow = compose_draw.stroke_width_px(elem, dpi)
+        x1, y1, x2, y2 = _points_box(points)
+        return _with_margin((x1 - grow, y1 - grow, x2 + grow, y2 + grow))
+    if elem.element_type == 'text' and len(points) >= 2 and elem.text:
+        x, y = points[:2]
+        ix1, iy1, ix2, iy2 = text_layout.ink_bbox(elem.font_family or 'Arial', elem.font_size or 14, elem.text)
+        return _with_margin((x + ix1, y + iy1, x + ix2, y + iy2))
+    return None
+
+
+ItemKey = Tuple[str, str]
+
+
+class Item(NamedTuple):
+    key: ItemKey
+    signature: tuple
+    extent: Optional[Box]
+    paint: Callable[..., None]  # paint(canvas, draw, origin=...)
+
+
+@dataclass
+class ComposeState:
+    source_key: tuple
+    img: Image.Image
+    items: Dict[ItemKey, Tuple[tuple, Optional[Box]]]
+    order: List[ItemKey]
+    png: BandedPng
+    thumb: Image.Image
+
+
+_states: "OrderedDict[str, ComposeState]" = OrderedDict()
+_states_lock = threading.Lock()
+
+
+def _canvas(block: np.ndarray, mode: str) -> Image.Image:
+    """Copia editable de un trozo de la original en el modo del lienzo."""
+    return Image.fromarray(to_uint8(block)).convert(mode)
+
+
+def _thumb_size(img: Image.Image) -> Tuple[int, int]:
+    w, h = img.size
+    scale = min(THUMB_SIZE[0] / w, THUMB_SIZE[1] / h)
+    return max(1, round(w * scale)), max(1, round(h * scale))
+
+
+def _update_thumb(state: ComposeState, rect: Box) -> None:
+    """Re-escala solo la zona del thumbnail que depende de rect."""
+    tw, th = state.thumb.size
+    sx, sy = tw / state.img.width, th / state.img.height
+    x1, y1, x2, y2 = rect
+    tx1 = max(0, int(x1 * sx) - _THUMB_SUPPORT)
+    ty1 = max(0, int(y1 * sy) - _THUMB_SUPPORT)
+    tx2 = min(tw, int(np.ceil(x2 * sx)) + _THUMB_SUPPORT)
+    ty2 = min(th, int(np.ceil(y2 * sy)) + _THUMB_SUPPORT)
+    patch = state.img.resize(
+        (tx2 - tx1, ty2 - ty1), Image.Resampling.BICUBIC, box=(tx1 / sx, ty1 / sy, tx2 / sx, ty2 / sy),
+    )
+    state.thumb.paste(patch, (tx1, ty1))
+
+
+def compose_full(source_key: tuple, img_array: np.ndarray, items: List[Item], modes: Tuple[str, str]) -> ComposeState:
+    img = _canvas(img_array, modes[0])
+    draw = ImageDraw.Draw(img)
+    for item in items:
+        item.paint(img, draw)
+    return ComposeState(
+        source_key=source_key,
+        img=img,
+        items={item.key: (item.signature, item.extent) for item in items},
+        order=[item.key for item in items],
+        png=BandedPng(img, modes[1]),
+        thumb=img.resize(_thumb_size(img), Image.Resampling.BICUBIC),
+    )
+
+
+def damaged_rects(state: ComposeState, items: List[Item]) -> Optional[List[Box]]:
+    """
+    Rectángulos a restaurar y redibujar: extent anterior y nuevo de cada
+    región/dibujo añadido, quitado o cambiado. None si no compensa (o no es
+    correcto) actualizar por zonas.
+    """
+    new_keys = {item.key for item in items}
+    unchanged = set()
+    rects: List[Box] = []
+    for item in items:
+        previous = state.items.get(item.key)
+        if previous is not None and previous[0] == item.signature:
+            unchanged.add(item.key)
+            continue
+        if previous is not None and previous[1]:
+            rects.append(previous[1])
+        if item.extent:
+            rects.append(item.extent)
+    rects.extend(extent for key, (_, extent) in state.items.items() if key not in new_keys and extent)
+
+    # Lo que cambió se redibuja entero; el resto debe conservar su orden relativo
+    if [key for key in state.order if key in unchanged] != [item.key for item in items if item.key in unchanged]:
+        return None
+
+    w, h = state.img.size
+    clipped = []
+    for x1, y1, x2, y2 in rects:
+        x1, y1, x2, y2 = max(0, x1), max(0, y1), min(w, x2), min(h, y2)
+        if x1 < x2 and y1 < y2:
+            clipped.append((x1, y1, x2, y2))
+    if sum((x2 - x1) * (y2 - y1) for x1, y1, x2, y2 in clipped) > FULL_RECOMPOSE_RATIO * w * h:
+        return None
+    return clipped
+
+
+def compose_incremental(state: ComposeState, img_array: np.ndarray, items: List[Item], rects: List[Box]) -> None:
+    index = SpatialIndex(item.extent or (0, 0, 0, 0) for item in items)
+    for rect in rects:
+        x1, y1, x2, y2 = rect
+        # Restaurar la zona desde la original y redibujar (recortado) lo que la corta
+        canvas = _canvas(img_array[y1:y2, x1:x2], state.img.mode)
+        draw = ImageDraw.Draw(canvas)
+        for i in index.query(rect):
+            items[i].paint(canvas, draw, origin=(x1, y1))
+        state.img.paste(canvas, (x1, y1))
+    for rect in rects:
+        _update_thumb(state, rect)
+    state.png.update_rows(state.img, [(y1, y2) for _, y1, _, y2 in rects])
+    state.items = {item.key: (item.signature, item.extent) for item in items}
+    state.order = [item.key for item in items]
+
+
+def take_state(output_path: Path, source_key: tuple) -> Optional[ComposeState]:
+    """Saca el estado de la LRU (mientras se usa no lo comparte ningún otro hilo)."""
+    with _states_lock:
+        state = _states.pop(str(output_path), None)
+    if state is not None and state.source_key != source_key:
+        return None
+    return state
+
+
+def put_state(output_path: Path, state: ComposeState) -> None:
+    with _states_lock:
+        _states[str(output_path)] = state
+        while len(_states) > MAX_COMPOSE_STATES:
+            _states.popitem(last=False)
+
+
+def clear_states() -> None:
+    with _states_lock:
+        _states.clear()
@@ -0,0 +1,165 @@
+"""
+Executors acotados para sacar el trabajo bloqueante del event loop.
+
+- cpu: pool de procesos para PyMuPDF y exportación.
+- io: pool de hilos para DeepL, escritura de ficheros y espera del pool OCR
+  (los motores OCR viven en su propio pool de procesos, ver ocr_pool).
+- compose: un único hilo del proceso del servidor para componer páginas. El
+  estado de composición incremental (compose_service) vive en memoria del
+  proceso: en el pool de procesos cada worker tendría el suyo y los aciertos
+  dependerían de qué worker tocara. Con un solo hilo, además, dos
+  composiciones de la misma página desde la API nunca se pisan.
+
+Cada executor admite como máximo workers + executor_queue_size tareas a la
+vez; por encima lanza ExecutorBusyError y la API responde 503 con
+Retry-After, en lugar de acumular peticiones sin límite.
+"""
+
+import asyncio
+import contextvars
+import functools
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from ..settings_cache import (
+    get_config,
+    get_cpu_executor_workers,
+    get_io_executor_workers,
+    get_executor_queue_size,
+    use_config_snapshot,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class ExecutorBusyError(Exception):
+    """El executor está al límite de tareas en ejecución + en cola."""
+
+    def __init__(self, name: str, limit: int):
+        super().__init__(f"Executor '{name}' saturado ({limit} tareas en curso)")
+        self.name = name
+        self.limit = limit
+
+
+def _call_with_config(config_snapshot: Dict[str, Any], func: Callable, args: tuple, kwargs: dict) -> Any:
+    """Punto de entrada en el proceso hijo: aplica el snapshot de config del padre."""
+    with use_config_snapshot(config_snapshot):
+        return func(*args, **kwargs)
+
+
+class BoundedExecutor:
+    def __init__(self, name: str, use_processes: bool, workers: Optional[int] = None):
+        self.name = name
+        self._use_processes = use_processes
+        self._fixed_workers = workers  # None: según la configuración
+        self._executor: Optional[Executor] = None
+        self._workers = 0
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self.rejected = 0
+
+    def _configured_workers(self) -> int:
+        if self._fixed_workers is not None:
+            return self._fixed_workers
+        return get_cpu_executor_workers() if self._use_processes else get_io_executor_workers()
+
+    def _get_executor(self, workers: int) -> Executor:
+        """Devuelve el executor activo, recreándolo si cambió el número de workers."""
+        if self._executor is not None and self._workers != workers:
+            logger.info("Executor %s: reiniciando (%s -> %s workers)", self.name, self._workers, workers)
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        if self._executor is None:
+            if self._use_processes:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"exec-{self.name}")
+            self._workers = workers
+        return self._executor
+
+    def _acquire(self, workers: int) -> Executor:
+        limit = workers + get_executor_queue_size()
+        with self._lock:
+            if self._in_flight >= limit:
+                self.rejected += 1
+                raise ExecutorBusyError(self.name, limit)
+            executor = self._get_executor(workers)
+            self._in_flight += 1
+        return executor
+
+    def _release(self) -> None:
+        with self._lock:
+            self._in_flight -= 1
+
+    async def run(self, func: Callable, *args: Any, **kwargs: Any) -> Any:
+        """Ejecuta func(*args, **kwargs) en el executor y espera el resultado."""
+        workers = self._configured_workers()
+        executor = self._acquire(workers)
+        try:
+            if self._use_processes:
+                future = executor.submit(_call_with_config, get_config(), func, args, kwargs)
+            else:
+                # El hilo hereda el contexto (snapshot de config incluido)
+                ctx = contextvars.copy_context()
+                future = executor.submit(ctx.run, functools.partial(func, *args, **kwargs))
+            return await asyncio.wrap_future(future)
+        finally:
+            self._release()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "workers": self._configured_workers(),
+                "queue_size": get_executor_queue_size(),
+                "in_flight": self._in_flight,
+                "rejected": self.rejected,
+            }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            self._workers = 0
+
+
+_cpu = BoundedExecutor("cpu", use_processes=True)
+_io = BoundedExecutor("io", use_processes=False)
+_compose = BoundedExecutor("compose", use_processes=False, workers=1)
+
+
+async def run_cpu(func: Callable, *args: Any, **kwargs: Any) -> Any:
+    """
+    Trabajo CPU en el pool de procesos. func y sus argumentos deben ser
+    serializables (funciones de módulo, Path, dataclasses). Con
+    cpu_executor_workers=0 se ejecuta en el executor de E/S.
+    """
+    if get_cpu_executor_workers() <= 0:
+        return await _io.run(func, *args, **kwargs)
+    return await _cpu.run(func, *args, **kwargs)
+
+
+async def run_io(func: Callable, *args: Any, **kwargs: Any) -> Any:
+    """Trabajo bloqueante de E/S (red, disco, espera de otros pools) en hilos."""
+    return await _io.run(func, *args, **kwargs)
+
+
+async def run_compose(func: Callable, *args: Any, **kwargs: Any) -> Any:
+    """Composición de páginas, siempre en el hilo de composición del servidor."""
+    return await _compose.run(func, *args, **kwargs)
+
+
+def stats() -> Dict[str, Dict[str, Any]]:
+    return {"cpu": _cpu.stats(), "io": _io.stats(), "compose": _compose.stats()}
+
+
+def shutdown() -> None:
+    _cpu.shutdown()
+    _io.shutdown()
+    _compose.shutdown()
@@ -1,63 +1,200 @@
 """
 Servicio de exportación: genera PDF final desde imágenes traducidas.
+
+La exportación va página a página y no decodifica nada: las PNG gris/RGB de
+8 bits se incrustan con su flujo zlib tal cual (FlateDecode + predictor PNG)
+y las JPEG se pasan a PyMuPDF, que conserva el DCT. Tras cada página el PDF
+se vuelca al disco con un guardado incremental y se cierra, así que en
+memoria solo vive la página en curso ya comprimida.
+
+Caché: junto a cada PDF se guarda un manifiesto con la huella (nombre,
+tamaño, mtime) de la imagen de cada página. Si no cambió ninguna, se
+devuelve el PDF existente sin tocarlo; si cambiaron algunas, se sustituyen
+solo esas páginas en el PDF anterior y el resto se copia sin re-codificar.
 """
 
+import json
+import logging
 from pathlib import Path
+from typing import Callable, List, Optional, Tuple
 
+import fitz  # PyMuPDF
 from PIL import Image
 
+from ..atomic_files import tmp_path_for, write_atomic
+from .png_bands import read_flate_stream
+
+logger = logging.getLogger(__name__)
+
+# progress(páginas_hechas, total)
+ExportProgress = Callable[[int, int], None]
+
+_COLOR_SPACES = {1: "/DeviceGray", 3: "/DeviceRGB"}
+
+
+def _page_images(pages_dir: Path, page_count: int, dpi: int) -> List[Path]:
+    """Imagen a exportar de cada página: la traducida o, si no hay, la original."""
+    images = []
+    for page_num in range(page_count):
+        # Preferir imagen traducida, fallback a original
+        translated_path = pages_dir / f"{page_num:03d}_translated_{dpi}.png"
+        original_path = pages_dir / f"{page_num:03d}_original_{dpi}.png"
+        if translated_path.exists():
+            images.append(translated_path)
+        elif original_path.exists():
+            images.append(original_path)
+    return images
+
+
+def page_fingerprint(path: Path) -> str:
+    """Huella barata de un fichero de salida: se reescriben siempre con replace, así que cambia el mtime."""
+    stat = path.stat()
+    return f"{path.name}:{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def read_manifest(output_path: Path) -> Optional[dict]:
+    """Manifiesto del PDF exportado, o None si falta el PDF o el manifiesto."""
+    manifest_path = output_path.with_suffix(".json")
+    if not output_path.exists() or not manifest_path.exists():
+        return None
+    try:
+        return json.loads(manifest_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError) as e:
+        logger.warning("Manifiesto de exportación ilegible %s: %s", manifest_path.name, e)
+        return None
+
+
+def replace_output(tmp_path: Path, output_path: Path, manifest: dict) -> None:
+    """
+    Publica el PDF y su manifiesto. El manifiesto viejo se borra antes de
+    sustituir el PDF: si el proceso muere entre medias, nunca queda un
+    manifiesto que describa otro PDF.
+    """
+    manifest_path = output_path.with_suffix(".json")
+    manifest_path.unlink(missing_ok=True)
+    tmp_path.replace(output_path)
+    write_atomic(manifest_path, json.dumps(manifest).encode("utf-8"))
+
+
+def _image_size(img_path: Path) -> Tuple[int, int]:
+    # Solo lee la cabecera, no decodifica
+    with Image.open(img_path) as img:
+        return img.size
+
+
+def _append_image_page(doc: fitz.Document, img_path: Path, dpi: int, pno: int = -1) -> bool:
+    """
+    Añade (en la posición pno, por defecto al final) una página del tamaño
+    físico de la imagen a dpi. Devuelve True si se incrustaron los bytes
+    comprimidos sin decodificar.
+    """
+    encoded = img_path.read_bytes()
+    stream = read_flate_stream(encoded)
+    width, height = (stream.width, stream.height) if stream else _image_size(img_path)
+    page = doc.new_page(pno, width=width * 72 / dpi, height=height * 72 / dpi)
+
+    if stream is None:
+        # JPEG (PyMuPDF conserva el DCT) u otras PNG (se decodifica solo esta página)
+        page.insert_image(page.rect, stream=encoded)
+        return img_path.suffix.lower() in (".jpg", ".jpeg")
+
+    xref = doc.get_new_xref()
+    doc.update_object(
+        xref,
+        f"<</Type/XObject/Subtype/Image/Width {width}/Height {height}"
+        f"/ColorSpace{_COLOR_SPACES[stream.colors]}/BitsPerComponent {stream.bits}>>",
+    )
+    doc.update_stream(xref, stream.data, compress=False)
+    # update_stream sin compresión no fija el filtro: se declara a mano
+    doc.xref_set_key(xref, "Filter", "/FlateDecode")
+    doc.xref_set_key(
+        xref, "DecodeParms", f"<</Predictor 15/Colors {stream.colors}/BitsPerComponent {stream.bits}/Columns {width}>>",
+    )
+    page.insert_image(page.rect, xref=xref)
+    return True
+
 
-def export_pdf(project_dir: Path, page_count: int, dpi: int) -> Path:
+def _write_all(tmp_path: Path, images: List[Path], dpi: int, progress: Optional[ExportProgress]) -> int:
+    passthrough = 0
+    for done, img_path in enumerate(images, start=1):
+        doc = fitz.open(str(tmp_path)) if done > 1 else fitz.open()
+        try:
+            passthrough += _append_image_page(doc, img_path, dpi)
+            if done > 1:
+                doc.saveIncr()
+            else:
+                doc.save(str(tmp_path))
+        finally:
+            doc.close()
+        if progress is not None:
+            progress(done, len(images))
+    return passthrough
+
+
+def _replace_pages(
+    output_path: Path, tmp_path: Path, images: List[Path], changed: List[int], dpi: int,
+    progress: Optional[ExportProgress],
+) -> int:
+    """Sustituye las páginas cambiadas del PDF anterior; las demás se copian tal cual al guardar."""
+    passthrough = 0
+    with fitz.open(str(output_path)) as doc:
+        for done, page_num in enumerate(changed, start=1):
+            doc.delete_page(page_num)
+            passthrough += _append_image_page(doc, images[page_num], dpi, pno=page_num)
+            if progress is not None:
+                progress(done, len(changed))
+        # garbage=1 descarta las páginas sustituidas; los flujos se escriben sin re-comprimir
+        doc.save(str(tmp_path), garbage=1)
+    return passthrough
+
+
+def export_pdf(
+    project_dir: Path,
+    page_count: int,
+    dpi: int,
+    progress: Optional[ExportProgress] = None,
+) -> Path:
     """
-    Genera un PDF final a partir de las imágenes traducidas.
-    
+    Genera un PDF final a partir de las imágenes traducidas, reutilizando el
+    exportado anterior si sus páginas no cambiaron.
+
     Args:
         project_dir: Directorio del proyecto
         page_count: Número de páginas
         dpi: DPI de las imágenes
-    
+        progress: Callback opcional progress(páginas_hechas, total)
+
     Returns:
         Ruta al PDF exportado
     """
     export_dir = project_dir / "export"
     export_dir.mkdir(parents=True, exist_ok=True)
     output_path = export_dir / f"export_{dpi}.pdf"
-    
-    images = []
-    pages_dir = project_dir / "pages"
-    
-    for page_num in range(page_count):
-        # Preferir imagen traducida, fallback a original
-        translated_path = pages_dir / f"{page_num:03d}_translated_{dpi}.png"
-        original_path = pages_dir / f"{page_num:03d}_original_{dpi}.png"
-        
-        if translated_path.exists():
-            img_path = translated_path
-        elif original_path.exists():
-            img_path = original_path
-        else:
-            continue
-        
-        img = Image.open(img_path).convert("RGB")
-        images.append(img)
-    
+
+    images = _page_images(project_dir / "pages", page_count, dpi)
     if not images:
         raise ValueError("No images found to export")
-    
-    # Guardar como PDF
-    # Calcular tamaño físico basado en DPI
-    first_img = images[0]
-    
-    images[0].save(
-        output_path,
-        "PDF",
-        resolution=dpi,
-        save_all=True,
-        append_images=images[1:] if len(images) > 1 else [],
+
+    fingerprints = [page_fingerprint(path) for path in images]
+    previous = (read_manifest(output_path) or {}).get("pages")
+    if previous == fingerprints:
+        logger.info("PDF sin cambios, se reutiliza: %s", output_path.name)
+        return output_path
+
+    tmp_path = tmp_path_for(output_path)
+    try:
+        if previous is not None and len(previous) == len(fingerprints):
+            changed = [i for i, (old, new) in enumerate(zip(previous, fingerprints)) if old != new]
+            passthrough = _replace_pages(output_path, tmp_path, images, changed, dpi, progress)
+        else:
+            changed = list(range(len(images)))
+            passthrough = _write_all(tmp_path, images, dpi, progress)
+        replace_output(tmp_path, output_path, {"pages": fingerprints})
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+    logger.info(
+        "PDF exportado: %s (%d páginas, %d re-generadas, %d sin re-codificar)",
+        output_path.name, len(images), len(changed), passthrough,
     )
-    
-    # Cerrar imágenes
-    for img in images:
-        img.close()
-    
     return output_path
@@ -0,0 +1,277 @@
+"""
+Exportación vectorial: dibuja la traducción sobre src.pdf en vez de
+rasterizar cada página.
+
+Cada región patch se convierte en un rectángulo relleno más texto PDF nativo
+(buscable y seleccionable) con la misma maquetación que la composición, y
+los elementos de dibujo en trazos vectoriales; las imágenes (snippets) se
+incrustan una sola vez aunque se repitan. El resultado pesa lo que el PDF
+original más unos pocos KB por página y se genera en segundos.
+
+Las coordenadas de regiones y dibujos son píxeles de la página visible a
+regions_dpi; se pasan a puntos (72 DPI) y se des-rotan al espacio de la
+página. Las fuentes son las base14 de PDF (Helvetica, Times, Courier) y la
+CJK incorporada cuando el texto no cabe en latin-1.
+
+Caché: el manifiesto guarda la huella de src.pdf y del contenido de todas
+las páginas; si no cambió, se devuelve el PDF anterior sin regenerarlo.
+"""
+
+import base64
+import dataclasses
+import hashlib
+import json
+import logging
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import fitz  # PyMuPDF
+import numpy as np
+from PIL import ImageColor
+
+from ..db.models import DrawingElement, TextRegion
+from ..db.repository import drawings_repo, pages_repo, text_regions_repo
+from . import compose_draw, text_layout
+from .compose_service import effective_bboxes_for_compose
+from ..atomic_files import tmp_path_for
+from .export_service import ExportProgress, page_fingerprint, read_manifest, replace_output
+from .region_translation import apply_glossary, build_glossary_map
+
+logger = logging.getLogger(__name__)
+
+# DPI al que se rasteriza la página solo para estimar colores de fondo
+BACKGROUND_DPI = 96
+# Los grosores de trazo se definen a zoom 100% en pantalla (96 DPI)
+STROKE_REFERENCE_DPI = 96
+
+_BASE14_FONTS = {"Arial": "helv", "Times New Roman": "tiro", "Courier New": "cour"}
+_CJK_FONT = "china-s"
+
+
+@dataclass
+class VectorPage:
+    """Contenido a dibujar sobre una página de src.pdf."""
+    page_number: int
+    regions_dpi: int
+    regions: List[TextRegion] = field(default_factory=list)
+    drawings: List[DrawingElement] = field(default_factory=list)
+
+
+def _pdf_font(font_family: str, text: str) -> str:
+    try:
+        text.encode("latin-1")
+    except UnicodeEncodeError:
+        return _CJK_FONT
+    return _BASE14_FONTS.get(font_family, "helv")
+
+
+def _unit_rgb(color: Tuple[int, ...]) -> Tuple[float, float, float]:
+    return tuple(c / 255 for c in color[:3])
+
+
+def _parse_color(value: Optional[str]) -> Optional[Tuple[float, float, float]]:
+    return _unit_rgb(ImageColor.getrgb(value)) if value else None
+
+
+class _PageSpace:
+    """Píxeles de la página visible a regions_dpi -> coordenadas de PyMuPDF."""
+
+    def __init__(self, page: fitz.Page, regions_dpi: int):
+        self.points = 72 / regions_dpi
+        to_points = fitz.Matrix(self.points, self.points)
+        self.text = to_points * page.derotation_matrix
+        # En páginas rotadas con cropbox desplazado, draw_* e insert_image no
+        # interpretan las coordenadas igual que insert_text: se pasa por el
+        # espacio PDF y se vuelve con la matriz que usa PyMuPDF para dibujar
+        crop = page.cropbox
+        to_pdf = fitz.Matrix(1, 0, 0, -1, crop.x0, page.mediabox.height - crop.y0)
+        self.shapes = self.text * to_pdf * page.transformation_matrix
+        self.rotation = page.rotation
+
+    def rect(self, x1: float, y1: float, x2: float, y2: float) -> fitz.Rect:
+        return (fitz.Rect(x1, y1, x2, y2) * self.shapes).normalize()
+
+    def point(self, x: float, y: float) -> fitz.Point:
+        return fitz.Point(x, y) * self.shapes
+
+
+def _background_array(page: fitz.Page) -> np.ndarray:
+    pix = page.get_pixmap(dpi=BACKGROUND_DPI, alpha=False, colorspace=fitz.csRGB)
+    return np.frombuffer(pix.samples, np.uint8).reshape(pix.h, pix.w, 3)
+
+
+def _insert_line(page: fitz.Page, space: _PageSpace, x: float, baseline: float, text: str,
+                 fontname: str, fontsize: float, color: Tuple[float, float, float]) -> None:
+    page.insert_text(
+        fitz.Point(x, baseline) * space.text, text, fontname=fontname, fontsize=fontsize * space.points,
+        color=color, rotate=space.rotation,
+    )
+
+
+def _draw_region(page: fitz.Page, space: _PageSpace, region: TextRegion, bbox: List[float],
+                 bg_array: Optional[np.ndarray], bg_scale: float) -> None:
+    plan = compose_draw.plan_text_region(region, bbox, 1.0)
+    if plan is None:
+        return
+    scaled_bbox = [v * bg_scale for v in region.bbox]
+    bg_color, text_color = compose_draw.region_colors(
+        region, bg_array, scaled_bbox, compose_draw.scaled_px(compose_draw.BACKGROUND_MARGIN, bg_scale),
+    )
+
+    # Igual que el rectángulo de PIL, que incluye el borde inferior/derecho
+    x1, y1, x2, y2 = plan.box
+    pad = plan.padding
+    page.draw_rect(space.rect(x1 - pad, y1 - pad, x2 + pad + 1, y2 + pad + 1),
+                   color=None, fill=_unit_rgb(bg_color), overlay=True)
+
+    # Las métricas de la fuente PDF no son las de FreeType: la posición
+    # horizontal se recalcula y, si una línea no cabe, se reduce el tamaño
+    text = "".join(plan.layout.lines)
+    fontname = _pdf_font(plan.font_family, text)
+    size = plan.layout.font_size
+    widths = [fitz.get_text_length(line, fontname=fontname, fontsize=size) for line in plan.layout.lines]
+    available = max(1, x2 - x1 - 2 * pad)
+    fit = min([1.0] + [available / w for w in widths if w > available])
+    ascent = text_layout.resolve_font(plan.font_family, size).getmetrics()[0]
+
+    align = getattr(region, 'text_align', 'center')
+    for line, width, (_, top) in zip(plan.layout.lines, widths, plan.positions):
+        width *= fit
+        if align == 'left':
+            x = x1 + pad
+        elif align == 'right':
+            x = x2 - width - pad
+        else:  # center
+            x = x1 + (x2 - x1 - width) / 2
+        _insert_line(page, space, x, top + ascent, line, fontname, size * fit, _unit_rgb(text_color))
+
+
+def _draw_element(page: fitz.Page, space: _PageSpace, elem: DrawingElement, images: Dict[str, int]) -> None:
+    points = elem.points
+    stroke = _parse_color(elem.stroke_color)
+    fill = _parse_color(elem.fill_color)
+    width = elem.stroke_width * 72 / STROKE_REFERENCE_DPI
+
+    if elem.element_type == 'line' and len(points) >= 4:
+        page.draw_line(space.point(*points[:2]), space.point(*points[2:4]), color=stroke, width=width)
+    elif elem.element_type == 'polyline' and len(points) >= 4 and len(points) % 2 == 0:
+        path = [space.point(points[i], points[i + 1]) for i in range(0, len(points), 2)]
+        page.draw_polyline(path, color=stroke, width=width)
+    elif elem.element_type == 'rect' and len(points) >= 4:
+        page.draw_rect(space.rect(*points[:4]), color=stroke, fill=fill, width=width)
+    elif elem.element_type == 'circle' and len(points) >= 4:
+        page.draw_oval(space.rect(*points[:4]), color=stroke, fill=fill, width=width)
+    elif elem.element_type == 'text' and len(points) >= 2 and elem.text:
+        font_family = elem.font_family or 'Arial'
+        size = elem.font_size or 14
+        ascent = text_layout.resolve_font(font_family, size).getmetrics()[0]
+        _insert_line(page, space, points[0], points[1] + ascent, elem.text,
+                     _pdf_font(font_family, elem.text), size, _parse_color(elem.text_color))
+    elif elem.element_type == 'image' and len(points) >= 4 and elem.image_data:
+        _insert_snippet(page, space, elem, images)
+
+
+def _insert_snippet(page: fitz.Page, space: _PageSpace, elem: DrawingElement, images: Dict[str, int]) -> None:
+    """Incrusta la imagen una vez por documento; las repeticiones reutilizan el xref."""
+    rect = space.rect(*elem.points[:4])
+    if rect.is_empty:
+        return
+    digest = hashlib.sha1(elem.image_data.encode("ascii")).hexdigest()
+    try:
+        if digest in images:
+            page.insert_image(rect, xref=images[digest], rotate=space.rotation, keep_proportion=False)
+        else:
+            images[digest] = page.insert_image(
+                rect, stream=base64.b64decode(elem.image_data), rotate=space.rotation, keep_proportion=False,
+            )
+    except (ValueError, RuntimeError) as e:
+        # binascii.Error es ValueError; PyMuPDF lanza RuntimeError con imágenes corruptas
+        logger.warning("Imagen no válida en el dibujo %s (página %d): %s", elem.id, elem.page_number, e)
+
+
+def _draw_page(page: fitz.Page, content: VectorPage, images: Dict[str, int]) -> None:
+    space = _PageSpace(page, content.regions_dpi)
+    # Mismo orden que la composición: regiones por render_order y dibujos encima
+    regions = sorted(content.regions, key=lambda r: getattr(r, 'render_order', 0))
+    img_h = page.rect.height / space.points
+    bg_array = None
+    if any(not r.bg_color for r in regions):
+        # Muestrear antes de pintar: el fondo se estima sobre la página original
+        bg_array = _background_array(page)
+    bg_scale = BACKGROUND_DPI / content.regions_dpi
+    for region, bbox in zip(regions, effective_bboxes_for_compose(regions, img_h)):
+        _draw_region(page, space, region, bbox, bg_array, bg_scale)
+    for elem in content.drawings:
+        _draw_element(page, space, elem, images)
+
+
+def vector_export_pages(project_id: str, page_count: int) -> List[VectorPage]:
+    """Regiones (con el glosario bloqueado aplicado, como al componer) y dibujos de cada página."""
+    glossary_map = build_glossary_map(project_id)
+    pages = []
+    for page_number in range(page_count):
+        regions = text_regions_repo.list_by_page(project_id, page_number)
+        apply_glossary(regions, glossary_map)
+        drawings = drawings_repo.list_by_page(project_id, page_number)
+        if regions or drawings:
+            pages.append(VectorPage(
+                page_number, pages_repo.regions_dpi(project_id, page_number), regions, drawings,
+            ))
+    return pages
+
+
+def _fingerprint(src_path: Path, pages: List[VectorPage]) -> str:
+    content = json.dumps([dataclasses.asdict(content) for content in pages], sort_keys=True, default=str)
+    digest = hashlib.sha1(page_fingerprint(src_path).encode("utf-8"))
+    digest.update(content.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def export_vector_pdf(
+    project_dir: Path,
+    pages: List[VectorPage],
+    progress: Optional[ExportProgress] = None,
+) -> Path:
+    """
+    Genera el PDF traducido dibujando regiones y dibujos sobre src.pdf.
+
+    Args:
+        project_dir: Directorio del proyecto
+        pages: Contenido de cada página (las que falten se exportan tal cual)
+        progress: Callback opcional progress(páginas_hechas, total)
+
+    Returns:
+        Ruta al PDF exportado
+    """
+    export_dir = project_dir / "export"
+    export_dir.mkdir(parents=True, exist_ok=True)
+    output_path = export_dir / "export_vector.pdf"
+    src_path = project_dir / "src.pdf"
+
+    fingerprint = _fingerprint(src_path, pages)
+    if (read_manifest(output_path) or {}).get("fingerprint") == fingerprint:
+        logger.info("PDF vectorial sin cambios, se reutiliza: %s", output_path.name)
+        return output_path
+
+    by_number = {content.page_number: content for content in pages}
+    images: Dict[str, int] = {}
+    tmp_path = tmp_path_for(output_path)
+    try:
+        with fitz.open(src_path) as doc:
+            for page in doc:
+                if page.number in by_number:
+                    _draw_page(page, by_number[page.number], images)
+                if progress is not None:
+                    progress(page.number + 1, len(doc))
+            page_count = len(doc)
+            doc.save(tmp_path, garbage=3, deflate=True)
+        replace_output(tmp_path, output_path, {"fingerprint": fingerprint})
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+    logger.info(
+        "PDF vectorial exportado: %s (%d páginas, %d con traducción, %d imágenes)",
+        output_path.name, page_count, len(by_number), len(images),
+    )
+    return output_path
@@ -0,0 +1,117 @@
+"""
+Caché LRU en memoria de imágenes de página decodificadas.
+
+La misma PNG de página (a 450 DPI, ~5000x7000 px) la leen el OCR, el recheck,
+la composición y la captura de snippets. Aquí se decodifica una vez por
+proceso y se reutiliza como array de solo lectura en el formato de la PNG
+(RGB, gris o 1 bit, ver color_modes).
+
+Clave: ruta del fichero (proyecto/página/DPI van en el nombre) + mtime_ns y
+tamaño, de modo que re-renderizar la página invalida la entrada. El total de
+bytes está limitado por image_cache_max_mb; al superarlo se expulsan las
+entradas menos usadas. Cada proceso (pool OCR, executor CPU) tiene su caché.
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Tuple
+
+import numpy as np
+from PIL import Image
+
+from ..settings_cache import get_image_cache_max_bytes
+
+logger = logging.getLogger(__name__)
+
+_CacheKey = Tuple[str, int, int]
+# Modos que se devuelven tal cual (las páginas en gris y bilevel no se expanden a RGB)
+_NATIVE_MODES = ("RGB", "L", "1")
+
+
+class ImageCache:
+    def __init__(self):
+        self._entries: "OrderedDict[_CacheKey, np.ndarray]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _key(path: Path) -> _CacheKey:
+        st = path.stat()
+        return (str(path.resolve()), st.st_mtime_ns, st.st_size)
+
+    def get_array(self, image_path: Path) -> np.ndarray:
+        """
+        Array de solo lectura de la imagen: (H, W, 3) uint8 si es RGB, (H, W)
+        uint8 si es gris y (H, W) bool si es de 1 bit; otros modos, a RGB.
+        """
+        path = Path(image_path)
+        key = self._key(path)
+        with self._lock:
+            arr = self._entries.get(key)
+            if arr is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return arr
+            self.misses += 1
+
+        # Decodificar fuera del lock (puede tardar cientos de ms)
+        with Image.open(path) as img:
+            arr = np.asarray(img if img.mode in _NATIVE_MODES else img.convert("RGB"))
+        arr.flags.writeable = False
+        self._put(key, arr)
+        return arr
+
+    def _put(self, key: _CacheKey, arr: np.ndarray) -> None:
+        max_bytes = get_image_cache_max_bytes()
+        if arr.nbytes > max_bytes:
+            return
+        with self._lock:
+            # Versiones anteriores del mismo fichero ya no son válidas
+            for old_key in [k for k in self._entries if k[0] == key[0] and k != key]:
+                self._bytes -= self._entries.pop(old_key).nbytes
+            if key not in self._entries:
+                self._entries[key] = arr
+                self._bytes += arr.nbytes
+            while self._bytes > max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": get_image_cache_max_bytes(),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+_cache = ImageCache()
+
+
+def get_array(image_path: Path) -> np.ndarray:
+    return _cache.get_array(image_path)
+
+
+def stats() -> Dict[str, int]:
+    return _cache.stats()
+
+
+def clear() -> None:
+    _cache.clear()
@@ -1,23 +1,39 @@
 """
 Servicio de jobs asíncronos.
+
+Los jobs corren en hilos del proceso del backend. Los cancelables (export)
+comprueban entre página y página si se pidió cancelarlos.
 """
 
 import json
+import logging
 import uuid
 import tempfile
 import os
 import time
-from pathlib import Path
+import threading
 from datetime import datetime
-from typing import Optional
+from typing import Dict, Optional
 
-from ..config import PROJECTS_DIR, JOBS_DIR, DEFAULT_DPI, get_config, use_config_snapshot
+from ..config import PROJECTS_DIR, JOBS_DIR
 from ..db.models import Job
-from ..db.repository import projects_repo, pages_repo, text_regions_repo, glossary_repo, global_glossary_repo
-from ..services import render_service, translate_service, compose_service
+from ..db.repository import projects_repo
+from ..services import export_service, export_vector
+
+logger = logging.getLogger(__name__)
+
+CANCELLABLE_JOB_TYPES = ("export",)
+
+# Eventos de cancelación de los jobs cancelables vivos en este proceso
+_cancel_events: Dict[str, threading.Event] = {}
+_cancel_lock = threading.Lock()
 
 
-def _save_job(job: Job):
+class JobCancelled(Exception):
+    """Se pidió cancelar el job."""
+
+
+def save_job(job: Job):
     """Guarda el estado del job a disco (escritura atómica con os.replace)."""
     job_path = JOBS_DIR / f"{job.id}.json"
     data = json.dumps({
@@ -29,6 +45,7 @@ def _save_job(job: Job):
         "current_step": job.current_step,
         "error": job.error,
         "created_at": job.created_at.isoformat(),
+        "result": job.result,
     }, ensure_ascii=False, indent=2)
     fd, tmp_path = tempfile.mkstemp(dir=str(JOBS_DIR), suffix=".tmp")
     try:
@@ -63,6 +80,7 @@ def _load_job(job_id: str) -> Optional[Job]:
                 current_step=data.get("current_step"),
                 error=data.get("error"),
                 created_at=datetime.fromisoformat(data["created_at"]),
+                result=data.get("result"),
             )
         except FileNotFoundError:
             if attempt == 0:
@@ -82,7 +100,26 @@ def create_job(project_id: str, job_type: str) -> Job:
         project_id=project_id,
         job_type=job_type,
     )
-    _save_job(job)
+    if job_type in CANCELLABLE_JOB_TYPES:
+        with _cancel_lock:
+            _cancel_events[job.id] = threading.Event()
+    save_job(job)
+    return job
+
+
+def cancel_job(job_id: str) -> Optional[Job]:
+    """Pide cancelar un job pendiente o en curso; se detiene en su siguiente punto de control."""
+    job = _load_job(job_id)
+    if not job or job.status not in ("pending", "running"):
+        return job
+    with _cancel_lock:
+        event = _cancel_events.get(job_id)
+    if event is None:
+        # Job de un proceso anterior del backend: nadie lo está ejecutando ya
+        job.status = "cancelled"
+        save_job(job)
+    else:
+        event.set()
     return job
 
 
@@ -91,193 +128,58 @@ def get_job(job_id: str) -> Optional[Job]:
     return _load_job(job_id)
 
 
-def run_render_all(job_id: str, project_id: str, dpi: int = None):
+def run_export(job_id: str, project_id: str, dpi: int, mode: str = "raster"):
     """
-    Ejecuta el job de procesar todas las páginas.
-    Versión simplificada que funciona exactamente como el flujo manual.
+    Ejecuta el job de exportación a PDF (mode="raster" | "vector").
+
+    Al terminar, job.result es la ruta del PDF. Si el proyecto no cambió
+    desde la última exportación se reutiliza el PDF (ver export_service).
     """
-    import logging
-    logging.basicConfig(level=logging.INFO)
-    logger = logging.getLogger(__name__)
-    
     job = _load_job(job_id)
-    if not job:
+    # Cancelado antes de arrancar sin evento en este proceso (cancel_job ya lo guardó)
+    if not job or job.status == "cancelled":
         return
-    
-    project = projects_repo.get(project_id)
-    if not project:
-        job.status = "error"
-        job.error = "Project not found"
-        _save_job(job)
-        return
-    
-    try:
-        job.status = "running"
-        _save_job(job)
-
-        config_snapshot = get_config()
-        with use_config_snapshot(config_snapshot):
-            # DPI: si viene del endpoint, usarlo. Si no, fallback a config.
-            if dpi is None:
-                try:
-                    dpi = int(config_snapshot.get("default_dpi", DEFAULT_DPI))
-                except Exception:
-                    dpi = DEFAULT_DPI
-
-            logger.info(f"[JOB] Iniciando con DPI={dpi}, páginas={project.page_count}")
-            
-            project_dir = PROJECTS_DIR / project_id
-            pdf_path = project_dir / "src.pdf"
-            total_pages = project.page_count
-        
-            # Preparar glosario (igual que el flujo manual)
-            global_entries = global_glossary_repo.list_all()
-            glossary_map = {e.src_term: e.tgt_term for e in global_entries if e.locked}
-            local_entries = glossary_repo.list_by_project(project_id)
-            for e in local_entries:
-                if e.locked and e.src_term not in glossary_map:
-                    glossary_map[e.src_term] = e.tgt_term
-            
-            logger.info(f"[JOB] Glosario: {len(glossary_map)} términos")
-            
-            # Preparar filtros OCR (igual que el flujo manual)
-            from ..config import get_ocr_region_filters
-            custom_filters = list(project.ocr_region_filters or [])
-            global_filters = get_ocr_region_filters()
-            seen_patterns = {(f.get("mode"), f.get("pattern"), f.get("case_sensitive")) for f in custom_filters}
-            for f in global_filters:
-                key = (f.get("mode"), f.get("pattern"), f.get("case_sensitive"))
-                if key not in seen_patterns:
-                    custom_filters.append(f)
-
-            if not custom_filters:
-                custom_filters = None
-            
-            logger.info(f"[JOB] Filtros OCR: {len(custom_filters) if custom_filters else 0}")
+    with _cancel_lock:
+        cancel = _cancel_events.setdefault(job_id, threading.Event())
 
-            from ..config import (
-                get_min_han_ratio,
-                get_ocr_enable_label_recheck,
-                get_ocr_engine,
-                get_ocr_mode,
-                get_ocr_recheck_max_regions_per_page,
-            )
-
-            logger.info(
-                "[JOB] OCR settings: engine=%s mode=%s min_han_ratio=%.2f label_recheck=%s recheck_max=%s",
-                get_ocr_engine(),
-                get_ocr_mode(),
-                float(get_min_han_ratio()),
-                bool(get_ocr_enable_label_recheck()),
-                int(get_ocr_recheck_max_regions_per_page()),
-            )
-            
-            # Procesar cada página como en el flujo manual
-            for page_num in range(total_pages):
-                logger.info(f"[JOB] === Página {page_num + 1}/{total_pages} ===")
+    def progress(done: int, total: int) -> None:
+        if cancel.is_set():
+            raise JobCancelled()
+        job.progress = done / total
+        job.current_step = f"Exportando página {done}/{total}..."
+        save_job(job)
 
-                # FASE 1: Renderizar página (igual que endpoint render_original)
-                job.current_step = f"Renderizando página {page_num + 1}/{total_pages}..."
-                job.progress = (page_num / total_pages) * 0.2
-                _save_job(job)
-                
-                image_path = project_dir / "pages" / f"{page_num:03d}_original_{dpi}.png"
-                if image_path.exists():
-                    logger.info(f"[JOB] Render skip (ya existe): {image_path}")
-                else:
-                    image_path = render_service.render_page(pdf_path, page_num, dpi, project_dir)
-                pages_repo.upsert(project_id, page_num, has_original=True)
-                logger.info(f"[JOB] Renderizado: {image_path}")
-                
-                # FASE 2: OCR (igual que endpoint run_ocr)
-                job.current_step = f"OCR página {page_num + 1}/{total_pages}..."
-                job.progress = 0.2 + (page_num / total_pages) * 0.3
-                _save_job(job)
-
-                from . import ocr_provider
-
-                regions = ocr_provider.detect_text(
-                    image_path,
-                    dpi,
-                    custom_filters=custom_filters,
-                    document_type=project.document_type.value,
-                )
-                
-                logger.info(f"[JOB] OCR detectó {len(regions)} regiones")
-                
-                # Traducir regiones detectadas (igual que endpoint run_ocr)
-                if regions:
-                    texts_to_translate = []
-                    translate_indexes = []
-                    for i, r in enumerate(regions):
-                        if r.src_text in glossary_map:
-                            r.tgt_text = glossary_map[r.src_text]
-                        else:
-                            texts_to_translate.append(r.src_text)
-                            translate_indexes.append(i)
-                    
-                    logger.info(
-                        f"[JOB] Traduciendo {len(texts_to_translate)} textos (glosario aplicó a {len(regions) - len(texts_to_translate)})"
-                    )
-
-                    if texts_to_translate:
-                        from ..config import get_ocr_mode
-
-                        if get_ocr_mode() == "advanced":
-                            from ..services import translate_mixed_service
+    try:
+        project = projects_repo.get(project_id)
+        if not project:
+            raise ValueError("Project not found")
+        if cancel.is_set():
+            raise JobCancelled()
+        job.status = "running"
+        save_job(job)
 
-                            translations = translate_mixed_service.translate_batch_preserving_non_han(
-                                texts_to_translate,
-                                glossary_map,
-                            )
-                        else:
-                            translations = translate_service.translate_batch(texts_to_translate)
-                        for idx, translation in zip(translate_indexes, translations):
-                            regions[idx].tgt_text = translation
+        project_dir = PROJECTS_DIR / project_id
+        t0 = time.perf_counter()
+        if mode == "vector":
+            pages = export_vector.vector_export_pages(project_id, project.page_count)
+            output_path = export_vector.export_vector_pdf(project_dir, pages, progress)
+        else:
+            output_path = export_service.export_pdf(project_dir, project.page_count, dpi, progress)
+        logger.info(f"[JOB] Exportación {mode} en {time.perf_counter() - t0:.3f}s: {output_path.name}")
 
-                # Guardar regiones (aunque sea lista vacía) para evitar composición con datos antiguos
-                text_regions_repo.replace_for_page(project_id, page_num, regions)
-                logger.info(f"[JOB] Guardadas {len(regions)} regiones")
-                
-                # FASE 3: Componer (igual que endpoint render_translated)
-                job.current_step = f"Componiendo página {page_num + 1}/{total_pages}..."
-                job.progress = 0.5 + (page_num / total_pages) * 0.5
-                _save_job(job)
-                
-                # Recargar regiones desde repo (como hace el endpoint)
-                regions_loaded = text_regions_repo.list_by_page(project_id, page_num)
-                logger.info(f"[JOB] Recargadas {len(regions_loaded)} regiones para composición")
-                
-                # Verificar que tienen tgt_text
-                for r in regions_loaded[:3]:  # Solo primeras 3 para no saturar log
-                    logger.info(
-                        f"[JOB]   - bbox={r.bbox[:2]}, src='{r.src_text[:20]}...', tgt='{(r.tgt_text or '')[:20]}...'"
-                    )
-                
-                # Aplicar glosario a regiones no bloqueadas
-                for r in regions_loaded:
-                    if not getattr(r, 'locked', False) and r.src_text in glossary_map:
-                        r.tgt_text = glossary_map[r.src_text]
-                
-                # Componer página
-                t_comp0 = time.perf_counter()
-                logger.info(f"[JOB] Componiendo (start): page={page_num} regions={len(regions_loaded)} dpi={dpi}")
-                compose_service.compose_page(image_path, regions_loaded, project_dir, page_num, dpi)
-                t_comp1 = time.perf_counter()
-                logger.info(f"[JOB] Componiendo (end): page={page_num} took={t_comp1 - t_comp0:.3f}s")
-                pages_repo.upsert(project_id, page_num, has_translated=True)
-                logger.info(f"[JOB] Composición completada")
-        
         job.status = "completed"
         job.progress = 1.0
         job.current_step = "Completado"
-        _save_job(job)
-        logger.info(f"[JOB] === JOB COMPLETADO ===")
-    
+        job.result = str(output_path)
+    except JobCancelled:
+        logger.info(f"[JOB] Exportación cancelada: {job_id}")
+        job.status = "cancelled"
+        job.current_step = "Cancelado"
     except Exception as e:
-        import traceback
-        logger.error(f"[JOB] ERROR: {e}")
-        logger.error(traceback.format_exc())
+        logger.exception(f"[JOB] ERROR en exportación: {e}")
         job.status = "error"
         job.error = str(e)
-        _save_job(job)
+    finally:
+        with _cancel_lock:
+            _cancel_events.pop(job_id, None)
+        save_job(job)
@@ -0,0 +1,221 @@
+"""
+Motor compilado de filtros de región OCR.
+
+Los filtros (globales + proyecto) se compilan una vez por conjunto distinto y
+proceso, no por región:
+- contains/starts/ends: un autómata Aho-Corasick por sensibilidad a
+  mayúsculas; una sola pasada por el texto resuelve todos los literales.
+- regex: se compilan y se unen en un patrón por sensibilidad
+  ((?P<f3>...)|(?P<f7>...)); las ancladas con ^ van en otra unión que solo
+  se prueba al inicio del texto. Las regex con grupos propios (referencias
+  \\1, grupos con nombre) o flags inline globales no admiten la unión y se
+  evalúan sueltas, ya compiladas.
+
+match() devuelve el índice del filtro que descarta el texto, de modo que el
+llamador puede contar aciertos por filtro (ver report()).
+"""
+
+import functools
+import logging
+import re
+from collections import Counter, deque
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from ..settings_cache import get_ocr_region_filters
+
+logger = logging.getLogger(__name__)
+
+FILTER_MODES = ("contains", "starts", "ends", "regex")
+
+# Flags inline globales ((?i)...): solo válidas al inicio de un patrón
+_GLOBAL_FLAGS_RE = re.compile(r"^\(\?[aiLmsux]+\)")
+
+# (mode, pattern, case_sensitive)
+FilterKey = Tuple[str, str, bool]
+
+
+class _Automaton:
+    """Aho-Corasick sobre literales; cada salida lleva (índice, modo, longitud)."""
+
+    def __init__(self, literals: Sequence[Tuple[int, str, str]]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[int, str, int]]] = [[]]
+        for idx, mode, literal in literals:
+            node = 0
+            for ch in literal:
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                node = nxt
+            self._out[node].append((idx, mode, len(literal)))
+
+        # Enlaces de fallo en anchura; cada nodo hereda las salidas de su sufijo
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                f = self._fail[node]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[child] = self._goto[f].get(ch, 0)
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def match(self, text: str) -> Optional[int]:
+        goto, fail, out = self._goto, self._fail, self._out
+        last = len(text) - 1
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for idx, mode, length in out[node]:
+                if mode == "contains" or (mode == "starts" and i + 1 == length) or (mode == "ends" and i == last):
+                    return idx
+        return None
+
+
+def _union(patterns: Sequence[Tuple[int, str]], flags: int) -> Optional[re.Pattern]:
+    if not patterns:
+        return None
+    return re.compile("|".join(f"(?P<f{idx}>{p})" for idx, p in patterns), flags)
+
+
+class _RegexSet:
+    """
+    Regex de una misma sensibilidad: uniones compiladas + las que no admiten
+    unión. Las ancladas al inicio (^... sin alternativas) van en una unión
+    aparte que se prueba con match(), solo en la posición 0.
+    """
+
+    def __init__(self, patterns: Sequence[Tuple[int, str]], flags: int):
+        self._anchored: Optional[re.Pattern] = None
+        self._floating: Optional[re.Pattern] = None
+        self._single: List[Tuple[int, re.Pattern]] = []
+        anchored: List[Tuple[int, str]] = []
+        floating: List[Tuple[int, str]] = []
+        for idx, pattern in patterns:
+            try:
+                compiled = re.compile(pattern, flags)
+            except re.error as e:
+                logger.warning("Filtro OCR regex inválido ignorado %r: %s", pattern, e)
+                continue
+            if compiled.groups or _GLOBAL_FLAGS_RE.match(pattern):
+                self._single.append((idx, compiled))
+            elif pattern.startswith("^") and "|" not in pattern:
+                anchored.append((idx, pattern))
+            else:
+                floating.append((idx, pattern))
+        try:
+            self._anchored = _union(anchored, flags)
+            self._floating = _union(floating, flags)
+        except re.error as e:
+            logger.warning("Filtros OCR regex sin unión (%s); se evalúan por separado", e)
+            self._anchored = self._floating = None
+            self._single.extend((idx, re.compile(p, flags)) for idx, p in anchored + floating)
+
+    def match(self, text: str) -> Optional[int]:
+        for union, search in ((self._anchored, False), (self._floating, True)):
+            if union is None:
+                continue
+            m = union.search(text) if search else union.match(text)
+            if m is not None:
+                return int(m.lastgroup[1:])
+        for idx, compiled in self._single:
+            if compiled.search(text):
+                return idx
+        return None
+
+
+class RegionFilter:
+    """Conjunto de filtros compilado. Sin estado mutable: se comparte entre hilos."""
+
+    def __init__(self, keys: Tuple[FilterKey, ...]):
+        self.keys = keys
+        literals = {True: [], False: []}
+        regexes = {True: [], False: []}
+        for idx, (mode, pattern, case_sensitive) in enumerate(keys):
+            if mode == "regex":
+                regexes[case_sensitive].append((idx, pattern))
+            else:
+                literals[case_sensitive].append((idx, mode, pattern if case_sensitive else pattern.lower()))
+        self._literal_cs = _Automaton(literals[True]) if literals[True] else None
+        self._literal_ci = _Automaton(literals[False]) if literals[False] else None
+        self._regex_cs = _RegexSet(regexes[True], 0)
+        self._regex_ci = _RegexSet(regexes[False], re.IGNORECASE)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def match(self, text: str) -> Optional[int]:
+        """Índice del filtro que descarta el texto, o None si pasa."""
+        if not self.keys:
+            return None
+        value = text or ""
+        if self._literal_cs is not None:
+            idx = self._literal_cs.match(value)
+            if idx is not None:
+                return idx
+        if self._literal_ci is not None:
+            idx = self._literal_ci.match(value.lower())
+            if idx is not None:
+                return idx
+        idx = self._regex_cs.match(value)
+        if idx is not None:
+            return idx
+        return self._regex_ci.match(value)
+
+    def report(self, hits: Counter) -> List[Dict[str, Any]]:
+        """Filtros con aciertos, de más a menos, en el formato de la config."""
+        return [
+            {"mode": mode, "pattern": pattern, "case_sensitive": case_sensitive, "hits": hits[idx]}
+            for idx, (mode, pattern, case_sensitive) in sorted(
+                enumerate(self.keys), key=lambda item: -hits[item[0]]
+            )
+            if hits[idx]
+        ]
+
+
+def _filter_keys(filters: Iterable[Mapping[str, Any]]) -> Tuple[FilterKey, ...]:
+    keys = []
+    for f in filters:
+        mode = f.get("mode")
+        pattern = f.get("pattern")
+        if mode not in FILTER_MODES or not pattern:
+            continue
+        keys.append((mode, str(pattern), bool(f.get("case_sensitive", False))))
+    return tuple(keys)
+
+
+@functools.lru_cache(maxsize=32)
+def _compile(keys: Tuple[FilterKey, ...]) -> RegionFilter:
+    return RegionFilter(keys)
+
+
+def compile_filters(filters: Optional[Iterable[Mapping[str, Any]]] = None) -> RegionFilter:
+    """
+    RegionFilter para la lista de filtros (None = filtros globales de la
+    config). Se compila una vez por conjunto distinto de filtros.
+    """
+    if filters is None:
+        filters = get_ocr_region_filters()
+    return _compile(_filter_keys(filters))
+
+
+def merge_filters(project_filters: Optional[List[Dict[str, Any]]], use_global: bool = True) -> Optional[list]:
+    """
+    Filtros del proyecto y, con use_global, los globales que no repitan uno
+    del proyecto. None si no queda ninguno (el OCR usa entonces los globales).
+    """
+    merged = list(project_filters or [])
+    if use_global:
+        seen = {(f.get("mode"), f.get("pattern"), f.get("case_sensitive")) for f in merged}
+        for f in get_ocr_region_filters():
+            if (f.get("mode"), f.get("pattern"), f.get("case_sensitive")) not in seen:
+                merged.append(f)
+    return merged or None
@@ -0,0 +1,200 @@
+"""
+Pool de procesos para OCR.
+
+Cada proceso carga el motor OCR configurado una sola vez al arrancar
+(warmup) y atiende páginas a medida que quedan libres. Los resultados
+vuelven serializados como dicts y se reconstruyen como TextRegion.
+Con ocr_pool_workers=0 el OCR se ejecuta en el propio proceso.
+
+Las páginas renderizadas en memoria viajan al proceso por memoria compartida
+(una copia, en vez de serializar ~60 MB por la tubería); el worker las mira
+sin copiarlas y quien encoló libera el segmento al terminar.
+"""
+
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import asdict
+from multiprocessing import shared_memory
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ..settings_cache import get_config, get_ocr_engine, get_ocr_pool_workers, use_config_snapshot
+from ..db.models import TextRegion
+from . import ocr_provider
+
+logger = logging.getLogger(__name__)
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_key: Optional[tuple] = None
+_pool_lock = threading.Lock()
+
+
+def _warmup_worker(engine: str, config_snapshot: Dict[str, Any]) -> None:
+    """Initializer de cada proceso: carga el motor OCR una vez."""
+    with use_config_snapshot(config_snapshot):
+        try:
+            if engine == "paddleocr":
+                from . import ocr_service_paddle
+                ocr_service_paddle._get_ocr()
+            elif engine == "rapidocr":
+                from . import ocr_service_rapid
+                ocr_service_rapid._get_ocr()
+            else:
+                from . import ocr_service
+                ocr_service._get_ocr()
+        except Exception as e:
+            # El error real se propagará en la primera tarea
+            logger.error("OCR worker warmup failed (engine=%s): %s", engine, e)
+
+
+# (nombre del segmento, forma, dtype) de una página en memoria compartida
+# (RGB o gris uint8, o bool si es bilevel)
+_SharedPage = Tuple[str, Tuple[int, ...], str]
+
+
+def _share_page(page: np.ndarray) -> Tuple[shared_memory.SharedMemory, _SharedPage]:
+    shm = shared_memory.SharedMemory(create=True, size=page.nbytes)
+    np.frombuffer(shm.buf, page.dtype).reshape(page.shape)[:] = page
+    return shm, (shm.name, page.shape, page.dtype.str)
+
+
+def _detect_in_worker(
+    image_path: Path,
+    dpi: int,
+    custom_filters: Optional[list],
+    document_type: str,
+    config_snapshot: Dict[str, Any],
+    shared_page: Optional[_SharedPage] = None,
+) -> List[Dict[str, Any]]:
+    shm = shared_memory.SharedMemory(name=shared_page[0]) if shared_page else None
+    try:
+        page = None
+        if shm is not None:
+            # frombuffer (no ndarray(buffer=)) retiene el buffer: close() falla
+            # en vez de desmapear bajo una vista viva
+            page = np.frombuffer(shm.buf, np.dtype(shared_page[2])).reshape(shared_page[1])
+            page.flags.writeable = False
+        with use_config_snapshot(config_snapshot):
+            regions = ocr_provider.detect_text(
+                image_path,
+                dpi,
+                custom_filters=custom_filters,
+                document_type=document_type,
+                page=page,
+            )
+        return [asdict(r) for r in regions]
+    finally:
+        if shm is not None:
+            # Soltar la vista antes de cerrar el segmento
+            page = None
+            try:
+                shm.close()
+            except BufferError:
+                # Un error en curso aún la referencia desde su traceback; el
+                # segmento se desmapea cuando se libere
+                logger.warning("OCR worker: segmento %s cerrado más tarde (vista en uso)", shm.name)
+
+
+def _regions_from_payload(payload: List[Dict[str, Any]]) -> List[TextRegion]:
+    return [TextRegion(**item) for item in payload]
+
+
+def pool_size() -> int:
+    """Número de procesos OCR configurados (0 = OCR en proceso)."""
+    return get_ocr_pool_workers()
+
+
+def _get_pool(workers: int, engine: str, config_snapshot: Dict[str, Any]) -> ProcessPoolExecutor:
+    """Devuelve el pool activo, recreándolo si cambió el motor o el tamaño."""
+    global _pool, _pool_key
+    key = (workers, engine)
+    with _pool_lock:
+        if _pool is not None and _pool_key != key:
+            logger.info("OCR pool: reiniciando (%s -> %s)", _pool_key, key)
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+        if _pool is None:
+            logger.info("OCR pool: arrancando %s procesos (engine=%s)", workers, engine)
+            _pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_warmup_worker,
+                initargs=(engine, config_snapshot),
+            )
+            _pool_key = key
+        return _pool
+
+
+def submit(
+    image_path: Path,
+    dpi: int,
+    custom_filters: Optional[list] = None,
+    document_type: str = "schematic",
+    page: Optional[np.ndarray] = None,
+) -> "Future[List[TextRegion]]":
+    """
+    Encola una página en el pool y devuelve un Future con sus TextRegion.
+    Usa el snapshot de config activo (use_config_snapshot) o el persistente.
+    page: la página ya renderizada en memoria (ver ocr_provider.detect_text).
+    """
+    config_snapshot = get_config()
+    workers = pool_size()
+    if workers <= 0:
+        raise RuntimeError("OCR pool disabled (ocr_pool_workers=0)")
+    pool = _get_pool(workers, get_ocr_engine(), config_snapshot)
+    shm, shared_page = _share_page(page) if page is not None else (None, None)
+    try:
+        raw = pool.submit(
+            _detect_in_worker, image_path, dpi, custom_filters, document_type, config_snapshot, shared_page,
+        )
+    except BaseException:
+        if shm is not None:
+            shm.close()
+            shm.unlink()
+        raise
+
+    out: Future = Future()
+
+    def _done(f: Future) -> None:
+        if shm is not None:
+            shm.close()
+            shm.unlink()
+        try:
+            out.set_result(_regions_from_payload(f.result()))
+        except BaseException as e:
+            out.set_exception(e)
+
+    raw.add_done_callback(_done)
+    return out
+
+
+def detect_text(
+    image_path: Path,
+    dpi: int,
+    custom_filters: Optional[list] = None,
+    document_type: str = "schematic",
+    page: Optional[np.ndarray] = None,
+) -> List[TextRegion]:
+    """Igual que ocr_provider.detect_text, pero en el pool si está habilitado."""
+    if pool_size() <= 0:
+        return ocr_provider.detect_text(
+            image_path,
+            dpi,
+            custom_filters=custom_filters,
+            document_type=document_type,
+            page=page,
+        )
+    return submit(image_path, dpi, custom_filters=custom_filters, document_type=document_type, page=page).result()
+
+
+def shutdown() -> None:
+    global _pool, _pool_key
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+        _pool_key = None
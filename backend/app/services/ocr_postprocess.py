@@ -1,11 +1,14 @@
 import logging
 from pathlib import Path
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 import numpy as np
-from PIL import Image
 
+from ..settings_cache import get_ocr_recheck_backend
 from ..db.models import TextRegion
+from . import image_cache
+from .color_modes import rgb_view
+from .recheck_crops import CropBatch, iter_crop_batches
 from .text_script_utils import has_han, is_pure_label_like, normalize_ocr_text
 
 logger = logging.getLogger(__name__)
@@ -26,47 +29,116 @@ def _get_easyocr_en_reader():
     return _en_reader
 
 
-def _crop_np(image_path: Path, bbox: List[float]) -> np.ndarray:
-    x1, y1, x2, y2 = bbox
-    with Image.open(image_path) as img:
-        w, h = img.size
-        pad = max(1, int(min(w, h) * 0.002))
-        left = max(0, int(x1) - pad)
-        top = max(0, int(y1) - pad)
-        right = min(w, int(x2) + pad)
-        bottom = min(h, int(y2) + pad)
-        crop = img.crop((left, top, right, bottom)).convert("RGB")
-        return np.array(crop)
-
-
-def _crop_np_scaled(image_path: Path, bbox: List[float], scale: float) -> np.ndarray:
-    if scale is None or float(scale) >= 0.999:
-        return _crop_np(image_path, bbox)
-    x1, y1, x2, y2 = bbox
-    with Image.open(image_path) as img:
-        w, h = img.size
-        pad = max(1, int(min(w, h) * 0.002))
-        left = max(0, int(x1) - pad)
-        top = max(0, int(y1) - pad)
-        right = min(w, int(x2) + pad)
-        bottom = min(h, int(y2) + pad)
-        crop = img.crop((left, top, right, bottom)).convert("RGB")
-        new_w = max(1, int(crop.size[0] * float(scale)))
-        new_h = max(1, int(crop.size[1] * float(scale)))
-        crop = crop.resize((new_w, new_h), Image.BILINEAR)
-        return np.array(crop)
+class _EasyOcrRecheck:
+    """Recheck con el lector EasyOCR EN (detección + reconocimiento)."""
+
+    def __init__(self):
+        self._reader = _get_easyocr_en_reader()
+
+    def _best(self, res) -> Tuple[str, float]:
+        if not res:
+            return "", 0.0
+        best = max(res, key=lambda it: float(it[2] if len(it) > 2 else 0.0))
+        return str(best[1]), float(best[2] if len(best) > 2 else 0.0)
+
+    def read(self, batch: CropBatch) -> List[Tuple[str, float]]:
+        readtext_batched = getattr(self._reader, "readtext_batched", None)
+        results = None
+        if callable(readtext_batched) and len(batch.indexes) > 1:
+            try:
+                results = readtext_batched(batch.images)
+            except Exception as e:
+                logger.debug("OCR recheck batch failed: %s", e)
+        if results is None:
+            results = [self._reader.readtext(img) for img in batch.images]
+        return [self._best(res) for res in results]
+
+
+class _RapidOcrRecheck:
+    """
+    Recheck solo-reconocimiento con el reconocedor ONNX de RapidOCR ya cargado
+    (sin detección ni EasyOCR/torch). El modelo chino también lee alfanuméricos.
+    """
+
+    def __init__(self):
+        from .ocr_service_rapid import _get_ocr
+        self._engine = _get_ocr()
+
+    def read(self, batch: CropBatch) -> List[Tuple[str, float]]:
+        # Quitar el relleno del cubo y pasar a BGR (convención de RapidOCR)
+        crops = [
+            np.ascontiguousarray(img[:h, :w, ::-1])
+            for img, (h, w) in zip(batch.images, batch.sizes)
+        ]
+        rec_res, _elapse = self._engine.text_rec(crops)
+        return [(str(text), float(score)) for text, score in rec_res]
+
+
+_RECHECK_BACKENDS = {"easyocr": _EasyOcrRecheck, "rapidocr": _RapidOcrRecheck}
 
 
 def _looks_like_label_en(text: str) -> bool:
     return is_pure_label_like(text)
 
 
+def _is_en_label(text: str, conf: float) -> bool:
+    """True si el texto reconocido parece una etiqueta alfanumérica."""
+    en_text = normalize_ocr_text(text)
+    return conf >= 0.6 and _looks_like_label_en(en_text) and not has_han(en_text)
+
+
+def _memo_key(backend_name: str, scale: float, bbox: List[float]) -> str:
+    x1, y1, x2, y2 = bbox
+    return f"{backend_name}|{scale:.4f}|{x1:.1f},{y1:.1f},{x2:.1f},{y2:.1f}"
+
+
+def _recheck_en_labels(
+    image_path: Path,
+    to_check: List[TextRegion],
+    scale: float,
+    recheck_memo: Optional[Dict[str, List[Any]]] = None,
+    page: Optional[np.ndarray] = None,
+) -> List[bool]:
+    """
+    Reconoce los recortes de las regiones y devuelve, por región, si es etiqueta.
+    La página (page si ya está en memoria) se decodifica una vez y los
+    recortes van en lotes del mismo tamaño.
+    Si se pasa recheck_memo, las lecturas (texto, confianza) se reutilizan por
+    backend/escala/bbox y las nuevas se añaden al diccionario.
+    """
+    backend_name = get_ocr_recheck_backend()
+    memo = recheck_memo if recheck_memo is not None else {}
+    keys = [_memo_key(backend_name, scale, r.bbox) for r in to_check]
+    pending = [i for i, key in enumerate(keys) if key not in memo]
+
+    n_batches = 0
+    if pending:
+        backend = _RECHECK_BACKENDS[backend_name]()
+        if page is None:
+            page = image_cache.get_array(image_path)
+        for batch in iter_crop_batches(rgb_view(page), [to_check[i].bbox for i in pending], scale):
+            n_batches += 1
+            for idx, (text, conf) in zip(batch.indexes, backend.read(batch)):
+                memo[keys[pending[idx]]] = [text, float(conf)]
+
+    logger.info(
+        "OCR recheck (%s): %s recortes (%s reutilizados) en %s lotes",
+        backend_name,
+        len(to_check),
+        len(to_check) - len(pending),
+        n_batches,
+    )
+    return [_is_en_label(*memo.get(key, ("", 0.0))) for key in keys]
+
+
 def recheck_suspicious_regions(
     image_path: Path,
     regions: List[TextRegion],
     recheck_max_regions_per_page: int,
     source_dpi: Optional[int] = None,
     target_dpi: int = 150,
+    recheck_memo: Optional[Dict[str, List[Any]]] = None,
+    page: Optional[np.ndarray] = None,
 ) -> List[TextRegion]:
     """
     Aplica recheck OCR EN en regiones sospechosas (cajas pequeñas con texto corto).
@@ -110,38 +182,8 @@ def recheck_suspicious_regions(
         float(scale),
     )
 
-    reader = _get_easyocr_en_reader()
-    crops: List[np.ndarray] = []
-    for r in to_check:
-        try:
-            crops.append(_crop_np_scaled(image_path, r.bbox, scale))
-        except Exception:
-            crops.append(_crop_np(image_path, r.bbox))
-
-    results: List[list] = []
-    try:
-        # EasyOCR soporta batch en algunas versiones
-        readtext_batched = getattr(reader, "readtext_batched", None)
-        if callable(readtext_batched):
-            results = readtext_batched(crops)
-        else:
-            results = [reader.readtext(c) for c in crops]
-    except Exception as e:
-        logger.debug("OCR recheck batch failed: %s", e)
-        results = [reader.readtext(c) for c in crops]
-
-    for r, res in zip(to_check, results):
-        try:
-            if res:
-                best = max(res, key=lambda it: float(it[2] if len(it) > 2 else 0.0))
-                en_text = normalize_ocr_text(best[1])
-                en_conf = float(best[2] if len(best) > 2 else 0.0)
-                if en_conf >= 0.6 and _looks_like_label_en(en_text) and not has_han(en_text):
-                    continue
-        except Exception as e:
-            logger.debug("OCR recheck parse failed: %s", e)
-
-        out.append(r)
+    is_label = _recheck_en_labels(image_path, to_check, scale, recheck_memo, page)
+    out.extend(r for r, label in zip(to_check, is_label) if not label)
 
     out.extend(passthrough)
 
@@ -156,6 +198,8 @@ def filter_regions_advanced(
     recheck_max_regions_per_page: int,
     source_dpi: Optional[int] = None,
     target_dpi: int = 150,
+    recheck_memo: Optional[Dict[str, List[Any]]] = None,
+    page: Optional[np.ndarray] = None,
 ) -> List[TextRegion]:
     out: List[TextRegion] = []
 
@@ -206,37 +250,8 @@ def filter_regions_advanced(
         float(scale),
     )
 
-    reader = _get_easyocr_en_reader()
-    crops: List[np.ndarray] = []
-    for r in to_check:
-        try:
-            crops.append(_crop_np_scaled(image_path, r.bbox, scale))
-        except Exception:
-            crops.append(_crop_np(image_path, r.bbox))
-
-    results: List[list] = []
-    try:
-        readtext_batched = getattr(reader, "readtext_batched", None)
-        if callable(readtext_batched):
-            results = readtext_batched(crops)
-        else:
-            results = [reader.readtext(c) for c in crops]
-    except Exception as e:
-        logger.debug("OCR recheck batch failed: %s", e)
-        results = [reader.readtext(c) for c in crops]
-
-    for r, res in zip(to_check, results):
-        try:
-            if res:
-                best = max(res, key=lambda it: float(it[2] if len(it) > 2 else 0.0))
-                en_text = normalize_ocr_text(best[1])
-                en_conf = float(best[2] if len(best) > 2 else 0.0)
-                if en_conf >= 0.6 and _looks_like_label_en(en_text) and not has_han(en_text):
-                    continue
-        except Exception as e:
-            logger.debug("OCR recheck parse failed: %s", e)
-
-        out.append(r)
+    is_label = _recheck_en_labels(image_path, to_check, scale, recheck_memo, page)
+    out.extend(r for r, label in zip(to_check, is_label) if not label)
 
     out.extend(passthrough)
 
@@ -1,46 +1,157 @@
+"""
+Punto de entrada del OCR: elige el motor, usa la caché de salida en bruto
+(ocr_raw_cache) y aplica el post-proceso común (ocr_regions).
+
+Los motores reciben siempre un array RGB (las páginas en gris o bilevel, como
+vista RGB). Si la página llega ya renderizada en memoria
+(render_service.render_page_array) se usa tal cual y su PNG se escribe en un
+hilo mientras corre el motor; si no, se lee de disco.
+"""
+
+import functools
 import logging
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from importlib import metadata
 from pathlib import Path
-from typing import List, Optional
+from types import ModuleType
+from typing import Any, Dict, List, Optional
+
+import numpy as np
 
-from ..config import get_ocr_engine
+from ..settings_cache import get_ocr_engine
 from ..db.models import TextRegion
+from . import image_cache, ocr_raw_cache, render_service
+from .color_modes import rgb_view
+from .ocr_filters import compile_filters
+from .ocr_raw_cache import RawOcrEntry
+from .ocr_regions import build_regions, finalize_regions
 
 logger = logging.getLogger(__name__)
 
 
-def detect_text(
-    image_path: Path,
-    dpi: int,
-    custom_filters: Optional[list] = None,
-    document_type: str = "schematic",
-) -> List[TextRegion]:
-    engine = get_ocr_engine()
-    logger.info("OCR engine selected: %s (dpi=%s, image=%s)", engine, dpi, str(image_path))
+class RawOcrMissingError(Exception):
+    """No hay salida en bruto guardada para la página con el motor actual."""
+
+
+def _engine_module(engine: str) -> ModuleType:
     if engine == "paddleocr":
         from . import ocr_service_paddle
 
-        return ocr_service_paddle.detect_text(
-            image_path,
-            dpi,
-            custom_filters=custom_filters,
-            document_type=document_type,
-        )
+        return ocr_service_paddle
 
     if engine == "rapidocr":
         from . import ocr_service_rapid
 
-        return ocr_service_rapid.detect_text(
-            image_path,
-            dpi,
-            custom_filters=custom_filters,
-            document_type=document_type,
-        )
+        return ocr_service_rapid
 
     from . import ocr_service
 
-    return ocr_service.detect_text(
-        image_path,
-        dpi,
-        custom_filters=custom_filters,
-        document_type=document_type,
+    return ocr_service
+
+
+@functools.lru_cache(maxsize=None)
+def _package_version(package: str) -> str:
+    try:
+        return metadata.version(package)
+    except metadata.PackageNotFoundError:
+        return "unknown"
+
+
+def _cache_key(image_path: Path, engine: str, module: ModuleType) -> str:
+    params: Dict[str, Any] = dict(module.ENGINE_PARAMS)
+    params["version"] = _package_version(module.ENGINE_PACKAGE)
+    return ocr_raw_cache.cache_key(image_path, engine, params)
+
+
+def _regions_from_entry(
+    image_path: Path,
+    dpi: int,
+    engine: str,
+    entry: RawOcrEntry,
+    custom_filters: Optional[list],
+    document_type: str,
+    is_new: bool,
+    filter_hits: Optional[Counter] = None,
+    page: Optional[np.ndarray] = None,
+) -> List[TextRegion]:
+    known_rechecks = len(entry.recheck)
+    hits = filter_hits if filter_hits is not None else Counter()
+    regions = build_regions(image_path, entry.size, entry.detections, custom_filters, filter_hits=hits)
+    if hits:
+        region_filter = compile_filters(custom_filters)
+        logger.info(
+            "OCR filtros: %s regiones descartadas en %s (%s)",
+            sum(hits.values()),
+            image_path.name,
+            ", ".join(f"{f['mode']}:{f['pattern']}={f['hits']}" for f in region_filter.report(hits)[:5]),
+        )
+    regions = finalize_regions(image_path, dpi, regions, document_type, recheck_memo=entry.recheck, page=page)
+    if is_new or len(entry.recheck) != known_rechecks:
+        ocr_raw_cache.save(image_path, engine, entry)
+    return regions
+
+
+def _run_on_rendered(image_path: Path, page: np.ndarray, engine: str, module: ModuleType) -> RawOcrEntry:
+    """
+    Motor sobre la página en memoria mientras otro hilo escribe su PNG. La
+    clave de la caché en bruto es la huella de la PNG, así que se calcula
+    cuando ambos terminan.
+    """
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="page-png") as writer:
+        saved = writer.submit(render_service.save_page_png, page, image_path)
+        detections = module.run_engine(rgb_view(page))
+        saved.result()
+    return RawOcrEntry(
+        key=_cache_key(image_path, engine, module), size=(page.shape[1], page.shape[0]), detections=detections,
     )
+
+
+def detect_text(
+    image_path: Path,
+    dpi: int,
+    custom_filters: Optional[list] = None,
+    document_type: str = "schematic",
+    page: Optional[np.ndarray] = None,
+) -> List[TextRegion]:
+    """
+    OCR de la página image_path. Si se pasa page (recién renderizada en
+    memoria, image_path aún no existe) el motor la usa directamente y la PNG
+    se persiste en paralelo; al ser una página nueva no se consulta la caché.
+    """
+    engine = get_ocr_engine()
+    module = _engine_module(engine)
+    if page is not None:
+        logger.info("OCR engine selected: %s (dpi=%s, image=%s, en memoria)", engine, dpi, str(image_path))
+        entry = _run_on_rendered(image_path, page, engine, module)
+        return _regions_from_entry(image_path, dpi, engine, entry, custom_filters, document_type, True, page=page)
+
+    key = _cache_key(image_path, engine, module)
+    entry = ocr_raw_cache.load(image_path, engine, key)
+    is_new = entry is None
+    if entry is None:
+        logger.info("OCR engine selected: %s (dpi=%s, image=%s)", engine, dpi, str(image_path))
+        page = image_cache.get_array(image_path)
+        entry = RawOcrEntry(key=key, size=(page.shape[1], page.shape[0]), detections=module.run_engine(rgb_view(page)))
+    else:
+        logger.info("OCR raw cache hit: %s (dpi=%s, image=%s)", engine, dpi, str(image_path))
+    return _regions_from_entry(image_path, dpi, engine, entry, custom_filters, document_type, is_new)
+
+
+def refilter_text(
+    image_path: Path,
+    dpi: int,
+    custom_filters: Optional[list] = None,
+    document_type: str = "schematic",
+    filter_hits: Optional[Counter] = None,
+) -> List[TextRegion]:
+    """
+    Re-aplica filtros y post-proceso sobre la salida en bruto guardada, sin
+    ejecutar el motor. Lanza RawOcrMissingError si la página no tiene caché.
+    filter_hits recibe los descartes por filtro (índices de compile_filters).
+    """
+    engine = get_ocr_engine()
+    entry = ocr_raw_cache.load(image_path, engine, _cache_key(image_path, engine, _engine_module(engine)))
+    if entry is None:
+        raise RawOcrMissingError(f"No raw OCR output cached for {image_path.name} (engine={engine})")
+    return _regions_from_entry(image_path, dpi, engine, entry, custom_filters, document_type, False, filter_hits)
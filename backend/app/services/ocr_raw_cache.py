@@ -0,0 +1,98 @@
+"""
+Caché persistente de la salida en bruto del motor OCR por página.
+
+El motor OCR es lo caro (segundos por página); los filtros de región, los
+umbrales Han, el modo avanzado y la agrupación en párrafos cuestan
+milisegundos. Guardando las detecciones en bruto, cambiar filtros o ajustes
+solo re-ejecuta el post-proceso (ocr_regions) y no el motor.
+
+Fichero por página y motor: <proyecto>/ocr_raw/<stem>.<motor>.json. La clave
+combina el hash del contenido de la imagen, el motor y sus parámetros; si
+cualquiera cambia (re-render, otro motor, otra versión) la entrada se ignora.
+Junto a las detecciones se guardan las lecturas del recheck EN (recheck_memo)
+para que re-filtrar tampoco repita el lector EN.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..atomic_files import write_atomic
+from .ocr_regions import RawDetection
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIRNAME = "ocr_raw"
+
+# Ruta -> (mtime_ns, tamaño, SHA-256); una entrada por fichero, la de su versión actual
+_digests: Dict[str, Tuple[int, int, str]] = {}
+_digests_lock = threading.Lock()
+
+
+@dataclass
+class RawOcrEntry:
+    key: str
+    size: Tuple[int, int]  # (ancho, alto) de la imagen
+    detections: List[RawDetection]
+    recheck: Dict[str, List[Any]] = field(default_factory=dict)
+
+
+def image_digest(image_path: Path) -> str:
+    """SHA-256 del fichero de imagen, memorizado por ruta + mtime + tamaño."""
+    path = Path(image_path)
+    st = path.stat()
+    resolved = str(path.resolve())
+    with _digests_lock:
+        cached = _digests.get(resolved)
+    if cached is not None and cached[:2] == (st.st_mtime_ns, st.st_size):
+        return cached[2]
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    digest = h.hexdigest()
+    with _digests_lock:
+        # Sustituye el hash de la versión anterior del mismo fichero
+        _digests[resolved] = (st.st_mtime_ns, st.st_size, digest)
+    return digest
+
+
+def cache_key(image_path: Path, engine: str, params: Dict[str, Any]) -> str:
+    payload = json.dumps(
+        {"image": image_digest(image_path), "engine": engine, "params": params},
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def cache_path(image_path: Path, engine: str) -> Path:
+    return image_path.parent.parent / CACHE_DIRNAME / f"{image_path.stem}.{engine}.json"
+
+
+def load(image_path: Path, engine: str, key: str) -> Optional[RawOcrEntry]:
+    """Entrada guardada si existe y su clave coincide; None en otro caso."""
+    path = cache_path(image_path, engine)
+    if not path.exists():
+        return None
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError) as e:
+        logger.warning("OCR raw cache ilegible (%s): %s", path, e)
+        return None
+    if data.get("key") != key:
+        return None
+    return RawOcrEntry(
+        key=data["key"],
+        size=tuple(data["size"]),
+        detections=data["detections"],
+        recheck=data.get("recheck", {}),
+    )
+
+
+def save(image_path: Path, engine: str, entry: RawOcrEntry) -> None:
+    """Escritura atómica (varios procesos OCR pueden escribir a la vez)."""
+    write_atomic(cache_path(image_path, engine), json.dumps(asdict(entry), ensure_ascii=False).encode("utf-8"))
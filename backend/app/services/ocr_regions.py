@@ -0,0 +1,250 @@
+"""
+Post-proceso común de las detecciones OCR, independiente del motor.
+
+Cada motor (ocr_service, ocr_service_paddle, ocr_service_rapid) solo produce
+detecciones en bruto: [puntos, texto, confianza]. Aquí se aplican los filtros
+de región, los umbrales Han, el modo avanzado / recheck EN y la agrupación en
+párrafos de los documentos "manual". Al no depender del motor, el mismo código
+sirve para re-filtrar la salida en bruto guardada (ver ocr_raw_cache).
+"""
+
+import uuid
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from ..config import CJK_RATIO_THRESHOLD
+from ..settings_cache import (
+    get_min_han_ratio,
+    get_min_ocr_confidence,
+    get_ocr_enable_label_recheck,
+    get_ocr_mode,
+    get_ocr_recheck_max_regions_per_page,
+)
+from ..db.models import TextRegion
+from .ocr_filters import compile_filters
+from .ocr_postprocess import filter_regions_advanced, recheck_suspicious_regions
+from .spatial_index import SpatialIndex
+from .text_script_utils import han_ratios
+
+# Detección en bruto: [[[x, y], ...], texto, confianza]
+RawDetection = List[Any]
+
+
+def raw_detection(points: Any, text: Any, confidence: Any) -> RawDetection:
+    """Detección en bruto serializable en JSON (los motores devuelven numpy)."""
+    return [[[float(p[0]), float(p[1])] for p in points], str(text), float(confidence)]
+
+
+def build_regions(
+    image_path: Path,
+    img_size: Sequence[int],
+    raw: Sequence[RawDetection],
+    custom_filters: Optional[list] = None,
+    filter_hits: Optional[Counter] = None,
+) -> List[TextRegion]:
+    """
+    Convierte detecciones en bruto en TextRegion aplicando filtros y umbrales Han.
+    Si se pasa filter_hits, suma ahí las regiones descartadas por cada filtro.
+    """
+    img_width, img_height = img_size
+    region_filter = compile_filters(custom_filters)
+    min_han_ratio = get_min_han_ratio()
+    project_id = image_path.parent.parent.name
+    page_number = int(image_path.stem.split("_")[0])
+
+    # Primera pasada: parseo + filtros de región
+    candidates = []
+    for item in raw:
+        try:
+            bbox_points = item[0]  # [[x1,y1],[x2,y2],[x3,y3],[x4,y4]]
+            text = str(item[1]) if item[1] is not None else ""
+            confidence = float(item[2])
+        except Exception:
+            continue
+
+        if not text:
+            continue
+
+        filter_idx = region_filter.match(text)
+        if filter_idx is not None:
+            if filter_hits is not None:
+                filter_hits[filter_idx] += 1
+            continue
+
+        candidates.append((bbox_points, text, confidence))
+
+    # Ratios Han de toda la página de una vez
+    ratios = han_ratios([text for _, text, _ in candidates])
+
+    regions: List[TextRegion] = []
+    for (bbox_points, text, confidence), ratio in zip(candidates, ratios):
+        # Primero descartar si casi no hay Han (ruido), luego el umbral configurable
+        if ratio < CJK_RATIO_THRESHOLD or ratio < min_han_ratio:
+            continue
+
+        try:
+            x_coords = [float(p[0]) for p in bbox_points]
+            y_coords = [float(p[1]) for p in bbox_points]
+        except Exception:
+            continue
+
+        x1, y1 = min(x_coords), min(y_coords)
+        x2, y2 = max(x_coords), max(y_coords)
+
+        regions.append(
+            TextRegion(
+                id=str(uuid.uuid4()),
+                project_id=project_id,
+                page_number=page_number,
+                bbox=[x1, y1, x2, y2],
+                bbox_normalized=[x1 / img_width, y1 / img_height, x2 / img_width, y2 / img_height],
+                src_text=text,
+                confidence=confidence,
+            )
+        )
+    return regions
+
+
+def finalize_regions(
+    image_path: Path,
+    dpi: int,
+    regions: List[TextRegion],
+    document_type: str = "schematic",
+    recheck_memo: Optional[Dict[str, List[Any]]] = None,
+    page: Optional[np.ndarray] = None,
+) -> List[TextRegion]:
+    """
+    Modo avanzado / recheck EN y agrupación en párrafos. recheck_memo guarda
+    las lecturas EN ya hechas para no repetirlas al re-filtrar. page es la
+    página ya en memoria, si la hay (si no, el recheck la lee de image_path).
+    """
+    # Recheck es caro en CPU: por defecto está desactivado, pero en documentos "manual"
+    # lo forzamos porque ayuda a eliminar etiquetas/ruido.
+    enable_label_recheck = bool(get_ocr_enable_label_recheck()) or (document_type == "manual")
+
+    if get_ocr_mode() == "advanced" and regions:
+        regions = filter_regions_advanced(
+            image_path=image_path,
+            regions=regions,
+            min_ocr_confidence=get_min_ocr_confidence(),
+            enable_label_recheck=enable_label_recheck,
+            recheck_max_regions_per_page=get_ocr_recheck_max_regions_per_page(),
+            source_dpi=dpi,
+            recheck_memo=recheck_memo,
+            page=page,
+        )
+    elif enable_label_recheck and regions:
+        # Modo básico con recheck activado
+        regions = recheck_suspicious_regions(
+            image_path=image_path,
+            regions=regions,
+            recheck_max_regions_per_page=get_ocr_recheck_max_regions_per_page(),
+            source_dpi=dpi,
+            recheck_memo=recheck_memo,
+            page=page,
+        )
+
+    # Para modo manual, agrupar líneas en párrafos
+    if document_type == "manual" and len(regions) > 1:
+        regions = group_lines_into_paragraphs(regions)
+
+    return regions
+
+
+def _continues_paragraph(prev: Sequence[float], curr: Sequence[float]) -> bool:
+    prev_x1, prev_y1, prev_x2, prev_y2 = prev
+    curr_x1, curr_y1, curr_x2, curr_y2 = curr
+
+    # Solapamiento en X
+    overlap_x = min(prev_x2, curr_x2) - max(prev_x1, curr_x1)
+    min_width = min(prev_x2 - prev_x1, curr_x2 - curr_x1)
+    x_overlap_ratio = overlap_x / min_width if min_width > 0 else 0
+
+    # Distancia vertical
+    avg_height = ((prev_y2 - prev_y1) + (curr_y2 - curr_y1)) / 2
+    vertical_gap = curr_y1 - prev_y2
+
+    return x_overlap_ratio > 0.5 and vertical_gap < avg_height * 1.5
+
+
+def group_lines_into_paragraphs(regions: List[TextRegion]) -> List[TextRegion]:
+    """
+    Agrupa líneas de texto cercanas en párrafos para modo manual.
+
+    Cada línea se enlaza con la línea más próxima por debajo que cumpla:
+    - Solapamiento horizontal > 50% (misma columna)
+    - Distancia vertical < 1.5x alto promedio (líneas consecutivas)
+    Las candidatas salen del índice espacial, de modo que las columnas
+    intercaladas en Y no cortan los párrafos de la columna vecina.
+    """
+    if not regions:
+        return regions
+
+    # Ordenar por posición Y (de arriba a abajo)
+    lines = sorted(regions, key=lambda r: r.bbox[1])
+    index = SpatialIndex(r.bbox for r in lines)
+    boxes = index.boxes
+    max_height = max(y2 - y1 for _, y1, _, y2 in boxes)
+
+    next_line: Dict[int, int] = {}
+    has_previous = set()
+    for i, (x1, y1, x2, y2) in enumerate(boxes):
+        reach = 1.5 * ((y2 - y1) + max_height) / 2
+        best = None
+        for j in index.query((x1, y1, x2, y2 + reach)):
+            if j <= i or j in has_previous or not _continues_paragraph(boxes[i], boxes[j]):
+                continue
+            if best is None or boxes[j][1] < boxes[best][1]:
+                best = j
+        if best is not None:
+            next_line[i] = best
+            has_previous.add(best)
+
+    grouped = []
+    for i, line in enumerate(lines):
+        if i in has_previous:
+            continue
+        paragraph = [line]
+        k = i
+        while k in next_line:
+            k = next_line[k]
+            paragraph.append(lines[k])
+        grouped.append(_merge_regions(paragraph))
+    return grouped
+
+
+def _merge_regions(regions: List[TextRegion]) -> TextRegion:
+    """Fusiona múltiples regiones en una sola (para párrafos)."""
+    if len(regions) == 1:
+        return regions[0]
+
+    base = regions[0]
+    merged_bbox = [
+        min(r.bbox[0] for r in regions),
+        min(r.bbox[1] for r in regions),
+        max(r.bbox[2] for r in regions),
+        max(r.bbox[3] for r in regions),
+    ]
+
+    # Tamaño de imagen deducido de la región base
+    img_width = base.bbox[2] / base.bbox_normalized[2] if base.bbox_normalized[2] > 0 else 1
+    img_height = base.bbox[3] / base.bbox_normalized[3] if base.bbox_normalized[3] > 0 else 1
+
+    return TextRegion(
+        id=str(uuid.uuid4()),
+        project_id=base.project_id,
+        page_number=base.page_number,
+        bbox=merged_bbox,
+        bbox_normalized=[
+            merged_bbox[0] / img_width,
+            merged_bbox[1] / img_height,
+            merged_bbox[2] / img_width,
+            merged_bbox[3] / img_height,
+        ],
+        # Combinar textos con espacio entre líneas y promediar confianza
+        src_text=" ".join(r.src_text for r in regions),
+        confidence=sum(r.confidence for r in regions) / len(regions),
+    )
@@ -3,23 +3,14 @@ Servicio de OCR usando RapidOCR (modelos PaddleOCR vía ONNX Runtime).
 Más rápido que EasyOCR en CPU, sin depender de PaddlePaddle.
 """
 
-import re
-import uuid
-from pathlib import Path
-from typing import List, Optional
+from typing import List
 
-from PIL import Image
+import numpy as np
 
-from ..config import (
-    CJK_RATIO_THRESHOLD,
-    get_min_han_ratio,
-    get_ocr_region_filters,
-    get_min_ocr_confidence,
-    get_ocr_enable_label_recheck,
-    get_ocr_recheck_max_regions_per_page,
-    get_ocr_mode,
-)
-from ..db.models import TextRegion
+from .ocr_regions import RawDetection, raw_detection
+
+ENGINE_PACKAGE = "rapidocr-onnxruntime"
+ENGINE_PARAMS = {}
 
 _ocr_engine = None
 
@@ -38,152 +29,19 @@ def _get_ocr():
     return _ocr_engine
 
 
-def _is_han_char(char: str) -> bool:
-    code = ord(char)
-    return (
-        0x4E00 <= code <= 0x9FFF
-        or 0x3400 <= code <= 0x4DBF
-        or 0x20000 <= code <= 0x2A6DF
-        or 0x2A700 <= code <= 0x2B73F
-        or 0x2B740 <= code <= 0x2B81F
-        or 0x2B820 <= code <= 0x2CEAF
-        or 0xF900 <= code <= 0xFAFF
-        or 0x2F800 <= code <= 0x2FA1F
-    )
-
-
-def _han_ratio(text: str) -> float:
-    if not text:
-        return 0.0
-    han_count = sum(1 for c in text if _is_han_char(c))
-    return han_count / len(text)
-
-
-def _apply_filters(text: str, ocr_filters: list) -> bool:
-    for f in ocr_filters:
-        mode = f.get("mode")
-        pattern = f.get("pattern")
-        if not mode or not pattern:
-            continue
-        case_sensitive = bool(f.get("case_sensitive", False))
-        raw_value = text or ""
-        value = raw_value if case_sensitive else raw_value.lower()
-        target = pattern if case_sensitive else str(pattern).lower()
-        try:
-            if mode == "contains" and target in value:
-                return True
-            if mode == "starts" and value.startswith(target):
-                return True
-            if mode == "ends" and value.endswith(target):
-                return True
-            if mode == "regex":
-                flags = 0 if case_sensitive else re.IGNORECASE
-                if re.search(str(pattern), raw_value, flags=flags):
-                    return True
-        except Exception:
-            continue
-    return False
-
-
-def detect_text(
-    image_path: Path,
-    dpi: int,
-    custom_filters: Optional[list] = None,
-    document_type: str = "schematic",
-) -> List[TextRegion]:
+def run_engine(page: np.ndarray) -> List[RawDetection]:
+    """Ejecuta RapidOCR sobre la página RGB y devuelve las detecciones en bruto."""
     engine = _get_ocr()
 
-    with Image.open(image_path) as img:
-        img_width, img_height = img.size
-
-    ocr_filters = custom_filters if custom_filters is not None else get_ocr_region_filters()
-    min_han_ratio = get_min_han_ratio()
-
     # RapidOCR devuelve (result, elapse)
     # result: list of [bbox_points, text, confidence]
-    result, _elapse = engine(str(image_path))
-
-    regions: List[TextRegion] = []
-
-    if not result:
-        return regions
-
-    for item in result:
-        try:
-            bbox_points = item[0]  # [[x1,y1],[x2,y2],[x3,y3],[x4,y4]]
-            text = str(item[1])
-            confidence = float(item[2])
-        except Exception:
-            continue
-
-        if not text:
-            continue
-
-        if _apply_filters(text, ocr_filters):
-            continue
-
-        if _han_ratio(text) < CJK_RATIO_THRESHOLD:
-            continue
-
-        if _han_ratio(text) < min_han_ratio:
-            continue
+    # RapidOCR trata los arrays como BGR (convención OpenCV)
+    result, _elapse = engine(np.ascontiguousarray(page[:, :, ::-1]))
 
+    detections: List[RawDetection] = []
+    for item in result or []:
         try:
-            x_coords = [float(p[0]) for p in bbox_points]
-            y_coords = [float(p[1]) for p in bbox_points]
+            detections.append(raw_detection(item[0], item[1], item[2]))
         except Exception:
             continue
-
-        x1, y1 = min(x_coords), min(y_coords)
-        x2, y2 = max(x_coords), max(y_coords)
-
-        bbox_normalized = [
-            x1 / img_width,
-            y1 / img_height,
-            x2 / img_width,
-            y2 / img_height,
-        ]
-
-        project_id = image_path.parent.parent.name
-        page_number = int(image_path.stem.split("_")[0])
-
-        region = TextRegion(
-            id=str(uuid.uuid4()),
-            project_id=project_id,
-            page_number=page_number,
-            bbox=[x1, y1, x2, y2],
-            bbox_normalized=bbox_normalized,
-            src_text=text,
-            confidence=confidence,
-        )
-        regions.append(region)
-
-    enable_label_recheck = bool(get_ocr_enable_label_recheck()) or (document_type == "manual")
-
-    if get_ocr_mode() == "advanced" and regions:
-        from .ocr_postprocess import filter_regions_advanced
-
-        regions = filter_regions_advanced(
-            image_path=image_path,
-            regions=regions,
-            min_ocr_confidence=get_min_ocr_confidence(),
-            enable_label_recheck=enable_label_recheck,
-            recheck_max_regions_per_page=get_ocr_recheck_max_regions_per_page(),
-            source_dpi=dpi,
-        )
-    elif enable_label_recheck and regions:
-        from .ocr_postprocess import recheck_suspicious_regions
-
-        regions = recheck_suspicious_regions(
-            image_path=image_path,
-            regions=regions,
-            recheck_max_regions_per_page=get_ocr_recheck_max_regions_per_page(),
-            source_dpi=dpi,
-        )
-
-    if document_type == "manual" and len(regions) > 1:
-        from .ocr_service import _group_lines_into_paragraphs
-
-        regions = _group_lines_into_paragraphs(regions)
-
-    return regions
+    return detections
@@ -0,0 +1,135 @@
+"""
+Fases del procesamiento de una página (render → OCR → traducción →
+composición) para el pipeline de render_pipeline.
+
+Cada fase es una función independiente que recibe un PageWork y lo devuelve
+enriquecido. La página nueva se rasteriza en memoria y pasa al OCR como
+array, sin codificar y decodificar una PNG por el camino; la PNG se escribe
+durante el OCR y ya existe cuando la fase termina.
+"""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from ..db.models import TextRegion
+from ..db.repository import pages_repo, text_regions_repo
+from . import render_service, compose_service, ocr_pool
+from .region_translation import apply_glossary, translate_regions
+
+logger = logging.getLogger(__name__)
+
+STAGES = ("render", "ocr", "translate", "compose")
+
+# Las escrituras a SQLite ya las serializa project_store; esto protege las
+# cachés en memoria de los repositorios (dicts sin lock que se cargan bajo
+# demanda), que las fases leen y modifican desde hilos distintos: p. ej.
+# list_by_page recorre las regiones mientras replace_for_page borra otras.
+_repo_cache_lock = threading.Lock()
+
+
+@dataclass
+class PageContext:
+    """Datos compartidos por todas las páginas de un job."""
+    project_id: str
+    project_dir: Path
+    dpi: int
+    document_type: str
+    glossary_map: Dict[str, str]
+    custom_filters: Optional[list] = None
+    color_mode: str = "rgb"
+
+    @property
+    def pdf_path(self) -> Path:
+        return self.project_dir / "src.pdf"
+
+
+@dataclass
+class PageWork:
+    """Estado de una página mientras avanza por las fases."""
+    page_num: int
+    image_path: Optional[Path] = None
+    regions: List[TextRegion] = field(default_factory=list)
+    # Página recién rasterizada cuya PNG aún no está en image_path (solo hasta el OCR)
+    page: Optional[np.ndarray] = None
+
+
+def render_step(ctx: PageContext, work: PageWork) -> PageWork:
+    image_path = ctx.project_dir / "pages" / f"{work.page_num:03d}_original_{ctx.dpi}.png"
+    if image_path.exists():
+        logger.info(f"[JOB] Render skip (ya existe): {image_path}")
+        with _repo_cache_lock:
+            pages_repo.upsert(ctx.project_id, work.page_num, has_original=True)
+    else:
+        work.page = render_service.render_page_array(
+            ctx.pdf_path, work.page_num, ctx.dpi, ctx.project_dir, ctx.color_mode,
+        )
+        logger.info(f"[JOB] Renderizado en memoria: {image_path}")
+    work.image_path = image_path
+    return work
+
+
+def ocr_step(ctx: PageContext, work: PageWork) -> PageWork:
+    work.regions = ocr_pool.detect_text(
+        work.image_path,
+        ctx.dpi,
+        custom_filters=ctx.custom_filters,
+        document_type=ctx.document_type,
+        page=work.page,
+    )
+    if work.page is not None:
+        # El OCR ya escribió la PNG: la página deja de ocupar memoria
+        work.page = None
+        with _repo_cache_lock:
+            pages_repo.upsert(ctx.project_id, work.page_num, has_original=True)
+    logger.info(f"[JOB] OCR detectó {len(work.regions)} regiones (página {work.page_num + 1})")
+    return work
+
+
+def save_regions(ctx: PageContext, work: PageWork) -> None:
+    # Guardar regiones (aunque sea lista vacía) para evitar composición con datos antiguos
+    with _repo_cache_lock:
+        text_regions_repo.replace_for_page(ctx.project_id, work.page_num, work.regions)
+        pages_repo.upsert(ctx.project_id, work.page_num, regions_dpi=ctx.dpi)
+    logger.info(f"[JOB] Guardadas {len(work.regions)} regiones")
+
+
+def translate_step(ctx: PageContext, work: PageWork) -> PageWork:
+    translate_regions(work.regions, ctx.glossary_map)
+    save_regions(ctx, work)
+    return work
+
+
+def compose_step(ctx: PageContext, work: PageWork) -> PageWork:
+    # Recargar regiones desde repo (como hace el endpoint)
+    with _repo_cache_lock:
+        regions_loaded = text_regions_repo.list_by_page(ctx.project_id, work.page_num)
+        regions_dpi = pages_repo.regions_dpi(ctx.project_id, work.page_num)
+    logger.info(f"[JOB] Recargadas {len(regions_loaded)} regiones para composición")
+
+    # Aplicar glosario a regiones no bloqueadas
+    apply_glossary(regions_loaded, ctx.glossary_map)
+
+    t_comp0 = time.perf_counter()
+    logger.info(f"[JOB] Componiendo (start): page={work.page_num} regions={len(regions_loaded)} dpi={ctx.dpi}")
+    compose_service.compose_page(
+        work.image_path, regions_loaded, ctx.project_dir, work.page_num, ctx.dpi, source_dpi=regions_dpi,
+    )
+    t_comp1 = time.perf_counter()
+    logger.info(f"[JOB] Componiendo (end): page={work.page_num} took={t_comp1 - t_comp0:.3f}s")
+    with _repo_cache_lock:
+        pages_repo.upsert(ctx.project_id, work.page_num, has_translated=True)
+    return work
+
+
+STEP_FUNCS = {
+    "render": render_step,
+    "ocr": ocr_step,
+    "translate": translate_step,
+    "compose": compose_step,
+}
@@ -0,0 +1,128 @@
+"""
+Recortes por lotes para el recheck OCR EN.
+
+La página se decodifica una sola vez (image_cache) y todos los recortes se
+obtienen de ese array. Los recortes de tamaño parecido se agrupan en cubos
+(alto/ancho redondeados hacia arriba) y cada cubo se recorta y reescala en un
+único paso vectorizado (interpolación bilineal por indexado), rellenando con
+blanco hasta el tamaño del cubo. Así el lector EN recibe lotes reales de
+imágenes del mismo tamaño en lugar de cientos de llamadas sueltas.
+"""
+
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+import numpy as np
+
+# Granularidad de los cubos y tamaño máximo de lote
+BUCKET_HEIGHT_STEP = 16
+BUCKET_WIDTH_STEP = 32
+MAX_BATCH_SIZE = 32
+
+
+@dataclass
+class CropBatch:
+    """Lote de recortes del mismo tamaño y sus índices en la lista original."""
+    indexes: List[int]
+    images: np.ndarray  # (N, H, W, 3) uint8
+    sizes: List[Tuple[int, int]]  # (alto, ancho) útil de cada recorte antes del relleno
+
+
+def padded_boxes(bboxes: Sequence[Sequence[float]], width: int, height: int) -> np.ndarray:
+    """Cajas [left, top, right, bottom] enteras con margen y recortadas a la página."""
+    boxes = np.asarray(bboxes, dtype=np.float64).reshape(-1, 4).astype(np.int64)
+    pad = max(1, int(min(width, height) * 0.002))
+    out = np.empty_like(boxes)
+    out[:, 0] = np.clip(boxes[:, 0] - pad, 0, width)
+    out[:, 1] = np.clip(boxes[:, 1] - pad, 0, height)
+    out[:, 2] = np.clip(boxes[:, 2] + pad, 0, width)
+    out[:, 3] = np.clip(boxes[:, 3] + pad, 0, height)
+    # Garantizar al menos 1 px por lado
+    out[:, 2] = np.maximum(out[:, 2], np.minimum(out[:, 0] + 1, width))
+    out[:, 3] = np.maximum(out[:, 3], np.minimum(out[:, 1] + 1, height))
+    out[:, 0] = np.minimum(out[:, 0], out[:, 2] - 1)
+    out[:, 1] = np.minimum(out[:, 1], out[:, 3] - 1)
+    return out
+
+
+def _output_sizes(boxes: np.ndarray, scale: float) -> Tuple[np.ndarray, np.ndarray]:
+    heights = boxes[:, 3] - boxes[:, 1]
+    widths = boxes[:, 2] - boxes[:, 0]
+    if scale >= 0.999:
+        return heights, widths
+    return (
+        np.maximum(1, (heights * scale).astype(np.int64)),
+        np.maximum(1, (widths * scale).astype(np.int64)),
+    )
+
+
+def _source_coords(start: np.ndarray, length: np.ndarray, out_len: np.ndarray, canvas: int):
+    """Coordenadas origen (índice inferior, superior, peso) para cada píxel de salida."""
+    j = np.arange(canvas)[None, :]
+    step = (length / out_len)[:, None]
+    src = start[:, None] + (j + 0.5) * step - 0.5
+    lo_lim = start[:, None]
+    hi_lim = (start + length - 1)[:, None]
+    src = np.clip(src, lo_lim, hi_lim)
+    i0 = np.floor(src).astype(np.int64)
+    i1 = np.minimum(i0 + 1, hi_lim)
+    weight = (src - i0).astype(np.float32)
+    valid = j < out_len[:, None]
+    return i0, i1, weight, valid
+
+
+def gather_resized(
+    page: np.ndarray,
+    boxes: np.ndarray,
+    out_heights: np.ndarray,
+    out_widths: np.ndarray,
+    canvas: Tuple[int, int],
+) -> np.ndarray:
+    """
+    Recorta y reescala (bilineal) N cajas de la página en un solo paso.
+    Devuelve (N, H, W, 3) uint8; lo que queda fuera de cada recorte es blanco.
+    """
+    canvas_h, canvas_w = canvas
+    y0, y1, wy, valid_y = _source_coords(boxes[:, 1], boxes[:, 3] - boxes[:, 1], out_heights, canvas_h)
+    x0, x1, wx, valid_x = _source_coords(boxes[:, 0], boxes[:, 2] - boxes[:, 0], out_widths, canvas_w)
+
+    rows0, rows1 = y0[:, :, None], y1[:, :, None]
+    cols0, cols1 = x0[:, None, :], x1[:, None, :]
+    wx4 = wx[:, None, :, None]
+    wy4 = wy[:, :, None, None]
+
+    top = page[rows0, cols0].astype(np.float32) * (1 - wx4) + page[rows0, cols1] * wx4
+    bottom = page[rows1, cols0].astype(np.float32) * (1 - wx4) + page[rows1, cols1] * wx4
+    out = np.rint(top * (1 - wy4) + bottom * wy4).astype(np.uint8)
+
+    mask = valid_y[:, :, None] & valid_x[:, None, :]
+    out[~mask] = 255
+    return out
+
+
+def iter_crop_batches(
+    page: np.ndarray,
+    bboxes: Sequence[Sequence[float]],
+    scale: float = 1.0,
+    max_batch_size: int = MAX_BATCH_SIZE,
+) -> Iterator[CropBatch]:
+    """Agrupa los recortes de bboxes por tamaño y genera lotes listos para el lector."""
+    if len(bboxes) == 0:
+        return
+    height, width = page.shape[:2]
+    boxes = padded_boxes(bboxes, width, height)
+    out_h, out_w = _output_sizes(boxes, float(scale))
+
+    bucket_h = -(-out_h // BUCKET_HEIGHT_STEP) * BUCKET_HEIGHT_STEP
+    bucket_w = -(-out_w // BUCKET_WIDTH_STEP) * BUCKET_WIDTH_STEP
+    buckets: Dict[Tuple[int, int], List[int]] = {}
+    for i, key in enumerate(zip(bucket_h.tolist(), bucket_w.tolist())):
+        buckets.setdefault(key, []).append(i)
+
+    for canvas, members in buckets.items():
+        for start in range(0, len(members), max_batch_size):
+            idx = members[start:start + max_batch_size]
+            sel = np.asarray(idx)
+            images = gather_resized(page, boxes[sel], out_h[sel], out_w[sel], canvas)
+            sizes = list(zip(out_h[sel].tolist(), out_w[sel].tolist()))
+            yield CropBatch(indexes=idx, images=images, sizes=sizes)
@@ -0,0 +1,69 @@
+"""
+Glosario y traducción de regiones, comunes al flujo manual por página (API)
+y a los jobs (render-all, exportación vectorial).
+
+El glosario efectivo es el bloqueado: primero el global y luego el del
+proyecto, sin pisar términos globales. Tras el OCR, las regiones cuyo texto
+está en el glosario toman su traducción y el resto se traduce en un solo
+lote; al componer o exportar, el glosario se vuelve a aplicar a las regiones
+no bloqueadas.
+"""
+
+import logging
+from typing import Dict, List
+
+from ..settings_cache import get_ocr_mode
+from ..db.models import TextRegion
+from ..db.repository import glossary_repo, global_glossary_repo
+from ..db.translation_memory import glossary_fingerprint
+from . import translate_mixed_service, translate_service
+
+logger = logging.getLogger(__name__)
+
+
+def build_glossary_map(project_id: str) -> Dict[str, str]:
+    """Glosario bloqueado: global primero, luego el del proyecto."""
+    glossary_map = {e.src_term: e.tgt_term for e in global_glossary_repo.list_all() if e.locked}
+    for e in glossary_repo.list_by_project(project_id):
+        if e.locked and e.src_term not in glossary_map:
+            glossary_map[e.src_term] = e.tgt_term
+    return glossary_map
+
+
+def apply_glossary(regions: List[TextRegion], glossary_map: Dict[str, str]) -> None:
+    """Aplica el glosario a las regiones no bloqueadas (in-place)."""
+    for r in regions:
+        if not getattr(r, 'locked', False) and r.src_text in glossary_map:
+            r.tgt_text = glossary_map[r.src_text]
+
+
+def translate_regions(regions: List[TextRegion], glossary_map: Dict[str, str]) -> None:
+    """Aplica el glosario y traduce en una sola llamada el resto de regiones (in-place, bloqueante)."""
+    if not regions:
+        return
+    texts_to_translate = []
+    translate_indexes = []
+    for i, r in enumerate(regions):
+        if r.src_text in glossary_map:
+            r.tgt_text = glossary_map[r.src_text]
+        else:
+            texts_to_translate.append(r.src_text)
+            translate_indexes.append(i)
+
+    logger.info(
+        "Traduciendo %d textos (glosario aplicó a %d)", len(texts_to_translate), len(regions) - len(texts_to_translate),
+    )
+
+    if texts_to_translate:
+        if get_ocr_mode() == "advanced":
+            translations = translate_mixed_service.translate_batch_preserving_non_han(
+                texts_to_translate,
+                glossary_map,
+            )
+        else:
+            translations = translate_service.translate_batch(
+                texts_to_translate,
+                glossary_fp=glossary_fingerprint(glossary_map),
+            )
+        for idx, translation in zip(translate_indexes, translations):
+            regions[idx].tgt_text = translation
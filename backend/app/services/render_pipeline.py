@@ -0,0 +1,301 @@
+"""
+Pipeline de procesamiento de páginas (render → OCR → traducción → composición)
+y el job render-all que lo ejecuta.
+
+Las fases están en page_stages. El modo pipeline ejecuta cada fase en su
+propio hilo unido por colas acotadas: la página N+1 se rasteriza mientras la
+N está en OCR y la N-1 se compone.
+"""
+
+import contextvars
+import logging
+import queue
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence
+
+from ..config import PROJECTS_DIR, DEFAULT_DPI, RENDER_ALL_MODES
+from ..settings_cache import (
+    get_config, get_min_han_ratio, get_ocr_enable_label_recheck, get_ocr_engine, get_ocr_mode,
+    get_ocr_recheck_max_regions_per_page, get_render_all_mode, get_render_pipeline_queue_size, use_config_snapshot,
+)
+from ..db.models import Job
+from ..db.repository import projects_repo
+from . import job_service, ocr_pool
+from .ocr_filters import merge_filters
+from .page_stages import STAGES, STEP_FUNCS, PageContext, PageWork, save_regions
+from .region_translation import build_glossary_map, translate_regions
+
+logger = logging.getLogger(__name__)
+
+# Contador de hilos vivos por fase (para propagar el fin de cola una sola vez)
+_stage_lock = threading.Lock()
+
+_STOP = object()
+
+
+# on_event(stage, page_num, event) con event en {"start", "done"}
+ProgressCallback = Callable[[str, int, str], None]
+
+
+def run_sequential(ctx: PageContext, total_pages: int, on_event: ProgressCallback) -> None:
+    """Procesa las páginas una a una, todas las fases de cada página seguidas."""
+    for page_num in range(total_pages):
+        logger.info(f"[JOB] === Página {page_num + 1}/{total_pages} ===")
+        work = PageWork(page_num=page_num)
+        for stage in STAGES:
+            on_event(stage, page_num, "start")
+            work = STEP_FUNCS[stage](ctx, work)
+            on_event(stage, page_num, "done")
+
+
+def _stage_worker(
+    stage: str,
+    ctx: PageContext,
+    inbox: queue.Queue,
+    outbox: queue.Queue,
+    failed: threading.Event,
+    errors: List[BaseException],
+    on_event: ProgressCallback,
+    remaining: List[int],
+) -> None:
+    step = STEP_FUNCS[stage]
+    while True:
+        work = inbox.get()
+        if work is _STOP:
+            # Devolver el centinela para los demás hilos de esta misma fase
+            inbox.put(_STOP)
+            break
+        # Tras un fallo seguimos vaciando la cola para no bloquear a la fase anterior
+        if failed.is_set():
+            continue
+        try:
+            on_event(stage, work.page_num, "start")
+            work = step(ctx, work)
+            on_event(stage, work.page_num, "done")
+        except BaseException as e:
+            logger.error(f"[JOB] Fase '{stage}' falló en página {work.page_num + 1}: {e}")
+            errors.append(e)
+            failed.set()
+            continue
+        outbox.put(work)
+    # El último hilo de la fase propaga el fin a la siguiente
+    with _stage_lock:
+        remaining[0] -= 1
+        last = remaining[0] == 0
+    if last:
+        outbox.put(_STOP)
+
+
+def run_pipelined(
+    ctx: PageContext,
+    total_pages: int,
+    on_event: ProgressCallback,
+    queue_size: int = 2,
+    stage_workers: Optional[Dict[str, int]] = None,
+    stages: Sequence[str] = STAGES,
+    works: Optional[List[PageWork]] = None,
+) -> List[PageWork]:
+    """
+    Procesa las páginas con una fase por hilo unidas por colas acotadas.
+    stage_workers permite varios hilos en una fase (p.ej. OCR con pool de procesos);
+    en ese caso las páginas pueden completar esa fase fuera de orden.
+    stages/works permiten ejecutar solo un tramo del pipeline sobre páginas ya
+    procesadas. Devuelve las páginas que completaron la última fase, ordenadas.
+    Re-lanza la primera excepción de cualquier fase cuando todas terminan.
+    """
+    queues = [queue.Queue()] + [queue.Queue(maxsize=max(1, int(queue_size))) for _ in stages[1:]]
+    finished: queue.Queue = queue.Queue()
+    failed = threading.Event()
+    errors: List[BaseException] = []
+
+    threads = []
+    for i, stage in enumerate(stages):
+        outbox = queues[i + 1] if i + 1 < len(stages) else finished
+        n_workers = max(1, int((stage_workers or {}).get(stage, 1)))
+        remaining = [n_workers]
+        for n in range(n_workers):
+            # Cada hilo hereda una copia del contexto (snapshot de config incluido)
+            worker_ctx = contextvars.copy_context()
+            t = threading.Thread(
+                target=worker_ctx.run,
+                args=(_stage_worker, stage, ctx, queues[i], outbox, failed, errors, on_event, remaining),
+                name=f"render-pipeline-{stage}-{n}",
+                daemon=True,
+            )
+            threads.append(t)
+            t.start()
+
+    if works is None:
+        works = [PageWork(page_num=page_num) for page_num in range(total_pages)]
+    for work in works:
+        queues[0].put(work)
+    queues[0].put(_STOP)
+
+    for t in threads:
+        t.join()
+
+    if errors:
+        raise errors[0]
+
+    done = [w for w in iter(finished.get_nowait, _STOP)]
+    return sorted(done, key=lambda w: w.page_num)
+
+
+def run_batched(
+    ctx: PageContext,
+    total_pages: int,
+    on_event: ProgressCallback,
+    queue_size: int = 2,
+    stage_workers: Optional[Dict[str, int]] = None,
+) -> None:
+    """
+    Render + OCR de todo el proyecto primero, luego una única traducción
+    deduplicada de todas las regiones (pocas peticiones DeepL por proyecto),
+    y por último guardado y composición en pipeline.
+    """
+    works = run_pipelined(
+        ctx, total_pages, on_event,
+        queue_size=queue_size,
+        stage_workers=stage_workers,
+        stages=("render", "ocr"),
+    )
+
+    all_regions = [r for w in works for r in w.regions]
+    logger.info(f"[JOB] Traducción por lotes: {len(all_regions)} regiones de {len(works)} páginas")
+    for w in works:
+        on_event("translate", w.page_num, "start")
+    translate_regions(all_regions, ctx.glossary_map)
+    for w in works:
+        save_regions(ctx, w)
+        on_event("translate", w.page_num, "done")
+
+    run_pipelined(
+        ctx, total_pages, on_event,
+        queue_size=queue_size,
+        stages=("compose",),
+        works=works,
+    )
+
+
+class _StageProgress:
+    """Traduce eventos de fase del pipeline a progreso del Job (thread-safe)."""
+
+    # Peso de cada fase en el progreso global (suma 1.0)
+    WEIGHTS = {"render": 0.2, "ocr": 0.2, "translate": 0.1, "compose": 0.5}
+    LABELS = {"render": "Render", "ocr": "OCR", "translate": "Traducción", "compose": "Composición"}
+    STEP_MESSAGES = {
+        "render": "Renderizando página {page}/{total}...",
+        "ocr": "OCR página {page}/{total}...",
+        "translate": "Traduciendo página {page}/{total}...",
+        "compose": "Componiendo página {page}/{total}...",
+    }
+
+    def __init__(self, job: Job, total_pages: int, pipelined: bool):
+        self._job = job
+        self._total = max(1, total_pages)
+        self._pipelined = pipelined
+        self._done = {stage: 0 for stage in STAGES}
+        self._lock = threading.Lock()
+
+    def __call__(self, stage: str, page_num: int, event: str) -> None:
+        with self._lock:
+            if event == "done":
+                self._done[stage] += 1
+            self._job.progress = min(
+                1.0,
+                sum(self.WEIGHTS[s] * self._done[s] / self._total for s in self._done),
+            )
+            if self._pipelined:
+                self._job.current_step = " · ".join(
+                    f"{self.LABELS[s]} {self._done[s]}/{self._total}" for s in STAGES
+                )
+            elif event == "start":
+                self._job.current_step = self.STEP_MESSAGES[stage].format(page=page_num + 1, total=self._total)
+            job_service.save_job(self._job)
+
+
+def run_render_all(job_id: str, project_id: str, dpi: int = None, mode: str = None):
+    """
+    Ejecuta el job de procesar todas las páginas.
+
+    mode="sequential" procesa cada página de principio a fin antes de la siguiente;
+    mode="pipeline" solapa render, OCR, traducción y composición entre páginas;
+    mode="batched" hace OCR de todas las páginas y traduce todo el proyecto en lote.
+    Si mode es None se usa el configurado (render_all_mode).
+    """
+    job = job_service.get_job(job_id)
+    if not job:
+        return
+    project = projects_repo.get(project_id)
+    if not project:
+        job.status = "error"
+        job.error = "Project not found"
+        job_service.save_job(job)
+        return
+
+    try:
+        job.status = "running"
+        job_service.save_job(job)
+
+        config_snapshot = get_config()
+        with use_config_snapshot(config_snapshot):
+            # DPI: si viene del endpoint, usarlo. Si no, fallback a config.
+            if dpi is None:
+                try:
+                    dpi = int(config_snapshot.get("default_dpi", DEFAULT_DPI))
+                except Exception:
+                    dpi = DEFAULT_DPI
+            if mode not in RENDER_ALL_MODES:
+                mode = get_render_all_mode()
+
+            logger.info(f"[JOB] Iniciando con DPI={dpi}, páginas={project.page_count}, modo={mode}")
+
+            total_pages = project.page_count
+            glossary_map = build_glossary_map(project_id)
+            logger.info(f"[JOB] Glosario: {len(glossary_map)} términos")
+
+            custom_filters = merge_filters(project.ocr_region_filters)
+            logger.info(f"[JOB] Filtros OCR: {len(custom_filters) if custom_filters else 0}")
+
+            logger.info(
+                "[JOB] OCR settings: engine=%s mode=%s min_han_ratio=%.2f label_recheck=%s recheck_max=%s",
+                get_ocr_engine(), get_ocr_mode(), float(get_min_han_ratio()),
+                bool(get_ocr_enable_label_recheck()), int(get_ocr_recheck_max_regions_per_page()),
+            )
+
+            ctx = PageContext(
+                project_id=project_id,
+                project_dir=PROJECTS_DIR / project_id,
+                dpi=dpi,
+                document_type=project.document_type.value,
+                glossary_map=glossary_map,
+                custom_filters=custom_filters,
+                color_mode=project.color_mode,
+            )
+            progress = _StageProgress(job, total_pages, pipelined=(mode != "sequential"))
+            pipeline_kwargs = dict(
+                queue_size=get_render_pipeline_queue_size(),
+                # Con pool OCR, un hilo por proceso para mantener todos ocupados
+                stage_workers={"ocr": max(1, ocr_pool.pool_size())},
+            )
+            t0 = time.perf_counter()
+            if mode == "pipeline":
+                run_pipelined(ctx, total_pages, progress, **pipeline_kwargs)
+            elif mode == "batched":
+                run_batched(ctx, total_pages, progress, **pipeline_kwargs)
+            else:
+                run_sequential(ctx, total_pages, progress)
+            logger.info(f"[JOB] {total_pages} páginas procesadas en {time.perf_counter() - t0:.3f}s (modo={mode})")
+
+        job.status = "completed"
+        job.progress = 1.0
+        job.current_step = "Completado"
+        job_service.save_job(job)
+        logger.info("[JOB] === JOB COMPLETADO ===")
+
+    except Exception as e:
+        logger.exception(f"[JOB] ERROR: {e}")
+        job.status = "error"
+        job.error = str(e)
+        job_service.save_job(job)
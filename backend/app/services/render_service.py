@@ -1,10 +1,64 @@
 """
 Servicio de renderizado PDF→PNG usando PyMuPDF.
+
+Cada página se rasteriza una sola vez, al DPI más alto que hace falta; el
+thumbnail y la vista previa (150 DPI) se derivan reduciendo ese mismo buffer
+en vez de volver a rasterizar o de redimensionar la PNG completa. Junto a las
+imágenes de cada página se guarda un manifiesto (pages/NNN_original.json) con
+el DPI de origen y los derivados que existen, de modo que un DPI menor que
+falte (ensure_page) se saca de la imagen de origen sin volver al PDF.
+
+Modo de color (color_modes): en gris y bilevel se rasteriza directamente en
+gris; en bilevel la imagen a dpi se umbraliza a 1 bit (vista previa y
+thumbnail siguen en gris); en auto se rasteriza en RGB y, si la página no
+tiene color, se convierte a gris. El modo resuelto queda en el manifiesto.
+
+render_page_array() rasteriza en memoria y devuelve un array numpy que mira
+directamente a las muestras del pixmap, sin pasar por PNG: el job de
+render-all se lo entrega al OCR y la PNG se escribe aparte (save_page_png)
+solo para persistirla.
 """
 
+import io
+import json
+import logging
+from collections import defaultdict
 from pathlib import Path
-from typing import List
+from typing import Dict, List, Optional, Tuple
+
 import fitz  # PyMuPDF
+import numpy as np
+from PIL import Image
+
+from ..atomic_files import write_atomic
+from .color_modes import has_color
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_DPI = 150
+PREVIEW_DPI = 150
+# Gris a partir del cual un píxel es blanco en modo bilevel
+BILEVEL_THRESHOLD = 128
+
+
+class _PixmapSamples:
+    """
+    Interfaz de array sobre pix.samples; el array resultante mantiene vivo el
+    pixmap. (H, W, n), o (H, W) si el pixmap es de un solo canal (gris).
+    """
+
+    def __init__(self, pix: fitz.Pixmap):
+        self._pix = pix
+        shape, strides = (pix.h, pix.w, pix.n), (pix.stride, pix.n, 1)
+        if pix.n == 1:
+            shape, strides = shape[:2], strides[:2]
+        self.__array_interface__ = {
+            "shape": shape,
+            "typestr": "|u1",
+            "data": (pix.samples_ptr, True),  # solo lectura
+            "strides": strides,
+            "version": 3,
+        }
 
 
 def count_pages(pdf_path: Path) -> int:
@@ -15,111 +69,221 @@ def count_pages(pdf_path: Path) -> int:
     return count
 
 
-def render_page(pdf_path: Path, page_number: int, dpi: int, output_dir: Path) -> Path:
+def page_path(project_dir: Path, page_number: int, dpi: int) -> Path:
+    return project_dir / "pages" / f"{page_number:03d}_original_{dpi}.png"
+
+
+def thumbnail_path(project_dir: Path, page_number: int) -> Path:
+    return project_dir / "thumbs" / f"{page_number:03d}_original.png"
+
+
+def _manifest_path(project_dir: Path, page_number: int) -> Path:
+    return project_dir / "pages" / f"{page_number:03d}_original.json"
+
+
+def _pixel_size(page_size: Tuple[float, float], dpi: int) -> Tuple[int, int]:
+    """Tamaño en píxeles del pixmap que PyMuPDF daría a dpi (mismo redondeo)."""
+    zoom = dpi / 72.0
+    rect = fitz.Rect(0, 0, *page_size) * fitz.Matrix(zoom, zoom)
+    return rect.irect.width, rect.irect.height
+
+
+def _downsample(source: np.ndarray, size: Tuple[int, int]) -> np.ndarray:
+    # reducing_gap=1: promedio por bloques enteros (rápido) y ajuste fino bilineal
+    img = Image.fromarray(source).resize(size, Image.Resampling.BILINEAR, reducing_gap=1.0)
+    return np.asarray(img)
+
+
+def _png_bytes(image: np.ndarray) -> bytes:
+    # Arrays bool (bilevel) -> PNG de 1 bit
+    buf = io.BytesIO()
+    Image.fromarray(image).save(buf, "PNG")
+    return buf.getvalue()
+
+
+def page_manifest(project_dir: Path, page_number: int) -> Optional[dict]:
+    """
+    Manifiesto de las imágenes de una página: {"source_dpi", "page_size"
+    (puntos de la página visible), "dpis" (PNG en pages/), "thumbnail",
+    "color_mode" (rgb, gray o bilevel, ya resuelto)}.
+    None si la página aún no se rasterizó con este mecanismo.
+    """
+    path = _manifest_path(project_dir, page_number)
+    if not path.exists():
+        return None
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError) as e:
+        logger.warning("Manifiesto de render ilegible %s: %s", path.name, e)
+        return None
+
+
+def _record(
+    project_dir: Path, page_number: int, source_dpi: int, page_size: Tuple[float, float], dpis,
+    color_mode: Optional[str] = None,
+) -> None:
+    # Dos renders concurrentes de la misma página pueden perder un DPI del
+    # manifiesto; no es grave: quien lo consulta comprueba el fichero en disco
+    manifest = page_manifest(project_dir, page_number) or {}
+    manifest = {
+        "source_dpi": max(source_dpi, manifest.get("source_dpi", 0)),
+        "page_size": list(page_size),
+        "dpis": sorted(set(manifest.get("dpis", [])) | set(dpis)),
+        "thumbnail": True,
+        "color_mode": color_mode or manifest.get("color_mode", "rgb"),
+    }
+    write_atomic(_manifest_path(project_dir, page_number), json.dumps(manifest).encode("utf-8"))
+
+
+def _render_derivatives(
+    page: fitz.Page, page_number: int, dpi: Optional[int], project_dir: Path, in_memory: bool = False,
+    color_mode: str = "rgb",
+) -> Optional[np.ndarray]:
+    """
+    Rasteriza la página una vez a max(dpi, PREVIEW_DPI, THUMBNAIL_DPI) y
+    escribe desde ese buffer la imagen a dpi, la vista previa y el thumbnail
+    (los derivados que ya existan no se rehacen). Con dpi=None solo vista
+    previa y thumbnail. Con in_memory la imagen a dpi no se escribe y se
+    devuelve como array (la persiste quien la use).
     """
-    Renderiza una página del PDF a PNG.
-    
+    source_dpi = max(dpi or 0, PREVIEW_DPI, THUMBNAIL_DPI)
+    zoom = source_dpi / 72.0
+    colorspace = fitz.csGRAY if color_mode in ("gray", "bilevel") else fitz.csRGB
+    pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), colorspace=colorspace, alpha=False)
+    pix_view = source = np.asarray(_PixmapSamples(pix))
+    if color_mode == "auto":
+        color_mode = "rgb" if has_color(source) else "gray"
+        if color_mode == "gray":
+            source = np.asarray(Image.fromarray(source).convert("L"))
+    page_size = (page.rect.width, page.rect.height)
+
+    outputs: Dict[int, List[Path]] = defaultdict(list)
+    if dpi is not None and not in_memory:
+        outputs[dpi].append(page_path(project_dir, page_number, dpi))
+    preview = page_path(project_dir, page_number, PREVIEW_DPI)
+    if not preview.exists() and not (in_memory and dpi == PREVIEW_DPI):
+        outputs[PREVIEW_DPI].append(preview)
+    thumb = thumbnail_path(project_dir, page_number)
+    if not thumb.exists():
+        outputs[THUMBNAIL_DPI].append(thumb)
+
+    images = {source_dpi: source}
+    for target in sorted(set(outputs) | ({dpi} if in_memory else set()), reverse=True):
+        if target not in images:
+            images[target] = _downsample(source, _pixel_size(page_size, target))
+        if target == dpi and color_mode == "bilevel":
+            images[target] = images[target] >= BILEVEL_THRESHOLD
+        if outputs[target]:
+            # Se codifica una vez aunque vaya a varios ficheros (vista previa = thumbnail)
+            image = images[target]
+            encoded = pix.tobytes("png") if image is pix_view else _png_bytes(image)
+            for path in outputs[target]:
+                write_atomic(path, encoded)
+
+    dpis = [PREVIEW_DPI] + ([dpi] if dpi is not None else [])
+    _record(project_dir, page_number, source_dpi, page_size, dpis, color_mode)
+    return images[dpi] if in_memory else None
+
+
+def render_page(pdf_path: Path, page_number: int, dpi: int, output_dir: Path, color_mode: str = "rgb") -> Path:
+    """
+    Renderiza una página del PDF a PNG (con su vista previa y thumbnail).
+
     Args:
         pdf_path: Ruta al PDF
         page_number: Número de página (0-indexed)
         dpi: Resolución en DPI
         output_dir: Directorio del proyecto
-    
+        color_mode: Modo de color del proyecto (ver color_modes)
+
     Returns:
         Ruta a la imagen generada
     """
-    pages_dir = output_dir / "pages"
-    pages_dir.mkdir(parents=True, exist_ok=True)
-    
-    thumbs_dir = output_dir / "thumbs"
-    thumbs_dir.mkdir(parents=True, exist_ok=True)
-    
-    output_path = pages_dir / f"{page_number:03d}_original_{dpi}.png"
-    thumb_path = thumbs_dir / f"{page_number:03d}_original.png"
-    
-    doc = fitz.open(str(pdf_path))
-    page = doc[page_number]
-    
-    # Renderizar a alta resolución
-    zoom = dpi / 72.0
-    mat = fitz.Matrix(zoom, zoom)
-    pix = page.get_pixmap(matrix=mat)
-    pix.save(str(output_path))
-    
-    # Thumbnail (150 DPI)
-    thumb_zoom = 150 / 72.0
-    thumb_mat = fitz.Matrix(thumb_zoom, thumb_zoom)
-    thumb_pix = page.get_pixmap(matrix=thumb_mat)
-    thumb_pix.save(str(thumb_path))
-    
-    doc.close()
-    
+    with fitz.open(str(pdf_path)) as doc:
+        _render_derivatives(doc[page_number], page_number, dpi, output_dir, color_mode=color_mode)
+    return page_path(output_dir, page_number, dpi)
+
+
+def ensure_page(pdf_path: Path, page_number: int, dpi: int, project_dir: Path, color_mode: str = "rgb") -> Path:
+    """
+    Devuelve la PNG de la página a dpi, generándola si falta: reduciendo la
+    imagen de origen del manifiesto si es de más DPI, o rasterizando el PDF.
+    """
+    path = page_path(project_dir, page_number, dpi)
+    if path.exists():
+        return path
+    manifest = page_manifest(project_dir, page_number)
+    if manifest and manifest["source_dpi"] > dpi:
+        source_path = page_path(project_dir, page_number, manifest["source_dpi"])
+        if source_path.exists():
+            with Image.open(source_path) as img:
+                # Se reduce en gris o RGB (una PNG de 1 bit, en gris)
+                source = np.asarray(img if img.mode in ("L", "RGB") else img.convert("L" if img.mode == "1" else "RGB"))
+            page_size = tuple(manifest["page_size"])
+            write_atomic(path, _png_bytes(_downsample(source, _pixel_size(page_size, dpi))))
+            _record(project_dir, page_number, manifest["source_dpi"], page_size, [dpi])
+            return path
+    return render_page(pdf_path, page_number, dpi, project_dir, color_mode)
+
+
+def render_page_array(
+    pdf_path: Path, page_number: int, dpi: int, project_dir: Path, color_mode: str = "rgb",
+) -> np.ndarray:
+    """
+    Renderiza una página en memoria (vista previa y thumbnail sí van a disco).
+
+    Returns:
+        Array de solo lectura: RGB (H, W, 3) uint8, gris (H, W) uint8 o
+        bilevel (H, W) bool según el modo de color. A partir de 150 DPI, en
+        RGB y gris mira directamente a las muestras del pixmap, sin copia. La
+        imagen a dpi no se escribe (ver save_page_png)
+    """
+    with fitz.open(str(pdf_path)) as doc:
+        return _render_derivatives(
+            doc[page_number], page_number, dpi, project_dir, in_memory=True, color_mode=color_mode,
+        )
+
+
+def save_page_png(page: np.ndarray, output_path: Path) -> Path:
+    """
+    Escribe como PNG una página renderizada en memoria. Atómica: quien lea la
+    ruta nunca ve un fichero a medias. Usa PIL y no PyMuPDF para poder
+    llamarse desde otro hilo (PIL suelta el GIL al comprimir).
+    """
+    write_atomic(output_path, _png_bytes(page))
     return output_path
 
 
-def render_thumbnails_only(pdf_path: Path, project_dir: Path) -> None:
+def render_thumbnails_only(
+    pdf_path: Path, project_dir: Path, pages: Optional[range] = None, color_mode: str = "rgb",
+) -> None:
     """
-    Genera solo thumbnails (150 DPI) para todas las páginas.
+    Genera solo thumbnails y vistas previas (150 DPI, una sola rasterización
+    y codificación por página) para las páginas de pages (por defecto todas).
     Mucho más rápido que render_all_pages (no genera imágenes a alta resolución).
     """
-    thumbs_dir = project_dir / "thumbs"
-    thumbs_dir.mkdir(parents=True, exist_ok=True)
-    
-    doc = fitz.open(str(pdf_path))
-    try:
-        thumb_zoom = 150 / 72.0
-        thumb_mat = fitz.Matrix(thumb_zoom, thumb_zoom)
-        for page_num in range(len(doc)):
-            thumb_path = thumbs_dir / f"{page_num:03d}_original.png"
-            page = doc[page_num]
-            thumb_pix = page.get_pixmap(matrix=thumb_mat)
-            thumb_pix.save(str(thumb_path))
-    finally:
-        doc.close()
+    with fitz.open(str(pdf_path)) as doc:
+        for page_num in pages if pages is not None else range(len(doc)):
+            if not project_dir.exists():
+                # El proyecto se borró mientras se generaban en segundo plano
+                return
+            _render_derivatives(doc[page_num], page_num, None, project_dir, color_mode=color_mode)
 
 
-def render_all_pages(pdf_path: Path, dpi: int, project_dir: Path) -> List[Path]:
+def render_all_pages(pdf_path: Path, dpi: int, project_dir: Path, color_mode: str = "rgb") -> List[Path]:
     """
     Renderiza todas las páginas del PDF de una vez, reutilizando el objeto documento.
-    
+
     Args:
         pdf_path: Ruta al PDF
         dpi: Resolución
         project_dir: Directorio del proyecto
-    
+        color_mode: Modo de color del proyecto (ver color_modes)
+
     Returns:
         Lista de rutas a las imágenes generadas
     """
-    from typing import List
-    
-    pages_dir = project_dir / "pages"
-    pages_dir.mkdir(parents=True, exist_ok=True)
-    
-    thumbs_dir = project_dir / "thumbs"
-    thumbs_dir.mkdir(parents=True, exist_ok=True)
-    
-    doc = fitz.open(str(pdf_path))
-    output_paths = []
-    
-    try:
+    with fitz.open(str(pdf_path)) as doc:
         for page_num in range(len(doc)):
-            page = doc[page_num]
-            
-            # Render principal
-            output_path = pages_dir / f"{page_num:03d}_original_{dpi}.png"
-            zoom = dpi / 72.0
-            mat = fitz.Matrix(zoom, zoom)
-            pix = page.get_pixmap(matrix=mat)
-            pix.save(str(output_path))
-            output_paths.append(output_path)
-            
-            # Thumbnail
-            thumb_path = thumbs_dir / f"{page_num:03d}_original.png"
-            thumb_zoom = 150 / 72.0
-            thumb_mat = fitz.Matrix(thumb_zoom, thumb_zoom)
-            thumb_pix = page.get_pixmap(matrix=thumb_mat)
-            thumb_pix.save(str(thumb_path))
-    finally:
-        doc.close()
-    
-    return output_paths
+            _render_derivatives(doc[page_num], page_num, dpi, project_dir, color_mode=color_mode)
+        return [page_path(project_dir, page_num, dpi) for page_num in range(len(doc))]
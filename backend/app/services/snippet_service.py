@@ -10,7 +10,8 @@ from typing import Any, Dict, List, Optional
 import numpy as np
 from PIL import Image, ImageDraw, ImageFont
 
-from ..config import SNIPPETS_DIR, get_ocr_engine
+from ..config import SNIPPETS_DIR
+from ..settings_cache import get_ocr_engine
 from ..db.repository import snippets_repo
 
 logger = logging.getLogger("uvicorn.error")
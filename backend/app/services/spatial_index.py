@@ -0,0 +1,95 @@
+"""
+Índice espacial de rejilla uniforme sobre las cajas de una página.
+
+Cada caja se registra en las celdas que cubre; una consulta solo mira las
+celdas del rectángulo pedido, así que "¿con qué se solapa esta región?" cuesta
+lo que sus vecinas y no lo que la página entera. El tamaño de celda sale de la
+mediana de las cajas; las cajas desmesuradas (p.ej. un recuadro de página
+completa) van a una lista aparte que se revisa siempre, para no ocupar miles
+de celdas.
+
+Lo usan la composición (regiones aisladas), la agrupación en párrafos del
+modo manual y cualquier hit-testing sobre regiones.
+"""
+
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+Box = Tuple[float, float, float, float]
+
+# Una caja que cubra más celdas que esto se trata como desmesurada
+MAX_CELLS_PER_BOX = 64
+
+
+def _normalized(box: Sequence[float]) -> Box:
+    x1, y1, x2, y2 = (float(v) for v in box)
+    return min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2)
+
+
+def boxes_intersect(a: Sequence[float], b: Sequence[float]) -> bool:
+    """Solape estricto (tocarse por el borde no cuenta)."""
+    ax1, ay1, ax2, ay2 = a
+    bx1, by1, bx2, by2 = b
+    return not (ax2 <= bx1 or ax1 >= bx2 or ay2 <= by1 or ay1 >= by2)
+
+
+class SpatialIndex:
+    def __init__(self, boxes: Iterable[Sequence[float]], cell_size: Optional[float] = None):
+        self.boxes: List[Box] = [_normalized(b) for b in boxes]
+        self.cell_size = float(cell_size) if cell_size else self._default_cell_size()
+        self._cells: Dict[Tuple[int, int], List[int]] = {}
+        self._oversized: List[int] = []
+        for i, box in enumerate(self.boxes):
+            cx1, cy1, cx2, cy2 = self._cell_range(box)
+            if (cx2 - cx1 + 1) * (cy2 - cy1 + 1) > MAX_CELLS_PER_BOX:
+                self._oversized.append(i)
+                continue
+            for cx in range(cx1, cx2 + 1):
+                for cy in range(cy1, cy2 + 1):
+                    self._cells.setdefault((cx, cy), []).append(i)
+
+    def _default_cell_size(self) -> float:
+        sides = sorted(max(x2 - x1, y2 - y1) for x1, y1, x2, y2 in self.boxes)
+        if not sides:
+            return 1.0
+        return max(1.0, 2.0 * sides[len(sides) // 2])
+
+    def _cell_range(self, box: Box) -> Tuple[int, int, int, int]:
+        size = self.cell_size
+        x1, y1, x2, y2 = box
+        return int(x1 // size), int(y1 // size), int(x2 // size), int(y2 // size)
+
+    def __len__(self) -> int:
+        return len(self.boxes)
+
+    def _candidates(self, box: Box) -> Set[int]:
+        cx1, cy1, cx2, cy2 = self._cell_range(box)
+        found: Set[int] = set(self._oversized)
+        if (cx2 - cx1 + 1) * (cy2 - cy1 + 1) > len(self._cells):
+            # Consulta más grande que la rejilla ocupada: recorrer las celdas existentes
+            for (cx, cy), members in self._cells.items():
+                if cx1 <= cx <= cx2 and cy1 <= cy <= cy2:
+                    found.update(members)
+            return found
+        for cx in range(cx1, cx2 + 1):
+            for cy in range(cy1, cy2 + 1):
+                members = self._cells.get((cx, cy))
+                if members:
+                    found.update(members)
+        return found
+
+    def query(self, rect: Sequence[float]) -> List[int]:
+        """Índices (ordenados) de las cajas que se solapan con rect."""
+        box = _normalized(rect)
+        return sorted(i for i in self._candidates(box) if boxes_intersect(self.boxes[i], box))
+
+    def neighbors(self, index: int, margin_x: float, margin_y: float) -> List[int]:
+        """Cajas a menos de margin_x / margin_y de la caja index (sin incluirla)."""
+        x1, y1, x2, y2 = self.boxes[index]
+        rect = (x1 - margin_x, y1 - margin_y, x2 + margin_x, y2 + margin_y)
+        return [i for i in self.query(rect) if i != index]
+
+    def is_isolated(self, index: int) -> bool:
+        box = self.boxes[index]
+        return not any(
+            i != index and boxes_intersect(self.boxes[i], box) for i in self._candidates(box)
+        )
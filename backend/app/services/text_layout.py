@@ -0,0 +1,142 @@
+"""
+Motor de maquetación de texto para la composición.
+
+Ajusta cada texto a su bbox con búsqueda binaria del tamaño de fuente (el
+ancho/alto medido crece con el tamaño) y reparte el texto en tantas líneas
+como quepan (wrap voraz por palabras), no solo en dos.
+
+Las medidas de FreeType se memorizan por (fuente, tamaño, texto) en una LRU
+acotada compartida entre páginas del mismo proceso, y también la maquetación
+completa por (fuente, texto, caja). Re-componer una página con las mismas
+etiquetas no repite ninguna llamada de layout.
+"""
+
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+from PIL import Image, ImageDraw, ImageFont
+
+MIN_FONT_SIZE = 8
+MAX_FONT_SIZE = 72
+MEASURE_CACHE_SIZE = 65536
+LAYOUT_CACHE_SIZE = 8192
+
+# Lienzo mínimo solo para medir (textbbox admite texto multilínea)
+_MEASURE_DRAW = ImageDraw.Draw(Image.new("L", (1, 1)))
+
+
+@dataclass(frozen=True)
+class TextLayout:
+    font_size: int
+    lines: Tuple[str, ...]
+    line_widths: Tuple[int, ...]
+    line_heights: Tuple[int, ...]
+    overflow: bool
+
+    @property
+    def total_height(self) -> int:
+        return sum(self.line_heights)
+
+
+@lru_cache(maxsize=64)
+def resolve_font(font_family: str, size: int) -> ImageFont.FreeTypeFont:
+    """Resuelve y cachea fuentes para evitar re-abrir archivos .ttf repetidamente."""
+    font_names = [f"{font_family}.ttf", f"{font_family.lower()}.ttf", "arial.ttf", "segoeui.ttf", "tahoma.ttf"]
+    for font_name in font_names:
+        try:
+            return ImageFont.truetype(font_name, size)
+        except Exception:
+            continue
+    return ImageFont.load_default()
+
+
+@lru_cache(maxsize=MEASURE_CACHE_SIZE)
+def measure(font_family: str, size: int, text: str) -> Tuple[int, int]:
+    """(ancho, alto) del texto en una línea; equivale a draw.textbbox((0, 0), ...)."""
+    x0, y0, x1, y1 = resolve_font(font_family, size).getbbox(text)
+    return int(x1 - x0), int(y1 - y0)
+
+
+@lru_cache(maxsize=MEASURE_CACHE_SIZE)
+def ink_bbox(font_family: str, size: int, text: str) -> Tuple[int, int, int, int]:
+    """Caja de tinta del texto dibujado en (0, 0), incluido el desplazamiento de los glifos."""
+    x0, y0, x1, y1 = _MEASURE_DRAW.textbbox((0, 0), text, font=resolve_font(font_family, size))
+    return int(x0), int(y0), int(x1), int(y1)
+
+
+def _wrap(font_family: str, size: int, text: str, max_width: int) -> Optional[List[str]]:
+    """
+    Wrap voraz por palabras respetando saltos de línea explícitos. None si
+    alguna palabra sola no cabe en el ancho.
+    """
+    lines: List[str] = []
+    for paragraph in text.split("\n"):
+        current = ""
+        for word in paragraph.split():
+            candidate = f"{current} {word}" if current else word
+            if measure(font_family, size, candidate)[0] <= max_width:
+                current = candidate
+                continue
+            if not current:
+                return None
+            lines.append(current)
+            if measure(font_family, size, word)[0] > max_width:
+                return None
+            current = word
+        lines.append(current)
+    return lines
+
+
+def _layout_at(font_family: str, size: int, text: str, width: int, height: int) -> Optional[TextLayout]:
+    """Maquetación a un tamaño dado, o None si no cabe en la caja."""
+    one_w, one_h = measure(font_family, size, text)
+    if one_w <= width and one_h <= height and "\n" not in text:
+        return TextLayout(size, (text,), (one_w,), (one_h,), False)
+
+    lines = _wrap(font_family, size, text, width)
+    if not lines:
+        return None
+    sizes = [measure(font_family, size, line) for line in lines]
+    if sum(h for _, h in sizes) > height:
+        return None
+    return TextLayout(size, tuple(lines), tuple(w for w, _ in sizes), tuple(h for _, h in sizes), False)
+
+
+def _single_line(font_family: str, size: int, text: str, overflow: bool) -> TextLayout:
+    w, h = measure(font_family, size, text)
+    return TextLayout(size, (text,), (w,), (h,), overflow)
+
+
+@lru_cache(maxsize=LAYOUT_CACHE_SIZE)
+def fit_text(
+    text: str,
+    width: int,
+    height: int,
+    font_family: str = "Arial",
+    fixed_font_size: Optional[int] = None,
+    min_font_size: int = MIN_FONT_SIZE,
+    max_font_size: int = MAX_FONT_SIZE,
+) -> TextLayout:
+    """
+    Mayor tamaño en [min_font_size, max_font_size] con el que el texto cabe
+    en width x height, en una o varias líneas. Con tamaño fijo no se ajusta
+    ni se parte; si nada cabe se usa el mínimo en una línea con overflow.
+    """
+    if fixed_font_size:
+        return _single_line(font_family, fixed_font_size, text, False)
+
+    best: Optional[TextLayout] = None
+    lo, hi = min_font_size, max_font_size
+    while lo <= hi:
+        mid = (lo + hi) // 2
+        layout = _layout_at(font_family, mid, text, width, height)
+        if layout is not None:
+            best, lo = layout, mid + 1
+        else:
+            hi = mid - 1
+
+    if best is None:
+        return _single_line(font_family, min_font_size, text, True)
+    return best
+
@@ -1,30 +1,70 @@
+"""
+Clasificación de escritura (Han / no Han) para el OCR y la traducción mixta.
+
+Todo se apoya en clases de caracteres precompiladas: un split por runs Han
+devuelve en una sola pasada (en C) el recuento Han y la segmentación en runs,
+en lugar de comprobar rangos con ord() carácter a carácter. classify_texts()
+y han_ratios() clasifican de una vez todos los textos de una página.
+"""
+
 import re
-from typing import Iterable
+from typing import List, NamedTuple, Sequence, Tuple
+
+# CJK unificados, extensiones A-E e ideogramas de compatibilidad
+_HAN_RANGES = (
+    "\u4e00-\u9fff"
+    "\u3400-\u4dbf"
+    "\U00020000-\U0002a6df"
+    "\U0002a700-\U0002b73f"
+    "\U0002b740-\U0002b81f"
+    "\U0002b820-\U0002ceaf"
+    "\uf900-\ufaff"
+    "\U0002f800-\U0002fa1f"
+)
+_HAN_RE = re.compile(f"[{_HAN_RANGES}]")
+# Con grupo de captura: [no Han, Han, no Han, ...] (los extremos pueden ser "")
+_HAN_RUN_SPLIT_RE = re.compile(f"([{_HAN_RANGES}]+)")
+
+HanRun = Tuple[bool, str]
+
 
+class ScriptProfile(NamedTuple):
+    """Recuento Han y runs (es_han, texto) de un texto."""
+    length: int
+    han_count: int
+    runs: Tuple[HanRun, ...]
 
-def is_han_char(char: str) -> bool:
-    code = ord(char)
-    return (
-        0x4E00 <= code <= 0x9FFF
-        or 0x3400 <= code <= 0x4DBF
-        or 0x20000 <= code <= 0x2A6DF
-        or 0x2A700 <= code <= 0x2B73F
-        or 0x2B740 <= code <= 0x2B81F
-        or 0x2B820 <= code <= 0x2CEAF
-        or 0xF900 <= code <= 0xFAFF
-        or 0x2F800 <= code <= 0x2FA1F
-    )
+    @property
+    def han_ratio(self) -> float:
+        return self.han_count / self.length if self.length else 0.0
 
 
 def has_han(text: str) -> bool:
-    return any(is_han_char(c) for c in (text or ""))
+    return _HAN_RE.search(text or "") is not None
 
 
 def han_ratio(text: str) -> float:
     if not text:
         return 0.0
-    han_count = sum(1 for c in text if is_han_char(c))
-    return han_count / len(text)
+    return sum(map(len, _HAN_RUN_SPLIT_RE.findall(text))) / len(text)
+
+
+def han_ratios(texts: Sequence[str]) -> List[float]:
+    """Ratio Han de cada texto (lote de una página)."""
+    return [han_ratio(text) for text in texts]
+
+
+def classify_text(text: str) -> ScriptProfile:
+    if not text:
+        return ScriptProfile(0, 0, ())
+    parts = _HAN_RUN_SPLIT_RE.split(text)
+    runs = tuple((bool(i & 1), part) for i, part in enumerate(parts) if part)
+    return ScriptProfile(len(text), sum(map(len, parts[1::2])), runs)
+
+
+def classify_texts(texts: Sequence[str]) -> List[ScriptProfile]:
+    """Ratio Han y runs de cada texto en una sola pasada por texto."""
+    return [classify_text(text) for text in texts]
 
 
 _ALLOWED_LABEL_CHARS_RE = re.compile(r"^[A-Za-z0-9\-_/().:+,\s]+$")
@@ -42,26 +82,3 @@ def normalize_ocr_text(text: str) -> str:
     if text is None:
         return ""
     return " ".join(str(text).strip().split())
-
-
-def iter_han_runs(text: str) -> Iterable[tuple[bool, str]]:
-    if not text:
-        return []
-
-    out: list[tuple[bool, str]] = []
-    buf: list[str] = []
-    buf_is_han = is_han_char(text[0])
-
-    for ch in text:
-        ch_is_han = is_han_char(ch)
-        if ch_is_han == buf_is_han:
-            buf.append(ch)
-        else:
-            out.append((buf_is_han, "".join(buf)))
-            buf = [ch]
-            buf_is_han = ch_is_han
-
-    if buf:
-        out.append((buf_is_han, "".join(buf)))
-
-    return out
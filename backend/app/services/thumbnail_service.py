@@ -0,0 +1,98 @@
+"""
+Generación de thumbnails en segundo plano al crear un proyecto.
+
+Las páginas se reparten en tramos contiguos que se rasterizan en paralelo en
+el pool de procesos; cada tramo abre su propio documento. El proyecto se
+devuelve sin esperar: cada thumbnail se escribe de forma atómica en cuanto
+está, así que su existencia en disco es la marca de "listo" por página que
+consulta la UI (ready_pages), también para los tramos aún en curso.
+"""
+
+import asyncio
+import logging
+import math
+from pathlib import Path
+from typing import Dict, List
+
+from ..settings_cache import get_cpu_executor_workers
+from . import executors, render_service
+
+logger = logging.getLogger(__name__)
+
+# Páginas por tramo: lo bastante pocas para repartir bien y que los
+# thumbnails lleguen en orden, lo bastante muchas para amortizar abrir el PDF
+THUMBNAIL_CHUNK_PAGES = 8
+# Espera antes de reintentar un tramo si el pool de CPU está saturado
+BUSY_RETRY_SECONDS = 0.5
+
+_tasks: Dict[str, asyncio.Task] = {}
+
+
+def page_ranges(page_count: int, workers: int) -> List[range]:
+    """Tramos contiguos en orden; con pocas páginas, uno por worker."""
+    size = max(1, min(THUMBNAIL_CHUNK_PAGES, math.ceil(page_count / max(1, workers))))
+    return [range(start, min(start + size, page_count)) for start in range(0, page_count, size)]
+
+
+async def _render_range(pdf_path: Path, project_dir: Path, pages: range, color_mode: str) -> None:
+    while True:
+        try:
+            await executors.run_cpu(
+                render_service.render_thumbnails_only, pdf_path, project_dir, pages, color_mode,
+            )
+            return
+        except executors.ExecutorBusyError:
+            logger.info("Thumbnails %s-%s: pool de CPU saturado, reintentando", pages.start, pages.stop - 1)
+            await asyncio.sleep(BUSY_RETRY_SECONDS)
+
+
+async def render_thumbnails(
+    project_id: str, pdf_path: Path, project_dir: Path, page_count: int, color_mode: str = "rgb",
+) -> None:
+    """Renderiza los thumbnails de todas las páginas con tantos tramos a la vez como workers de CPU."""
+    # Con 0 workers run_cpu usa hilos: PyMuPDF no admite varios documentos en paralelo en hilos
+    workers = get_cpu_executor_workers() or 1
+    ranges = page_ranges(page_count, workers)
+    slots = asyncio.Semaphore(workers)
+
+    async def _one(pages: range) -> None:
+        async with slots:
+            await _render_range(pdf_path, project_dir, pages, color_mode)
+
+    await asyncio.gather(*(_one(pages) for pages in ranges))
+    logger.info("Thumbnails de %s: %d páginas en %d tramos", project_id, page_count, len(ranges))
+
+
+def _forget(project_id: str, task: asyncio.Task) -> None:
+    if _tasks.get(project_id) is task:
+        del _tasks[project_id]
+    if not task.cancelled() and task.exception() is not None:
+        logger.error("Failed to render thumbnails for project %s: %s", project_id, task.exception())
+
+
+def start(
+    project_id: str, pdf_path: Path, project_dir: Path, page_count: int, color_mode: str = "rgb",
+) -> asyncio.Task:
+    """Lanza la generación en segundo plano (requiere un event loop en marcha)."""
+    task = asyncio.create_task(render_thumbnails(project_id, pdf_path, project_dir, page_count, color_mode))
+    _tasks[project_id] = task
+    task.add_done_callback(lambda t: _forget(project_id, t))
+    return task
+
+
+def is_running(project_id: str) -> bool:
+    return project_id in _tasks
+
+
+def cancel(project_id: str) -> None:
+    """Cancela la generación pendiente (los tramos ya en un proceso terminan igualmente)."""
+    task = _tasks.get(project_id)
+    if task is not None:
+        task.cancel()
+
+
+def ready_pages(project_dir: Path, page_count: int) -> List[bool]:
+    """Por página, si su thumbnail ya está en disco."""
+    thumbs_dir = project_dir / "thumbs"
+    existing = {p.name for p in thumbs_dir.glob("*_original.png")} if thumbs_dir.exists() else set()
+    return [render_service.thumbnail_path(project_dir, n).name in existing for n in range(page_count)]
@@ -0,0 +1,261 @@
+"""
+Pirámide de teselas (deep zoom) de las imágenes de página, original o traducida.
+
+Niveles como en Deep Zoom (DZI): max_level es la imagen a resolución completa
+y cada nivel inferior mide la mitad (redondeando hacia arriba) hasta
+min_level, el primero que cabe en una sola tesela. Las teselas (256 o 512 px,
+sin solape) se generan bajo demanda a partir de la PNG de página y se guardan
+en tiles/<imagen>/<generación>/<tamaño>/<nivel>/<col>_<fila>_<versión>.png.
+
+Versión de una tesela: mtime_ns de la última escritura de la PNG que cambió
+su zona. La composición anota qué rectángulos re-dibujó (record_update) y
+solo las teselas que los cortan cambian de versión; si la PNG cambió sin
+anotación (re-render, composición completa) cambian todas. La versión va en
+la URL, así que cada URL de tesela es inmutable y se cachea sin caducidad.
+
+Generación: huella (mtime_ns y tamaño) de la PNG cuando se rehízo la
+pirámide, con un sufijo aleatorio. Una tesela que se estaba generando
+mientras cambiaba la PNG queda en el directorio de la generación anterior, o
+se borra al comprobar tras escribirla que la PNG ya no es la del manifiesto;
+y solo se sirven teselas de la generación del manifiesto vigente para la PNG
+actual.
+"""
+
+import io
+import json
+import logging
+import re
+import shutil
+import uuid
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+from PIL import Image
+
+from . import image_cache
+from ..atomic_files import write_atomic
+from .color_modes import to_uint8
+
+logger = logging.getLogger(__name__)
+
+TILE_SIZES = (256, 512)
+DEFAULT_TILE_SIZE = 512
+# Zonas anotadas por imagen; por encima se invalida la pirámide entera
+MAX_EDITS = 256
+
+Box = Tuple[int, int, int, int]
+
+_TOKEN = re.compile(r"[0-9a-f]+")
+
+
+def _tiles_root(image_path: Path) -> Path:
+    # <proyecto>/pages/000_translated_450.png -> <proyecto>/tiles
+    return image_path.parent.parent / "tiles"
+
+
+def _manifest_path(image_path: Path) -> Path:
+    return _tiles_root(image_path) / f"{image_path.stem}.json"
+
+
+def tile_path(manifest: dict, image_path: Path, tile_size: int, level: int, col: int, row: int, version: str) -> Path:
+    return (
+        _tiles_root(image_path) / image_path.stem / manifest["generation"] / str(tile_size) / str(level)
+        / f"{col}_{row}_{version}.png"
+    )
+
+
+def cached_tile(image_path: Path, tile_size: int, level: int, col: int, row: int, version: str) -> Optional[Path]:
+    """
+    Tesela ya generada en esa versión (vigente o no), o None. Solo se busca en
+    la generación actual y si el manifiesto describe la PNG tal como está.
+    """
+    image_path = Path(image_path)
+    if not _TOKEN.fullmatch(version):
+        return None
+    manifest = _read_manifest(image_path)
+    if manifest is None or "generation" not in manifest or manifest["source"] != _source_key(image_path):
+        return None
+    path = tile_path(manifest, image_path, tile_size, level, col, row, version)
+    return path if path.exists() else None
+
+
+def _source_key(image_path: Path) -> List[int]:
+    st = image_path.stat()
+    return [st.st_mtime_ns, st.st_size]
+
+
+def _read_manifest(image_path: Path) -> Optional[dict]:
+    path = _manifest_path(image_path)
+    if not path.exists():
+        return None
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError) as e:
+        logger.warning("Manifiesto de teselas ilegible %s: %s", path.name, e)
+        return None
+
+
+def _write_manifest(image_path: Path, manifest: dict) -> None:
+    write_atomic(_manifest_path(image_path), json.dumps(manifest).encode("utf-8"))
+
+
+def _next_version(previous: Optional[dict], key: List[int]) -> int:
+    # El mtime_ns, salvo que no supere la última versión: con mtime de poca
+    # resolución dos escrituras seguidas repetirían versión (y URL inmutable)
+    if previous is None:
+        return key[0]
+    return max(key[0], previous["base"] + 1, *(edit[0] + 1 for edit in previous["edits"]))
+
+
+def _reset(image_path: Path, previous: Optional[dict]) -> dict:
+    """Nueva generación con una versión nueva para todas las teselas: las anteriores se borran."""
+    tiles_dir = _tiles_root(image_path) / image_path.stem
+    if tiles_dir.exists():
+        shutil.rmtree(tiles_dir)
+    key = _source_key(image_path)
+    with Image.open(image_path) as img:
+        width, height = img.size
+    # Huella de la PNG más un sufijo aleatorio: por la misma razón, dos
+    # escrituras seguidas del mismo tamaño podrían dar la misma huella
+    manifest = {
+        "source": key, "generation": f"{key[0]:x}-{key[1]:x}-{uuid.uuid4().hex[:8]}",
+        "width": width, "height": height, "base": _next_version(previous, key), "edits": [],
+    }
+    _write_manifest(image_path, manifest)
+    return manifest
+
+
+def current_manifest(image_path: Path) -> dict:
+    """Manifiesto de la pirámide, rehecho si la PNG cambió sin anotarse."""
+    manifest = _read_manifest(image_path)
+    if manifest is None or "generation" not in manifest:
+        return _reset(image_path, None)
+    if manifest["source"] != _source_key(image_path):
+        return _reset(image_path, manifest)
+    return manifest
+
+
+def record_update(image_path: Path, rects: Optional[Sequence[Box]]) -> None:
+    """
+    Anota la escritura de image_path recién hecha: solo cambiaron rects
+    (píxeles de la imagen) o, con None, la imagen entera. Si aún no hay
+    pirámide no hay nada que invalidar.
+    """
+    manifest = _read_manifest(Path(image_path))
+    if manifest is None:
+        return
+    if "generation" not in manifest or rects is None or len(manifest["edits"]) + len(rects) > MAX_EDITS:
+        _reset(Path(image_path), manifest if "generation" in manifest else None)
+        return
+    key = _source_key(Path(image_path))
+    version = _next_version(manifest, key)
+    manifest["edits"].extend([version, *rect] for rect in rects)
+    manifest["source"] = key
+    _write_manifest(Path(image_path), manifest)
+
+
+def _max_level(manifest: dict) -> int:
+    return (max(manifest["width"], manifest["height"]) - 1).bit_length()
+
+
+def _level_size(manifest: dict, level: int) -> Tuple[int, int]:
+    scale = 1 << (_max_level(manifest) - level)
+    return -(-manifest["width"] // scale), -(-manifest["height"] // scale)
+
+
+def _min_level(manifest: dict, tile_size: int) -> int:
+    level = _max_level(manifest)
+    while level > 0 and max(_level_size(manifest, level)) > tile_size:
+        level -= 1
+    return level
+
+
+def _version_grid(manifest: dict, tile_size: int, level: int) -> np.ndarray:
+    """(filas, columnas) con el mtime_ns de la última escritura que tocó cada tesela."""
+    width, height = _level_size(manifest, level)
+    span = tile_size << (_max_level(manifest) - level)  # lado de la tesela en píxeles de la imagen
+    grid = np.full((-(-height // tile_size), -(-width // tile_size)), manifest["base"], dtype=np.int64)
+    for version, x1, y1, x2, y2 in manifest["edits"]:
+        block = grid[y1 // span:-(-y2 // span), x1 // span:-(-x2 // span)]
+        np.maximum(block, version, out=block)
+    return grid
+
+
+def _token(version: int) -> str:
+    # En hexadecimal: los mtime_ns no caben en un número de JavaScript
+    return format(int(version), "x")
+
+
+def pyramid_info(image_path: Path, tile_size: int = DEFAULT_TILE_SIZE) -> dict:
+    """Geometría de la pirámide y versión de cada tesela por nivel (fila a fila)."""
+    manifest = current_manifest(Path(image_path))
+    levels = []
+    for level in range(_min_level(manifest, tile_size), _max_level(manifest) + 1):
+        width, height = _level_size(manifest, level)
+        grid = _version_grid(manifest, tile_size, level)
+        levels.append({
+            "level": level,
+            "width": width,
+            "height": height,
+            "versions": [[_token(v) for v in row] for row in grid.tolist()],
+        })
+    return {
+        "width": manifest["width"],
+        "height": manifest["height"],
+        "tile_size": tile_size,
+        "min_level": levels[0]["level"],
+        "max_level": levels[-1]["level"],
+        "levels": levels,
+    }
+
+
+def _render_tile(image_path: Path, manifest: dict, tile_size: int, level: int, col: int, row: int) -> bytes:
+    page = image_cache.get_array(image_path)
+    scale = 1 << (_max_level(manifest) - level)
+    span = tile_size * scale
+    crop = page[row * span:(row + 1) * span, col * span:(col + 1) * span]
+    if scale == 1:
+        img = Image.fromarray(crop)  # tal cual: una página de 1 bit da teselas de 1 bit
+    else:
+        width, height = _level_size(manifest, level)
+        size = (min(tile_size, width - col * tile_size), min(tile_size, height - row * tile_size))
+        img = Image.fromarray(to_uint8(crop)).resize(size, Image.Resampling.BOX)
+    buf = io.BytesIO()
+    img.save(buf, "PNG")
+    return buf.getvalue()
+
+
+def get_tile(image_path: Path, tile_size: int, level: int, col: int, row: int) -> Tuple[Path, str]:
+    """
+    Ruta de la tesela en su versión actual (generándola si falta) y la
+    versión. ValueError si la tesela no existe en la pirámide.
+    """
+    image_path = Path(image_path)
+    while True:
+        manifest = current_manifest(image_path)
+        if not _min_level(manifest, tile_size) <= level <= _max_level(manifest):
+            raise ValueError(f"Nivel {level} fuera de la pirámide")
+        grid = _version_grid(manifest, tile_size, level)
+        if not (0 <= row < grid.shape[0] and 0 <= col < grid.shape[1]):
+            raise ValueError(f"Tesela {col},{row} fuera del nivel {level}")
+        version = _token(grid[row, col])
+        path = tile_path(manifest, image_path, tile_size, level, col, row, version)
+        if path.exists():
+            return path, version
+        data = _render_tile(image_path, manifest, tile_size, level, col, row)
+        for old in path.parent.glob(f"{col}_{row}_*.png"):
+            old.unlink(missing_ok=True)
+        write_atomic(path, data)
+        # Se comprueba después de escribir: si la PNG cambió durante el render
+        # (o la pirámide se rehízo), la tesela puede ser de otro contenido y
+        # no debe quedar a la vista; se borra y se repite con el manifiesto nuevo
+        latest = _read_manifest(image_path)
+        if (
+            latest is None
+            or latest.get("generation") != manifest["generation"]
+            or _source_key(image_path) != manifest["source"]
+        ):
+            path.unlink(missing_ok=True)
+            continue
+        return path, version
@@ -1,7 +1,8 @@
-from typing import Dict, List
+from typing import Dict, List, Tuple
 
+from ..db.translation_memory import glossary_fingerprint
 from . import translate_service
-from .text_script_utils import iter_han_runs
+from .text_script_utils import HanRun, classify_texts
 
 
 def translate_batch_preserving_non_han(texts: List[str], glossary_map: Dict[str, str]) -> List[str]:
@@ -10,10 +11,10 @@ def translate_batch_preserving_non_han(texts: List[str], glossary_map: Dict[str,
     segment_texts: List[str] = []
     segment_keys: List[tuple[int, int]] = []
 
-    split_runs: List[List[tuple[bool, str]]] = []
+    split_runs: List[Tuple[HanRun, ...]] = []
 
-    for i, text in enumerate(texts):
-        runs = list(iter_han_runs(text or ""))
+    for i, profile in enumerate(classify_texts(texts)):
+        runs = profile.runs
         split_runs.append(runs)
         for j, (is_han, seg) in enumerate(runs):
             if not is_han:
@@ -28,7 +29,10 @@ def translate_batch_preserving_non_han(texts: List[str], glossary_map: Dict[str,
 
     translations: List[str] = []
     if segment_texts:
-        translations = translate_service.translate_batch(segment_texts)
+        translations = translate_service.translate_batch(
+            segment_texts,
+            glossary_fp=glossary_fingerprint(glossary_map),
+        )
 
     translated_by_key: Dict[tuple[int, int], str] = {}
     for (i, j), t in zip(segment_keys, translations):
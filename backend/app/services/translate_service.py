@@ -2,53 +2,120 @@
 Servicio de traducción usando DeepL API.
 """
 
-from typing import List, Optional
+import logging
+from typing import Dict, Iterator, List, Optional
 
-from ..config import get_config
+from ..settings_cache import get_settings, get_translation_memory_enabled, get_translation_memory_max_entries
+from ..db.repository import translation_memory
+
+logger = logging.getLogger(__name__)
+
+# Límites por petición de DeepL (50 textos; cuerpo < 128 KiB, margen para UTF-8)
+DEEPL_MAX_TEXTS_PER_REQUEST = 50
+DEEPL_MAX_CHARS_PER_REQUEST = 30000
+
+# Un Translator por API key (reutiliza la sesión HTTP entre llamadas)
+_translators: Dict[str, object] = {}
 
 
 def _get_api_key() -> str:
     """Obtiene la API key de DeepL desde la configuración persistente."""
-    config = get_config()
-    return config.get("deepl_api_key", "")
+    return get_settings().deepl_api_key
+
+
+def _get_translator(api_key: str):
+    translator = _translators.get(api_key)
+    if translator is None:
+        import deepl
+        translator = deepl.Translator(api_key)
+        _translators.clear()
+        _translators[api_key] = translator
+    return translator
+
 
+def _iter_chunks(texts: List[str]) -> Iterator[List[str]]:
+    """Parte la lista en lotes que respetan los límites de una petición DeepL."""
+    chunk: List[str] = []
+    chunk_chars = 0
+    for t in texts:
+        if chunk and (
+            len(chunk) >= DEEPL_MAX_TEXTS_PER_REQUEST
+            or chunk_chars + len(t) > DEEPL_MAX_CHARS_PER_REQUEST
+        ):
+            yield chunk
+            chunk = []
+            chunk_chars = 0
+        chunk.append(t)
+        chunk_chars += len(t)
+    if chunk:
+        yield chunk
 
-def translate_batch(texts: List[str], source_lang: str = "ZH", target_lang: str = "ES") -> List[str]:
+
+def translate_batch(
+    texts: List[str],
+    source_lang: str = "ZH",
+    target_lang: str = "ES",
+    glossary_fp: str = "",
+) -> List[str]:
     """
     Traduce una lista de textos de chino a español usando DeepL.
+    Los textos repetidos se envían una sola vez y la lista se reparte en
+    lotes limitados por tamaño; el resultado conserva el orden de entrada.
+    Antes de llamar a DeepL se consulta la memoria de traducción y las
+    traducciones nuevas se guardan en ella.
     
     Args:
         texts: Lista de textos a traducir
         source_lang: Idioma origen (default: ZH)
         target_lang: Idioma destino (default: ES)
+        glossary_fp: Huella del glosario activo (parte de la clave de memoria)
     
     Returns:
         Lista de textos traducidos
     """
-    api_key = _get_api_key()
-    if not api_key:
-        # Fallback: devolver textos sin traducir con marcador
-        return [f"[ES] {t}" for t in texts]
-    
-    try:
-        import deepl
-        translator = deepl.Translator(api_key)
-        
-        results = translator.translate_text(
-            texts,
-            source_lang=source_lang,
-            target_lang=target_lang,
-        )
-        
-        if isinstance(results, list):
-            return [r.text for r in results]
-        else:
-            return [results.text]
-    
-    except Exception as e:
-        # Fallback en caso de error
-        print(f"Error en traducción DeepL: {e}")
-        return [f"[ES] {t}" for t in texts]
+    unique_texts = list(dict.fromkeys(texts))
+    use_memory = get_translation_memory_enabled()
+
+    translated: Dict[str, str] = {}
+    if use_memory and unique_texts:
+        translated = translation_memory.lookup(unique_texts, source_lang, target_lang, glossary_fp)
+    pending = [t for t in unique_texts if t not in translated]
+
+    if pending:
+        api_key = _get_api_key()
+        fresh: Dict[str, str] = {}
+        if api_key:
+            requests = 0
+            try:
+                translator = _get_translator(api_key)
+                for chunk in _iter_chunks(pending):
+                    results = translator.translate_text(
+                        chunk,
+                        source_lang=source_lang,
+                        target_lang=target_lang,
+                    )
+                    requests += 1
+                    if not isinstance(results, list):
+                        results = [results]
+                    for src, r in zip(chunk, results):
+                        fresh[src] = r.text
+            except Exception as e:
+                # Fallback en caso de error (lo ya traducido se conserva)
+                print(f"Error en traducción DeepL: {e}")
+            logger.info(
+                "DeepL: %s textos (%s únicos, %s en memoria) en %s peticiones",
+                len(texts),
+                len(unique_texts),
+                len(unique_texts) - len(pending),
+                requests,
+            )
+            if use_memory and fresh:
+                translation_memory.max_entries = get_translation_memory_max_entries()
+                translation_memory.store(fresh, source_lang, target_lang, glossary_fp)
+        translated.update(fresh)
+
+    # Fallback: devolver textos sin traducir con marcador
+    return [translated.get(t, f"[ES] {t}") for t in texts]
 
 
 def translate_single(text: str, source_lang: str = "ZH", target_lang: str = "ES") -> str:
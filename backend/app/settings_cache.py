@@ -0,0 +1,284 @@
+"""
+Configuración validada y cacheada (Settings) y sus accesores.
+
+config.json se parsea y valida una vez por versión del fichero (guardados de
+este proceso, mtime y tamaño); los accesores get_* leen de esa instancia
+inmutable. use_config_snapshot fija una configuración para el contexto
+actual (los jobs la propagan a sus hilos).
+"""
+
+import os
+import copy
+import threading
+import contextvars
+import contextlib
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from . import config
+from .config import (
+    DEFAULT_CPU_EXECUTOR_WORKERS,
+    DEFAULT_EXECUTOR_QUEUE_SIZE,
+    DEFAULT_IMAGE_CACHE_MAX_MB,
+    DEFAULT_IO_EXECUTOR_WORKERS,
+    DEFAULT_MIN_HAN_RATIO,
+    DEFAULT_MIN_OCR_CONFIDENCE,
+    DEFAULT_OCR_ENABLE_LABEL_RECHECK,
+    DEFAULT_OCR_ENGINE,
+    DEFAULT_OCR_MODE,
+    DEFAULT_OCR_POOL_WORKERS,
+    DEFAULT_OCR_RECHECK_BACKEND,
+    DEFAULT_OCR_RECHECK_MAX_REGIONS_PER_PAGE,
+    DEFAULT_RENDER_ALL_MODE,
+    DEFAULT_RENDER_PIPELINE_QUEUE_SIZE,
+    DEFAULT_SYNC_ENABLED,
+    DEFAULT_TRANSLATION_MEMORY_ENABLED,
+    DEFAULT_TRANSLATION_MEMORY_MAX_ENTRIES,
+    OCR_RECHECK_BACKENDS,
+    RENDER_ALL_MODES,
+)
+
+
+@dataclass(frozen=True)
+class Settings:
+    """Configuración validada e inmutable (una instancia por versión de config.json)."""
+    deepl_api_key: str
+    min_han_ratio: float
+    ocr_engine: str
+    ocr_mode: str
+    min_ocr_confidence: float
+    ocr_enable_label_recheck: bool
+    ocr_recheck_max_regions_per_page: int
+    ocr_recheck_backend: str
+    ocr_region_filters: Tuple[Mapping[str, Any], ...]
+    render_all_mode: str
+    render_pipeline_queue_size: int
+    ocr_pool_workers: int
+    cpu_executor_workers: int
+    io_executor_workers: int
+    executor_queue_size: int
+    image_cache_max_mb: int
+    translation_memory_enabled: bool
+    translation_memory_max_entries: int
+    sync_enabled: bool
+
+
+def _read_float(raw: Mapping[str, Any], key: str, default: float, lo: float, hi: float) -> float:
+    try:
+        value = float(raw.get(key, default))
+    except Exception:
+        value = default
+    return max(lo, min(value, hi))
+
+
+def _read_int(raw: Mapping[str, Any], key: str, default: int, lo: int, hi: Optional[int] = None) -> int:
+    try:
+        value = int(raw.get(key, default))
+    except Exception:
+        value = default
+    value = max(lo, value)
+    return value if hi is None else min(value, hi)
+
+
+def _read_choice(raw: Mapping[str, Any], key: str, default: str, allowed) -> str:
+    value = str(raw.get(key, default) or default).lower()
+    return value if value in allowed else default
+
+
+def _read_region_filters(raw: Mapping[str, Any]) -> Tuple[Mapping[str, Any], ...]:
+    value = raw.get("ocr_region_filters", [])
+    if not isinstance(value, list):
+        return ()
+    out = []
+    for item in value:
+        if not isinstance(item, dict):
+            continue
+        mode = str(item.get("mode", "contains"))
+        if mode not in {"contains", "starts", "ends", "regex"}:
+            continue
+        pattern = str(item.get("pattern", ""))
+        if not pattern:
+            continue
+        out.append(
+            MappingProxyType({
+                "mode": mode,
+                "pattern": pattern,
+                "case_sensitive": bool(item.get("case_sensitive", False)),
+            })
+        )
+    return tuple(out)
+
+
+def _build_settings(raw: Mapping[str, Any]) -> Settings:
+    cpu_count = os.cpu_count() or 1
+    return Settings(
+        deepl_api_key=str(raw.get("deepl_api_key", "") or ""),
+        min_han_ratio=_read_float(raw, "min_han_ratio", DEFAULT_MIN_HAN_RATIO, 0.0, 1.0),
+        ocr_engine=_read_choice(raw, "ocr_engine", DEFAULT_OCR_ENGINE, {"easyocr", "paddleocr", "rapidocr"}),
+        ocr_mode=_read_choice(raw, "ocr_mode", DEFAULT_OCR_MODE, {"basic", "advanced"}),
+        min_ocr_confidence=_read_float(raw, "min_ocr_confidence", DEFAULT_MIN_OCR_CONFIDENCE, 0.0, 1.0),
+        ocr_enable_label_recheck=bool(raw.get("ocr_enable_label_recheck", DEFAULT_OCR_ENABLE_LABEL_RECHECK)),
+        ocr_recheck_max_regions_per_page=_read_int(
+            raw, "ocr_recheck_max_regions_per_page", DEFAULT_OCR_RECHECK_MAX_REGIONS_PER_PAGE, 0
+        ),
+        ocr_recheck_backend=_read_choice(raw, "ocr_recheck_backend", DEFAULT_OCR_RECHECK_BACKEND, OCR_RECHECK_BACKENDS),
+        ocr_region_filters=_read_region_filters(raw),
+        render_all_mode=_read_choice(raw, "render_all_mode", DEFAULT_RENDER_ALL_MODE, RENDER_ALL_MODES),
+        render_pipeline_queue_size=_read_int(raw, "render_pipeline_queue_size", DEFAULT_RENDER_PIPELINE_QUEUE_SIZE, 1),
+        ocr_pool_workers=_read_int(raw, "ocr_pool_workers", DEFAULT_OCR_POOL_WORKERS, 0, cpu_count),
+        cpu_executor_workers=_read_int(raw, "cpu_executor_workers", DEFAULT_CPU_EXECUTOR_WORKERS, 0, cpu_count),
+        io_executor_workers=_read_int(raw, "io_executor_workers", DEFAULT_IO_EXECUTOR_WORKERS, 1, 64),
+        executor_queue_size=_read_int(raw, "executor_queue_size", DEFAULT_EXECUTOR_QUEUE_SIZE, 0, 1024),
+        image_cache_max_mb=_read_int(raw, "image_cache_max_mb", DEFAULT_IMAGE_CACHE_MAX_MB, 0),
+        translation_memory_enabled=bool(raw.get("translation_memory_enabled", DEFAULT_TRANSLATION_MEMORY_ENABLED)),
+        translation_memory_max_entries=_read_int(
+            raw, "translation_memory_max_entries", DEFAULT_TRANSLATION_MEMORY_MAX_ENTRIES, 0
+        ),
+        sync_enabled=bool(raw.get("sync_enabled", DEFAULT_SYNC_ENABLED)),
+    )
+
+
+class _ConfigSource:
+    """Config en bruto (solo lectura) + su Settings validado, construido bajo demanda."""
+
+    def __init__(self, raw: Dict[str, Any]):
+        self.raw: Mapping[str, Any] = MappingProxyType(raw)
+        self._settings: Optional[Settings] = None
+
+    @property
+    def settings(self) -> Settings:
+        if self._settings is None:
+            self._settings = _build_settings(self.raw)
+        return self._settings
+
+
+_CONFIG_OVERRIDE: contextvars.ContextVar[_ConfigSource | None] = contextvars.ContextVar(
+    "NB7X_CONFIG_OVERRIDE",
+    default=None,
+)
+
+# Caché de config.json: se recarga solo si cambian mtime/tamaño o tras save_config
+_cache_lock = threading.Lock()
+_config_cache: Optional[_ConfigSource] = None
+_config_cache_key: Optional[Tuple[int, int, int]] = None
+
+
+def _current_source() -> _ConfigSource:
+    global _config_cache, _config_cache_key
+    override = _CONFIG_OVERRIDE.get()
+    if override is not None:
+        return override
+    key = config.config_file_version()
+    with _cache_lock:
+        if _config_cache is None or key != _config_cache_key:
+            _config_cache = _ConfigSource(config.load_config_file() if key is not None else {})
+            _config_cache_key = key
+        return _config_cache
+
+
+def get_config() -> dict:
+    """Copia mutable de la configuración persistente (o del snapshot activo)."""
+    return copy.deepcopy(dict(_current_source().raw))
+
+
+def get_settings() -> Settings:
+    """Configuración validada e inmutable (cacheada hasta que cambie config.json)."""
+    return _current_source().settings
+
+
+@contextlib.contextmanager
+def use_config_snapshot(snapshot: Dict[str, Any]):
+    token = _CONFIG_OVERRIDE.set(_ConfigSource(copy.deepcopy(dict(snapshot or {}))))
+    try:
+        yield
+    finally:
+        _CONFIG_OVERRIDE.reset(token)
+
+
+def get_ocr_region_filters() -> List[Dict[str, Any]]:
+    return [dict(f) for f in get_settings().ocr_region_filters]
+
+
+def get_min_han_ratio() -> float:
+    """Obtiene el ratio mínimo de caracteres Han para aceptar una región OCR."""
+    return get_settings().min_han_ratio
+
+
+def get_ocr_engine() -> str:
+    """Obtiene el motor OCR a usar (easyocr, paddleocr o rapidocr)."""
+    return get_settings().ocr_engine
+
+
+def get_ocr_mode() -> str:
+    """Obtiene el modo OCR (basic o advanced)."""
+    return get_settings().ocr_mode
+
+
+def get_min_ocr_confidence() -> float:
+    return get_settings().min_ocr_confidence
+
+
+def get_ocr_enable_label_recheck() -> bool:
+    return get_settings().ocr_enable_label_recheck
+
+
+def get_ocr_recheck_max_regions_per_page() -> int:
+    return get_settings().ocr_recheck_max_regions_per_page
+
+
+def get_ocr_recheck_backend() -> str:
+    """Motor del recheck de etiquetas resuelto (easyocr o rapidocr)."""
+    settings = get_settings()
+    if settings.ocr_recheck_backend == "auto":
+        return "rapidocr" if settings.ocr_engine == "rapidocr" else "easyocr"
+    return settings.ocr_recheck_backend
+
+
+def get_render_all_mode() -> str:
+    """Obtiene el modo de ejecución del job render-all (sequential, pipeline o batched)."""
+    return get_settings().render_all_mode
+
+
+def get_render_pipeline_queue_size() -> int:
+    """Tamaño de las colas entre fases del pipeline (páginas en vuelo por fase)."""
+    return get_settings().render_pipeline_queue_size
+
+
+def get_ocr_pool_workers() -> int:
+    """Número de procesos del pool OCR (0 = deshabilitado, máximo = núcleos)."""
+    return get_settings().ocr_pool_workers
+
+
+def get_cpu_executor_workers() -> int:
+    """Procesos del executor CPU (0 = ejecutar en el executor de E/S, máximo = núcleos)."""
+    return get_settings().cpu_executor_workers
+
+
+def get_io_executor_workers() -> int:
+    """Hilos del executor de E/S (1..64)."""
+    return get_settings().io_executor_workers
+
+
+def get_executor_queue_size() -> int:
+    """Tareas en espera admitidas por executor además de las que están en ejecución."""
+    return get_settings().executor_queue_size
+
+
+def get_image_cache_max_bytes() -> int:
+    """Presupuesto en bytes de la caché de imágenes decodificadas."""
+    return get_settings().image_cache_max_mb * 1024 * 1024
+
+
+def get_translation_memory_enabled() -> bool:
+    return get_settings().translation_memory_enabled
+
+
+def get_translation_memory_max_entries() -> int:
+    """Máximo de entradas de la memoria de traducción (0 = sin límite)."""
+    return get_settings().translation_memory_max_entries
+
+
+def get_sync_enabled() -> bool:
+    """Obtiene si la sincronización con InsForge está habilitada."""
+    return get_settings().sync_enabled
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark de la clasificación Han (text_script_utils).
+
+Compara la implementación anterior (rangos con ord() carácter a carácter,
+ratio y runs en pasadas separadas) con la actual basada en regex
+precompiladas y clasificación por lotes.
+
+Uso (desde backend/):  python -m benchmarks.bench_text_script
+"""
+
+import random
+import time
+from typing import Callable, List
+
+from app.services.text_script_utils import classify_texts, han_ratios
+
+
+def _ord_is_han(char: str) -> bool:
+    code = ord(char)
+    return (
+        0x4E00 <= code <= 0x9FFF
+        or 0x3400 <= code <= 0x4DBF
+        or 0x20000 <= code <= 0x2A6DF
+        or 0x2A700 <= code <= 0x2B73F
+        or 0x2B740 <= code <= 0x2B81F
+        or 0x2B820 <= code <= 0x2CEAF
+        or 0xF900 <= code <= 0xFAFF
+        or 0x2F800 <= code <= 0x2FA1F
+    )
+
+
+def _ord_han_ratio(text: str) -> float:
+    if not text:
+        return 0.0
+    return sum(1 for c in text if _ord_is_han(c)) / len(text)
+
+
+def _ord_runs(text: str) -> list:
+    out, buf = [], []
+    buf_is_han = _ord_is_han(text[0]) if text else False
+    for ch in text:
+        ch_is_han = _ord_is_han(ch)
+        if ch_is_han == buf_is_han:
+            buf.append(ch)
+        else:
+            out.append((buf_is_han, "".join(buf)))
+            buf, buf_is_han = [ch], ch_is_han
+    if buf:
+        out.append((buf_is_han, "".join(buf)))
+    return out
+
+
+def _page_texts(n: int, max_len: int, seed: int = 0) -> List[str]:
+    rng = random.Random(seed)
+    alphabet = "继电器控制回路电源模块断路开关接触AC220V-K1QF ()/"
+    return ["".join(rng.choice(alphabet) for _ in range(rng.randint(1, max_len))) for _ in range(n)]
+
+
+def _best_of(fn: Callable[[], object], repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main() -> None:
+    cases = {
+        "etiquetas cortas (5000 x <=30)": _page_texts(5000, 30),
+        "párrafos (1000 x <=600)": _page_texts(1000, 600, seed=1),
+    }
+    print(f"{'caso':<32}{'operación':<22}{'ord()':>10}{'regex':>10}{'x':>7}")
+    for name, texts in cases.items():
+        assert han_ratios(texts) == [_ord_han_ratio(t) for t in texts]
+        assert [list(p.runs) for p in classify_texts(texts)] == [_ord_runs(t) for t in texts]
+        rows = [
+            ("ratio Han", lambda: [_ord_han_ratio(t) for t in texts], lambda: han_ratios(texts)),
+            (
+                "ratio + runs",
+                lambda: [(_ord_han_ratio(t), _ord_runs(t)) for t in texts],
+                lambda: classify_texts(texts),
+            ),
+        ]
+        for op, old, new in rows:
+            t_old, t_new = _best_of(old), _best_of(new)
+            print(f"{name:<32}{op:<22}{t_old * 1e3:>8.1f}ms{t_new * 1e3:>8.1f}ms{t_old / t_new:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,7 @@ This script runs the FastAPI app with uvicorn.
 
 import os
 import sys
+import multiprocessing
 
 # Ensure the app package is importable
 if getattr(sys, 'frozen', False):
@@ -15,10 +16,15 @@ else:
 
 sys.path.insert(0, base_path)
 
-import uvicorn
-from app.main import app
-
 if __name__ == "__main__":
+    # Necesario para los pools de procesos en el ejecutable de PyInstaller. Va
+    # antes de importar la app: un worker arrancado desde el ejecutable sale
+    # aquí sin cargar FastAPI, los modelos ni la configuración.
+    multiprocessing.freeze_support()
+
+    import uvicorn
+    from app.main import app
+
     port = int(os.environ.get("PORT", 8000))
     print(f"Starting backend on port {port}...")
     uvicorn.run(app, host="127.0.0.1", port=port)
@@ -0,0 +1,160 @@
+"""
+Tests de los modos de color de página (rgb / gray / bilevel / auto): render,
+caché de imágenes, composición y exportación.
+"""
+
+import base64
+import io
+
+import fitz
+import numpy as np
+import pytest
+from PIL import Image
+
+from app.db.models import DrawingElement, TextRegion
+from app.services import color_modes, compose_service, compose_state, export_service, image_cache, ocr_pool, render_service
+
+
+@pytest.fixture(autouse=True)
+def clean_caches():
+    compose_state.clear_states()
+    image_cache.clear()
+    yield
+    compose_state.clear_states()
+    image_cache.clear()
+
+
+@pytest.fixture
+def project(tmp_path):
+    doc = fitz.open()
+    page = doc.new_page(width=300, height=200)  # esquema en negro
+    page.draw_line((20, 30), (280, 30), width=1.5)
+    page.insert_text((40, 120), "K1 QF2", fontsize=14)
+    page = doc.new_page(width=300, height=200)  # con una línea roja fina
+    page.draw_line((20, 30), (280, 30), width=1.5)
+    page.draw_line((20, 150), (280, 150), color=(1, 0, 0), width=0.5)
+    doc.save(tmp_path / "src.pdf")
+    doc.close()
+    return tmp_path
+
+
+def _mode(path):
+    with Image.open(path) as img:
+        return img.mode
+
+
+def _region(tgt_text="Relé", **kwargs):
+    return TextRegion(
+        id="r", project_id="p", page_number=0, bbox=[60, 250, 400, 330], bbox_normalized=[0, 0, 0, 0],
+        src_text="继电器", tgt_text=tgt_text, **kwargs,
+    )
+
+
+def _stamp(color):
+    buf = io.BytesIO()
+    Image.new("RGBA", (20, 20), color).save(buf, "PNG")
+    return DrawingElement(
+        id="s", project_id="p", page_number=0, element_type="image", points=[500, 500, 560, 560],
+        image_data=base64.b64encode(buf.getvalue()).decode(),
+    )
+
+
+class TestColorDetection:
+    def test_gray_page_and_thin_colored_line(self):
+        page = np.full((400, 400, 3), 255, np.uint8)
+        page[100:110, :] = 0
+        page[200:204, 50:60] = (128, 120, 125)  # antialiasing casi gris
+        assert not color_modes.has_color(page)
+        page[300, :] = (220, 30, 30)
+        assert color_modes.has_color(page)
+        assert not color_modes.has_color(page[:, :, 0])
+
+    def test_rgb_view_of_bilevel_page(self):
+        view = color_modes.rgb_view(np.array([[True, False]]))
+        assert view.shape == (1, 2, 3) and view.tolist() == [[[255] * 3, [0] * 3]]
+
+    def test_unreadable_stamp_is_neutral_and_logged(self, caplog):
+        with caplog.at_level("WARNING", logger="app.services.color_modes"):
+            assert color_modes.stamp_is_neutral("no-es-base64!")
+            assert color_modes.stamp_is_neutral("aGVsbG8=")  # base64 válido, no es imagen
+        assert len(caplog.records) == 2
+
+
+class TestRender:
+    @pytest.mark.parametrize("color_mode,mode", [("rgb", "RGB"), ("gray", "L"), ("bilevel", "1")])
+    def test_page_png_in_color_mode(self, project, color_mode, mode):
+        path = render_service.render_page(project / "src.pdf", 0, 300, project, color_mode)
+        assert _mode(path) == mode
+        assert Image.open(path).size == (1250, 834)
+        # Vista previa y thumbnail: en gris salvo en RGB
+        assert _mode(render_service.page_path(project, 0, 150)) == ("RGB" if mode == "RGB" else "L")
+        assert render_service.page_manifest(project, 0)["color_mode"] == color_mode
+
+    def test_bilevel_is_much_smaller_than_rgb(self, project, tmp_path):
+        rgb_dir, bilevel_dir = tmp_path / "rgb", tmp_path / "bilevel"
+        rgb = render_service.render_page(project / "src.pdf", 0, 450, rgb_dir, "rgb")
+        bilevel = render_service.render_page(project / "src.pdf", 0, 450, bilevel_dir, "bilevel")
+        assert bilevel.stat().st_size * 3 < rgb.stat().st_size
+
+    def test_auto_uses_gray_only_without_color(self, project):
+        for page_number, resolved in ((0, "gray"), (1, "rgb")):
+            page = render_service.render_page_array(project / "src.pdf", page_number, 300, project, "auto")
+            assert page.ndim == (3 if resolved == "rgb" else 2)
+            assert render_service.page_manifest(project, page_number)["color_mode"] == resolved
+
+    def test_in_memory_bilevel_page_survives_shared_memory(self, project):
+        page = render_service.render_page_array(project / "src.pdf", 0, 300, project, "bilevel")
+        assert page.dtype == bool
+        render_service.save_page_png(page, render_service.page_path(project, 0, 300))
+        assert (image_cache.get_array(render_service.page_path(project, 0, 300)) == page).all()
+
+        shm, shared_page = ocr_pool._share_page(page)
+        try:
+            copy = np.frombuffer(shm.buf, np.dtype(shared_page[2])).reshape(shared_page[1]).copy()
+        finally:
+            shm.close()
+            shm.unlink()
+        assert copy.dtype == bool and (copy == page).all()
+
+
+class TestComposeAndExport:
+    @pytest.fixture
+    def bilevel_page(self, project):
+        return render_service.render_page(project / "src.pdf", 0, 300, project, "bilevel")
+
+    def test_bilevel_stays_one_bit_until_a_color_is_used(self, bilevel_page, project):
+        gray_stamp = _stamp((90, 90, 90, 255))
+        out = compose_service.compose_page_with_drawings(bilevel_page, [_region()], [gray_stamp], project, 0, 300)
+        assert _mode(out) == "1"
+        with Image.open(out) as img:
+            assert np.asarray(img)[520, 520] == 0  # el sello gris (<128) pasa a negro
+
+        out = compose_service.compose_page(bilevel_page, [_region(text_color="#d01010")], project, 0, 300)
+        assert _mode(out) == "RGB"
+        out = compose_service.compose_page_with_drawings(
+            bilevel_page, [_region()], [_stamp((200, 0, 0, 255))], project, 0, 300,
+        )
+        assert _mode(out) == "RGB"
+
+    def test_incremental_compose_keeps_bilevel_output(self, bilevel_page, project):
+        compose_service.compose_page(bilevel_page, [_region()], project, 0, 300)
+        out = compose_service.compose_page(bilevel_page, [_region(tgt_text="Contactor")], project, 0, 300)
+        with Image.open(out) as img:
+            assert img.mode == "1"
+            incremental = np.asarray(img)
+        compose_state.clear_states()
+        compose_service.compose_page(bilevel_page, [_region(tgt_text="Contactor")], project, 0, 300)
+        with Image.open(out) as img:
+            assert (incremental == np.asarray(img)).all()
+
+    def test_one_bit_page_is_exported_without_decoding(self, bilevel_page, project):
+        compose_service.compose_page(bilevel_page, [_region()], project, 0, 300)
+        out = export_service.export_pdf(project, 1, 300)
+        translated = project / "pages" / "000_translated_300.png"
+        with fitz.open(out) as doc:
+            xref = doc[0].get_images()[0][0]
+            assert doc.xref_get_key(xref, "BitsPerComponent") == ("int", "1")
+            pix = doc[0].get_pixmap(dpi=300, colorspace=fitz.csGRAY)
+        rendered = np.frombuffer(pix.samples, np.uint8).reshape(pix.h, pix.w)
+        with Image.open(translated) as img:
+            assert (rendered == np.asarray(img.convert("L"))).all()
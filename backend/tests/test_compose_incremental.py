@@ -0,0 +1,179 @@
+"""
+Tests de la composición incremental (zonas dañadas, PNG por bandas, thumbnail).
+"""
+
+import copy
+import io
+import zlib
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw
+
+from app.settings_cache import use_config_snapshot
+from app.db.models import DrawingElement, Project, TextRegion
+from app.services import compose_service, compose_state
+from app.services.png_bands import BAND_ROWS, BandedPng, adler32_combine
+
+
+@pytest.fixture(autouse=True)
+def clean_states():
+    compose_state.clear_states()
+    yield
+    compose_state.clear_states()
+
+
+@pytest.fixture
+def page(tmp_path):
+    img = Image.new("RGB", (600, 800), "white")
+    draw = ImageDraw.Draw(img)
+    for y in range(20, 800, 37):
+        draw.line([(0, y), (600, y + 15)], fill=(200, 30, 30), width=3)
+    path = tmp_path / "pages" / "001_original_450.png"
+    path.parent.mkdir(parents=True)
+    img.save(path)
+    return path
+
+
+def _region(rid, bbox, text, **kwargs):
+    return TextRegion(
+        id=rid, project_id="p", page_number=1, bbox=bbox, bbox_normalized=[0, 0, 0, 0],
+        src_text="继电器", tgt_text=text, **kwargs,
+    )
+
+
+def _scene():
+    regions = [
+        _region("a", [50, 50, 250, 90], "Relé térmico"),
+        _region("b", [200, 70, 400, 110], "Fuente de alimentación", render_order=1),
+        _region("c", [300, 500, 500, 540], "Interruptor", bg_color="#ffffaa"),
+    ]
+    drawings = [
+        DrawingElement(id="d1", project_id="p", page_number=1, element_type="line", points=[10.5, 300.2, 590.7, 320.9]),
+        DrawingElement(id="d2", project_id="p", page_number=1, element_type="rect", points=[280, 480, 520, 560]),
+        DrawingElement(id="d3", project_id="p", page_number=1, element_type="text", points=[60, 600], text="Nota"),
+        # Coordenadas fraccionarias, como llegan del lienzo del editor
+        DrawingElement(
+            id="d4", project_id="p", page_number=1, element_type="circle", points=[290.4, 470.6, 530.3, 575.5],
+        ),
+        DrawingElement(
+            id="d5", project_id="p", page_number=1, element_type="polyline",
+            points=[5.3, 95.7, 305.5, 60.25, 590.6, 100.4], stroke_width=1.7,
+        ),
+        DrawingElement(
+            id="d6", project_id="p", page_number=1, element_type="text", points=[310.6, 515.5], text="Nota 2",
+        ),
+    ]
+    return regions, drawings
+
+
+def _compose(page, regions, drawings):
+    out = compose_service.compose_page_with_drawings(
+        page, copy.deepcopy(regions), copy.deepcopy(drawings), page.parent.parent, 1, 450,
+    )
+    thumb = page.parent.parent / "thumbs" / "001_translated.jpg"
+    with Image.open(out) as img, Image.open(thumb) as th:
+        return np.asarray(img.convert("RGB")), th.size
+
+
+def _fresh(page, regions, drawings):
+    compose_state.clear_states()
+    return _compose(page, regions, drawings)[0]
+
+
+class TestIncrementalCompose:
+    @pytest.mark.parametrize(
+        "edit", ["text", "move", "delete", "add", "drawing", "fractional", "order", "remove_drawings"],
+    )
+    def test_matches_full_compose(self, page, edit):
+        regions, drawings = _scene()
+        _compose(page, regions, drawings)
+        if edit == "text":
+            regions[0].tgt_text = "Contactor"
+        elif edit == "move":
+            regions[2].bbox = [320, 620, 520, 660]
+        elif edit == "delete":
+            regions.pop(1)
+        elif edit == "add":
+            regions.append(_region("n", [100, 700, 300, 740], "Nuevo"))
+        elif edit == "drawing":
+            drawings[0].points = [10.5, 330.2, 590.7, 350.9]
+        elif edit == "fractional":
+            regions[2].tgt_text = "Interruptor general"
+            drawings[4].points = [5.3, 97.45, 305.5, 62.7, 590.6, 103.15]
+        elif edit == "order":
+            regions[0].render_order = 5
+        else:
+            drawings = []
+
+        incremental, thumb_size = _compose(page, regions, drawings)
+        assert (incremental == _fresh(page, regions, drawings)).all()
+        assert thumb_size == (300, 400)
+
+    def test_unchanged_page_reencodes_nothing(self, page, monkeypatch):
+        regions, drawings = _scene()
+        _compose(page, regions, drawings)
+        encoded = []
+        monkeypatch.setattr(BandedPng, "_encode", lambda self, img, y0: encoded.append(y0))
+        _compose(page, regions, drawings)
+        assert encoded == []
+
+    def test_new_original_forces_full_compose(self, page):
+        regions, drawings = _scene()
+        _compose(page, regions, drawings)
+        Image.new("RGB", (600, 800), (240, 240, 255)).save(page)
+        assert (_compose(page, regions, drawings)[0] == _fresh(page, regions, drawings)).all()
+
+
+class TestComposeEndpoint:
+    @pytest.fixture
+    def repos(self, page):
+        regions, drawings = _scene()
+        repos = {name: MagicMock() for name in ("projects_repo", "text_regions_repo", "drawings_repo", "pages_repo")}
+        glossaries = {name: MagicMock() for name in ("global_glossary_repo", "glossary_repo")}
+        repos["projects_repo"].get.return_value = Project(id="p", name="p", page_count=2)
+        repos["text_regions_repo"].list_by_page.side_effect = lambda *a: copy.deepcopy(regions)
+        repos["drawings_repo"].list_by_page.return_value = drawings
+        repos["pages_repo"].regions_dpi.return_value = None
+        glossaries["global_glossary_repo"].list_all.return_value = []
+        glossaries["glossary_repo"].list_by_project.return_value = []
+        with patch("app.api.pages.PROJECTS_DIR", page.parent.parent.parent), \
+             patch.multiple("app.api.pages", **repos), \
+             patch.multiple("app.services.region_translation", **glossaries):
+            yield regions, drawings
+
+    def test_recompose_reuses_state_of_the_server_process(self, page, repos, monkeypatch):
+        regions, drawings = repos
+        from fastapi.testclient import TestClient
+        from app.main import app
+
+        full = MagicMock(wraps=compose_state.compose_full)
+        monkeypatch.setattr(compose_state, "compose_full", full)
+        url = f"/projects/{page.parent.parent.name}/pages/1/render-translated"
+        # Con el pool de procesos activo la composición sigue en el servidor
+        with use_config_snapshot({"cpu_executor_workers": 2}):
+            client = TestClient(app)
+            for text in ("Contactor", "Contactor auxiliar"):
+                regions[0].tgt_text = text
+                assert client.post(url, params={"dpi": 450}).status_code == 200
+        assert full.call_count == 1
+        output = page.parent / "001_translated_450.png"
+        with Image.open(output) as img:
+            served = np.asarray(img.convert("RGB"))
+        assert (served == _fresh(page, regions, drawings)).all()
+
+
+class TestBandedPng:
+    def test_roundtrip_and_partial_update(self):
+        rng = np.random.default_rng(0)
+        arr = rng.integers(0, 255, (BAND_ROWS * 3 + 5, 37, 3), dtype=np.uint8)
+        png = BandedPng(Image.fromarray(arr))
+        arr[BAND_ROWS + 3:BAND_ROWS + 9] = 7
+        assert png.update_rows(Image.fromarray(arr), [(BAND_ROWS + 3, BAND_ROWS + 9), (BAND_ROWS, BAND_ROWS + 1)]) == 1
+        with Image.open(io.BytesIO(png.to_bytes())) as decoded:
+            assert (np.asarray(decoded) == arr).all()
+
+    def test_adler32_combine(self):
+        a, b = b"composicion ", b"incremental" * 50
+        assert adler32_combine(zlib.adler32(a), zlib.adler32(b), len(b)) == zlib.adler32(a + b)
@@ -0,0 +1,86 @@
+"""
+Tests de la composición independiente de la resolución (regiones a un DPI,
+salida a otro).
+"""
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from app.db.models import DrawingElement, TextRegion
+from app.services import compose_service, compose_state
+
+
+@pytest.fixture(autouse=True)
+def clean_states():
+    compose_state.clear_states()
+    yield
+    compose_state.clear_states()
+
+
+def _page(tmp_path, dpi, size):
+    path = tmp_path / "pages" / f"001_original_{dpi}.png"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    Image.new("RGB", size, "white").save(path)
+    return path
+
+
+def _painted_box(path, color):
+    with Image.open(path) as img:
+        arr = np.asarray(img.convert("RGB"))
+    ys, xs = np.nonzero((arr == color).all(axis=2))
+    return xs.min(), ys.min(), xs.max(), ys.max()
+
+
+def _scene():
+    region = TextRegion(
+        id="r", project_id="p", page_number=1, bbox=[300, 600, 900, 720], bbox_normalized=[0, 0, 0, 0],
+        src_text="继电器", tgt_text="Relé", bg_color="#ffff00", font_size=60,
+    )
+    line = DrawingElement(
+        id="d", project_id="p", page_number=1, element_type="line", points=[150, 1500, 1350, 1500],
+        stroke_color="#0000ff", stroke_width=1,
+    )
+    return [region], [line]
+
+
+class TestResolutionIndependentCompose:
+    def test_preview_maps_source_pixels_to_target_dpi(self, tmp_path):
+        regions, drawings = _scene()
+        full = compose_service.compose_page_with_drawings(
+            _page(tmp_path, 450, (1500, 2100)), regions, drawings, tmp_path, 1, 450, source_dpi=450,
+        )
+        preview = compose_service.compose_page_with_drawings(
+            _page(tmp_path, 150, (500, 700)), regions, drawings, tmp_path, 1, 150, source_dpi=450,
+        )
+
+        fx1, fy1, fx2, fy2 = _painted_box(full, (255, 255, 0))
+        px1, py1, px2, py2 = _painted_box(preview, (255, 255, 0))
+        assert abs(px1 - fx1 / 3) <= 1 and abs(py1 - fy1 / 3) <= 1
+        assert abs(px2 - fx2 / 3) <= 1 and abs(py2 - fy2 / 3) <= 1
+
+        lx1, ly1, lx2, _ = _painted_box(preview, (0, 0, 255))
+        assert (lx1, lx2) == (50, 450) and abs(ly1 - 500) <= 1
+
+    def test_fixed_font_size_scales_with_dpi(self, tmp_path):
+        regions, _ = _scene()
+        regions[0].font_family = "DejaVuSans"
+        heights = []
+        for dpi, size in ((450, (1500, 2100)), (150, (500, 700))):
+            out = compose_service.compose_page(_page(tmp_path, dpi, size), regions, tmp_path, 1, dpi, source_dpi=450)
+            with Image.open(out) as img:
+                ys = np.nonzero((np.asarray(img.convert("L")) < 128).any(axis=1))[0]
+            heights.append(ys.max() - ys.min())
+        assert abs(heights[1] - heights[0] / 3) <= 2
+
+    def test_same_dpi_leaves_regions_untouched(self, tmp_path):
+        regions, drawings = _scene()
+        path = _page(tmp_path, 450, (1500, 2100))
+        scaled = compose_service.compose_page_with_drawings(path, regions, drawings, tmp_path, 1, 450, source_dpi=450)
+        with Image.open(scaled) as img:
+            first = np.asarray(img.convert("RGB")).copy()
+        compose_state.clear_states()
+        default = compose_service.compose_page_with_drawings(path, regions, drawings, tmp_path, 1, 450)
+        with Image.open(default) as img:
+            assert (np.asarray(img.convert("RGB")) == first).all()
+        assert regions[0].bbox == [300, 600, 900, 720]
@@ -0,0 +1,86 @@
+"""
+Tests de la caché de configuración (recarga por mtime/tamaño y snapshots).
+"""
+
+import dataclasses
+import json
+import os
+
+import pytest
+
+from app import config, settings_cache
+
+
+@pytest.fixture
+def config_file(tmp_path, monkeypatch):
+    path = tmp_path / "config.json"
+    monkeypatch.setattr(config, "CONFIG_FILE", path)
+    monkeypatch.setattr(settings_cache, "_config_cache", None)
+    monkeypatch.setattr(settings_cache, "_config_cache_key", None)
+    return path
+
+
+def _write(path, data, mtime_ns=None):
+    path.write_text(json.dumps(data), encoding="utf-8")
+    if mtime_ns is not None:
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+class TestConfigCache:
+    def test_parses_file_once_while_unchanged(self, config_file, monkeypatch):
+        _write(config_file, {"ocr_engine": "paddleocr"})
+        calls = []
+        original = config.load_config_file
+        monkeypatch.setattr(config, "load_config_file", lambda: calls.append(1) or original())
+
+        for _ in range(10):
+            assert settings_cache.get_ocr_engine() == "paddleocr"
+            settings_cache.get_min_han_ratio()
+        assert len(calls) == 1
+
+    def test_reloads_when_file_changes(self, config_file):
+        _write(config_file, {"ocr_mode": "basic"}, mtime_ns=1_000_000_000)
+        assert settings_cache.get_ocr_mode() == "basic"
+        _write(config_file, {"ocr_mode": "advanced"}, mtime_ns=2_000_000_000)
+        assert settings_cache.get_ocr_mode() == "advanced"
+
+    def test_save_config_refreshes_cache(self, config_file):
+        _write(config_file, {"ocr_pool_workers": 0})
+        assert settings_cache.get_ocr_pool_workers() == 0
+        config.save_config({"ocr_engine": "easyocr"})
+        assert settings_cache.get_ocr_engine() == "easyocr"
+        assert json.loads(config_file.read_text(encoding="utf-8")) == {"ocr_engine": "easyocr"}
+
+    def test_settings_are_validated_and_immutable(self, config_file):
+        _write(config_file, {"min_han_ratio": 7, "ocr_engine": "tesseract", "executor_queue_size": "x"})
+        settings = settings_cache.get_settings()
+        assert settings.min_han_ratio == 1.0
+        assert settings.ocr_engine == config.DEFAULT_OCR_ENGINE
+        assert settings.executor_queue_size == config.DEFAULT_EXECUTOR_QUEUE_SIZE
+        with pytest.raises(dataclasses.FrozenInstanceError):
+            settings.ocr_engine = "easyocr"
+
+    def test_get_config_returns_independent_copy(self, config_file):
+        _write(config_file, {"ocr_region_filters": [{"mode": "contains", "pattern": "A"}]})
+        data = settings_cache.get_config()
+        data["ocr_region_filters"].append({"mode": "contains", "pattern": "B"})
+        assert [f["pattern"] for f in settings_cache.get_ocr_region_filters()] == ["A"]
+
+    def test_snapshot_overrides_file(self, config_file):
+        _write(config_file, {"ocr_mode": "basic"})
+        with settings_cache.use_config_snapshot({"ocr_mode": "advanced"}):
+            assert settings_cache.get_ocr_mode() == "advanced"
+            assert settings_cache.get_config() == {"ocr_mode": "advanced"}
+        assert settings_cache.get_ocr_mode() == "basic"
+
+
+class TestSettingsApi:
+    def test_get_settings_reports_recheck_backend(self, config_file):
+        from fastapi.testclient import TestClient
+        from app.main import app
+
+        _write(config_file, {"ocr_recheck_backend": "rapidocr", "ocr_engine": "easyocr"})
+        response = TestClient(app).get("/settings")
+        assert response.status_code == 200
+        assert response.json()["ocr_recheck_backend"] == "rapidocr"
+        assert response.json()["ocr_engine"] == "easyocr"
@@ -0,0 +1,78 @@
+"""
+Tests de los executors acotados (CPU en procesos, E/S en hilos, backpressure).
+"""
+
+import asyncio
+import os
+import threading
+from unittest.mock import patch
+
+import pytest
+
+from app.settings_cache import get_config, use_config_snapshot
+from app.services import executors
+from app.services.executors import BoundedExecutor, ExecutorBusyError
+
+
+@pytest.fixture
+def limits():
+    with patch.object(executors, "get_io_executor_workers", return_value=1), \
+         patch.object(executors, "get_cpu_executor_workers", return_value=1), \
+         patch.object(executors, "get_executor_queue_size", return_value=0):
+        yield
+
+
+class TestBoundedExecutor:
+    def test_thread_executor_keeps_config_snapshot(self, limits):
+        ex = BoundedExecutor("t", use_processes=False)
+
+        async def main():
+            with use_config_snapshot({"ocr_engine": "rapidocr"}):
+                return await ex.run(get_config)
+
+        try:
+            assert asyncio.run(main()) == {"ocr_engine": "rapidocr"}
+        finally:
+            ex.shutdown()
+
+    def test_rejects_when_over_capacity(self, limits):
+        ex = BoundedExecutor("t", use_processes=False)
+        release = threading.Event()
+
+        async def main():
+            first = asyncio.ensure_future(ex.run(release.wait, 5))
+            await asyncio.sleep(0.05)
+            with pytest.raises(ExecutorBusyError):
+                await ex.run(int, "1")
+            release.set()
+            await first
+            # Con la tarea anterior terminada vuelve a admitir trabajo
+            return await ex.run(int, "2")
+
+        try:
+            assert asyncio.run(main()) == 2
+            assert ex.stats()["rejected"] == 1
+            assert ex.stats()["in_flight"] == 0
+        finally:
+            ex.shutdown()
+
+    def test_process_executor_runs_in_child_with_snapshot(self, limits):
+        ex = BoundedExecutor("p", use_processes=True)
+
+        async def main():
+            with use_config_snapshot({"default_dpi": 300}):
+                pid = await ex.run(os.getpid)
+                config = await ex.run(get_config)
+            return pid, config
+
+        try:
+            pid, config = asyncio.run(main())
+        finally:
+            ex.shutdown()
+        assert pid != os.getpid()
+        assert config == {"default_dpi": 300}
+
+    def test_run_cpu_falls_back_to_threads(self):
+        with patch.object(executors, "get_cpu_executor_workers", return_value=0), \
+             patch.object(executors._cpu, "run", side_effect=AssertionError("no debe usarse")):
+            assert asyncio.run(executors.run_cpu(threading.current_thread)).name.startswith("exec-io")
@@ -0,0 +1,74 @@
+"""
+Tests del job de exportación (progreso, cancelación y resultado).
+"""
+
+import pytest
+from PIL import Image
+
+from app.db.models import Project
+from app.services import export_service, job_service
+
+
+@pytest.fixture
+def project(tmp_path, monkeypatch):
+    jobs_dir = tmp_path / "jobs"
+    jobs_dir.mkdir()
+    monkeypatch.setattr(job_service, "JOBS_DIR", jobs_dir)
+    monkeypatch.setattr(job_service, "PROJECTS_DIR", tmp_path)
+    project = Project(id="p1", name="Esquema", page_count=3)
+    monkeypatch.setattr(job_service.projects_repo, "get", lambda pid: project if pid == "p1" else None)
+    pages = tmp_path / "p1" / "pages"
+    pages.mkdir(parents=True)
+    for n in range(3):
+        Image.new("RGB", (200, 280), (255, 255 - 40 * n, 255)).save(pages / f"{n:03d}_translated_150.png")
+    return tmp_path / "p1"
+
+
+class TestExportJob:
+    def test_completes_with_result_and_progress(self, project):
+        job = job_service.create_job("p1", "export")
+        job_service.run_export(job.id, "p1", 150)
+        done = job_service.get_job(job.id)
+        assert (done.status, done.progress) == ("completed", 1.0)
+        assert done.result == str(project / "export" / "export_150.pdf")
+        assert done.current_step == "Completado"
+
+    def test_cancel_stops_between_pages_and_keeps_previous_output(self, project, monkeypatch):
+        job = job_service.create_job("p1", "export")
+        append = export_service._append_image_page
+
+        def append_then_cancel(doc, path, dpi, pno=-1):
+            job_service.cancel_job(job.id)
+            return append(doc, path, dpi, pno)
+
+        monkeypatch.setattr(export_service, "_append_image_page", append_then_cancel)
+        job_service.run_export(job.id, "p1", 150)
+        cancelled = job_service.get_job(job.id)
+        assert cancelled.status == "cancelled" and cancelled.result is None
+        assert not (project / "export" / "export_150.pdf").exists()
+        assert not list((project / "export").glob("*.tmp"))
+
+    def test_cancel_before_start(self, project):
+        job = job_service.create_job("p1", "export")
+        job_service.cancel_job(job.id)
+        job_service.run_export(job.id, "p1", 150)
+        assert job_service.get_job(job.id).status == "cancelled"
+
+    def test_orphan_job_is_marked_cancelled(self, project):
+        job = job_service.create_job("p1", "export")
+        job_service._cancel_events.pop(job.id)  # como si lo hubiera creado otro proceso
+        assert job_service.cancel_job(job.id).status == "cancelled"
+
+    def test_orphan_cancel_before_start_is_not_overwritten(self, project):
+        job = job_service.create_job("p1", "export")
+        job_service._cancel_events.pop(job.id)
+        job_service.cancel_job(job.id)
+        job_service.run_export(job.id, "p1", 150)
+        assert job_service.get_job(job.id).status == "cancelled"
+        assert not (project / "export" / "export_150.pdf").exists()
+
+    def test_missing_project_is_an_error(self, project):
+        job = job_service.create_job("nope", "export")
+        job_service.run_export(job.id, "nope", 150)
+        failed = job_service.get_job(job.id)
+        assert failed.status == "error" and failed.error == "Project not found"
@@ -0,0 +1,113 @@
+"""
+Tests de la exportación PDF por páginas (sin decodificar las imágenes).
+"""
+
+import io
+
+import fitz
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw
+
+from app.services import export_service
+from app.services.png_bands import read_flate_stream
+
+
+def _page_image(size=(300, 420), color=(200, 20, 20)):
+    img = Image.new("RGB", size, "white")
+    ImageDraw.Draw(img).rectangle([20, 30, 120, 90], fill=color)
+    return img
+
+
+def _render(doc, index, dpi):
+    pix = doc[index].get_pixmap(dpi=dpi)
+    return np.frombuffer(pix.samples, np.uint8).reshape(pix.h, pix.w, pix.n)
+
+
+@pytest.fixture
+def project(tmp_path):
+    pages = tmp_path / "pages"
+    pages.mkdir()
+    _page_image().save(pages / "000_translated_150.png")
+    _page_image(color=(0, 0, 255)).save(pages / "001_original_150.png")
+    _page_image().convert("P").save(pages / "002_translated_150.png")  # paleta: se decodifica
+    _page_image().save(pages / "003_original_300.png")  # otro DPI: no se exporta
+    return tmp_path
+
+
+class TestExportPdf:
+    def test_exports_every_page_in_order_with_physical_size(self, project):
+        seen = []
+        out = export_service.export_pdf(project, 4, 150, progress=lambda done, total: seen.append((done, total)))
+        assert seen == [(1, 3), (2, 3), (3, 3)]
+        with fitz.open(out) as doc:
+            assert len(doc) == 3
+            assert doc[0].rect.width == pytest.approx(300 * 72 / 150, abs=1e-3)
+            assert doc[0].rect.height == pytest.approx(420 * 72 / 150, abs=1e-3)
+            expected_pages = [_page_image(), _page_image(color=(0, 0, 255)), _page_image().convert("P").convert("RGB")]
+            for index, expected in enumerate(expected_pages):
+                assert (_render(doc, index, 150) == np.asarray(expected)).all()
+        assert not list((project / "export").glob("*.tmp"))
+
+    def test_png_stream_is_embedded_without_reencoding(self, project):
+        out = export_service.export_pdf(project, 1, 150)
+        idat = read_flate_stream((project / "pages" / "000_translated_150.png").read_bytes()).data
+        with fitz.open(out) as doc:
+            xref = doc[0].get_images()[0][0]
+            assert doc.xref_stream_raw(xref) == idat
+
+    def test_no_images_raises(self, tmp_path):
+        (tmp_path / "pages").mkdir()
+        with pytest.raises(ValueError):
+            export_service.export_pdf(tmp_path, 2, 150)
+
+
+class TestExportCache:
+    def test_unchanged_project_reuses_the_pdf(self, project, monkeypatch):
+        out = export_service.export_pdf(project, 3, 150)
+        mtime = out.stat().st_mtime_ns
+        monkeypatch.setattr(export_service, "_append_image_page", lambda *a, **k: pytest.fail("re-exported"))
+        assert export_service.export_pdf(project, 3, 150) == out
+        assert out.stat().st_mtime_ns == mtime
+
+    def test_only_changed_pages_are_regenerated(self, project, monkeypatch):
+        out = export_service.export_pdf(project, 3, 150)
+        changed = _page_image(color=(0, 160, 0))
+        changed.save(project / "pages" / "001_translated_150.png")  # nueva traducida de la página 1
+
+        appended = []
+        append = export_service._append_image_page
+        monkeypatch.setattr(
+            export_service, "_append_image_page",
+            lambda doc, path, dpi, pno=-1: appended.append(path.name) or append(doc, path, dpi, pno),
+        )
+        export_service.export_pdf(project, 3, 150)
+        assert appended == ["001_translated_150.png"]
+
+        idat = read_flate_stream((project / "pages" / "000_translated_150.png").read_bytes()).data
+        with fitz.open(out) as doc:
+            assert len(doc) == 3
+            assert (_render(doc, 1, 150) == np.asarray(changed)).all()
+            assert (_render(doc, 2, 150) == np.asarray(_page_image().convert("P").convert("RGB"))).all()
+            assert doc.xref_stream_raw(doc[0].get_images()[0][0]) == idat
+
+    def test_page_set_change_rebuilds(self, project):
+        export_service.export_pdf(project, 3, 150)
+        out = export_service.export_pdf(project, 2, 150)
+        with fitz.open(out) as doc:
+            assert len(doc) == 2
+
+
+class TestReadFlateStream:
+    @pytest.mark.parametrize("mode,colors,bits", [("RGB", 3, 8), ("L", 1, 8), ("1", 1, 1)])
+    def test_accepts_8bit_gray_and_rgb_and_1bit(self, mode, colors, bits):
+        buf = io.BytesIO()
+        _page_image().convert(mode).save(buf, "PNG")
+        stream = read_flate_stream(buf.getvalue())
+        assert (stream.width, stream.height, stream.colors, stream.bits) == (300, 420, colors, bits)
+
+    @pytest.mark.parametrize("mode", ["RGBA", "P"])
+    def test_rejects_formats_needing_decode(self, mode):
+        buf = io.BytesIO()
+        _page_image().convert(mode).save(buf, "PNG")
+        assert read_flate_stream(buf.getvalue()) is None
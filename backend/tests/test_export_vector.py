@@ -0,0 +1,137 @@
+"""
+Tests de la exportación vectorial (texto y trazos PDF sobre src.pdf).
+"""
+
+import base64
+import io
+
+import fitz
+import numpy as np
+import pytest
+from PIL import Image
+
+from app.db.models import DrawingElement, TextRegion
+from app.services import export_service, export_vector
+
+
+def _src_pdf(project_dir, rotation=0, cropbox=None, pages=1):
+    doc = fitz.open()
+    for _ in range(pages):
+        page = doc.new_page(width=595, height=842)
+        if cropbox:
+            page.set_cropbox(fitz.Rect(*cropbox))
+        page.set_rotation(rotation)
+    doc.save(project_dir / "src.pdf")
+    doc.close()
+
+
+def _region(bbox, text, **kwargs):
+    return TextRegion(
+        id=text, project_id="p", page_number=0, bbox=bbox, bbox_normalized=[0, 0, 0, 0],
+        src_text="继电器", tgt_text=text, **kwargs,
+    )
+
+
+def _stamp(color):
+    buf = io.BytesIO()
+    Image.new("RGB", (40, 20), color).save(buf, "PNG")
+    return base64.b64encode(buf.getvalue()).decode("ascii")
+
+
+def _render(page, dpi=150):
+    pix = page.get_pixmap(dpi=dpi)
+    return np.frombuffer(pix.samples, np.uint8).reshape(pix.h, pix.w, pix.n).astype(int)
+
+
+def _box(arr, color):
+    ys, xs = np.nonzero((np.abs(arr - color) < 30).all(axis=2))
+    return xs.min(), ys.min(), xs.max(), ys.max()
+
+
+class TestExportVectorPdf:
+    @pytest.mark.parametrize("rotation", [0, 90, 180, 270])
+    @pytest.mark.parametrize("cropbox", [None, (50, 100, 545, 742)])
+    def test_shapes_land_on_the_visible_page_pixels(self, tmp_path, rotation, cropbox):
+        _src_pdf(tmp_path, rotation, cropbox)
+        drawings = [
+            DrawingElement(id="r", project_id="p", page_number=0, element_type="rect",
+                           points=[300, 150, 900, 360], stroke_color="#0000ff", fill_color="#0000ff"),
+            DrawingElement(id="i", project_id="p", page_number=0, element_type="image",
+                           points=[900, 600, 1020, 660], image_data=_stamp((0, 255, 0))),
+        ]
+        # Regiones y dibujos en píxeles de la página visible a 450 DPI -> 150 DPI = /3
+        out = export_vector.export_vector_pdf(tmp_path, [export_vector.VectorPage(0, 450, [], drawings)])
+        with fitz.open(out) as doc:
+            arr = _render(doc[0])
+        assert np.allclose(_box(arr, (0, 0, 255)), (100, 50, 300, 120), atol=2)
+        assert np.allclose(_box(arr, (0, 255, 0)), (300, 200, 340, 220), atol=2)
+
+    @pytest.mark.parametrize("rotation", [0, 90])
+    def test_translation_is_searchable_text_over_the_patch(self, tmp_path, rotation):
+        _src_pdf(tmp_path, rotation)
+        regions = [
+            _region([300, 600, 900, 720], "Relé térmico", bg_color="#ffff00"),
+            _region([300, 900, 900, 1020], "电源 KM1"),
+        ]
+        out = export_vector.export_vector_pdf(tmp_path, [export_vector.VectorPage(0, 450, regions)])
+        with fitz.open(out) as doc:
+            page = doc[0]
+            words = {w[4]: fitz.Rect(w[:4]) * page.rotation_matrix for w in page.get_text("words")}
+            patch = fitz.Rect(_box(_render(page, 72), (255, 255, 0)))
+        assert {"Relé", "térmico", "电源", "KM1"} <= set(words)
+        # Texto dentro del rectángulo de fondo, en la página visible
+        assert patch.contains(words["Relé"].irect) and patch.contains(words["térmico"].irect)
+
+    def test_repeated_snippet_is_embedded_once(self, tmp_path):
+        _src_pdf(tmp_path, pages=2)
+        stamp = _stamp((255, 0, 0))
+        pages = [
+            export_vector.VectorPage(n, 300, [], [
+                DrawingElement(id=f"{n}{k}", project_id="p", page_number=n, element_type="image",
+                               points=[100 + 200 * k, 100, 180 + 200 * k, 140], image_data=stamp)
+                for k in range(3)
+            ])
+            for n in range(2)
+        ]
+        out = export_vector.export_vector_pdf(tmp_path, pages)
+        with fitz.open(out) as doc:
+            xrefs = {img[0] for page in doc for img in page.get_images()}
+        assert len(xrefs) == 1
+
+    def test_untouched_pages_are_kept_and_progress_covers_all(self, tmp_path):
+        _src_pdf(tmp_path, pages=3)
+        seen = []
+        out = export_vector.export_vector_pdf(
+            tmp_path, [export_vector.VectorPage(1, 450, [_region([300, 600, 900, 720], "Relé")])],
+            progress=lambda done, total: seen.append((done, total)),
+        )
+        with fitz.open(out) as doc:
+            assert [bool(page.get_text().strip()) for page in doc] == [False, True, False]
+        assert seen == [(1, 3), (2, 3), (3, 3)]
+        assert not list((tmp_path / "export").glob("*.tmp"))
+
+    def test_unchanged_content_reuses_the_pdf(self, tmp_path):
+        _src_pdf(tmp_path)
+        regions = [_region([300, 600, 900, 720], "Relé")]
+        out = export_vector.export_vector_pdf(tmp_path, [export_vector.VectorPage(0, 450, regions)])
+        mtime = out.stat().st_mtime_ns
+        export_vector.export_vector_pdf(tmp_path, [export_vector.VectorPage(0, 450, regions)])
+        assert out.stat().st_mtime_ns == mtime
+
+        regions[0].tgt_text = "Contactor"
+        export_vector.export_vector_pdf(tmp_path, [export_vector.VectorPage(0, 450, regions)])
+        with fitz.open(out) as doc:
+            assert "Contactor" in doc[0].get_text()
+
+    def test_much_smaller_than_raster_export(self, tmp_path):
+        _src_pdf(tmp_path)
+        regions = [_region([300, 600 + 200 * k, 900, 720 + 200 * k], f"Relé {k}") for k in range(5)]
+        vector = export_vector.export_vector_pdf(tmp_path, [export_vector.VectorPage(0, 450, regions)])
+
+        pages = tmp_path / "pages"
+        pages.mkdir()
+        rng = np.random.default_rng(0)
+        noise = rng.integers(200, 255, (1754, 1240, 3), dtype=np.uint8)  # A4 a 150 DPI, fondo escaneado
+        Image.fromarray(noise).save(pages / "000_translated_150.png")
+        raster = export_service.export_pdf(tmp_path, 1, 150)
+        assert vector.stat().st_size * 10 < raster.stat().st_size
@@ -0,0 +1,64 @@
+"""
+Tests de la caché LRU de páginas decodificadas.
+"""
+
+import os
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from app.services import image_cache
+from app.services.image_cache import ImageCache
+
+
+def _png(path, size=(40, 30), color=(255, 0, 0)):
+    Image.new("RGB", size, color).save(path)
+    return path
+
+
+@pytest.fixture
+def cache():
+    with patch.object(image_cache, "get_image_cache_max_bytes", return_value=10_000):
+        yield ImageCache()
+
+
+class TestImageCache:
+    def test_hit_returns_same_readonly_array(self, cache, tmp_path):
+        path = _png(tmp_path / "000_original_450.png")
+        first = cache.get_array(path)
+        second = cache.get_array(path)
+        assert first is second
+        assert first.shape == (30, 40, 3)
+        assert not first.flags.writeable
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+    def test_rewritten_file_invalidates_entry(self, cache, tmp_path):
+        path = _png(tmp_path / "p.png")
+        cache.get_array(path)
+        _png(path, color=(0, 0, 255))
+        os.utime(path, ns=(1, 1))
+        arr = cache.get_array(path)
+        assert tuple(arr[0, 0]) == (0, 0, 255)
+        assert cache.stats()["entries"] == 1
+
+    def test_evicts_least_recently_used_over_budget(self, cache, tmp_path):
+        # Cada imagen ocupa 3600 bytes: caben dos en 10000
+        a, b, c = (_png(tmp_path / f"{n}.png") for n in "abc")
+        cache.get_array(a)
+        cache.get_array(b)
+        cache.get_array(a)
+        cache.get_array(c)
+        stats = cache.stats()
+        assert stats["entries"] == 2
+        assert stats["bytes"] == 7200
+        assert stats["evictions"] == 1
+        cache.get_array(a)
+        assert cache.stats()["hits"] == 2
+
+    def test_images_over_budget_are_not_cached(self, cache, tmp_path):
+        path = _png(tmp_path / "big.png", size=(100, 100))
+        assert isinstance(cache.get_array(path), np.ndarray)
+        assert cache.stats()["entries"] == 0
@@ -0,0 +1,78 @@
+"""
+Tests del motor compilado de filtros de región OCR.
+"""
+
+import random
+import re
+from collections import Counter
+
+from app.settings_cache import use_config_snapshot
+from app.services.ocr_filters import compile_filters
+
+
+def _reference_filtered(text, filters):
+    """Semántica original: bucle por filtro con re.search sin compilar."""
+    for f in filters:
+        mode, pattern = f.get("mode"), f.get("pattern")
+        if not mode or not pattern:
+            continue
+        cs = bool(f.get("case_sensitive", False))
+        value = text if cs else text.lower()
+        target = pattern if cs else str(pattern).lower()
+        try:
+            if mode == "contains" and target in value:
+                return True
+            if mode == "starts" and value.startswith(target):
+                return True
+            if mode == "ends" and value.endswith(target):
+                return True
+            if mode == "regex" and re.search(str(pattern), text, 0 if cs else re.IGNORECASE):
+                return True
+        except re.error:
+            continue
+    return False
+
+
+_FILTERS = [
+    {"mode": "contains", "pattern": "电源"},
+    {"mode": "contains", "pattern": "AbC", "case_sensitive": True},
+    {"mode": "starts", "pattern": "kM"},
+    {"mode": "starts", "pattern": "继", "case_sensitive": True},
+    {"mode": "ends", "pattern": "器"},
+    {"mode": "ends", "pattern": "Xy", "case_sensitive": True},
+    {"mode": "regex", "pattern": r"^\d+[A-Z]$"},
+    {"mode": "regex", "pattern": r"(ab)\1", "case_sensitive": True},
+    {"mode": "regex", "pattern": r"(?i)^zz"},
+    {"mode": "regex", "pattern": r"^q|制9"},
+    {"mode": "regex", "pattern": r"([unclosed"},
+    {"mode": "contains", "pattern": ""},
+]
+
+
+class TestRegionFilter:
+    def test_matches_reference_semantics(self):
+        rng = random.Random(0)
+        alphabet = "电源继器控制abcABCkmKMxyXYZz0123456789 "
+        texts = ["".join(rng.choice(alphabet) for _ in range(rng.randint(1, 12))) for _ in range(3000)]
+        texts += ["继电器", "KM1", "abab", "ABAB", "12B", "zzTop", "ZZtop", "电源模块", "fooXy", "fooxy"]
+        region_filter = compile_filters(_FILTERS)
+        for text in texts:
+            assert (region_filter.match(text) is not None) == _reference_filtered(text, _FILTERS), text
+
+    def test_reports_hits_per_filter(self):
+        region_filter = compile_filters(_FILTERS)
+        hits = Counter()
+        for text in ["电源模块", "电源", "km1", "12B", "继电路"]:
+            idx = region_filter.match(text)
+            if idx is not None:
+                hits[idx] += 1
+        report = region_filter.report(hits)
+        assert report[0] == {"mode": "contains", "pattern": "电源", "case_sensitive": False, "hits": 2}
+        assert sum(r["hits"] for r in report) == 5
+
+    def test_compiled_once_per_filter_set(self):
+        assert compile_filters(_FILTERS) is compile_filters([dict(f) for f in _FILTERS])
+
+    def test_none_uses_global_filters(self):
+        with use_config_snapshot({"ocr_region_filters": [{"mode": "contains", "pattern": "QF"}]}):
+            assert compile_filters(None).match("QF1") == 0
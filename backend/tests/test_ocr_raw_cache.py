@@ -0,0 +1,88 @@
+"""
+Tests de la caché de salida OCR en bruto y del re-filtrado sin motor.
+"""
+
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from app.settings_cache import use_config_snapshot
+from app.services import ocr_postprocess, ocr_provider, ocr_raw_cache, ocr_service_rapid
+
+_RAW = [
+    [[[10, 10], [200, 10], [200, 40], [10, 40]], "继电器控制回路", 0.95],
+    [[[10, 100], [120, 100], [120, 130], [10, 130]], "电源模块输入", 0.9],
+    [[[300, 300], [330, 300], [330, 320], [300, 320]], "继电", 0.9],
+    [[[400, 10], [460, 10], [460, 30], [400, 30]], "K1", 0.99],
+]
+
+
+@pytest.fixture
+def page_path(tmp_path):
+    path = tmp_path / "proj" / "pages" / "001_original_450.png"
+    path.parent.mkdir(parents=True)
+    Image.fromarray(np.full((400, 600, 3), 255, dtype=np.uint8)).save(path)
+    return path
+
+
+@pytest.fixture
+def engine():
+    with use_config_snapshot({"ocr_engine": "rapidocr", "ocr_enable_label_recheck": False}), \
+         patch.object(ocr_service_rapid, "run_engine", return_value=_RAW) as run_engine:
+        yield run_engine
+
+
+def _texts(regions):
+    return sorted(r.src_text for r in regions)
+
+
+class TestRawOcrCache:
+    def test_second_detection_skips_engine(self, page_path, engine):
+        first = ocr_provider.detect_text(page_path, 450)
+        second = ocr_provider.detect_text(page_path, 450)
+        assert engine.call_count == 1
+        assert _texts(first) == _texts(second) == ["电源模块输入", "继电", "继电器控制回路"]
+        assert ocr_raw_cache.cache_path(page_path, "rapidocr").exists()
+        assert second[0].project_id == "proj" and second[0].page_number == 1
+
+    def test_refilter_applies_new_filters_without_engine(self, page_path, engine):
+        ocr_provider.detect_text(page_path, 450)
+        regions = ocr_provider.refilter_text(
+            page_path, 450, custom_filters=[{"mode": "contains", "pattern": "电源"}]
+        )
+        assert engine.call_count == 1
+        assert _texts(regions) == ["继电", "继电器控制回路"]
+
+    def test_rerendered_image_invalidates_entry(self, page_path, engine):
+        ocr_provider.detect_text(page_path, 450)
+        Image.fromarray(np.zeros((400, 600, 3), dtype=np.uint8)).save(page_path)
+        with pytest.raises(ocr_provider.RawOcrMissingError):
+            ocr_provider.refilter_text(page_path, 450)
+        ocr_provider.detect_text(page_path, 450)
+        assert engine.call_count == 2
+
+    def test_digest_memo_keeps_one_entry_per_file(self, page_path):
+        first = ocr_raw_cache.image_digest(page_path)
+        entries = len(ocr_raw_cache._digests)
+        Image.fromarray(np.zeros((400, 600, 3), dtype=np.uint8)).save(page_path)
+        second = ocr_raw_cache.image_digest(page_path)
+        assert first != second
+        assert len(ocr_raw_cache._digests) == entries
+        assert ocr_raw_cache._digests[str(page_path.resolve())][2] == second
+
+    def test_recheck_readings_are_reused(self, page_path, engine):
+        reads = []
+
+        class _Backend:
+            def read(self, batch):
+                reads.append(len(batch.indexes))
+                return [("K1", 0.9)] * len(batch.indexes)
+
+        with use_config_snapshot({"ocr_engine": "rapidocr", "ocr_enable_label_recheck": True}), \
+             patch.dict(ocr_postprocess._RECHECK_BACKENDS, {"rapidocr": _Backend}):
+            first = ocr_provider.detect_text(page_path, 450)
+            second = ocr_provider.refilter_text(page_path, 450)
+        assert reads == [1]
+        assert _texts(first) == _texts(second) == ["电源模块输入", "继电器控制回路"]
@@ -0,0 +1,65 @@
+"""
+Tests del almacén SQLite de proyectos (migración desde JSON y escrituras por fila).
+"""
+
+import json
+
+import pytest
+
+from app.db.project_store import ProjectStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    s = ProjectStore(tmp_path / "projects.sqlite3", projects_dir=tmp_path / "projects")
+    yield s
+    s.close()
+
+
+def _region(rid, page=0, text="继电器"):
+    return {"id": rid, "project_id": "p1", "page_number": page, "src_text": text}
+
+
+class TestProjectStore:
+    def test_migrates_legacy_json_once(self, store, tmp_path):
+        project_dir = tmp_path / "projects" / "p1"
+        project_dir.mkdir(parents=True)
+        legacy = project_dir / "text_regions.json"
+        legacy.write_text(json.dumps([_region("a"), _region("b", page=1)]), encoding="utf-8")
+
+        loaded = store.load("text_regions", "p1")
+
+        assert [r["id"] for r in loaded] == ["a", "b"]
+        assert not legacy.exists()
+        assert (project_dir / "text_regions.json.bak").exists()
+        assert [r["id"] for r in store.load("text_regions", "p1")] == ["a", "b"]
+
+    def test_upsert_updates_single_row(self, store):
+        store.upsert("text_regions", [_region("a"), _region("b")])
+        store.upsert("text_regions", [_region("a", text="急停")])
+
+        by_id = {r["id"]: r for r in store.load("text_regions", "p1")}
+        assert by_id["a"]["src_text"] == "急停"
+        assert by_id["b"]["src_text"] == "继电器"
+
+    def test_pages_keyed_by_project_and_number(self, store):
+        store.upsert("pages", [{"project_id": "p1", "page_number": 0, "has_original": True}])
+        store.upsert("pages", [{"project_id": "p1", "page_number": 0, "has_translated": True}])
+        store.upsert("pages", [{"project_id": "p2", "page_number": 0}])
+
+        assert store.load("pages", "p1") == [{"project_id": "p1", "page_number": 0, "has_translated": True}]
+
+    def test_transaction_rolls_back_on_error(self, store):
+        store.upsert("glossary", [{"id": "g1", "project_id": "p1"}])
+        with pytest.raises(RuntimeError):
+            with store.transaction() as conn:
+                store.delete("glossary", ["g1"], conn=conn)
+                raise RuntimeError("fallo")
+        assert [e["id"] for e in store.load("glossary", "p1")] == ["g1"]
+
+    def test_delete_project(self, store):
+        store.upsert("text_regions", [_region("a")])
+        store.upsert("drawings", [{"id": "d1", "project_id": "p1", "page_number": 0}])
+        store.delete_project("p1")
+        assert store.load("text_regions", "p1") == []
+        assert store.load("drawings", "p1") == []
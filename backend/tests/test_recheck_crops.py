@@ -0,0 +1,114 @@
+"""
+Tests de los recortes por lotes del recheck OCR EN.
+"""
+
+from unittest.mock import patch
+
+import numpy as np
+from PIL import Image
+
+from app.db.models import TextRegion
+from app.services import ocr_postprocess
+from app.services.recheck_crops import iter_crop_batches, padded_boxes
+
+
+def _page(h=400, w=600):
+    rng = np.random.default_rng(0)
+    return rng.integers(0, 256, size=(h, w, 3), dtype=np.uint8)
+
+
+def _region(i, bbox, text="K1"):
+    return TextRegion(
+        id=str(i), project_id="p", page_number=0, bbox=bbox,
+        bbox_normalized=[0, 0, 0, 0], src_text=text, confidence=0.9,
+    )
+
+
+class TestCropBatches:
+    def test_unscaled_crops_match_slices(self):
+        page = _page()
+        bboxes = [[10, 20, 60, 45], [100, 100, 140, 130], [590, 390, 600, 400]]
+        boxes = padded_boxes(bboxes, 600, 400)
+        crops = {}
+        for batch in iter_crop_batches(page, bboxes, scale=1.0):
+            for idx, img in zip(batch.indexes, batch.images):
+                crops[idx] = img
+        for i, (l, t, r, b) in enumerate(boxes.tolist()):
+            np.testing.assert_array_equal(crops[i][: b - t, : r - l], page[t:b, l:r])
+            assert (crops[i][b - t:, :] == 255).all()
+
+    def test_scaled_crops_close_to_pil_resize(self):
+        page = np.zeros((300, 300, 3), dtype=np.uint8)
+        page[:, :, 0] = np.linspace(0, 255, 300, dtype=np.uint8)[None, :]
+        (batch,) = list(iter_crop_batches(page, [[30, 30, 150, 90]], scale=1 / 3))
+        l, t, r, b = padded_boxes([[30, 30, 150, 90]], 300, 300)[0].tolist()
+        expected = np.asarray(Image.fromarray(page[t:b, l:r]).resize(((r - l) // 3, (b - t) // 3), Image.BILINEAR))
+        got = batch.images[0][: expected.shape[0], : expected.shape[1]]
+        assert np.abs(got.astype(int) - expected.astype(int)).max() <= 6
+
+    def test_similar_sizes_share_a_batch(self):
+        page = _page()
+        bboxes = [[0, 0, 40, 20], [50, 50, 88, 68], [200, 200, 400, 300]]
+        batches = list(iter_crop_batches(page, bboxes, scale=1.0))
+        assert sorted(len(b.indexes) for b in batches) == [1, 2]
+        for b in batches:
+            assert b.images.ndim == 4
+
+
+class _FakeReader:
+    def __init__(self):
+        self.batch_sizes = []
+
+    def readtext_batched(self, images):
+        self.batch_sizes.append(len(images))
+        return [[([[0, 0]], "K1", 0.95)] for _ in images]
+
+    def readtext(self, image):
+        self.batch_sizes.append(1)
+        return [([[0, 0]], "K1", 0.95)]
+
+
+class TestRecheckUsesSingleDecode:
+    def test_page_loaded_once_and_labels_dropped(self, tmp_path):
+        path = tmp_path / "000_original_450.png"
+        Image.fromarray(_page()).save(path)
+        regions = [_region(i, [10 + i * 50, 10, 40 + i * 50, 30]) for i in range(6)]
+        regions.append(_region(99, [0, 200, 300, 260], text="继电器控制回路"))
+        reader = _FakeReader()
+        with patch.object(ocr_postprocess, "get_ocr_recheck_backend", return_value="easyocr"), \
+             patch.object(ocr_postprocess, "_get_easyocr_en_reader", return_value=reader), \
+             patch.object(ocr_postprocess.image_cache, "get_array", wraps=ocr_postprocess.image_cache.get_array) as get_array:
+            out = ocr_postprocess.recheck_suspicious_regions(path, regions, 200, source_dpi=450, target_dpi=150)
+        assert get_array.call_count == 1
+        assert reader.batch_sizes == [6]
+        assert [r.id for r in out] == ["99"]
+
+
+class _FakeRapidRecognizer:
+    def __init__(self):
+        self.calls = []
+
+    def text_rec(self, crops):
+        self.calls.append([c.shape for c in crops])
+        texts = [("K1", 0.9) if c.shape[1] < 20 else ("继电器", 0.9) for c in crops]
+        return texts, 0.01
+
+
+class TestRapidRecheckBackend:
+    def test_recognition_only_on_unpadded_bgr_crops(self, tmp_path):
+        path = tmp_path / "000_original_450.png"
+        Image.fromarray(_page()).save(path)
+        regions = [_region(0, [10, 10, 20, 20], "继电"), _region(1, [100, 100, 190, 112], "继电")]
+        recognizer = _FakeRapidRecognizer()
+        engine = type("Engine", (), {})()
+        engine.text_rec = recognizer.text_rec
+        with patch.object(ocr_postprocess, "get_ocr_recheck_backend", return_value="rapidocr"), \
+             patch("app.services.ocr_service_rapid._get_ocr", return_value=engine), \
+             patch.object(ocr_postprocess, "_get_easyocr_en_reader", side_effect=AssertionError("no EasyOCR")):
+            out = ocr_postprocess.filter_regions_advanced(
+                path, regions, min_ocr_confidence=0.5, enable_label_recheck=True,
+                recheck_max_regions_per_page=200, source_dpi=450, target_dpi=450,
+            )
+        assert [r.id for r in out] == ["1"]
+        shapes = sorted(shape for call in recognizer.calls for shape in call)
+        assert shapes == [(12, 12, 3), (14, 92, 3)]
@@ -0,0 +1,95 @@
+"""
+Tests de la rasterización única con vista previa/thumbnail derivados y su manifiesto.
+"""
+
+import fitz
+import numpy as np
+import pytest
+from PIL import Image
+
+from app.services import render_service
+
+
+@pytest.fixture
+def project(tmp_path):
+    doc = fitz.open()
+    for rotation in (0, 90):
+        page = doc.new_page(width=300.5, height=200.3)
+        page.draw_rect(fitz.Rect(20, 30, 120, 90), color=(1, 0, 0), fill=(0, 0, 1))
+        page.set_rotation(rotation)
+    doc.save(tmp_path / "src.pdf")
+    doc.close()
+    return tmp_path
+
+
+@pytest.fixture
+def rasterizations(monkeypatch):
+    seen = []
+    get_pixmap = fitz.Page.get_pixmap
+
+    def _counting(page, *args, **kwargs):
+        seen.append(page.number)
+        return get_pixmap(page, *args, **kwargs)
+
+    monkeypatch.setattr(fitz.Page, "get_pixmap", _counting)
+    return seen
+
+
+def _direct(project, page_number, dpi):
+    with fitz.open(project / "src.pdf") as doc:
+        pix = doc[page_number].get_pixmap(dpi=dpi)
+        return np.frombuffer(pix.samples, np.uint8).reshape(pix.h, pix.w, pix.n).astype(int)
+
+
+def _read(path):
+    with Image.open(path) as img:
+        return np.asarray(img.convert("RGB")).astype(int)
+
+
+class TestRenderDerivatives:
+    @pytest.mark.parametrize("page_number", [0, 1])
+    def test_one_rasterization_gives_page_preview_and_thumbnail(self, project, rasterizations, page_number):
+        path = render_service.render_page(project / "src.pdf", page_number, 450, project)
+        assert rasterizations == [page_number]
+
+        assert (_read(path) == _direct(project, page_number, 450)).all()
+        preview = _read(render_service.page_path(project, page_number, 150))
+        direct = _direct(project, page_number, 150)
+        assert preview.shape == direct.shape
+        assert np.abs(preview - direct).mean() < 3
+        assert (_read(render_service.thumbnail_path(project, page_number)) == preview).all()
+
+        manifest = render_service.page_manifest(project, page_number)
+        assert manifest["source_dpi"] == 450 and manifest["dpis"] == [150, 450] and manifest["thumbnail"]
+        assert not list((project / "pages").glob("*.tmp"))
+
+    def test_thumbnails_only_then_full_render_keeps_derivatives(self, project, rasterizations):
+        render_service.render_thumbnails_only(project / "src.pdf", project)
+        assert rasterizations == [0, 1]
+        thumb = render_service.thumbnail_path(project, 1)
+        assert (_read(thumb) == _direct(project, 1, 150)).all()
+        assert render_service.page_manifest(project, 1)["dpis"] == [150]
+
+        mtime = thumb.stat().st_mtime_ns
+        render_service.render_page(project / "src.pdf", 1, 450, project)
+        assert thumb.stat().st_mtime_ns == mtime
+        assert render_service.page_manifest(project, 1)["source_dpi"] == 450
+
+    def test_ensure_page_derives_lower_dpi_from_the_source(self, project, monkeypatch):
+        render_service.render_page(project / "src.pdf", 1, 450, project)
+        monkeypatch.setattr(fitz, "open", lambda *a, **k: pytest.fail("volvió al PDF"))
+        path = render_service.ensure_page(project / "src.pdf", 1, 300, project)
+        monkeypatch.undo()
+
+        derived, direct = _read(path), _direct(project, 1, 300)
+        assert derived.shape == direct.shape
+        assert np.abs(derived - direct).mean() < 3
+        assert render_service.page_manifest(project, 1)["dpis"] == [150, 300, 450]
+
+    def test_in_memory_render_writes_only_derivatives(self, project, rasterizations):
+        page = render_service.render_page_array(project / "src.pdf", 0, 450, project)
+        assert rasterizations == [0]
+        assert (page == _direct(project, 0, 450)).all()
+        assert not render_service.page_path(project, 0, 450).exists()
+        assert render_service.page_path(project, 0, 150).exists()
+        assert render_service.thumbnail_path(project, 0).exists()
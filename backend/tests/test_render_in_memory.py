@@ -0,0 +1,108 @@
+"""
+Tests del render en memoria y su entrega al OCR sin pasar por PNG.
+"""
+
+import gc
+from unittest.mock import patch
+
+import fitz
+import numpy as np
+import pytest
+from PIL import Image
+
+from app.settings_cache import use_config_snapshot
+from app.services import image_cache, ocr_pool, ocr_postprocess, ocr_provider, ocr_service_rapid, render_service
+
+_RAW = [
+    [[[10, 10], [200, 10], [200, 40], [10, 40]], "继电器控制回路", 0.95],
+    [[[400, 10], [430, 10], [430, 30], [400, 30]], "K1", 0.99],
+]
+# Texto corto no descartado de entrada: pasa por el recheck de etiquetas
+_SHORT = [[[100, 300], [140, 300], [140, 320], [100, 320]], "电机", 0.9]
+
+
+@pytest.fixture
+def project(tmp_path):
+    doc = fitz.open()
+    page = doc.new_page(width=300, height=200)
+    page.draw_rect(fitz.Rect(20, 30, 120, 90), color=(1, 0, 0), fill=(0, 0, 1))
+    page.set_rotation(90)
+    doc.save(tmp_path / "src.pdf")
+    doc.close()
+    return tmp_path
+
+
+@pytest.fixture
+def engine():
+    with use_config_snapshot({"ocr_engine": "rapidocr", "ocr_enable_label_recheck": False}), \
+         patch.object(ocr_service_rapid, "run_engine", return_value=_RAW) as run_engine:
+        yield run_engine
+
+
+class TestRenderPageArray:
+    def test_matches_png_render_without_copy(self, project):
+        page = render_service.render_page_array(project / "src.pdf", 0, 150, project)
+        png = render_service.render_page(project / "src.pdf", 0, 150, project)
+        gc.collect()  # el array mantiene vivo el pixmap
+        with Image.open(png) as img:
+            assert (np.asarray(img.convert("RGB")) == page).all()
+        assert page.shape == (625, 417, 3) and not page.flags.owndata and not page.flags.writeable
+        assert (project / "thumbs" / "000_original.png").exists()
+
+    def test_save_page_png_roundtrip(self, project):
+        page = render_service.render_page_array(project / "src.pdf", 0, 150, project)
+        path = render_service.save_page_png(page, project / "pages" / "000_original_150.png")
+        with Image.open(path) as img:
+            assert (np.asarray(img) == page).all()
+        assert not list(path.parent.glob("*.tmp"))
+
+
+class TestOcrOnRenderedPage:
+    def test_engine_gets_the_array_and_png_is_persisted(self, project, engine, monkeypatch):
+        page = render_service.render_page_array(project / "src.pdf", 0, 150, project)
+        path = project / "pages" / "000_original_150.png"
+        monkeypatch.setattr(image_cache, "get_array", lambda p: pytest.fail("decodificó la PNG"))
+
+        regions = ocr_provider.detect_text(path, 150, page=page)
+        assert engine.call_args[0][0] is page
+        assert [r.src_text for r in regions] == ["继电器控制回路"]
+        with Image.open(path) as img:
+            assert (np.asarray(img) == page).all()
+
+        # La caché en bruto queda con la clave de la PNG: la siguiente lectura no pasa por el motor
+        monkeypatch.undo()
+        ocr_provider.detect_text(path, 150)
+        assert engine.call_count == 1
+
+    def test_recheck_crops_from_the_array(self, project, monkeypatch):
+        page = render_service.render_page_array(project / "src.pdf", 0, 150, project)
+        monkeypatch.setattr(image_cache, "get_array", lambda p: pytest.fail("decodificó la PNG"))
+        seen = []
+
+        class _Backend:
+            def read(self, batch):
+                seen.append(len(batch.indexes))
+                return [("K1", 0.9)] * len(batch.indexes)
+
+        with use_config_snapshot({"ocr_engine": "rapidocr", "ocr_enable_label_recheck": True}), \
+             patch.object(ocr_service_rapid, "run_engine", return_value=_RAW + [_SHORT]), \
+             patch.dict(ocr_postprocess._RECHECK_BACKENDS, {"rapidocr": _Backend}):
+            ocr_provider.detect_text(project / "pages" / "000_original_150.png", 150, page=page)
+        assert seen == [1]
+
+    def test_pool_worker_reads_page_from_shared_memory(self, project, monkeypatch):
+        page = render_service.render_page_array(project / "src.pdf", 0, 150, project)
+        seen = []
+        # Sin Mock: call_args retendría la vista y el worker no podría cerrar el segmento
+        monkeypatch.setattr(ocr_service_rapid, "run_engine", lambda arr: seen.append(arr.copy()) or _RAW)
+        shm, shared_page = ocr_pool._share_page(page)
+        try:
+            payload = ocr_pool._detect_in_worker(
+                project / "pages" / "000_original_150.png", 150, None, "schematic",
+                {"ocr_engine": "rapidocr", "ocr_enable_label_recheck": False}, shared_page,
+            )
+            assert (seen[0] == page).all()
+            assert [item["src_text"] for item in payload] == ["继电器控制回路"]
+        finally:
+            shm.close()
+            shm.unlink()
@@ -0,0 +1,157 @@
+"""
+Tests del pipeline de render-all (modo secuencial y modo pipeline).
+Las fases reales (PyMuPDF, OCR, DeepL, PIL) se sustituyen por funciones falsas.
+"""
+
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+from app.db.models import TextRegion
+from app.services import page_stages, render_pipeline
+
+
+@pytest.fixture
+def ctx(tmp_path):
+    return render_pipeline.PageContext(
+        project_id="p1",
+        project_dir=tmp_path,
+        dpi=150,
+        document_type="schematic",
+        glossary_map={},
+    )
+
+
+def _fake_steps(log, delay=0.0, fail_on=None):
+    lock = threading.Lock()
+
+    def make(stage):
+        def step(ctx, work):
+            if fail_on == (stage, work.page_num):
+                raise RuntimeError(f"boom {stage} {work.page_num}")
+            time.sleep(delay)
+            with lock:
+                log.append((stage, work.page_num))
+            return work
+        return step
+
+    return {stage: make(stage) for stage in render_pipeline.STAGES}
+
+
+class TestRunSequential:
+    def test_stages_in_page_order(self, ctx):
+        log = []
+        events = []
+        with patch.dict(page_stages.STEP_FUNCS, _fake_steps(log)):
+            render_pipeline.run_sequential(ctx, 2, lambda s, p, e: events.append((s, p, e)))
+        assert log == [(s, p) for p in range(2) for s in render_pipeline.STAGES]
+        assert len(events) == 2 * len(render_pipeline.STAGES) * 2
+
+
+class TestRunPipelined:
+    def test_every_page_goes_through_every_stage_in_order(self, ctx):
+        log = []
+        with patch.dict(page_stages.STEP_FUNCS, _fake_steps(log, delay=0.01)):
+            render_pipeline.run_pipelined(ctx, 5, lambda s, p, e: None, queue_size=1)
+        for page in range(5):
+            stages_seen = [s for s, p in log if p == page]
+            assert stages_seen == list(render_pipeline.STAGES)
+        for stage in render_pipeline.STAGES:
+            assert [p for s, p in log if s == stage] == list(range(5))
+
+    def test_stages_overlap_across_pages(self, ctx):
+        log = []
+        with patch.dict(page_stages.STEP_FUNCS, _fake_steps(log, delay=0.02)):
+            render_pipeline.run_pipelined(ctx, 4, lambda s, p, e: None)
+        # La página 1 se renderiza antes de que la página 0 termine de componerse
+        assert log.index(("render", 1)) < log.index(("compose", 0))
+
+    def test_multiple_workers_in_one_stage(self, ctx):
+        log = []
+        with patch.dict(page_stages.STEP_FUNCS, _fake_steps(log, delay=0.01)):
+            render_pipeline.run_pipelined(ctx, 7, lambda s, p, e: None, stage_workers={"ocr": 3})
+        for stage in render_pipeline.STAGES:
+            assert sorted(p for s, p in log if s == stage) == list(range(7))
+
+    def test_error_in_stage_is_raised(self, ctx):
+        log = []
+        steps = _fake_steps(log, fail_on=("ocr", 2))
+        with patch.dict(page_stages.STEP_FUNCS, steps):
+            with pytest.raises(RuntimeError, match="boom ocr 2"):
+                render_pipeline.run_pipelined(ctx, 6, lambda s, p, e: None, queue_size=1)
+        assert ("compose", 2) not in log
+
+
+class TestRunBatched:
+    def test_translates_whole_project_once(self, ctx):
+        log = []
+        steps = _fake_steps(log)
+
+        def ocr(ctx, work):
+            work.regions = [
+                TextRegion(
+                    id=f"{work.page_num}-{i}",
+                    project_id="p1",
+                    page_number=work.page_num,
+                    bbox=[0, 0, 10, 10],
+                    bbox_normalized=[0, 0, 0.1, 0.1],
+                    src_text=text,
+                )
+                for i, text in enumerate(["继电器", "急停"])
+            ]
+            return work
+
+        steps["ocr"] = ocr
+        calls = []
+
+        def fake_translate(texts, **kwargs):
+            calls.append(list(texts))
+            return [f"ES:{t}" for t in texts]
+
+        saved = {}
+        with patch.dict(page_stages.STEP_FUNCS, steps), \
+             patch("app.services.region_translation.get_ocr_mode", return_value="basic"), \
+             patch("app.services.region_translation.translate_service.translate_batch", fake_translate), \
+             patch("app.services.page_stages.text_regions_repo.replace_for_page",
+                   lambda pid, page, regions: saved.__setitem__(page, regions)):
+            render_pipeline.run_batched(ctx, 3, lambda s, p, e: None)
+
+        assert len(calls) == 1
+        assert len(calls[0]) == 6
+        assert sorted(saved) == [0, 1, 2]
+        assert saved[2][0].tgt_text == "ES:继电器"
+        assert [p for s, p in log if s == "compose"] == [0, 1, 2]
+
+
+class TestTranslateBatchChunking:
+    def test_dedupes_and_chunks(self):
+        from app.services import translate_service
+
+        sent = []
+
+        class FakeResult:
+            def __init__(self, text):
+                self.text = text
+
+        class FakeTranslator:
+            def __init__(self, key):
+                pass
+
+            def translate_text(self, texts, source_lang, target_lang):
+                sent.append(list(texts))
+                return [FakeResult(f"ES:{t}") for t in texts]
+
+        texts = [f"t{i % 120}" for i in range(600)]
+        fake_deepl = type("deepl", (), {"Translator": FakeTranslator})
+        with patch.object(translate_service, "_get_api_key", return_value="key"), \
+             patch.object(translate_service, "get_translation_memory_enabled", return_value=False), \
+             patch.dict(translate_service._translators, clear=True), \
+             patch.dict("sys.modules", {"deepl": fake_deepl}):
+            out = translate_service.translate_batch(texts)
+
+        assert out == [f"ES:{t}" for t in texts]
+        assert sum(len(c) for c in sent) == 120
+        assert all(len(c) <= translate_service.DEEPL_MAX_TEXTS_PER_REQUEST for c in sent)
+        assert len(sent) == 3
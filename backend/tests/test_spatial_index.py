@@ -0,0 +1,67 @@
+"""
+Tests del índice espacial y de sus usos (composición y párrafos).
+"""
+
+import random
+
+from app.db.models import TextRegion
+from app.services.compose_service import effective_bboxes_for_compose
+from app.services.ocr_regions import group_lines_into_paragraphs
+from app.services.spatial_index import SpatialIndex, boxes_intersect
+
+
+def _random_boxes(n, seed=0):
+    rng = random.Random(seed)
+    boxes = []
+    for _ in range(n):
+        x, y = rng.uniform(0, 3000), rng.uniform(0, 4000)
+        boxes.append([x, y, x + rng.uniform(1, 200), y + rng.uniform(1, 60)])
+    boxes.append([0, 0, 3000, 4000])  # caja desmesurada
+    boxes.append([500, 500, 500, 520])  # degenerada (ancho 0)
+    return boxes
+
+
+def _line(i, bbox, text="行"):
+    x1, y1, x2, y2 = bbox
+    return TextRegion(
+        id=str(i), project_id="p", page_number=0, bbox=bbox,
+        bbox_normalized=[x1 / 1000, y1 / 1000, x2 / 1000, y2 / 1000], src_text=text, confidence=0.9,
+    )
+
+
+class TestSpatialIndex:
+    def test_query_matches_brute_force(self):
+        boxes = _random_boxes(2000)
+        index = SpatialIndex(boxes)
+        rng = random.Random(1)
+        for _ in range(200):
+            x, y = rng.uniform(-100, 3000), rng.uniform(-100, 4000)
+            rect = [x, y, x + rng.uniform(0, 800), y + rng.uniform(0, 800)]
+            assert index.query(rect) == [i for i, b in enumerate(boxes) if boxes_intersect(b, rect)]
+
+    def test_isolation_and_neighbors(self):
+        boxes = _random_boxes(500, seed=2)[:-2]
+        index = SpatialIndex(boxes)
+        for i, box in enumerate(boxes):
+            expected = not any(j != i and boxes_intersect(box, other) for j, other in enumerate(boxes))
+            assert index.is_isolated(i) == expected
+        near = SpatialIndex([[0, 0, 10, 10], [15, 0, 25, 10], [100, 100, 110, 110]])
+        assert near.neighbors(0, 6, 0) == [1]
+
+    def test_compose_expands_only_isolated_regions(self):
+        regions = [_line(0, [0, 100, 50, 120]), _line(1, [40, 110, 90, 130]), _line(2, [300, 100, 350, 120])]
+        bboxes = effective_bboxes_for_compose(regions, img_h=1000)
+        assert bboxes[0] == [0, 100, 50, 120] and bboxes[1] == [40, 110, 90, 130]
+        assert bboxes[2] == [300.0, 98.0, 350.0, 122.0]
+
+
+class TestParagraphGrouping:
+    def test_interleaved_columns_stay_separate(self):
+        left = [_line(f"L{k}", [0, 100 + k * 30, 200, 120 + k * 30], f"左{k}") for k in range(3)]
+        right = [_line(f"R{k}", [400, 105 + k * 30, 600, 125 + k * 30], f"右{k}") for k in range(3)]
+        paragraphs = group_lines_into_paragraphs(left + right)
+        assert sorted(p.src_text for p in paragraphs) == ["右0 右1 右2", "左0 左1 左2"]
+
+    def test_distant_lines_are_not_merged(self):
+        lines = [_line(0, [0, 0, 200, 20]), _line(1, [0, 25, 200, 45]), _line(2, [0, 200, 200, 220])]
+        assert [p.src_text for p in group_lines_into_paragraphs(lines)] == ["行 行", "行"]
@@ -0,0 +1,62 @@
+"""
+Tests del motor de maquetación (búsqueda binaria, wrap en N líneas, caché).
+"""
+
+import pytest
+
+from app.services import text_layout
+from app.services.text_layout import fit_text, measure
+
+FONT = "DejaVuSans"
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    measure.cache_clear()
+    fit_text.cache_clear()
+    yield
+
+
+def _linear_fit(text, width, height):
+    """Referencia: primer tamaño que cabe bajando de max a min."""
+    for size in range(text_layout.MAX_FONT_SIZE, text_layout.MIN_FONT_SIZE - 1, -1):
+        layout = text_layout._layout_at(FONT, size, text, width, height)
+        if layout is not None:
+            return layout.font_size
+    return text_layout.MIN_FONT_SIZE
+
+
+class TestFitText:
+    @pytest.mark.parametrize("text,width,height", [
+        ("Relé", 120, 40),
+        ("Interruptor automático principal", 200, 90),
+        ("Fuente de alimentación del módulo de control", 150, 200),
+        ("Motor", 30, 400),
+        ("A", 500, 500),
+    ])
+    def test_binary_search_matches_linear_scan(self, text, width, height):
+        assert fit_text(text, width, height, font_family=FONT).font_size == _linear_fit(text, width, height)
+
+    def test_wraps_into_more_than_two_lines(self):
+        text = "Fuente de alimentación del módulo de control auxiliar"
+        layout = fit_text(text, 120, 300, font_family=FONT)
+        assert len(layout.lines) > 2
+        assert " ".join(layout.lines) == text
+        assert max(layout.line_widths) <= 120
+        assert layout.total_height <= 300
+        assert not layout.overflow
+
+    def test_overflow_and_fixed_size_use_single_line(self):
+        overflow = fit_text("Supercalifragilístico", 10, 5, font_family=FONT)
+        assert overflow.overflow and overflow.font_size == text_layout.MIN_FONT_SIZE
+        fixed = fit_text("Texto largo sin ajuste", 10, 5, font_family=FONT, fixed_font_size=30)
+        assert fixed.lines == ("Texto largo sin ajuste",) and fixed.font_size == 30
+        assert not fixed.overflow
+
+    def test_repeated_layout_does_no_new_measurements(self):
+        fit_text("Contactor principal", 140, 40, font_family=FONT)
+        misses = measure.cache_info().misses
+        # Misma etiqueta en otra página/caja igual: ni medidas ni maquetación nuevas
+        fit_text("Contactor principal", 140, 40, font_family=FONT)
+        assert measure.cache_info().misses == misses
+        assert fit_text.cache_info().hits == 1
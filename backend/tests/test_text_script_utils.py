@@ -0,0 +1,54 @@
+"""
+Tests de la clasificación Han por regex (ratio y runs por lotes).
+"""
+
+import itertools
+import random
+
+from app.services.text_script_utils import classify_text, classify_texts, han_ratio, han_ratios, has_han
+
+# Rangos Han de referencia, comprobados carácter a carácter con ord()
+_HAN_RANGES = [
+    (0x4E00, 0x9FFF), (0x3400, 0x4DBF), (0x20000, 0x2A6DF), (0x2A700, 0x2B73F),
+    (0x2B740, 0x2B81F), (0x2B820, 0x2CEAF), (0xF900, 0xFAFF), (0x2F800, 0x2FA1F),
+]
+
+# Bordes de cada rango Han y sus vecinos inmediatos
+_EDGES = "".join(chr(c) for lo, hi in _HAN_RANGES for c in (lo - 1, lo, hi, hi + 1))
+
+
+def _is_han(char):
+    return any(lo <= ord(char) <= hi for lo, hi in _HAN_RANGES)
+
+
+def _reference_ratio(text):
+    return sum(map(_is_han, text)) / len(text) if text else 0.0
+
+
+def _reference_runs(text):
+    return [(is_han, "".join(chars)) for is_han, chars in itertools.groupby(text, _is_han)]
+
+
+def _page_texts(n, max_len):
+    rng = random.Random(0)
+    alphabet = "继电器控制回路电源模块断路开关接触AC220V-K1QF ()/"
+    return ["".join(rng.choice(alphabet) for _ in range(rng.randint(1, max_len))) for _ in range(n)]
+
+
+class TestScriptClassification:
+    def test_matches_codepoint_ranges(self):
+        texts = _page_texts(500, 40) + [_EDGES, "AC220V", "继电器", "K1继电器KM2", " 电 "]
+        assert han_ratios(texts) == [_reference_ratio(t) for t in texts]
+        assert [list(p.runs) for p in classify_texts(texts)] == [_reference_runs(t) for t in texts]
+
+    def test_profile_combines_ratio_and_runs(self):
+        profile = classify_text("K1继电器")
+        assert profile.han_count == 3 and profile.length == 5
+        assert profile.han_ratio == han_ratio("K1继电器") == 0.6
+        assert profile.runs == ((False, "K1"), (True, "继电器"))
+
+    def test_empty_text(self):
+        assert classify_text("").runs == ()
+        assert classify_text("").han_ratio == 0.0
+        assert han_ratio("") == 0.0
+        assert not has_han("") and has_han("AC继")
@@ -0,0 +1,79 @@
+"""
+Tests de la generación de thumbnails en segundo plano, por tramos de páginas.
+"""
+
+import asyncio
+
+import fitz
+import pytest
+
+from app.settings_cache import use_config_snapshot
+from app.services import executors, render_service, thumbnail_service
+
+
+@pytest.fixture
+def project(tmp_path):
+    doc = fitz.open()
+    for n in range(5):
+        page = doc.new_page(width=200, height=300)
+        page.insert_text((20, 40), f"P{n}")
+    doc.save(tmp_path / "src.pdf")
+    doc.close()
+    return tmp_path
+
+
+@pytest.fixture
+def in_threads():
+    with use_config_snapshot({"cpu_executor_workers": 0}):
+        yield
+
+
+class TestPageRanges:
+    @pytest.mark.parametrize("page_count,workers,sizes", [
+        (200, 4, [8] * 25),
+        (20, 4, [5] * 4),
+        (3, 8, [1, 1, 1]),
+        (10, 1, [8, 2]),
+        (0, 4, []),
+    ])
+    def test_contiguous_ranges_in_order(self, page_count, workers, sizes):
+        ranges = thumbnail_service.page_ranges(page_count, workers)
+        assert [len(r) for r in ranges] == sizes
+        assert [n for r in ranges for n in r] == list(range(page_count))
+
+
+class TestRenderThumbnails:
+    def test_start_returns_immediately_and_pages_become_ready(self, project, in_threads):
+        async def main():
+            task = thumbnail_service.start("p1", project / "src.pdf", project, 5)
+            assert thumbnail_service.is_running("p1")
+            assert thumbnail_service.ready_pages(project, 5) == [False] * 5
+            await task
+            await asyncio.sleep(0)  # done-callback
+            return thumbnail_service.is_running("p1")
+
+        assert asyncio.run(main()) is False
+        assert thumbnail_service.ready_pages(project, 5) == [True] * 5
+        assert render_service.page_manifest(project, 4)["dpis"] == [150]
+
+    def test_busy_pool_is_retried(self, project, monkeypatch):
+        monkeypatch.setattr(thumbnail_service, "BUSY_RETRY_SECONDS", 0)
+        calls = []
+
+        async def flaky_run_cpu(func, *args):
+            calls.append(args[-2])
+            if len(calls) == 1:
+                raise executors.ExecutorBusyError("cpu", 2)
+            return func(*args)
+
+        monkeypatch.setattr(executors, "run_cpu", flaky_run_cpu)
+        monkeypatch.setattr(thumbnail_service, "get_cpu_executor_workers", lambda: 2)
+        asyncio.run(thumbnail_service.render_thumbnails("p1", project / "src.pdf", project, 5))
+        assert calls[0] == range(0, 3)
+        assert sorted(calls, key=lambda r: r.start) == [range(0, 3), range(0, 3), range(3, 5)]
+        assert thumbnail_service.ready_pages(project, 5) == [True] * 5
+
+    def test_range_stops_when_project_was_deleted(self, project, tmp_path):
+        gone = tmp_path / "deleted"
+        render_service.render_thumbnails_only(project / "src.pdf", gone, range(0, 5))
+        assert not gone.exists()
@@ -0,0 +1,174 @@
+"""
+Tests de la pirámide de teselas: geometría, contenido, invalidación parcial
+tras una composición incremental y cabeceras de caché de la API.
+"""
+
+import copy
+import os
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw
+
+from app.settings_cache import use_config_snapshot
+from app.db.models import Project, TextRegion
+from app.services import compose_service, compose_state, image_cache, tile_service
+
+
+@pytest.fixture(autouse=True)
+def clean_caches():
+    compose_state.clear_states()
+    image_cache.clear()
+    yield
+    compose_state.clear_states()
+    image_cache.clear()
+
+
+@pytest.fixture
+def original(tmp_path):
+    img = Image.new("RGB", (1300, 900), "white")
+    draw = ImageDraw.Draw(img)
+    for x in range(0, 1300, 41):
+        draw.line([(x, 0), (x + 200, 900)], fill=(30, 30, 200), width=3)
+    path = tmp_path / "pages" / "000_original_450.png"
+    path.parent.mkdir(parents=True)
+    img.save(path)
+    return path
+
+
+def _region(rid, bbox, text):
+    return TextRegion(
+        id=rid, project_id="p", page_number=0, bbox=bbox, bbox_normalized=[0, 0, 0, 0],
+        src_text="继电器", tgt_text=text,
+    )
+
+
+_REGIONS = [_region("a", [40, 40, 300, 90], "Relé térmico"), _region("b", [900, 700, 1200, 760], "Fusible")]
+
+
+def _compose(original, regions):
+    return compose_service.compose_page(original, copy.deepcopy(regions), original.parent.parent, 0, 450)
+
+
+def _tile(path):
+    with Image.open(path) as img:
+        return np.asarray(img.convert("RGB"))
+
+
+class TestPyramid:
+    def test_levels_down_to_a_single_tile(self, original):
+        info = tile_service.pyramid_info(original, 512)
+        assert (info["width"], info["height"], info["min_level"], info["max_level"]) == (1300, 900, 9, 11)
+        sizes = [(lv["width"], lv["height"], len(lv["versions"][0]), len(lv["versions"])) for lv in info["levels"]]
+        assert sizes == [(325, 225, 1, 1), (650, 450, 2, 1), (1300, 900, 3, 2)]
+
+    def test_tiles_are_cut_and_downscaled_from_the_page(self, original):
+        page = _tile(original)
+        path, _ = tile_service.get_tile(original, 512, 11, 2, 1)
+        assert (_tile(path) == page[512:900, 1024:1300]).all()
+
+        path, _ = tile_service.get_tile(original, 256, 10, 2, 1)
+        expected = np.asarray(Image.fromarray(page[512:900, 1024:1300]).resize((138, 194), Image.Resampling.BOX))
+        assert (_tile(path) == expected).all()
+
+        with pytest.raises(ValueError):
+            tile_service.get_tile(original, 512, 11, 3, 0)
+
+    def test_one_bit_page_gives_one_bit_full_resolution_tiles(self, original):
+        Image.open(original).convert("1").save(original)
+        path, _ = tile_service.get_tile(original, 512, 11, 0, 0)
+        assert Image.open(path).mode == "1"
+        path, _ = tile_service.get_tile(original, 512, 9, 0, 0)
+        assert Image.open(path).mode == "L"
+
+
+class TestInvalidation:
+    def test_incremental_compose_changes_only_touched_tiles(self, original):
+        translated = _compose(original, _REGIONS)
+        before = tile_service.pyramid_info(translated, 256)
+        kept, _ = tile_service.get_tile(translated, 256, 11, 0, 3)
+
+        edited = [_REGIONS[0], _region("b", [900, 700, 1200, 760], "Fusible rápido")]
+        _compose(original, edited)
+        after = tile_service.pyramid_info(translated, 256)
+        full_before, full_after = before["levels"][-1]["versions"], after["levels"][-1]["versions"]
+        changed = {(c, r) for r, row in enumerate(full_after) for c, v in enumerate(row) if v != full_before[r][c]}
+        # Región b (con margen) en píxeles 880..1220 x 690..770 -> columnas 3-4, filas 2-3
+        assert changed == {(3, 2), (4, 2), (3, 3), (4, 3)}
+        assert before["levels"][0]["versions"] != after["levels"][0]["versions"]
+        assert kept.exists()
+
+        path, version = tile_service.get_tile(translated, 256, 11, 4, 2)
+        assert version == full_after[2][4]
+        assert (_tile(path) == _tile(translated)[512:768, 1024:1280]).all()
+
+    def test_unrecorded_rewrite_invalidates_every_tile(self, original):
+        before = tile_service.pyramid_info(original, 512)
+        old, _ = tile_service.get_tile(original, 512, 11, 0, 0)
+        Image.open(original).rotate(180).save(original)
+        os.utime(original, ns=(1, 1))
+        after = tile_service.pyramid_info(original, 512)
+        # mtime hacia atrás: la versión no se repite ni retrocede
+        versions = {v for lv in after["levels"] for row in lv["versions"] for v in row}
+        assert len(versions) == 1 and int(versions.pop(), 16) > int(before["levels"][-1]["versions"][0][0], 16)
+        assert not old.exists()
+
+
+class TestStaleTiles:
+    def test_tile_written_after_a_reset_is_dropped(self, original, monkeypatch):
+        write = tile_service.write_atomic
+        rewritten = []
+
+        def rewrite_then_write(path, data):
+            # La PNG cambia y la pirámide se rehace justo antes de escribir la tesela
+            if path.suffix == ".png" and not rewritten:
+                rewritten.append(True)
+                Image.open(original).rotate(180).save(original)
+                tile_service.record_update(original, None)
+            write(path, data)
+
+        tile_service.pyramid_info(original, 512)
+        monkeypatch.setattr(tile_service, "write_atomic", rewrite_then_write)
+        path, version = tile_service.get_tile(original, 512, 11, 0, 0)
+        assert (_tile(path) == _tile(original)[:512, :512]).all()
+        tiles = list((tile_service._tiles_root(original) / original.stem).rglob("*.png"))
+        assert tiles == [path]
+        assert tile_service.cached_tile(original, 512, 11, 0, 0, version) == path
+
+    def test_cached_tile_is_not_served_for_another_source(self, original):
+        path, version = tile_service.get_tile(original, 512, 11, 0, 0)
+        Image.open(original).rotate(180).save(original)
+        assert tile_service.cached_tile(original, 512, 11, 0, 0, version) is None
+        assert path.exists()  # se borra al rehacer la pirámide, no al consultar
+        assert tile_service.get_tile(original, 512, 11, 0, 0)[1] != version
+        assert not path.exists()
+
+
+class TestTileApi:
+    @pytest.fixture
+    def client(self, original):
+        repo = MagicMock()
+        repo.get.return_value = Project(id="p", name="p", page_count=1)
+        with patch("app.api.page_images.PROJECTS_DIR", original.parent.parent.parent), \
+             patch("app.api.page_images.projects_repo", repo), \
+             use_config_snapshot({"cpu_executor_workers": 0}):
+            from app.main import app
+            from fastapi.testclient import TestClient
+            yield TestClient(app)
+
+    def test_current_version_is_cached_for_a_year(self, client, original):
+        base = f"/projects/{original.parent.parent.name}/pages/0/tiles"
+        info = client.get(base, params={"tile_size": 512})
+        assert info.status_code == 200 and info.headers["cache-control"] == "no-cache"
+        version = info.json()["levels"][-1]["versions"][1][2]
+
+        tile = client.get(f"{base}/11/2/1", params={"v": version})
+        assert tile.status_code == 200 and tile.headers["content-type"] == "image/png"
+        assert "immutable" in tile.headers["cache-control"]
+        assert client.get(f"{base}/11/2/1", params={"v": version}).content == tile.content
+
+        assert client.get(f"{base}/11/2/1", params={"v": "ab"}).headers["cache-control"] == "no-cache"
+        assert client.get(f"{base}/11/2/1", params={"v": "../x"}).headers["cache-control"] == "no-cache"
+        assert client.get(f"{base}/11/9/9").status_code == 404
+        assert client.get(base, params={"tile_size": 300}).status_code == 400
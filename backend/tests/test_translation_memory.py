@@ -0,0 +1,83 @@
+"""
+Tests de la memoria de traducción (SQLite) y su uso desde translate_service.
+"""
+
+from unittest.mock import patch
+
+import pytest
+
+from app.db.translation_memory import TranslationMemory, glossary_fingerprint
+
+
+@pytest.fixture
+def memory(tmp_path):
+    return TranslationMemory(tmp_path / "tm.sqlite3", max_entries=10)
+
+
+class TestTranslationMemory:
+    def test_store_and_lookup(self, memory):
+        memory.store({"继电器": "Relé"}, "ZH", "ES")
+        assert memory.lookup(["继电器", "急停"], "ZH", "ES") == {"继电器": "Relé"}
+        assert memory.hits == 1
+        assert memory.misses == 1
+
+    def test_key_includes_language_pair_and_glossary(self, memory):
+        memory.store({"继电器": "Relé"}, "ZH", "ES", glossary_fp="a")
+        assert memory.lookup(["继电器"], "ZH", "EN-GB", glossary_fp="a") == {}
+        assert memory.lookup(["继电器"], "ZH", "ES", glossary_fp="b") == {}
+        assert memory.lookup(["继电器"], "ZH", "ES", glossary_fp="a") == {"继电器": "Relé"}
+
+    def test_eviction_keeps_recently_used(self, memory):
+        memory.store({f"t{i}": f"x{i}" for i in range(10)}, "ZH", "ES")
+        memory.lookup(["t0"], "ZH", "ES")
+        memory.store({"nuevo": "y"}, "ZH", "ES")
+        stats = memory.stats()
+        assert stats["entries"] == 9
+        assert memory.lookup(["t0", "nuevo"], "ZH", "ES") == {"t0": "x0", "nuevo": "y"}
+
+    def test_persists_across_instances(self, tmp_path):
+        TranslationMemory(tmp_path / "tm.sqlite3").store({"急停": "Parada de emergencia"}, "ZH", "ES")
+        reopened = TranslationMemory(tmp_path / "tm.sqlite3")
+        assert reopened.lookup(["急停"], "ZH", "ES") == {"急停": "Parada de emergencia"}
+
+    def test_glossary_fingerprint_is_order_independent(self):
+        a = glossary_fingerprint({"a": "1", "b": "2"})
+        b = glossary_fingerprint({"b": "2", "a": "1"})
+        assert a == b
+        assert glossary_fingerprint({}) == ""
+
+
+class TestTranslateBatchWithMemory:
+    def test_second_call_needs_no_network(self, memory):
+        from app.services import translate_service
+
+        sent = []
+
+        class FakeResult:
+            def __init__(self, text):
+                self.text = text
+
+        class FakeTranslator:
+            def translate_text(self, texts, source_lang, target_lang):
+                sent.append(list(texts))
+                return [FakeResult(f"ES:{t}") for t in texts]
+
+        with patch.object(translate_service, "translation_memory", memory), \
+             patch.object(translate_service, "get_translation_memory_enabled", return_value=True), \
+             patch.object(translate_service, "_get_api_key", return_value="key"), \
+             patch.object(translate_service, "_get_translator", return_value=FakeTranslator()):
+            first = translate_service.translate_batch(["继电器", "急停", "继电器"])
+            second = translate_service.translate_batch(["继电器", "急停"])
+
+        assert first == ["ES:继电器", "ES:急停", "ES:继电器"]
+        assert second == ["ES:继电器", "ES:急停"]
+        assert sent == [["继电器", "急停"]]
+
+    def test_fallback_results_are_not_stored(self, memory):
+        from app.services import translate_service
+
+        with patch.object(translate_service, "translation_memory", memory), \
+             patch.object(translate_service, "get_translation_memory_enabled", return_value=True), \
+             patch.object(translate_service, "_get_api_key", return_value=""):
+            assert translate_service.translate_batch(["继电器"]) == ["[ES] 继电器"]
+        assert memory.stats()["entries"] == 0
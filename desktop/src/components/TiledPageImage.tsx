@@ -0,0 +1,75 @@
+import type { TilePyramid, TilePyramidLevel } from '../lib/api'
+
+interface TiledPageImageProps {
+  pyramid: TilePyramid
+  // Píxeles de pantalla por píxel de la imagen completa
+  scale: number
+  tileUrl: (level: number, col: number, row: number, version: string) => string
+  alt: string
+}
+
+// Nivel más pequeño que sigue siendo nítido a esta escala (en píxeles físicos)
+function pickLevel(pyramid: TilePyramid, scale: number): number {
+  const ratio = scale * (window.devicePixelRatio || 1)
+  const level = pyramid.max_level + Math.ceil(Math.log2(Math.max(ratio, 1e-6)))
+  return Math.min(pyramid.max_level, Math.max(pyramid.min_level, level))
+}
+
+function LevelTiles({ pyramid, level, scale, tileUrl }: {
+  pyramid: TilePyramid
+  level: TilePyramidLevel
+  scale: number
+  tileUrl: TiledPageImageProps['tileUrl']
+}) {
+  const size = pyramid.tile_size
+  // Píxeles de pantalla por píxel de este nivel
+  const levelScale = scale * 2 ** (pyramid.max_level - level.level)
+  return (
+    <>
+      {level.versions.map((row, r) =>
+        row.map((version, c) => (
+          <img
+            key={`${level.level}/${c}/${r}`}
+            src={tileUrl(level.level, c, r, version)}
+            alt=""
+            loading="lazy"
+            draggable={false}
+            className="absolute block select-none"
+            style={{
+              left: c * size * levelScale,
+              top: r * size * levelScale,
+              width: Math.min(size, level.width - c * size) * levelScale,
+              height: Math.min(size, level.height - r * size) * levelScale,
+              maxWidth: 'none',
+            }}
+          />
+        ))
+      )}
+    </>
+  )
+}
+
+/**
+ * Imagen de página por teselas (deep zoom). Pinta solo el nivel de la
+ * pirámide que corresponde al zoom, con el nivel de una tesela debajo
+ * mientras cargan; las teselas fuera de la vista no se descargan. Tras
+ * recomponer, solo cambian de URL (y se descargan) las teselas afectadas.
+ */
+export function TiledPageImage({ pyramid, scale, tileUrl, alt }: TiledPageImageProps) {
+  const byLevel = new Map(pyramid.levels.map((level) => [level.level, level]))
+  const base = byLevel.get(pyramid.min_level)!
+  const current = byLevel.get(pickLevel(pyramid, scale))!
+
+  return (
+    <div
+      data-testid="page-image"
+      role="img"
+      aria-label={alt}
+      className="shadow-lg relative overflow-hidden bg-white"
+      style={{ width: pyramid.width * scale, height: pyramid.height * scale }}
+    >
+      <LevelTiles pyramid={pyramid} level={base} scale={scale} tileUrl={tileUrl} />
+      {current !== base && <LevelTiles pyramid={pyramid} level={current} scale={scale} tileUrl={tileUrl} />}
+    </div>
+  )
+}
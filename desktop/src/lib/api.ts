@@ -30,8 +30,11 @@ export interface Project {
   page_count: number
   created_at: string
   document_type: 'schematic' | 'manual'
+  color_mode: ColorMode
 }
 
+export type ColorMode = 'auto' | 'rgb' | 'gray' | 'bilevel'
+
 export interface Page {
   page_number: number
   has_original: boolean
@@ -39,6 +42,28 @@ export interface Page {
   text_region_count: number
 }
 
+export interface ThumbnailsStatus {
+  ready: boolean[]
+  pending: boolean
+}
+
+export interface TilePyramidLevel {
+  level: number
+  width: number
+  height: number
+  // Versión de cada tesela, fila a fila (va en su URL)
+  versions: string[][]
+}
+
+export interface TilePyramid {
+  width: number
+  height: number
+  tile_size: number
+  min_level: number
+  max_level: number
+  levels: TilePyramidLevel[]
+}
+
 export interface TextRegion {
   id: string
   page_number: number
@@ -81,6 +106,7 @@ export interface Job {
   progress: number
   current_step: string | null
   error: string | null
+  result?: string | null
 }
 
 export interface Settings {
@@ -102,14 +128,16 @@ export const projectsApi = {
     name: string,
     file: File,
     documentType?: 'schematic' | 'manual',
-    rotation?: number
+    rotation?: number,
+    colorMode?: ColorMode
   ) => {
     const formData = new FormData()
     formData.append('file', file)
     const docType = documentType || 'schematic'
     const rot = typeof rotation === 'number' ? rotation : 0
+    const color = colorMode ? `&color_mode=${colorMode}` : ''
     return api.post<Project>(
-      `/projects?name=${encodeURIComponent(name)}&document_type=${docType}&rotation=${rot}`,
+      `/projects?name=${encodeURIComponent(name)}&document_type=${docType}&rotation=${rot}${color}`,
       formData
     )
   },
@@ -129,6 +157,8 @@ export const projectsApi = {
 
 export const pagesApi = {
   list: (projectId: string) => api.get<Page[]>(`/projects/${projectId}/pages`),
+  getThumbnailsStatus: (projectId: string) =>
+    api.get<ThumbnailsStatus>(`/projects/${projectId}/pages/thumbnails`),
   renderOriginal: (projectId: string, pageNumber: number, dpi = 450) =>
     api.post(`/projects/${projectId}/pages/${pageNumber}/render-original?dpi=${dpi}`),
   runOcr: (projectId: string, pageNumber: number, dpi = 450) =>
@@ -150,6 +180,23 @@ export const pagesApi = {
     api.post(`/projects/${projectId}/pages/${pageNumber}/render-translated?dpi=${dpi}&preview=${preview}`),
   getImageUrl: (projectId: string, pageNumber: number, kind: 'original' | 'translated', dpi = 450) =>
     `${apiBaseUrl}/projects/${projectId}/pages/${pageNumber}/image?kind=${kind}&dpi=${dpi}`,
+  getTiles: (projectId: string, pageNumber: number, kind: 'original' | 'translated', dpi = 450, tileSize = 512) =>
+    api.get<TilePyramid>(
+      `/projects/${projectId}/pages/${pageNumber}/tiles?kind=${kind}&dpi=${dpi}&tile_size=${tileSize}`
+    ),
+  getTileUrl: (
+    projectId: string,
+    pageNumber: number,
+    kind: 'original' | 'translated',
+    level: number,
+    col: number,
+    row: number,
+    version: string,
+    dpi = 450,
+    tileSize = 512
+  ) =>
+    `${apiBaseUrl}/projects/${projectId}/pages/${pageNumber}/tiles/${level}/${col}/${row}` +
+    `?kind=${kind}&dpi=${dpi}&tile_size=${tileSize}&v=${version}`,
   getThumbnailUrl: (projectId: string, pageNumber: number, kind: 'original' | 'translated') =>
     `${apiBaseUrl}/projects/${projectId}/pages/${pageNumber}/thumbnail?kind=${kind}`,
 }
@@ -169,6 +216,10 @@ export const globalGlossaryApi = {
 export const jobsApi = {
   startRenderAll: (projectId: string, dpi = 450) =>
     api.post<Job>(`/projects/${projectId}/jobs/render-all/async?dpi=${dpi}`),
+  startExport: (projectId: string, dpi = 450, mode: 'raster' | 'vector' = 'raster') =>
+    api.post<Job>(`/projects/${projectId}/jobs/export/async?dpi=${dpi}&mode=${mode}`),
+  cancel: (projectId: string, jobId: string) =>
+    api.post<Job>(`/projects/${projectId}/jobs/${jobId}/cancel`),
   getStatus: (projectId: string, jobId: string) =>
     api.get<Job>(`/projects/${projectId}/jobs/${jobId}`),
 }
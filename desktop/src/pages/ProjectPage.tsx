@@ -22,6 +22,7 @@ import { DrawingToolbar } from '../components/DrawingToolbar'
 import { DrawingOverlay } from '../components/DrawingOverlay'
 import { SnippetLibraryPanel } from '../components/SnippetLibraryPanel'
 import { SnippetEditorModal } from '../components/SnippetEditorModal'
+import { TiledPageImage } from '../components/TiledPageImage'
 import { CaptureDialog } from '../components/CaptureDialog'
 import { useUndoRedo } from '../lib/undoRedo'
 import toast from 'react-hot-toast'
@@ -38,7 +39,6 @@ export default function ProjectPage() {
   const [jobProgress, setJobProgress] = useState(0)
   const [jobStep, setJobStep] = useState('')
   const imageViewerRef = useRef<HTMLDivElement>(null)
-  const imageRef = useRef<HTMLImageElement>(null)
   const [imageSize, setImageSize] = useState({ width: 0, height: 0 })
   const [imageTimestamp, setImageTimestamp] = useState(Date.now())
   const [showTranslated, setShowTranslated] = useState(true)
@@ -95,6 +95,14 @@ export default function ProjectPage() {
     enabled: !!projectId,
   })
 
+  // Los thumbnails se generan en segundo plano al crear el proyecto
+  const { data: thumbnails } = useQuery({
+    queryKey: ['thumbnails', projectId],
+    queryFn: () => pagesApi.getThumbnailsStatus(projectId!).then(res => res.data),
+    enabled: !!projectId,
+    refetchInterval: (query) => (query.state.data?.pending ? 1000 : false),
+  })
+
   const { data: regions } = useQuery({
     queryKey: ['regions', projectId, selectedPage],
     queryFn: () => pagesApi.getTextRegions(projectId!, selectedPage).then(res => res.data),
@@ -601,19 +609,6 @@ export default function ProjectPage() {
     setBaseImageScale(fitScale)
   }
 
-  const handleImageLoad = () => {
-    if (imageRef.current) {
-      const naturalWidth = imageRef.current.naturalWidth
-      const naturalHeight = imageRef.current.naturalHeight
-      
-      // Usar dimensiones naturales para el overlay
-      setImageSize({
-        width: naturalWidth,
-        height: naturalHeight,
-      })
-    }
-  }
-
   useEffect(() => {
     // Recalcular cuando ya tenemos tamaño de imagen o cambia el tamaño del visor
     recomputeBaseImageScale()
@@ -777,9 +772,18 @@ export default function ProjectPage() {
   }, [])
 
   const imageKind = (showTranslated && canShowTranslated) ? 'translated' : 'original'
-  const imageUrl = (canShowOriginal || canShowTranslated)
-    ? `${pagesApi.getImageUrl(projectId!, selectedPage, imageKind as 'original' | 'translated')}&t=${imageTimestamp}`
-    : null
+  // Pirámide de teselas de la imagen visible; tras recomponer (imageTimestamp)
+  // solo cambian las versiones de las teselas afectadas
+  const { data: pyramid } = useQuery({
+    queryKey: ['tiles', projectId, selectedPage, imageKind, imageTimestamp],
+    queryFn: () => pagesApi.getTiles(projectId!, selectedPage, imageKind).then(res => res.data),
+    enabled: !!projectId && !!(canShowOriginal || canShowTranslated),
+  })
+
+  useEffect(() => {
+    // Dimensiones naturales de la imagen para el overlay
+    if (pyramid) setImageSize({ width: pyramid.width, height: pyramid.height })
+  }, [pyramid?.width, pyramid?.height])
 
   return (
     <div className="h-full flex flex-col">
@@ -899,16 +903,22 @@ export default function ProjectPage() {
                 selectedPage === i ? 'border-primary-500' : 'border-transparent hover:border-gray-300'
               }`}
             >
-              <img
-                src={pagesApi.getThumbnailUrl(projectId!, i, 'original')}
-                alt={`Página ${i + 1}`}
-                className="w-full aspect-[3/4] object-cover rounded bg-gray-200"
-                onError={(e) => {
-                  // Si la imagen no existe, mostrar placeholder con número
-                  (e.target as HTMLImageElement).style.display = 'none';
-                  (e.target as HTMLImageElement).parentElement!.innerHTML = `<div class="aspect-[3/4] bg-gray-200 rounded flex items-center justify-center text-sm text-gray-500">${i + 1}</div>`;
-                }}
-              />
+              {thumbnails && !thumbnails.ready[i] ? (
+                <div className="aspect-[3/4] bg-gray-200 rounded flex items-center justify-center text-sm text-gray-500">
+                  {i + 1}
+                </div>
+              ) : (
+                <img
+                  src={pagesApi.getThumbnailUrl(projectId!, i, 'original')}
+                  alt={`Página ${i + 1}`}
+                  className="w-full aspect-[3/4] object-cover rounded bg-gray-200"
+                  onError={(e) => {
+                    // Si la imagen no existe, mostrar placeholder con número
+                    (e.target as HTMLImageElement).style.display = 'none';
+                    (e.target as HTMLImageElement).parentElement!.innerHTML = `<div class="aspect-[3/4] bg-gray-200 rounded flex items-center justify-center text-sm text-gray-500">${i + 1}</div>`;
+                  }}
+                />
+              )}
             </button>
           ))}
         </aside>
@@ -1099,21 +1109,15 @@ export default function ProjectPage() {
             </div>
           )}
 
-          {imageUrl ? (
+          {pyramid ? (
             <div className="relative inline-block">
-              <img
-                data-testid="page-image"
-                ref={imageRef}
-                src={imageUrl}
+              <TiledPageImage
+                pyramid={pyramid}
+                scale={imageScale}
+                tileUrl={(level, col, row, version) =>
+                  pagesApi.getTileUrl(projectId!, selectedPage, imageKind, level, col, row, version)
+                }
                 alt={`Página ${selectedPage + 1}`}
-                className="shadow-lg block"
-                style={{
-                  maxWidth: 'none',
-                  maxHeight: 'none',
-                  width: imageSize.width > 0 ? imageSize.width * imageScale : undefined,
-                  height: imageSize.height > 0 ? imageSize.height * imageScale : undefined,
-                }}
-                onLoad={handleImageLoad}
               />
               {/* Overlay interactivo para regiones de texto */}
               {regions && regions.length > 0 && imageSize.width > 0 && (